@@ -0,0 +1,159 @@
+"""
+AI 分析结果缓存
+以「模型 + 规范化后的提示词输入」的内容哈希为键，复用 redis_cache 的 Redis/数据库两层缓存。
+输入数据不变时直接返回上次的分析结果，不再调用 LLM；相同输入的并发请求只调用一次
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import orjson
+
+from redis_cache import get_cached_result, save_cached_result
+
+logger = logging.getLogger(__name__)
+
+# AI 分析缓存过期时间（秒），默认 7 天
+AI_ANALYSIS_CACHE_TTL = int(os.environ.get('AI_ANALYSIS_CACHE_TTL', 7 * 86400))
+# 设为 false 可关闭 AI 分析缓存
+AI_ANALYSIS_CACHE_ENABLED = os.environ.get('AI_ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+
+# 缓存层中的查询类型（CachedResult.query_type / Redis 键前缀）
+AI_CACHE_QUERY_TYPE = 'ai_analysis'
+
+# 正在进行的分析：缓存键 -> Future（相同输入的并发请求共享一次 LLM 调用）
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def analysis_cache_key(kind: str, model: str, inputs: Any) -> str:
+    """
+    计算分析缓存键
+
+    Args:
+        kind: 分析类型（如 person_analysis / gpt5_osint）
+        model: 模型标识（模型或上游接口变化时缓存自动失效）
+        inputs: 提示词输入（字典键排序后序列化，顺序不同的相同数据得到相同的键）
+    """
+    payload = orjson.dumps(
+        {'kind': kind, 'model': model, 'inputs': inputs},
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+    )
+    return hashlib.sha256(payload).hexdigest()
+
+
+async def get_cached_analysis(key: str, db_session=None) -> Optional[Dict[str, Any]]:
+    """查询缓存的分析结果（未启用缓存或未命中时返回 None）"""
+    if not AI_ANALYSIS_CACHE_ENABLED:
+        return None
+    return await get_cached_result(key, AI_CACHE_QUERY_TYPE, db_session)
+
+
+async def save_cached_analysis(
+    key: str,
+    result: Dict[str, Any],
+    db_session=None,
+    ttl: int = AI_ANALYSIS_CACHE_TTL
+):
+    """缓存成功的分析结果"""
+    if not AI_ANALYSIS_CACHE_ENABLED or not result.get('success'):
+        return
+    await save_cached_result(key, AI_CACHE_QUERY_TYPE, result, db_session, ttl)
+    logger.info(f"✅ [AICache] 已缓存分析结果: {key[:12]} (TTL: {ttl}s)")
+
+
+def claim_inflight(key: str) -> asyncio.Future:
+    """登记进行中的分析，相同输入的并发请求等待它（结束时必须调用 release_inflight）"""
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    return future
+
+
+def release_inflight(
+    key: str,
+    future: asyncio.Future,
+    result: Optional[Dict[str, Any]] = None,
+    error: Optional[BaseException] = None
+):
+    """
+    结束进行中的分析：把结果或异常交给等待方并移除登记
+
+    error 为 CancelledError（发起请求被取消、客户端断开）时取消 future，等待方改为自行计算
+    """
+    if not future.done():
+        if isinstance(error, asyncio.CancelledError):
+            future.cancel()
+        elif error is not None:
+            future.set_exception(error)
+            # 没有等待者时避免 "Future exception was never retrieved" 警告
+            future.exception()
+        else:
+            future.set_result(result)
+    if _inflight.get(key) is future:
+        del _inflight[key]
+
+
+async def wait_inflight(key: str) -> Optional[Dict[str, Any]]:
+    """
+    等待相同输入的进行中分析并返回其结果
+
+    没有进行中的分析、或发起该分析的请求被取消（如客户端断开）时返回 None，由调用方自行计算
+    """
+    while True:
+        inflight = _inflight.get(key)
+        if inflight is None:
+            return None
+        logger.info(f"⏳ [AICache] 等待相同输入的进行中分析: {key[:12]}")
+        try:
+            return await asyncio.shield(inflight)
+        except asyncio.CancelledError:
+            if not inflight.cancelled():
+                # 当前请求本身被取消
+                raise
+            logger.warning(f"⚠️ [AICache] 进行中的分析已取消，改为自行计算: {key[:12]}")
+
+
+async def cached_analysis(
+    key: str,
+    compute: Callable[[], Awaitable[Dict[str, Any]]],
+    db_session=None,
+    ttl: int = AI_ANALYSIS_CACHE_TTL
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    先查缓存，未命中时执行 compute 并缓存成功的结果
+
+    Args:
+        key: analysis_cache_key 生成的缓存键
+        compute: 实际调用 LLM 的协程工厂
+        db_session: 数据库会话（可选，提供时使用数据库缓存层）
+        ttl: 缓存过期时间（秒）
+
+    Returns:
+        (分析结果, 是否命中缓存)；共享并发请求的结果不算命中缓存
+    """
+    if not AI_ANALYSIS_CACHE_ENABLED:
+        return await compute(), False
+
+    cached = await get_cached_analysis(key, db_session)
+    if cached is not None:
+        logger.info(f"✅ [AICache] 命中缓存: {key[:12]}")
+        return cached, True
+
+    shared = await wait_inflight(key)
+    if shared is not None:
+        return shared, False
+
+    future = claim_inflight(key)
+    result = None
+    error: Optional[BaseException] = None
+    try:
+        result = await compute()
+        await save_cached_analysis(key, result, db_session, ttl)
+        return result, False
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        release_inflight(key, future, result, error)
@@ -0,0 +1,111 @@
+"""
+AI 分析的 SSE 流式输出
+把 LLM 的流式 completion 以 Server-Sent Events 转发给前端：
+- status: 阶段变化（fetching / prompt / queued / analyzing）
+- delta:  LLM 输出的文本增量
+- field:  增量 JSON 解析出的顶层字段（前端可逐步渲染人物档案）
+- reset:  之前收到的 field 作废（LLM 输出中先出现了无效的 JSON 候选对象），之后会重新发送全部字段
+- result: 最终结果（与非流式接口的返回结构相同）
+- error:  出错信息
+命中 AI 分析缓存时直接发送 result；相同输入的分析正在进行时（流式或非流式）等待其结果，
+不再重复调用 LLM；流结束后成功的结果写入缓存
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ai_cache import (
+    claim_inflight, get_cached_analysis, release_inflight, save_cached_analysis, wait_inflight,
+)
+from apis.llm_client import IncrementalJSONExtractor, get_llm_stats, stream_llm
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',  # 关闭 nginx 缓冲，保证事件实时到达
+}
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """编码一条 SSE 事件"""
+    return b'event: ' + event.encode('utf-8') + b'\ndata: ' + dumps(data) + b'\n\n'
+
+
+async def stream_analysis(
+    prompt: str,
+    cache_key: str,
+    finalize: Callable[[str], Dict[str, Any]],
+    build_response: Callable[[Dict[str, Any], bool], Awaitable[Dict[str, Any]]],
+    db_session=None
+) -> AsyncIterator[bytes]:
+    """
+    流式执行一次 AI 分析
+
+    Args:
+        prompt: 已构建的提示词
+        cache_key: ai_cache.analysis_cache_key 生成的缓存键
+        finalize: 把完整 LLM 文本转换为分析结果（与非流式分析函数的返回值相同）
+        build_response: 把分析结果转换为接口响应，参数为 (分析结果, 是否命中缓存)
+        db_session: 数据库会话（可选）
+    """
+    cached = await get_cached_analysis(cache_key, db_session)
+    if cached is not None:
+        yield sse_event('result', await build_response(cached, True))
+        return
+
+    try:
+        shared = await wait_inflight(cache_key)
+    except Exception as e:
+        logger.error(f"❌ [AIStream] 共享的分析失败: {str(e)}")
+        yield sse_event('error', {'success': False, 'error': str(e)})
+        return
+    if shared is not None:
+        yield sse_event('result', await build_response(shared, False))
+        return
+
+    future = claim_inflight(cache_key)
+    result = None
+    # 没有正常结束（客户端断开导致生成器关闭等）时按取消处理，等待方改为自行计算
+    error: Optional[BaseException] = asyncio.CancelledError()
+    try:
+        yield sse_event('status', {'stage': 'queued', 'llm': get_llm_stats()})
+        extractor = IncrementalJSONExtractor()
+        discarded = 0
+        parts = []
+
+        def field_events(fields: List[Tuple[str, Any]]) -> List[bytes]:
+            nonlocal discarded
+            events = []
+            if extractor.discarded != discarded:
+                discarded = extractor.discarded
+                events.append(sse_event('reset', {}))
+            events.extend(sse_event('field', {'key': key, 'value': value}) for key, value in fields)
+            return events
+
+        try:
+            async for chunk in stream_llm(prompt):
+                if not parts:
+                    yield sse_event('status', {'stage': 'analyzing'})
+                parts.append(chunk)
+                yield sse_event('delta', {'text': chunk})
+                for event in field_events(extractor.feed(chunk)):
+                    yield event
+        except Exception as e:
+            error = e
+            logger.error(f"❌ [AIStream] LLM 流式调用失败: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': str(e)})
+            return
+        for event in field_events(extractor.finish()):
+            yield event
+
+        result = finalize(''.join(parts))
+        await save_cached_analysis(cache_key, result, db_session)
+        error = None
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        release_inflight(cache_key, future, result, error)
+    yield sse_event('result', await build_response(result, False))
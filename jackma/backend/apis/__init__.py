@@ -1,48 +1,53 @@
 """
 独立的API模块
 每个API服务都有自己的文件
+
+导出的查询函数按需导入：首次访问 apis.query_xxx 时才加载对应提供商模块，
+导入 apis 的子模块（如 apis.google_api）或启动服务时不会加载全部提供商
 """
-from .osint_industries import query_osint_industries
-from .hibp import query_hibp
-from .social_media_scanner import query_social_media_scanner
-from .caller_id import query_caller_id
-from .truecaller import query_truecaller
-from .ipqualityscore import query_ipqualityscore
-from .whatsapp import query_whatsapp
-from .osint_deep import query_osint_deep_phone
-from .callapp import query_callapp
-from .microsoft_phone import query_microsoft_phone
-from .phone_lookup import query_phone_lookup
-from .data_breach import query_data_breach
-from .aggregator import query_phone_comprehensive, query_email_comprehensive
-from .external_lookup import query_external_lookup
-from .models import PhoneQueryResult, EmailQueryResult
-from .telegram_username import query_telegram_by_username
-
-__all__ = [
+import importlib
+from typing import Any
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
     # 邮箱API
-    'query_osint_industries',
-    'query_hibp',
-    
+    'query_osint_industries': 'osint_industries',
+    'query_hibp': 'hibp',
+
     # 电话API
-    'query_social_media_scanner',
-    'query_caller_id',
-    'query_truecaller',
-    'query_ipqualityscore',
-    'query_whatsapp',
-    'query_osint_deep_phone',
-    'query_callapp',
-    'query_microsoft_phone',
-    'query_phone_lookup',
-    'query_data_breach',
-    
+    'query_social_media_scanner': 'social_media_scanner',
+    'query_caller_id': 'caller_id',
+    'query_truecaller': 'truecaller',
+    'query_ipqualityscore': 'ipqualityscore',
+    'query_whatsapp': 'whatsapp',
+    'query_osint_deep_phone': 'osint_deep',
+    'query_callapp': 'callapp',
+    'query_microsoft_phone': 'microsoft_phone',
+    'query_phone_lookup': 'phone_lookup',
+    'query_data_breach': 'data_breach',
+
     # 聚合查询
-    'query_phone_comprehensive',
-    'query_email_comprehensive',
-    'query_external_lookup',
-    'query_telegram_by_username',
-    
+    'query_phone_comprehensive': 'aggregator',
+    'query_email_comprehensive': 'aggregator',
+    'query_external_lookup': 'external_lookup',
+    'query_telegram_by_username': 'telegram_username',
+
     # 数据模型
-    'PhoneQueryResult',
-    'EmailQueryResult',
-]
+    'PhoneQueryResult': 'models',
+    'EmailQueryResult': 'models',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # 缓存，之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -4,90 +4,158 @@ API聚合器
 """
 import asyncio
 import logging
-from typing import List, Dict, Any
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from .models import PhoneQueryResult, EmailQueryResult
-from .osint_industries import query_osint_industries
-from .hibp import query_hibp
-from .social_media_scanner import query_social_media_scanner
-from .caller_id import query_caller_id
-from .truecaller import query_truecaller
-from .ipqualityscore import query_ipqualityscore
-from .whatsapp import query_whatsapp
-# from .osint_deep import query_osint_deep_phone  # 已删除
-from .callapp import query_callapp
-from .microsoft_phone import query_microsoft_phone
-from .phone_lookup import query_phone_lookup
-from .data_breach import query_data_breach
-from .telegram_complete import query_telegram_complete
-from .investigate_api import query_investigate_api
-from .phone_lookup import query_phone_lookup
-from .telegram_complete import query_telegram_complete
-from .investigate_api import query_investigate_api
-from .external_lookup import query_external_lookup
-from .config import OSINT_INDUSTRIES_API_KEY
+from .blob_store import externalize_inline_images
+from . import provider_registry
+from .provider_registry import ProviderSpec
+from .tracing import set_attributes, start_span, traced
 
 logger = logging.getLogger(__name__)
 
+# 单个提供商查询结束时的回调 (提供商, 耗时秒, 结果: success/error/timeout/exception)，供指标采集使用
+_provider_observers: List[Callable[[str, float, str], None]] = []
 
-async def query_phone_comprehensive(phone: str) -> PhoneQueryResult:
+
+def add_provider_observer(observer: Callable[[str, float, str], None]):
+    """注册提供商查询回调"""
+    if observer not in _provider_observers:
+        _provider_observers.append(observer)
+
+
+async def _timed(provider: str, query: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """执行单个提供商查询（独立 span），并通知回调（耗时与结果分类）"""
+    start = time.perf_counter()
+    outcome = 'exception'
+    try:
+        with start_span(f"provider {provider}", **{'provider.name': provider}) as span:
+            result = await query
+            if isinstance(result, dict) and result.get("success"):
+                outcome = 'success'
+            elif isinstance(result, dict) and 'timeout' in str(result.get("error", "")).lower():
+                outcome = 'timeout'
+            else:
+                outcome = 'error'
+            set_attributes(span, **{'provider.outcome': outcome})
+        return result
+    except asyncio.TimeoutError:
+        outcome = 'timeout'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        for observer in _provider_observers:
+            try:
+                observer(provider, elapsed, outcome)
+            except Exception as e:
+                logger.error(f"❌ 提供商查询回调出错: {str(e)}")
+
+
+async def _call_provider(spec: ProviderSpec, query: str, timeout_cap: Optional[float] = None) -> Dict[str, Any]:
+    """调用单个提供商；有外层超时（提供商声明或查询模式上限，取较小者）时超时后返回失败结果"""
+    coro = provider_registry.resolve(spec)(query, **spec.kwargs)
+    timeouts = [t for t in (spec.timeout, timeout_cap) if t is not None]
+    if not timeouts:
+        return await coro
+    timeout = min(timeouts)
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ [{spec.name}] 查询超时 ({timeout}秒)")
+        return {
+            "success": False,
+            "error": f"Query timeout after {timeout:g} seconds",
+            "source": spec.name
+        }
+
+
+async def _run_providers(specs: List[ProviderSpec], query: str,
+                         timeout_cap: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    并行运行提供商（按 specs 顺序，每个提供商一条结果）
+    有依赖的提供商等依赖全部成功后才开始，任一依赖失败时返回失败结果
+    """
+    tasks: Dict[str, asyncio.Future] = {}
+
+    async def run(spec: ProviderSpec) -> Dict[str, Any]:
+        for dependency in spec.depends_on:
+            try:
+                upstream = await asyncio.shield(tasks[dependency])
+            except Exception:
+                upstream = None
+            if not (isinstance(upstream, dict) and upstream.get("success")):
+                return {
+                    "success": False,
+                    "data": None,
+                    "error": f"Skipped: dependency {dependency} did not succeed",
+                    "source": spec.name
+                }
+        return await _timed(spec.name, _call_provider(spec, query, timeout_cap))
+
+    for spec in specs:
+        tasks[spec.name] = asyncio.ensure_future(run(spec))
+    api_results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    # 收集所有结果（包括失败的）
+    results = []
+    for spec, result in zip(specs, api_results):
+        if isinstance(result, dict):
+            # 添加所有结果，不管成功与否
+            results.append(result)
+        else:
+            # 如果有异常（或返回值无效），转换为失败结果
+            results.append({
+                "success": False,
+                "data": None,
+                "error": str(result),
+                "source": spec.name
+            })
+    return results
+
+
+@traced("query_phone_comprehensive")
+async def query_phone_comprehensive(
+    phone: str,
+    max_cost: Optional[float] = None,
+    mode: str = "deep",
+    reuse: Optional[List[Dict[str, Any]]] = None
+) -> PhoneQueryResult:
     """
-    综合电话号码查询（使用多个API）
+    综合电话号码查询（使用提供商注册表中已启用的电话API）
     
     Args:
         phone: 电话号码
+        max_cost: 只调度单次成本不超过该值的提供商（None 表示不限制）
+        mode: 查询模式，quick 只调度低延迟提供商（运营商、来电姓名等），deep 调度全部
+        reuse: 已有的提供商结果（如快速模式的缓存结果），其中成功的提供商不再调用，结果直接合并
         
     Returns:
         PhoneQueryResult: 包含所有成功API的结果
     """
     try:
-        logger.info(f"📞 开始综合电话查询: {phone}")
-        results = []
+        logger.info(f"📞 开始综合电话查询: {phone} (模式 {mode})")
         
-        # 为 WhatsApp API 设置独立的超时包装
-        async def query_whatsapp_with_timeout(phone: str, timeout: int = 45):
-            """WhatsApp API 带超时控制"""
-            try:
-                return await asyncio.wait_for(query_whatsapp(phone), timeout=timeout)
-            except asyncio.TimeoutError:
-                logger.warning(f"⚠️ [WhatsApp] 查询超时 ({timeout}秒)")
-                return {
-                    "success": False,
-                    "error": f"Query timeout after {timeout} seconds",
-                    "source": "whatsapp"
-                }
+        # 按注册表调度电话提供商（deep 包括 Investigate API、Data Breach API 和 External Lookup API）
+        await provider_registry.refresh_settings()
+        specs = provider_registry.select_for_mode("phone", mode, max_cost=max_cost)
         
-        # 并行运行所有电话API（包括新的 Investigate API、Data Breach API 和 External Lookup API）
-        tasks = [
-            query_social_media_scanner(phone),
-            query_caller_id(phone), 
-            query_truecaller(phone),
-            query_ipqualityscore(phone),
-            query_whatsapp_with_timeout(phone, timeout=45),  # 使用带超时的版本
-            # query_osint_deep_phone(phone),  # 已删除
-            query_callapp(phone),
-            query_microsoft_phone(phone),
-            query_phone_lookup(phone),
-            query_telegram_complete(phone),
-            query_investigate_api(phone, timeout=120),  # 新增：Investigate API（120秒超时）
-            query_data_breach(phone, timeout=120),  # 新增：Data Breach API（120秒超时）
-            query_external_lookup(phone, mode="medium", timeout=120),  # 新增：External Lookup API（120秒超时）
-        ]
+        # 复用已有结果中成功的提供商（快速结果升级为深度结果时只补查其余提供商）
+        reused = {
+            r["source"]: r for r in reuse or []
+            if isinstance(r, dict) and r.get("success") and r.get("source")
+        }
+        pending = [spec for spec in specs if spec.name not in reused]
+        if reused:
+            logger.info(f"♻️ 复用 {len(specs) - len(pending)} 个提供商的已有结果")
         
-        api_results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await _run_providers(pending, phone, timeout_cap=provider_registry.mode_timeout(mode))
+        logger.info(f"💰 电话查询调度 {len(pending)} 个提供商，估算成本 ${sum(s.cost for s in pending):.3f}")
         
-        # 收集所有结果（包括失败的）
-        for result in api_results:
-            if isinstance(result, dict):
-                # 添加所有结果，不管成功与否
-                results.append(result)
-            elif isinstance(result, Exception):
-                # 如果有异常，转换为失败结果
-                results.append({
-                    "success": False,
-                    "data": None,
-                    "error": str(result),
-                    "source": "unknown"
-                })
+        # 内联 Base64 图片外置到 Blob 存储，避免写入缓存/数据库（复用的结果已外置）
+        results = await asyncio.to_thread(externalize_inline_images, results)
+        if reused:
+            fresh = dict(zip((spec.name for spec in pending), results))
+            results = [fresh[spec.name] if spec.name in fresh else reused[spec.name] for spec in specs]
         
         successful_count = len([r for r in results if r.get("success", False)])
         logger.info(f"✅ 电话查询完成: {successful_count}/{len(results)} 个API返回成功")
@@ -95,6 +163,7 @@ async def query_phone_comprehensive(phone: str) -> PhoneQueryResult:
         return PhoneQueryResult(
             success=len(results) > 0,
             phone=phone,
+            mode=mode,
             data=results if results else None,
             error=None if results else "所有API查询均失败"
         )
@@ -105,17 +174,20 @@ async def query_phone_comprehensive(phone: str) -> PhoneQueryResult:
         return PhoneQueryResult(
             success=False,
             phone=phone,
+            mode=mode,
             data=None,
             error=error_msg
         )
 
 
-async def query_email_comprehensive(email: str) -> EmailQueryResult:
+@traced("query_email_comprehensive")
+async def query_email_comprehensive(email: str, max_cost: Optional[float] = None) -> EmailQueryResult:
     """
-    综合邮箱查询（仅使用 OSINT Industries API）
+    综合邮箱查询（使用提供商注册表中已启用的邮箱API，默认仅 OSINT Industries）
     
     Args:
         email: 邮箱地址
+        max_cost: 只调度单次成本不超过该值的提供商（None 表示不限制）
         
     Returns:
         EmailQueryResult: 查询结果
@@ -123,9 +195,16 @@ async def query_email_comprehensive(email: str) -> EmailQueryResult:
     try:
         logger.info(f"📧 开始邮箱查询: {email}")
         
+        await provider_registry.refresh_settings()
+        specs = provider_registry.select_providers("email", max_cost=max_cost)
+        
         # 检查 API 密钥是否配置
-        if not OSINT_INDUSTRIES_API_KEY or len(OSINT_INDUSTRIES_API_KEY) < 10:
-            error_msg = "OSINT Industries API key 未配置。请在 .env 文件中添加 OSINT_INDUSTRIES_API_KEY。"
+        if not specs:
+            osint_industries = provider_registry.get_provider("osint_industries")
+            if provider_registry.is_enabled("osint_industries") and not provider_registry.is_configured(osint_industries):
+                error_msg = "OSINT Industries API key 未配置。请在 .env 文件中添加 OSINT_INDUSTRIES_API_KEY。"
+            else:
+                error_msg = "没有已启用的邮箱查询提供商"
             logger.error(f"❌ {error_msg}")
             return EmailQueryResult(
                 success=False,
@@ -134,19 +213,20 @@ async def query_email_comprehensive(email: str) -> EmailQueryResult:
                 error=error_msg
             )
         
-        # 调用 OSINT Industries API
-        result = await query_osint_industries(email, query_type="email")
+        # 按注册表调度邮箱提供商（默认仅 OSINT Industries）
+        results = await _run_providers(specs, email)
+        successful = [r for r in results if r.get("success")]
         
-        if result.get("success"):
+        if successful:
             logger.info(f"✅ 邮箱查询成功: {email}")
             return EmailQueryResult(
                 success=True,
                 email=email,
-                data=[result],
+                data=successful,
                 error=None
             )
         else:
-            error_msg = result.get("error", "未知错误")
+            error_msg = results[0].get("error", "未知错误")
             
             # 如果是 401 错误，提供更详细的说明
             if "401" in str(error_msg):
@@ -1,25 +1,25 @@
 """
 AI分析器 - 使用ChatGPT分析OSINT数据并提取主要人物资料
 """
-import httpx
-import json
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from .llm_client import LLM_API_URL, complete, extract_json_object
+from .prompt_budget import PROMPT_RECORD_TOKEN_BUDGET, build_record_section, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
-# RapidAPI配置
-RAPIDAPI_KEY = "b491571bafmsh04f7fa840b92045p1a8db2jsn4c5d1dbd653d"
-RAPIDAPI_HOST = "chatgpt-gpt5.p.rapidapi.com"
-API_URL = f"https://{RAPIDAPI_HOST}/ask"
+# 模型标识（参与 AI 分析缓存键，更换模型/接口后旧缓存自动失效）
+MODEL_ID = LLM_API_URL
 
 
-async def analyze_person_data(osint_data: Dict[str, Any]) -> Dict[str, Any]:
+async def analyze_person_data(osint_data: Dict[str, Any], prompt: Optional[str] = None) -> Dict[str, Any]:
     """
     使用AI分析OSINT数据，提取主要人物资料
     
     Args:
         osint_data: OSINT查询返回的原始数据
+        prompt: 已构建的提示词（可选，调用方计算缓存键时已构建则直接复用）
         
     Returns:
         Dict包含:
@@ -30,40 +30,17 @@ async def analyze_person_data(osint_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         # 构建AI提示词
-        prompt = build_analysis_prompt(osint_data)
+        if prompt is None:
+            prompt = build_analysis_prompt(osint_data)
         
-        # 调用ChatGPT API
-        headers = {
-            "Content-Type": "application/json",
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": RAPIDAPI_KEY
-        }
+        logger.info(f"🤖 调用ChatGPT API分析数据（提示词约 {estimate_tokens(prompt)} tokens）...")
         
-        payload = {
-            "query": prompt
-        }
+        # 调用ChatGPT API（受全局并发上限保护）
+        ai_response = await complete(prompt)
         
-        logger.info("🤖 调用ChatGPT API分析数据...")
+        logger.info("✅ AI分析完成")
         
-        async with httpx.AsyncClient(timeout=60) as client:
-            response = await client.post(API_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
-            
-            # 解析AI响应
-            ai_response = result.get("response", "")
-            
-            # 尝试从AI响应中提取JSON格式的人物档案
-            person_profile = extract_person_profile(ai_response)
-            
-            logger.info("✅ AI分析完成")
-            
-            return {
-                "success": True,
-                "analysis": ai_response,
-                "person_profile": person_profile,
-                "raw_response": result
-            }
+        return build_analysis_result(ai_response)
             
     except Exception as e:
         error_msg = str(e)
@@ -74,18 +51,62 @@ async def analyze_person_data(osint_data: Dict[str, Any]) -> Dict[str, Any]:
         }
 
 
-def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
+def build_analysis_result(ai_response: str) -> Dict[str, Any]:
+    """把完整的AI响应文本转换为分析结果（流式与非流式调用共用）"""
+    return {
+        "success": True,
+        "analysis": ai_response,
+        # 尝试从AI响应中提取JSON格式的人物档案
+        "person_profile": extract_person_profile(ai_response),
+        "raw_response": {"response": ai_response}
+    }
+
+
+def _unique(values: Iterable[Any]) -> List[str]:
+    """去重并保持顺序"""
+    return list(dict.fromkeys(str(v) for v in values if v))
+
+
+def iter_source_records(results: List[Any]):
+    """
+    展开 external_search 的结构化结果为 (来源, 记录) 序列
+    
+    兼容旧的字符串格式（每个来源一条字符串）
+    """
+    for result in results:
+        if isinstance(result, dict) and isinstance(result.get("records"), list):
+            for record in result["records"]:
+                yield result.get("source"), record
+        else:
+            yield None, result
+
+
+def assemble_analysis_prompt(
+    osint_data: Dict[str, Any],
+    token_budget: int = PROMPT_RECORD_TOKEN_BUDGET
+) -> Tuple[str, Dict[str, Any]]:
     """
     构建专业OSINT分析提示词 - EFID生成与唯一人判定
+    
+    数据记录按信息量填充到 token_budget 以内
+    
+    Returns:
+        (提示词, 统计信息)，统计信息包含记录数和 prompt_tokens 估算
     """
     # 提取关键信息
     summary = osint_data.get("summary", {})
-    keywords = summary.get("keywords", [])
-    emails = summary.get("email", [])
-    phones = summary.get("phone", [])
+    keywords = _unique(summary.get("keywords", []))
+    emails = _unique(summary.get("email", []))
+    phones = _unique(summary.get("phone", []))
     sources = summary.get("sources", [])
     results = summary.get("results", [])
     
+    records_text, stats = build_record_section(
+        iter_source_records(results),
+        token_budget=token_budget,
+        hints=emails + phones
+    )
+    
     # 构建提示词
     prompt = f"""
 # OSINT 实体分析 - EFID 生成与唯一人判定
@@ -95,10 +116,10 @@ def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
 - **发现的邮箱**: {', '.join(emails) if emails else '无'}
 - **发现的电话**: {', '.join(phones) if phones else '无'}
 - **数据来源**: {len(sources)}个平台
-- **数据记录**: {len(results)}条
+- **数据记录**: {stats['records_total']}条（去重后 {stats['records_unique']} 条，以下按信息量列出 {stats['records_included']} 条）
 
-## 原始JSON数据（异构多源）
-{format_results_sample(results, max_samples=10)}
+## 原始JSON数据（异构多源，每行一条记录，[来源] 开头）
+{records_text}
 
 ---
 
@@ -158,7 +179,7 @@ def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
 
 #### v1 规则
 ```
-拼接格式: v1|{primary_email}|{primary_phone_10}|{birthdate}|{canonical_location}
+拼接格式: v1|{{primary_email}}|{{primary_phone_10}}|{{birthdate}}|{{canonical_location}}
 哈希算法: SHA-256
 输出: efid_v1_sha256
 ```
@@ -261,7 +282,7 @@ def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
         }}
       ]
     }}
-  ]},
+  ],
   
   "security_analysis": {{
     "leaked_passwords": [
@@ -304,26 +325,13 @@ def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
 4. 输出纯JSON，不要包含markdown代码块标记
 """
     
-    return prompt
+    stats["prompt_tokens"] = estimate_tokens(prompt)
+    return prompt, stats
 
 
-def format_results_sample(results: List[str], max_samples: int = 5) -> str:
-    """
-    格式化结果样本用于AI分析
-    """
-    if not results:
-        return "无数据记录"
-    
-    samples = []
-    for i, result in enumerate(results[:max_samples]):
-        # 截断过长的记录
-        truncated = result[:500] + "..." if len(result) > 500 else result
-        samples.append(f"记录{i+1}: {truncated}")
-    
-    if len(results) > max_samples:
-        samples.append(f"... 还有 {len(results) - max_samples} 条记录")
-    
-    return "\n".join(samples)
+def build_analysis_prompt(osint_data: Dict[str, Any]) -> str:
+    """构建专业OSINT分析提示词（不需要统计信息时使用）"""
+    return assemble_analysis_prompt(osint_data)[0]
 
 
 def extract_person_profile(ai_response: str) -> Dict[str, Any]:
@@ -331,20 +339,11 @@ def extract_person_profile(ai_response: str) -> Dict[str, Any]:
     从AI响应中提取JSON格式的人物档案
     """
     try:
-        # 尝试找到JSON部分
-        start_idx = ai_response.find("{")
-        end_idx = ai_response.rfind("}") + 1
-        
-        if start_idx != -1 and end_idx > start_idx:
-            json_str = ai_response[start_idx:end_idx]
-            profile = json.loads(json_str)
+        # 取第一个完整且合法的 JSON 对象（忽略前后的说明文字和代码块标记）
+        profile = extract_json_object(ai_response)
+        if isinstance(profile, dict):
             return profile
-        else:
-            # 如果没有找到JSON，返回原始文本
-            return {"raw_analysis": ai_response}
-            
-    except json.JSONDecodeError:
-        # JSON解析失败，返回原始文本
+        # 如果没有找到JSON，返回原始文本
         return {"raw_analysis": ai_response}
     except Exception as e:
         logger.error(f"提取人物档案失败: {str(e)}")
@@ -0,0 +1,244 @@
+"""
+内容寻址 Blob 存储
+提供商返回的图片（头像等）按 SHA-256 存储一次，查询结果中只保留哈希和访问URL，
+避免 Base64 图片被序列化进数据库、Redis 缓存和每一次 API 响应。
+默认使用本地文件系统，可通过 register_blob_backend 注册其他后端（如对象存储）
+"""
+import asyncio
+import inspect
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from .image_cache import ALLOWED_IMAGE_TYPES, IMAGE_ENDPOINT_LABEL, IMAGE_PROXY_MAX_BYTES
+from .http_instrumentation import provider_client
+
+logger = logging.getLogger(__name__)
+
+# 存储配置
+BLOB_STORE_BACKEND = os.environ.get('BLOB_STORE_BACKEND', 'local')
+BLOB_STORE_DIR = Path(os.environ.get('BLOB_STORE_DIR', Path(__file__).resolve().parent.parent / 'blob_store'))
+BLOB_URL_PREFIX = os.environ.get('BLOB_URL_PREFIX', '/api/blob')
+
+# 内联图片：data:image/png;base64,xxxx
+DATA_URL_RE = re.compile(r'^data:(image/[\w.+-]+);base64,(.+)$', re.DOTALL)
+BLOB_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def blob_url(blob_hash: str) -> str:
+    """返回 Blob 的访问URL"""
+    return f"{BLOB_URL_PREFIX}/{blob_hash}"
+
+
+def _blob_ref(meta: Dict[str, Any]) -> Dict[str, Any]:
+    """结果中引用 Blob 时使用的精简结构"""
+    return {
+        'hash': meta['hash'],
+        'url': blob_url(meta['hash']),
+        'content_type': meta['content_type'],
+        'size': meta['size'],
+    }
+
+
+class BlobStore(ABC):
+    """Blob 存储后端接口（未实现全部抽象方法的后端在注册时即报错）"""
+
+    @abstractmethod
+    def put(self, data: bytes, content_type: str) -> Dict[str, Any]:
+        """写入数据，返回元数据（内容已存在时不重复写入）"""
+
+    @abstractmethod
+    def get_meta(self, blob_hash: str) -> Optional[Dict[str, Any]]:
+        """读取元数据，不存在返回None"""
+
+    @abstractmethod
+    def read(self, blob_hash: str) -> Optional[bytes]:
+        """读取内容，不存在返回None"""
+
+    def local_path(self, blob_hash: str) -> Optional[Path]:
+        """本地文件路径（可直接以文件流返回）；非本地后端返回None"""
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': self.__class__.__name__}
+
+
+class LocalBlobStore(BlobStore):
+    """本地文件系统后端：{root}/{hash[:2]}/{hash}（内容）+ {hash}.json（元数据）"""
+
+    def __init__(self, root: Path = BLOB_STORE_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def _path(self, blob_hash: str) -> Path:
+        return self.root / blob_hash[:2] / blob_hash
+
+    def _meta_path(self, blob_hash: str) -> Path:
+        return self.root / blob_hash[:2] / f"{blob_hash}.json"
+
+    def put(self, data: bytes, content_type: str) -> Dict[str, Any]:
+        blob_hash = hashlib.sha256(data).hexdigest()
+        meta = {
+            'hash': blob_hash,
+            'content_type': content_type,
+            'size': len(data),
+            'created_at': time.time(),
+        }
+        path = self._path(blob_hash)
+        with self._lock:
+            if path.exists():
+                return self.get_meta(blob_hash) or meta
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._meta_path(blob_hash).write_text(json.dumps(meta))
+        logger.info(f"💾 [BlobStore] 新增 {blob_hash[:12]} ({len(data)} bytes, {content_type})")
+        return meta
+
+    def get_meta(self, blob_hash: str) -> Optional[Dict[str, Any]]:
+        if not BLOB_HASH_RE.match(blob_hash or ''):
+            return None
+        try:
+            return json.loads(self._meta_path(blob_hash).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def read(self, blob_hash: str) -> Optional[bytes]:
+        path = self.local_path(blob_hash)
+        return path.read_bytes() if path else None
+
+    def local_path(self, blob_hash: str) -> Optional[Path]:
+        if not BLOB_HASH_RE.match(blob_hash or ''):
+            return None
+        path = self._path(blob_hash)
+        return path if path.exists() else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        count = 0
+        total = 0
+        if self.root.exists():
+            for meta_path in self.root.glob('*/*.json'):
+                try:
+                    total += json.loads(meta_path.read_text()).get('size', 0)
+                    count += 1
+                except (OSError, ValueError):
+                    continue
+        return {'backend': 'local', 'root': str(self.root), 'blobs': count, 'total_bytes': total}
+
+
+# 后端注册表：名称 -> 工厂函数
+_BLOB_BACKENDS: Dict[str, Callable[[], BlobStore]] = {
+    'local': LocalBlobStore,
+}
+_blob_store: Optional[BlobStore] = None
+
+
+def register_blob_backend(name: str, factory: Callable[[], BlobStore]):
+    """
+    注册 Blob 存储后端，通过环境变量 BLOB_STORE_BACKEND 选择
+
+    Raises:
+        TypeError: factory 是未实现全部抽象方法的 BlobStore 子类
+    """
+    if inspect.isclass(factory) and issubclass(factory, BlobStore) and inspect.isabstract(factory):
+        missing = ', '.join(sorted(factory.__abstractmethods__))
+        raise TypeError(f"Blob 存储后端 {name} 未实现: {missing}")
+    _BLOB_BACKENDS[name] = factory
+
+
+def get_blob_store() -> BlobStore:
+    """获取全局 Blob 存储实例（首次调用时按配置创建）"""
+    global _blob_store
+    if _blob_store is None:
+        factory = _BLOB_BACKENDS.get(BLOB_STORE_BACKEND)
+        if factory is None:
+            logger.warning(f"⚠️ [BlobStore] 未知后端 {BLOB_STORE_BACKEND}，使用本地存储")
+            factory = LocalBlobStore
+        _blob_store = factory()
+    return _blob_store
+
+
+def store_data_url(value: str) -> Optional[Dict[str, Any]]:
+    """将 data:image/...;base64 字符串写入 Blob 存储，返回引用；非图片 data URL 返回None"""
+    match = DATA_URL_RE.match(value)
+    if not match:
+        return None
+    try:
+        data = base64.b64decode(match.group(2), validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    return _blob_ref(get_blob_store().put(data, match.group(1)))
+
+
+def externalize_inline_images(obj: Any) -> Any:
+    """
+    递归替换结果中的内联 Base64 图片为 Blob URL（原地修改并返回）
+
+    提供商偶尔直接返回 data URL 头像，写入缓存/数据库前统一外置
+    """
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(value, str) and value.startswith('data:image/'):
+                ref = store_data_url(value)
+                if ref:
+                    obj[key] = ref['url']
+            elif isinstance(value, (dict, list)):
+                externalize_inline_images(value)
+    elif isinstance(obj, list):
+        for index, value in enumerate(obj):
+            if isinstance(value, str) and value.startswith('data:image/'):
+                ref = store_data_url(value)
+                if ref:
+                    obj[index] = ref['url']
+            elif isinstance(value, (dict, list)):
+                externalize_inline_images(value)
+    return obj
+
+
+async def store_image_from_url(
+    url: str,
+    timeout: float = 15.0,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: int = IMAGE_PROXY_MAX_BYTES
+) -> Optional[Dict[str, Any]]:
+    """
+    下载图片并写入 Blob 存储
+
+    Args:
+        url: 图片URL
+        timeout: 超时时间
+        headers: 额外请求头
+        max_bytes: 单张图片大小上限
+
+    Returns:
+        {'hash', 'url', 'content_type', 'size'}，失败返回None
+    """
+    try:
+        async with provider_client("blob_store", endpoint=IMAGE_ENDPOINT_LABEL, timeout=timeout,
+                                     follow_redirects=True, headers=headers) as client:
+            response = await client.get(url)
+        if response.status_code != 200:
+            logger.warning(f"⚠️ [BlobStore] 图片下载失败: {response.status_code}")
+            return None
+        content_type = response.headers.get('content-type', 'image/jpeg').split(';')[0].strip().lower()
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            logger.warning(f"⚠️ [BlobStore] 不支持的图片类型: {content_type}")
+            return None
+        if len(response.content) > max_bytes:
+            logger.warning(f"⚠️ [BlobStore] 图片过大: {len(response.content)} bytes")
+            return None
+        meta = await asyncio.to_thread(get_blob_store().put, response.content, content_type)
+        return _blob_ref(meta)
+    except Exception as e:
+        logger.error(f"❌ [BlobStore] 图片下载异常: {str(e)}")
+        return None
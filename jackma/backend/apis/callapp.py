@@ -3,10 +3,10 @@ CallApp API
 来电显示、用户信息查询
 返回: 用户名、头像、社交媒体资料、企业信息
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +54,7 @@ async def query_callapp(phone: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str,
         
         logger.info(f"🔍 [CallApp] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("callapp", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
             
             if response.status_code == 200:
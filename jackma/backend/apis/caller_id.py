@@ -2,10 +2,10 @@
 Caller ID API (RapidAPI - Eyecon)
 来电显示和社交搜索
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import CALLER_ID_RAPIDAPI_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +42,7 @@ async def query_caller_id(phone: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[st
         
         logger.info(f"🔍 [Caller ID] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("caller_id", timeout=timeout) as client:
             response = None
             for params in candidates:
                 try:
@@ -2,11 +2,11 @@
 External Lookup API integration
 替换 Investigate API：调用外部查询服务并规范化返回结构。
 """
-import httpx
 import logging
 from typing import Dict, Any, List
 from datetime import datetime
 from .config import DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -294,7 +294,7 @@ async def query_external_lookup(phone: str, mode: str = "medium", timeout: int =
         params = {"mode": mode}
 
         logger.info(f"🔍 [External Lookup] GET {url} mode={mode}")
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("external_lookup", timeout=timeout) as client:
             resp = await client.get(url, params=params)
             if resp.status_code == 200:
                 payload = resp.json() if "application/json" in resp.headers.get("Content-Type", "") else {"raw": resp.text}
@@ -314,9 +314,9 @@ async def query_external_lookup(phone: str, mode: str = "medium", timeout: int =
                         "module": "external_lookup",
                         "platform_name": "External Lookup",
                         "data": {
-                            "processed": processed_data,  # InvestigateResume 使用
+                            **payload,  # 保留所有原始字段（primary, sources, filters等）
                             "consolidated": consolidated,  # ExternalLookupResume 需要这个！
-                            **payload  # 保留所有原始字段（primary, sources, filters等）
+                            "processed": processed_data,  # InvestigateResume 使用（放在最后：与 consolidated 重复的子树去重时保留 consolidated 中的原件）
                         },
                     }
                     logger.info(f"✅ [External Lookup] 查询成功并转换数据格式，consolidated字段: {bool(consolidated)}")
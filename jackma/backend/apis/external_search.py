@@ -1,6 +1,8 @@
-import httpx
 import asyncio
-from typing import Any, Dict
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from .http_instrumentation import provider_client
 
 # 使用 OSINT Deep Vercel API
 BASE_URL = "https://osint-deep.vercel.app/api/search"
@@ -19,29 +21,71 @@ FIELD_ALIASES = {
     "lon": ["lon", "lng", "longitude"],
 }
 
+# 别名 -> (标准键, 优先级)，优先级即在 FIELD_ALIASES 中的位置，越小越优先
+ALIAS_LOOKUP: Dict[str, Tuple[str, int]] = {
+    alias: (std_key, priority)
+    for std_key, aliases in FIELD_ALIASES.items()
+    for priority, alias in enumerate(aliases)
+}
+
+# 关键词分类用的正则（模块加载时编译一次）
+EMAIL_RE = re.compile(r"^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}$", re.I)
+PHONE_RE = re.compile(r"^\+?\d[\d\-()\s]{5,}$")
+
+
 def normalize_fields(data: Dict[str, Any]) -> Dict[str, Any]:
-    """将嵌套或别名字段扁平化并统一键名"""
-    flat = {}
-    def _flatten(obj, prefix=""):
+    """将嵌套或别名字段扁平化并统一键名（一次遍历，别名通过查找表匹配）"""
+    flat: Dict[str, Any] = {}
+    matched: Dict[str, Tuple[int, str]] = {}  # 标准键 -> (优先级, 扁平键)
+
+    def _flatten(obj, path):
         if isinstance(obj, dict):
             for k, v in obj.items():
-                _flatten(v, f"{prefix}{k}." if prefix else k)
-        elif isinstance(obj, list) and obj and isinstance(obj[0], (str, int, float)):
-            # 简单列表值直接加入
-            flat[prefix.rstrip(".")] = obj
-        elif prefix:
-            flat[prefix.rstrip(".")] = obj
-    _flatten(data)
-    # 别名统一
-    unified = {}
-    for std_key, aliases in FIELD_ALIASES.items():
-        for alias in aliases:
-            if alias in flat:
-                unified[std_key] = flat.pop(alias)
-                break
-    unified.update(flat)  # 剩余字段保持原名
+                _flatten(v, f"{path}.{k}" if path else str(k))
+            return
+        if not path:
+            return
+        # 列表（无论元素类型）与标量都作为叶子值
+        flat[path] = obj
+        alias = ALIAS_LOOKUP.get(path)
+        if alias:
+            std_key, priority = alias
+            current = matched.get(std_key)
+            if current is None or priority < current[0]:
+                matched[std_key] = (priority, path)
+
+    _flatten(data, "")
+    # 别名统一：每个标准键取优先级最高的别名，剩余字段保持原名
+    unified = {std_key: flat.pop(matched[std_key][1]) for std_key in FIELD_ALIASES if std_key in matched}
+    unified.update(flat)
     return unified
 
+
+def classify_keywords(keywords: List[Any]) -> Tuple[List[str], List[str]]:
+    """一次遍历把关键词分为邮箱和电话"""
+    emails, phones = [], []
+    email_match, phone_match = EMAIL_RE.match, PHONE_RE.match
+    for k in keywords:
+        if not isinstance(k, str):
+            continue
+        if email_match(k):
+            emails.append(k)
+        elif phone_match(k):
+            phones.append(k)
+    return emails, phones
+
+
+def collect_source_records(data_list: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """按数据源收集记录，保持结构化（每项为 {"source": 名称, "records": [...]}）"""
+    results = []
+    for source_name, source_data in data_list.items():
+        if isinstance(source_data, dict):
+            data_records = source_data.get("Data", [])
+            if isinstance(data_records, list) and data_records:
+                results.append({"source": source_name, "records": data_records})
+    return results
+
+
 async def query_external_search(request_value: str, timeout: int = 10) -> Dict[str, Any]:
     """带重试与字段归一化的外部搜索查询"""
     # 使用查询参数
@@ -49,7 +93,7 @@ async def query_external_search(request_value: str, timeout: int = 10) -> Dict[s
     retries, delay = 3, 1
     for attempt in range(1, retries + 1):
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with provider_client("external_search", retry_count=attempt - 1, timeout=timeout) as client:
                 resp = await client.get(url)
                 resp.raise_for_status()
                 raw = resp.json()
@@ -66,11 +110,7 @@ async def query_external_search(request_value: str, timeout: int = 10) -> Dict[s
                         unified["raw_keywords"] = keywords
                         
                         # 从关键词中提取邮箱和电话
-                        import re
-                        email_re = re.compile(r"^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}$", re.I)
-                        phone_re = re.compile(r"^\+?\d[\d\-()\s]{5,}$")
-                        emails = [k for k in keywords if isinstance(k, str) and email_re.match(k)]
-                        phones = [k for k in keywords if isinstance(k, str) and phone_re.match(k)]
+                        emails, phones = classify_keywords(keywords)
                         if emails:
                             unified["email"] = emails
                         if phones:
@@ -89,23 +129,17 @@ async def query_external_search(request_value: str, timeout: int = 10) -> Dict[s
                         unified["sources_with_results"] = len(source_names)
                         unified["total_sources_checked"] = len(source_names)
                         
-                        # 提取所有记录并转换为字符串数组（保持原格式）
-                        results = []
-                        for source_name, source_data in data_list.items():
-                            if isinstance(source_data, dict):
-                                data_records = source_data.get("Data", [])
-                                if isinstance(data_records, list) and data_records:
-                                    # 将每个数据源的记录转换为字符串
-                                    results.append(str(data_records))
+                        # 按数据源提取记录（保持结构化，下游无需再解析字符串）
+                        results = collect_source_records(data_list)
                         
                         if results:
                             unified["results"] = results
+                            unified["total_records"] = sum(len(r["records"]) for r in results)
                         
                         # 统计识别的实体数量
                         unified["identified_entities"] = len(keywords) if keywords else 0
                     
                     # 3. 添加时间戳
-                    from datetime import datetime
                     unified["timestamp"] = datetime.utcnow().isoformat()
                     
                     return {"success": True, "data": unified}
@@ -12,6 +12,7 @@ from typing import Optional, Dict, List, Any
 from urllib.parse import quote
 import re
 from datetime import datetime
+from .http_instrumentation import provider_client
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -98,7 +99,7 @@ async def analyze_google_account(request: EmailAnalysisRequest):
         logger.info(f"🌐 [Google API] Target URL: {EXTERNAL_API_URL}")
         
         # 调用外部API
-        async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
+        async with provider_client("google", timeout=REQUEST_TIMEOUT) as client:
             try:
                 response = await client.post(
                     EXTERNAL_API_URL,
@@ -234,7 +235,7 @@ async def perform_duckduckgo_search(query: str, num_results: int = 10) -> List[D
     使用DuckDuckGo执行搜索
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with provider_client("duckduckgo", timeout=30.0) as client:
             # DuckDuckGo即时搜索API
             url = "https://api.duckduckgo.com/"
             params = {
@@ -275,7 +276,7 @@ async def check_google_account_existence(email: str) -> Dict[str, Any]:
     检查Google账户是否存在
     """
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with provider_client("google", timeout=30.0) as client:
             # 使用Google账户恢复页面检查账户存在性
             url = "https://accounts.google.com/signin/v2/lookup"
             
@@ -431,7 +432,7 @@ async def fetch_google_avatar(email: str, size: int) -> Dict[str, Any]:
         email_hash = hashlib.md5(email.lower().encode()).hexdigest()
         gravatar_url = f"https://www.gravatar.com/avatar/{email_hash}?s={size}&d=404"
         
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with provider_client("gravatar", timeout=10.0) as client:
             response = await client.head(gravatar_url)
             if response.status_code == 200:
                 return {
@@ -2,35 +2,36 @@
 GPT-5 数据分析模块
 使用 RapidAPI 的 ChatGPT-GPT5 API 来分析 OSINT 数据
 """
-import httpx
-import json
 import logging
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+from .llm_client import LLM_API_URL, complete, extract_json_object
+from .prompt_budget import PROMPT_RECORD_TOKEN_BUDGET, build_record_section, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
-RAPIDAPI_KEY = "b491571bafmsh04f7fa840b92045p1a8db2jsn4c5d1dbd653d"
-GPT5_API_URL = "https://chatgpt-gpt5.p.rapidapi.com/ask"
+# 模型标识（参与 AI 分析缓存键，更换模型/接口后旧缓存自动失效）
+MODEL_ID = LLM_API_URL
 
-async def analyze_osint_data_with_gpt5(
+
+def assemble_gpt5_prompt(
     results: List[Dict[str, Any]],
     query: str,
-    main_person: Optional[str] = None
-) -> Dict[str, Any]:
+    main_person: Optional[str] = None,
+    token_budget: int = PROMPT_RECORD_TOKEN_BUDGET
+) -> Tuple[str, Dict[str, Any]]:
     """
-    使用 GPT-5 分析 OSINT Industries 数据
-    
-    Args:
-        results: OSINT Industries 返回的结果列表
-        query: 查询的邮箱或电话
-        main_person: 主要人物姓名（可选）
+    构建 GPT-5 OSINT 分析提示词，数据样本按信息量填充到 token_budget 以内
     
     Returns:
-        分析结果，包含提取的字段和 AI 生成的摘要
+        (提示词, 统计信息)，统计信息包含记录数和 prompt_tokens 估算
     """
-    try:
-        # 构建提示词
-        prompt = f"""
+    records_text, stats = build_record_section(
+        ((r.get("module") if isinstance(r, dict) else None, r) for r in results),
+        token_budget=token_budget,
+        hints=[query, main_person]
+    )
+    prompt = f"""
 请分析以下 OSINT 数据，提取主要人物的关键信息。
 
 查询目标: {query}
@@ -71,8 +72,8 @@ async def analyze_osint_data_with_gpt5(
    - 注册时间
    - 最后活跃时间
 
-数据样本（前5条）:
-{json.dumps(results[:5], indent=2, ensure_ascii=False)}
+数据样本（去重后 {stats['records_unique']} 条，按信息量列出 {stats['records_included']} 条，每行一条紧凑 JSON）:
+{records_text}
 
 请以 JSON 格式返回，结构如下：
 {{
@@ -105,68 +106,66 @@ async def analyze_osint_data_with_gpt5(
   "summary": "一段简短的人物摘要（100-200字）"
 }}
 """
+    stats["prompt_tokens"] = estimate_tokens(prompt)
+    return prompt, stats
 
-        # 调用 GPT-5 API
-        headers = {
-            "Content-Type": "application/json",
-            "x-rapidapi-host": "chatgpt-gpt5.p.rapidapi.com",
-            "x-rapidapi-key": RAPIDAPI_KEY
+
+def build_gpt5_prompt(
+    results: List[Dict[str, Any]],
+    query: str,
+    main_person: Optional[str] = None
+) -> str:
+    """构建 GPT-5 OSINT 分析提示词（不需要统计信息时使用）"""
+    return assemble_gpt5_prompt(results, query, main_person)[0]
+
+
+def parse_gpt5_response(gpt_response: str) -> Dict[str, Any]:
+    """从 GPT-5 的完整响应文本中提取 JSON 结果"""
+    analyzed_data = extract_json_object(gpt_response)
+    if analyzed_data is None:
+        logger.error("❌ Failed to parse GPT-5 JSON response")
+        return {
+            "success": False,
+            "error": "Failed to parse AI response",
+            "raw_response": gpt_response
         }
+    return {
+        "success": True,
+        "data": analyzed_data,
+        "raw_response": gpt_response
+    }
+
+
+async def analyze_osint_data_with_gpt5(
+    results: List[Dict[str, Any]],
+    query: str,
+    main_person: Optional[str] = None,
+    prompt: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    使用 GPT-5 分析 OSINT Industries 数据
+    
+    Args:
+        results: OSINT Industries 返回的结果列表
+        query: 查询的邮箱或电话
+        main_person: 主要人物姓名（可选）
+        prompt: 已构建的提示词（可选，调用方计算缓存键时已构建则直接复用）
+    
+    Returns:
+        分析结果，包含提取的字段和 AI 生成的摘要
+    """
+    try:
+        # 构建提示词
+        if prompt is None:
+            prompt = build_gpt5_prompt(results, query, main_person)
         
-        payload = {
-            "query": prompt
-        }
+        logger.info(f"🤖 Calling GPT-5 API to analyze {len(results)} records (~{estimate_tokens(prompt)} prompt tokens)...")
         
-        logger.info(f"🤖 Calling GPT-5 API to analyze {len(results)} records...")
+        # 调用 GPT-5 API（受全局并发上限保护）
+        gpt_response = await complete(prompt)
+        logger.info(f"✅ GPT-5 API response received")
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                GPT5_API_URL,
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"❌ GPT-5 API error: {response.status_code} - {response.text}")
-                return {
-                    "success": False,
-                    "error": f"API error: {response.status_code}"
-                }
-            
-            result = response.json()
-            logger.info(f"✅ GPT-5 API response received")
-            
-            # 解析 GPT-5 的响应
-            gpt_response = result.get("response", "")
-            
-            # 尝试从响应中提取 JSON
-            try:
-                # 查找 JSON 代码块
-                if "```json" in gpt_response:
-                    json_start = gpt_response.find("```json") + 7
-                    json_end = gpt_response.find("```", json_start)
-                    json_str = gpt_response[json_start:json_end].strip()
-                elif "```" in gpt_response:
-                    json_start = gpt_response.find("```") + 3
-                    json_end = gpt_response.find("```", json_start)
-                    json_str = gpt_response[json_start:json_end].strip()
-                else:
-                    json_str = gpt_response
-                
-                analyzed_data = json.loads(json_str)
-                
-                return {
-                    "success": True,
-                    "data": analyzed_data,
-                    "raw_response": gpt_response
-                }
-            except json.JSONDecodeError as e:
-                logger.error(f"❌ Failed to parse GPT-5 JSON response: {e}")
-                return {
-                    "success": False,
-                    "error": "Failed to parse AI response",
-                    "raw_response": gpt_response
-                }
+        return parse_gpt5_response(gpt_response)
     
     except Exception as e:
         logger.error(f"❌ GPT-5 analysis error: {str(e)}")
@@ -3,10 +3,10 @@ Have I Been Pwned API
 邮箱数据泄露查询
 文档: https://haveibeenpwned.com/API/v3
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import HIBP_API_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +37,7 @@ async def query_hibp(email: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[str, An
         
         logger.info(f"🔍 [HIBP] 查询邮箱: {email}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("hibp", timeout=timeout) as client:
             response = await client.get(url, headers=headers)
             
             if response.status_code == 200:
@@ -0,0 +1,213 @@
+"""
+提供商 HTTP 调用埋点
+provider_client() 创建带埋点传输层的 httpx.AsyncClient，每个出站请求完成（响应体读完或关闭）后
+生成一条 ProviderCall 记录：来源、端点、状态码、耗时、字节数、重试次数。
+记录交给通过 add_call_sink() 注册的接收器处理（如 usage_sink 批量写入 api_usage_logs），
+本模块不依赖数据库，未注册接收器时记录直接丢弃
+
+设置 PROVIDER_BASE_URL_OVERRIDE 后所有提供商请求改发到该地址（本地模拟服务器 mock_provider_farm.py），
+原始 host[:port] 作为路径第一段：
+    https://api.osint.industries/v2/request -> {override}/api.osint.industries/v2/request
+调用记录中的端点仍为原始地址
+
+httpx 在传入自定义 transport 时不再读取 HTTP(S)_PROXY / ALL_PROXY / NO_PROXY，
+provider_client() 按相同规则为每个代理挂载带埋点的传输层
+"""
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+# 与 httpx.AsyncClient 读取代理环境变量的规则一致
+from httpx._utils import get_environment_proxies
+
+logger = logging.getLogger(__name__)
+
+# 传给 AsyncHTTPTransport 而不是 AsyncClient 的参数（使用自定义传输层时客户端不再处理这些参数）
+_TRANSPORT_KWARGS = ('verify', 'cert', 'http1', 'http2', 'limits', 'trust_env')
+
+# 路径中可能包含电话号码、邮箱等查询值的片段，记录前替换为占位符（避免泄露并控制基数）
+_SENSITIVE_SEGMENT_RE = re.compile(r'@|\d{5,}|%40|^\+')
+
+# 提供商请求改发地址（为空时直连真实提供商）
+PROVIDER_BASE_URL_OVERRIDE = os.environ.get('PROVIDER_BASE_URL_OVERRIDE', '').strip()
+
+
+@dataclass
+class ProviderCall:
+    """一次出站提供商请求"""
+    source: str
+    method: str
+    endpoint: str
+    status_code: int
+    latency_ms: int
+    response_bytes: int
+    retry_count: int
+    success: bool
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+_sinks: List[Callable[[ProviderCall], None]] = []
+
+
+def add_call_sink(sink: Callable[[ProviderCall], None]):
+    """注册调用记录接收器（同步、不可阻塞；耗时操作应自行缓冲后批量处理）"""
+    if sink not in _sinks:
+        _sinks.append(sink)
+
+
+def remove_call_sink(sink: Callable[[ProviderCall], None]):
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+def _emit(call: ProviderCall):
+    for sink in _sinks:
+        try:
+            sink(call)
+        except Exception as e:
+            logger.error(f"❌ [HTTPInstrumentation] 调用记录接收器出错: {str(e)}")
+
+
+def endpoint_label(url: httpx.URL) -> str:
+    """端点标识：host + 路径（去掉查询参数，敏感路径片段替换为 {id}）"""
+    segments = [
+        '{id}' if _SENSITIVE_SEGMENT_RE.search(segment) else segment
+        for segment in url.path.split('/')
+    ]
+    return f"{url.host}{'/'.join(segments)}"[:255]
+
+
+def override_url(url: httpx.URL, base_url: str) -> httpx.URL:
+    """把提供商地址改写到 base_url 下，原始 host[:port] 作为路径第一段（保留查询参数）"""
+    base = httpx.URL(base_url)
+    prefix = base.raw_path.split(b'?')[0].rstrip(b'/')
+    return base.copy_with(raw_path=prefix + b'/' + url.netloc + url.raw_path)
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    """统计响应体字节数，关闭时回调"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[int, Optional[str]], None]):
+        self._stream = stream
+        self._on_close = on_close
+        self._bytes = 0
+        self._error: Optional[str] = None
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                self._bytes += len(chunk)
+                yield chunk
+        except Exception as e:
+            self._error = f"{type(e).__name__}: {e}"
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._bytes, self._error)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """包装 AsyncHTTPTransport，为每个请求生成 ProviderCall 记录"""
+
+    def __init__(self, source: str, retry_count: int = 0, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 endpoint: Optional[str] = None, **transport_kwargs):
+        self.source = source
+        self.retry_count = retry_count
+        self.endpoint = endpoint
+        self._transport = transport or httpx.AsyncHTTPTransport(**transport_kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        endpoint = self.endpoint or endpoint_label(request.url)
+        if PROVIDER_BASE_URL_OVERRIDE:
+            request.url = override_url(request.url, PROVIDER_BASE_URL_OVERRIDE)
+            request.headers['Host'] = request.url.netloc.decode('ascii')
+
+        def record(status_code: int, nbytes: int, error: Optional[str]):
+            _emit(ProviderCall(
+                source=self.source,
+                method=request.method,
+                endpoint=endpoint,
+                status_code=status_code,
+                latency_ms=int((time.perf_counter() - start) * 1000),
+                response_bytes=nbytes,
+                retry_count=self.retry_count,
+                success=error is None and status_code < 400,
+                error=error or (f"HTTP {status_code}" if status_code >= 400 else None),
+            ))
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            # 连接失败、超时等：状态码记为 0
+            record(0, 0, f"{type(e).__name__}: {e}"[:512])
+            raise
+
+        response.stream = _CountingStream(
+            response.stream,
+            lambda nbytes, error: record(response.status_code, nbytes, error)
+        )
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _proxy_mounts(
+    source: str,
+    retry_count: int,
+    endpoint: Optional[str],
+    proxy: Any,
+    trust_env: bool,
+    transport_kwargs: Dict[str, Any]
+) -> Dict[str, Optional[httpx.AsyncBaseTransport]]:
+    """
+    代理 mounts：显式的 proxy 参数，或 trust_env 时的代理环境变量
+
+    每个代理使用一个带埋点的传输层；NO_PROXY 匹配的地址映射为 None（使用默认的直连传输层）。
+    改发到 mock 服务器（PROVIDER_BASE_URL_OVERRIDE）时不使用环境变量中的代理
+    """
+    if proxy is not None:
+        proxies = {'all://': proxy}
+    elif trust_env and not PROVIDER_BASE_URL_OVERRIDE:
+        proxies = get_environment_proxies()
+    else:
+        return {}
+    return {
+        pattern: None if url is None else InstrumentedTransport(
+            source, retry_count, endpoint=endpoint, proxy=url, **transport_kwargs
+        )
+        for pattern, url in proxies.items()
+    }
+
+
+def provider_client(source: str, retry_count: int = 0, endpoint: Optional[str] = None, **kwargs) -> httpx.AsyncClient:
+    """
+    创建带调用埋点的 httpx.AsyncClient（参数与 httpx.AsyncClient 相同，代理环境变量同样生效）
+
+    Args:
+        source: 提供商名称（api_usage_logs.api_name）
+        retry_count: 当前是第几次重试（首次请求为 0）
+        endpoint: 固定的端点标识；请求任意第三方地址的客户端（图片代理等）使用，
+            避免把任意 host 写入 api_usage_logs
+    """
+    transport_kwargs = {k: kwargs.pop(k) for k in _TRANSPORT_KWARGS if k in kwargs}
+    mounts = _proxy_mounts(
+        source, retry_count, endpoint, kwargs.pop('proxy', None),
+        transport_kwargs.get('trust_env', True), transport_kwargs
+    )
+    transport = InstrumentedTransport(source, retry_count, endpoint=endpoint, **transport_kwargs)
+    return httpx.AsyncClient(transport=transport, mounts={**mounts, **kwargs.pop('mounts', {})}, **kwargs)
@@ -0,0 +1,377 @@
+"""
+图片代理磁盘缓存
+头像/Logo 代理共用的 LRU 磁盘缓存：按 URL 哈希存储，带容量上限、TTL 和 404 负缓存，
+并为浏览器提供 ETag / Cache-Control / 304 Not Modified 支持。
+未命中时边下载边流式返回（同时写入缓存），命中时直接从磁盘文件流式输出，不在内存中缓冲完整图片
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from .http_instrumentation import provider_client
+
+logger = logging.getLogger(__name__)
+
+# 缓存配置
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', Path(__file__).resolve().parent.parent / 'image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))  # 200MB
+IMAGE_CACHE_TTL = int(os.environ.get('IMAGE_CACHE_TTL', 7 * 86400))  # 图片保留7天
+IMAGE_CACHE_NEGATIVE_TTL = int(os.environ.get('IMAGE_CACHE_NEGATIVE_TTL', 3600))  # 404 负缓存1小时
+IMAGE_BROWSER_MAX_AGE = int(os.environ.get('IMAGE_BROWSER_MAX_AGE', 86400))  # 浏览器缓存1天
+
+IMAGE_PROXY_MAX_BYTES = int(os.environ.get('IMAGE_PROXY_MAX_BYTES', 5 * 1024 * 1024))  # 单张图片最大5MB
+IMAGE_PROXY_CHUNK_SIZE = 64 * 1024
+# 图片来自任意头像/Logo 地址，调用记录中的端点统一记为该标识（不把任意 host 写入 api_usage_logs）
+IMAGE_ENDPOINT_LABEL = '{image_host}'
+
+# 需要负缓存的上游状态码（明确不存在的资源）
+NEGATIVE_STATUS_CODES = {404, 410}
+
+# 允许代理的图片类型（不含 SVG，避免同源执行脚本）
+ALLOWED_IMAGE_TYPES = {
+    'image/png',
+    'image/jpeg',
+    'image/jpg',
+    'image/gif',
+    'image/webp',
+    'image/avif',
+    'image/bmp',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+}
+
+# 透传给浏览器的上游缓存相关响应头
+PASSTHROUGH_CACHE_HEADERS = ('cache-control', 'etag', 'last-modified', 'expires')
+
+
+class ImageCache:
+    """LRU 磁盘图片缓存"""
+
+    def __init__(
+        self,
+        cache_dir: Path = IMAGE_CACHE_DIR,
+        max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+        ttl: int = IMAGE_CACHE_TTL,
+        negative_ttl: int = IMAGE_CACHE_NEGATIVE_TTL
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._index: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # 按访问顺序排列，末尾为最近使用
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        """URL 的缓存键（SHA-256）"""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _data_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.bin"
+
+    def _load_index(self):
+        """首次使用时从磁盘重建索引（按写入时间排序近似LRU）"""
+        if self._loaded:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for meta_path in self.cache_dir.glob('*.json'):
+            try:
+                entries.append(json.loads(meta_path.read_text()))
+            except Exception:
+                meta_path.unlink(missing_ok=True)
+        entries.sort(key=lambda e: e.get('stored_at', 0))
+        for entry in entries:
+            self._index[entry['key']] = entry
+            self._total_bytes += entry.get('size', 0)
+        self._loaded = True
+        logger.info(f"✅ [ImageCache] 已加载 {len(self._index)} 个缓存条目 ({self._total_bytes} bytes)")
+
+    def _remove(self, key: str):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._total_bytes -= entry.get('size', 0)
+        self._meta_path(key).unlink(missing_ok=True)
+        self._data_path(key).unlink(missing_ok=True)
+
+    def _evict(self):
+        """按LRU淘汰，直到总大小不超过容量上限"""
+        while self._total_bytes > self.max_bytes and self._index:
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        获取缓存条目
+
+        Returns:
+            缓存条目（负缓存条目的 status 为上游状态码），未命中或已过期返回None
+        """
+        key = self.key_for(url)
+        with self._lock:
+            self._load_index()
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            ttl = self.ttl if entry['status'] == 200 else self.negative_ttl
+            if time.time() - entry['stored_at'] > ttl:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def data_path(self, entry: Dict[str, Any]) -> Path:
+        """缓存条目对应的图片文件路径"""
+        return self._data_path(entry['key'])
+
+    def temp_path(self, url: str) -> Path:
+        """流式写入时使用的临时文件路径（每次下载独立，写完后由 commit 原子替换）"""
+        with self._lock:
+            self._load_index()
+        return self.cache_dir / f"{self.key_for(url)}.{uuid.uuid4().hex}.tmp"
+
+    def commit(
+        self,
+        url: str,
+        temp_path: Path,
+        size: int,
+        content_hash: str,
+        content_type: str,
+        upstream_headers: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        将已写完的临时文件登记为缓存条目，ETag 为内容哈希
+
+        临时文件已不存在时视为已登记，返回现有条目（不存在返回None）
+        """
+        key = self.key_for(url)
+        entry = {
+            'key': key,
+            'url': url,
+            'status': 200,
+            'content_type': content_type,
+            'size': size,
+            'etag': f'"{content_hash[:32]}"',
+            'upstream_headers': upstream_headers or {},
+            'stored_at': time.time()
+        }
+        with self._lock:
+            self._load_index()
+            try:
+                os.replace(temp_path, self._data_path(key))
+            except FileNotFoundError:
+                return self._index.get(key)
+            # 同一 URL 的并发下载：新文件已原子替换旧文件，只需替换索引条目
+            previous = self._index.pop(key, None)
+            if previous:
+                self._total_bytes -= previous.get('size', 0)
+            self._meta_path(key).write_text(json.dumps(entry))
+            self._index[key] = entry
+            self._total_bytes += size
+            self._evict()
+        return entry
+
+    def put(self, url: str, content: bytes, content_type: str) -> Dict[str, Any]:
+        """写入完整的图片内容"""
+        temp_path = self.temp_path(url)
+        temp_path.write_bytes(content)
+        return self.commit(url, temp_path, len(content), hashlib.sha256(content).hexdigest(), content_type)
+
+    def put_negative(self, url: str, status: int) -> Dict[str, Any]:
+        """记录上游明确不存在的资源（负缓存）"""
+        key = self.key_for(url)
+        entry = {'key': key, 'url': url, 'status': status, 'size': 0, 'stored_at': time.time()}
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._remove(key)
+            self._meta_path(key).write_text(json.dumps(entry))
+            self._index[key] = entry
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            self._load_index()
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'negative_entries': sum(1 for e in self._index.values() if e['status'] != 200),
+                'total_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': f"{(self.hits / total * 100) if total else 0:.2f}%"
+            }
+
+
+# 全局图片缓存实例
+image_cache = ImageCache()
+
+
+def _media_type(content_type: str) -> str:
+    """去掉参数部分并统一小写，如 'image/png; charset=x' -> 'image/png'"""
+    return (content_type or '').split(';')[0].strip().lower()
+
+
+def _cache_headers(entry: Dict[str, Any], max_age: int) -> Dict[str, str]:
+    """缓存命中时的响应头：本地内容哈希 ETag + 上游缓存头（缺省使用本地 max-age）"""
+    upstream = entry.get('upstream_headers') or {}
+    headers = {
+        "ETag": entry['etag'],
+        "Cache-Control": upstream.get('cache-control') or f"public, max-age={max_age}",
+    }
+    for name in ('last-modified', 'expires'):
+        if upstream.get(name):
+            headers[name.title()] = upstream[name]
+    return headers
+
+
+def _cached_response(request: Optional[Request], entry: Dict[str, Any], max_age: int) -> Response:
+    """从磁盘流式返回缓存图片；If-None-Match 匹配时返回 304"""
+    headers = _cache_headers(entry, max_age)
+    if request is not None:
+        if_none_match = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+        # 首次流式响应透传的是上游 ETag，因此两者都视为有效
+        known_etags = {entry['etag'], (entry.get('upstream_headers') or {}).get('etag')}
+        if known_etags.intersection(if_none_match):
+            return Response(status_code=304, headers=headers)
+    return FileResponse(image_cache.data_path(entry), media_type=entry['content_type'], headers=headers)
+
+
+async def proxy_image(
+    request: Optional[Request],
+    url: str,
+    timeout: float = 10.0,
+    headers: Optional[Dict[str, str]] = None,
+    follow_redirects: bool = True,
+    default_type: str = "image/png",
+    max_age: int = IMAGE_BROWSER_MAX_AGE,
+    max_bytes: int = IMAGE_PROXY_MAX_BYTES
+) -> Optional[Response]:
+    """
+    代理图片：优先读磁盘缓存，未命中时流式转发上游内容并同时写入缓存
+
+    Args:
+        request: 当前请求（用于 If-None-Match 协商）
+        url: 图片URL
+        timeout: 上游超时时间（秒）
+        headers: 额外请求头
+        follow_redirects: 是否跟随重定向
+        default_type: 上游未返回 Content-Type 时使用的类型
+        max_age: 上游未提供 Cache-Control 时的浏览器缓存时间
+        max_bytes: 允许的最大图片大小
+
+    Returns:
+        图片响应；负缓存命中或上游非200时返回None
+
+    Raises:
+        HTTPException: 502 网络错误（与图片不存在区分），413 图片超过大小上限，415 非允许的图片类型
+    """
+    entry = await asyncio.to_thread(image_cache.get, url)
+    if entry is not None:
+        if entry['status'] != 200:
+            return None
+        if image_cache.data_path(entry).exists():
+            return _cached_response(request, entry, max_age)
+
+    client = provider_client("image_proxy", endpoint=IMAGE_ENDPOINT_LABEL, timeout=timeout,
+                             follow_redirects=follow_redirects, headers=headers)
+    try:
+        upstream = await client.send(client.build_request("GET", url), stream=True)
+    except asyncio.CancelledError:
+        # 并发竞速时被取消（见 logo_api.race_logo_candidates），释放连接后继续传播
+        await client.aclose()
+        raise
+    except Exception as e:
+        await client.aclose()
+        logger.warning(f"⚠️ [ImageCache] 下载失败 {url}: {e}")
+        raise HTTPException(status_code=502, detail="Upstream image fetch failed")
+
+    async def _close():
+        await upstream.aclose()
+        await client.aclose()
+
+    if upstream.status_code != 200:
+        if upstream.status_code in NEGATIVE_STATUS_CODES:
+            await asyncio.to_thread(image_cache.put_negative, url, upstream.status_code)
+        await _close()
+        return None
+
+    content_type = upstream.headers.get("Content-Type") or default_type
+    if _media_type(content_type) not in ALLOWED_IMAGE_TYPES:
+        await _close()
+        raise HTTPException(status_code=415, detail=f"Unsupported image type: {_media_type(content_type)}")
+
+    declared_length = upstream.headers.get("Content-Length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+        await _close()
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    upstream_headers = {
+        name: upstream.headers[name]
+        for name in PASSTHROUGH_CACHE_HEADERS
+        if upstream.headers.get(name)
+    }
+    response_headers = {name.title(): value for name, value in upstream_headers.items()}
+    response_headers.setdefault("Cache-Control", f"public, max-age={max_age}")
+    # aiter_bytes() 会解码 Content-Encoding，上游压缩时其 Content-Length 与转发的字节数不符
+    encoding = upstream.headers.get("Content-Encoding", "identity").strip().lower()
+    if declared_length and declared_length.isdigit() and encoding == "identity":
+        response_headers["Content-Length"] = declared_length
+
+    async def _stream():
+        """逐块转发给客户端，同时写入临时文件；完整下载后登记到缓存"""
+        temp_path = image_cache.temp_path(url)
+        digest = hashlib.sha256()
+        size = 0
+        completed = False
+        try:
+            with open(temp_path, 'wb') as f:
+                async for chunk in upstream.aiter_bytes(IMAGE_PROXY_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        logger.warning(f"⚠️ [ImageCache] 图片超过大小上限，已中止: {url}")
+                        return
+                    digest.update(chunk)
+                    f.write(chunk)
+                    yield chunk
+            completed = size > 0
+        finally:
+            await _close()
+            if completed:
+                await asyncio.to_thread(
+                    image_cache.commit, url, temp_path, size, digest.hexdigest(), content_type, upstream_headers
+                )
+            else:
+                temp_path.unlink(missing_ok=True)
+
+    # background 在响应发送完成后释放上游连接；若响应被丢弃未发送，调用方应手动 await response.background()
+    return StreamingResponse(
+        _stream(),
+        media_type=content_type,
+        headers=response_headers,
+        background=BackgroundTask(_close)
+    )
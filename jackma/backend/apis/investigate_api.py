@@ -17,8 +17,13 @@ API地址: http://47.253.238.111:3007/investigate/{phone}
 """
 import httpx
 import logging
-from typing import Dict, Any, Optional
-from .investigate_data_processor import process_investigate_response, get_investigate_summary
+from typing import Dict, Any, List, Optional
+from .investigate_data_processor import (
+    InvestigateDataProcessor,
+    process_investigate_response,
+    get_investigate_summary,
+)
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +32,132 @@ INVESTIGATE_API_BASE_URL = "http://47.253.238.111:3007"
 INVESTIGATE_API_TIMEOUT = 120  # 120秒超时
 
 
-async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEOUT) -> Dict[str, Any]:
+# 处理器读取的元数据字段（与 person_profile 一起构成处理器输入，随结果保存以便按需重算板块）
+PROCESSOR_META_FIELDS = (
+    "investigation_id", "phone_number", "status", "duration_seconds",
+    "data_sources_count", "start_time", "end_time",
+)
+
+
+def build_processor_input(normalized_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从规范化数据中取出处理器需要的字段（元数据 + person_profile）
+
+    查询时与按需计算板块时使用同一份输入，两者结果一致并命中同一个处理缓存条目
+    """
+    processor_input = {k: normalized_data[k] for k in PROCESSOR_META_FIELDS if k in normalized_data}
+    processor_input["person_profile"] = normalized_data.get("person_profile") or {}
+    return processor_input
+
+
+def normalize_investigate_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    规范化 Investigate API 原始响应，确保下游处理器能识别核心字段：
+    补齐 person_profile / summary / data_sources_count（兼容嵌套在 pipeline_result 中的结构），
+    person_profile 为空时使用 phone_lookup_data 构造最小可用档案
+    
+    Args:
+        data: API 原始响应
+        
+    Returns:
+        规范化后的数据（data 的浅拷贝）
+    """
+    pipeline_result = data.get("pipeline_result", {})
+    pipeline_results = pipeline_result.get("results", {}) if isinstance(pipeline_result, dict) else {}
+    person_profile = data.get("person_profile") or pipeline_results.get("person_profile") or {}
+    
+    # 提取并规范化 summary（兼容嵌套结构）
+    summary = data.get("summary") or pipeline_results.get("summary") or {}
+    data_sources_count = (
+        summary.get("data_sources_found")
+        if isinstance(summary, dict) else 0
+    )
+
+    # 规范化原始数据，确保下游处理器能识别核心字段
+    normalized_data = dict(data)
+    normalized_data["person_profile"] = person_profile
+    normalized_data["summary"] = summary
+
+    # Fallback：若顶层数据源统计为0，尝试使用 api_sources 或 phone_lookup 估算
+    if not isinstance(data_sources_count, int) or data_sources_count == 0:
+        api_sources = []
+        try:
+            api_sources = pipeline_results.get("phone_lookup_data", {}).get("api_sources", [])
+        except Exception:
+            api_sources = []
+        if isinstance(api_sources, list) and len(api_sources) > 0:
+            data_sources_count = len(api_sources)
+        elif pipeline_results.get("phone_lookup_data"):
+            data_sources_count = 1
+        else:
+            data_sources_count = 0
+        # 写回 normalized_data.summary
+        if isinstance(summary, dict):
+            summary["data_sources_found"] = data_sources_count
+        normalized_data["summary"] = summary
+        normalized_data["data_sources_count"] = data_sources_count
+    else:
+        normalized_data["data_sources_count"] = data_sources_count
+
+    # Fallback：构造人物档案（当 person_profile 为空时，使用 phone_lookup_data 填充）
+    def is_empty_profile(profile: Dict[str, Any]) -> bool:
+        try:
+            return not profile or (
+                not profile.get("phones") and not profile.get("emails") and not profile.get("addresses")
+            )
+        except Exception:
+            return True
+    if is_empty_profile(person_profile):
+        phone_lookup = pipeline_results.get("phone_lookup_data", {}) if isinstance(pipeline_results, dict) else {}
+        raw_pl = phone_lookup.get("raw_data", {}) if isinstance(phone_lookup, dict) else {}
+        primary_name = phone_lookup.get("name") or raw_pl.get("name") or ""
+        city = phone_lookup.get("city") or raw_pl.get("location", "")
+        state = phone_lookup.get("state") or ""
+        metro_area = ", ".join([v for v in [city, state] if v]) or (raw_pl.get("location") or "")
+        number_e164 = raw_pl.get("phone_number") or phone_lookup.get("phone") or ""
+        formatted_phone = phone_lookup.get("formatted_phone") or raw_pl.get("formatted_number") or number_e164
+        carrier = phone_lookup.get("carrier") or raw_pl.get("carrier") or ""
+        number_type = phone_lookup.get("number_type") or raw_pl.get("number_type") or ""
+        confidence = phone_lookup.get("confidence_score") or raw_pl.get("confidence_score") or 0
+        # 构建最小可用的档案
+        fallback_profile = {
+            "primary_name": primary_name,
+            "name_variants": phone_lookup.get("all_detected_names", []) or [],
+            "gender": "",
+            "age": None,
+            "birthdate": "",
+            "geolocation": {"metro_area": metro_area},
+            "phones": [
+                {
+                    "number_e164": number_e164,
+                    "display": formatted_phone,
+                    "carrier": carrier,
+                    "location": metro_area,
+                    "type": number_type,
+                    "confidence": confidence,
+                }
+            ] if number_e164 else [],
+            "emails": [],
+            "addresses": [],
+            "employment": [],
+            "education": [],
+            "relatives": [],
+            "leaked_credentials": {"total": 0, "sources": []},
+            "sources": phone_lookup.get("api_sources", []) or []
+        }
+        normalized_data["person_profile"] = fallback_profile
+    
+    return normalized_data
+
+
+async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEOUT, sections: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     调用 Investigate API 查询电话号码的详细信息
     
     Args:
         phone: 电话号码（支持 +14126704024 或 14126704024 格式）
         timeout: 超时时间（秒），默认120秒
+        sections: processed 中只计算这些板块（None 表示全部）
         
     Returns:
         Dict包含:
@@ -53,7 +177,7 @@ async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEO
         logger.info(f"📡 [Investigate API] URL: {url}")
         
         # 发送请求
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("investigate_api", timeout=timeout) as client:
             response = await client.get(url)
             
             if response.status_code == 200:
@@ -67,91 +191,10 @@ async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEO
                 # 提取pipeline结果
                 pipeline_result = data.get("pipeline_result", {})
                 pipeline_success = pipeline_result.get("success", False)
-                pipeline_results = pipeline_result.get("results", {}) if isinstance(pipeline_result, dict) else {}
                 
-                # 提取并规范化 person_profile（兼容嵌套结构）
-                person_profile = data.get("person_profile") or pipeline_results.get("person_profile") or {}
-                
-                # 提取并规范化 summary（兼容嵌套结构）
-                summary = data.get("summary") or pipeline_results.get("summary") or {}
-                data_sources_count = (
-                    summary.get("data_sources_found")
-                    if isinstance(summary, dict) else 0
-                )
-                
-                # 规范化原始数据，确保下游处理器能识别核心字段
-                normalized_data = dict(data)
-                normalized_data["person_profile"] = person_profile
-                normalized_data["summary"] = summary
-                
-                # Fallback：若顶层数据源统计为0，尝试使用 api_sources 或 phone_lookup 估算
-                if not isinstance(data_sources_count, int) or data_sources_count == 0:
-                    api_sources = []
-                    try:
-                        api_sources = pipeline_results.get("phone_lookup_data", {}).get("api_sources", [])
-                    except Exception:
-                        api_sources = []
-                    if isinstance(api_sources, list) and len(api_sources) > 0:
-                        data_sources_count = len(api_sources)
-                    elif pipeline_results.get("phone_lookup_data"):
-                        data_sources_count = 1
-                    else:
-                        data_sources_count = 0
-                    # 写回 normalized_data.summary
-                    if isinstance(summary, dict):
-                        summary["data_sources_found"] = data_sources_count
-                    normalized_data["summary"] = summary
-                    normalized_data["data_sources_count"] = data_sources_count
-                else:
-                    normalized_data["data_sources_count"] = data_sources_count
-                
-                # Fallback：构造人物档案（当 person_profile 为空时，使用 phone_lookup_data 填充）
-                def is_empty_profile(profile: Dict[str, Any]) -> bool:
-                    try:
-                        return not profile or (
-                            not profile.get("phones") and not profile.get("emails") and not profile.get("addresses")
-                        )
-                    except Exception:
-                        return True
-                if is_empty_profile(person_profile):
-                    phone_lookup = pipeline_results.get("phone_lookup_data", {}) if isinstance(pipeline_results, dict) else {}
-                    raw_pl = phone_lookup.get("raw_data", {}) if isinstance(phone_lookup, dict) else {}
-                    primary_name = phone_lookup.get("name") or raw_pl.get("name") or ""
-                    city = phone_lookup.get("city") or raw_pl.get("location", "")
-                    state = phone_lookup.get("state") or ""
-                    metro_area = ", ".join([v for v in [city, state] if v]) or (raw_pl.get("location") or "")
-                    number_e164 = raw_pl.get("phone_number") or phone_lookup.get("phone") or ""
-                    formatted_phone = phone_lookup.get("formatted_phone") or raw_pl.get("formatted_number") or number_e164
-                    carrier = phone_lookup.get("carrier") or raw_pl.get("carrier") or ""
-                    number_type = phone_lookup.get("number_type") or raw_pl.get("number_type") or ""
-                    confidence = phone_lookup.get("confidence_score") or raw_pl.get("confidence_score") or 0
-                    # 构建最小可用的档案
-                    fallback_profile = {
-                        "primary_name": primary_name,
-                        "name_variants": phone_lookup.get("all_detected_names", []) or [],
-                        "gender": "",
-                        "age": None,
-                        "birthdate": "",
-                        "geolocation": {"metro_area": metro_area},
-                        "phones": [
-                            {
-                                "number_e164": number_e164,
-                                "display": formatted_phone,
-                                "carrier": carrier,
-                                "location": metro_area,
-                                "type": number_type,
-                                "confidence": confidence,
-                            }
-                        ] if number_e164 else [],
-                        "emails": [],
-                        "addresses": [],
-                        "employment": [],
-                        "education": [],
-                        "relatives": [],
-                        "leaked_credentials": {"total": 0, "sources": []},
-                        "sources": phone_lookup.get("api_sources", []) or []
-                    }
-                    normalized_data["person_profile"] = fallback_profile
+                normalized_data = normalize_investigate_payload(data)
+                processor_input = build_processor_input(normalized_data)
+                data_sources_count = normalized_data["data_sources_count"]
                 
                 logger.info(f"✅ [Investigate API] 查询成功")
                 logger.info(f"📊 [Investigate API] 调查ID: {investigation_id}")
@@ -163,10 +206,10 @@ async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEO
                 logger.info(f"🔄 [Investigate API] 开始数据处理...")
                 raw_response_data = {
                     "success": True,
-                    "data": normalized_data
+                    "data": processor_input
                 }
                 
-                processed_data = process_investigate_response(raw_response_data)
+                processed_data = process_investigate_response(raw_response_data, sections=sections)
                 summary_data = get_investigate_summary(raw_response_data)
                 
                 if processed_data:
@@ -265,25 +308,28 @@ async def query_investigate_api(phone: str, timeout: int = INVESTIGATE_API_TIMEO
                         }
                     }
                 
-                    return {
-                        "success": True,
-                        "source": "investigate_api",
-                        "data": {
-                            "investigation_id": investigation_id,
-                            "phone_number": phone_clean,
-                            "status": status,
-                            "duration_seconds": duration,
-                            "pipeline_success": pipeline_success,
-                            "data_sources_count": data_sources_count,
-                            
-                            # 处理后的数据（优先使用）
-                            "processed": processed_data,
-                            "summary": summary_data,
+                return {
+                    "success": True,
+                    "source": "investigate_api",
+                    "data": {
+                        "investigation_id": investigation_id,
+                        "phone_number": phone_clean,
+                        "status": status,
+                        "duration_seconds": duration,
+                        "pipeline_success": pipeline_success,
+                        "data_sources_count": data_sources_count,
+                        
+                        # 处理后的数据（优先使用）
+                        "processed": processed_data,
+                        "summary": summary_data,
                         
-                        # 核心数据（向后兼容）
-                        "person_profile": person_profile,
+                        # 核心数据（向后兼容；person_profile 为规范化后的档案，即 processed 的数据来源）
+                        "person_profile": processor_input["person_profile"],
                         "pipeline_result": pipeline_result,
                         
+                        # 处理器输入的元数据（与 person_profile 一起用于按需重算板块）
+                        "processor_meta": {k: v for k, v in processor_input.items() if k != "person_profile"},
+                        
                         # 原始数据（可选，用于调试）
                         # "raw_data": data  # 注释掉以减少响应大小
                     },
@@ -395,6 +441,61 @@ async def extract_person_summary(investigate_data: Dict[str, Any]) -> Dict[str,
         }
 
 
+def select_investigate_sections(results: List[Dict[str, Any]], sections: Optional[List[str]]) -> List[Dict[str, Any]]:
+    """
+    按 sections 裁剪聚合结果中 Investigate API 的 processed 数据（返回新列表，不修改原结果）
+    
+    Args:
+        results: 聚合查询返回的各 API 结果列表
+        sections: 保留的板块（None 表示不裁剪；包含 summary 时保留摘要）
+        
+    Returns:
+        裁剪后的结果列表
+    """
+    if sections is None or not isinstance(results, list):
+        return results
+    selected = []
+    for result in results:
+        data = result.get("data") if isinstance(result, dict) else None
+        if result.get("source") != "investigate_api" or not isinstance(data, dict) or not isinstance(data.get("processed"), dict):
+            selected.append(result)
+            continue
+        trimmed = {**data, "processed": {k: v for k, v in data["processed"].items() if k in sections}}
+        if "summary" not in sections:
+            trimmed.pop("summary", None)
+        selected.append({**result, "data": trimmed})
+    return selected
+
+
+def get_investigate_sections(result: Dict[str, Any], sections: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    从已保存的 Investigate API 结果中按需计算板块
+    
+    用结果中保存的处理器输入（processor_meta + person_profile）重新处理，与查询时的输入相同，
+    结果与 processed 一致并命中查询时的处理缓存；只计算请求的板块
+    
+    Args:
+        result: query_investigate_api 的返回值（success 为 True）
+        sections: 需要的板块（None 表示全部）
+        
+    Returns:
+        {板块名: 数据}，无法处理时返回None
+    """
+    data = result.get("data")
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("processor_meta"), dict):
+        processor_input = {**data["processor_meta"], "person_profile": data.get("person_profile") or {}}
+    else:
+        # 早期保存的结果没有 processor_meta：按原始字段重新规范化（summary 是派生摘要，不参与）
+        source = {k: v for k, v in data.items() if k not in ("processed", "summary")}
+        processor_input = build_processor_input(normalize_investigate_payload(source))
+    lazy = InvestigateDataProcessor({"success": True, "data": processor_input}).process_lazy()
+    if lazy is None:
+        return None
+    return lazy.select(sections)
+
+
 # 测试函数
 async def test_investigate_api():
     """测试 Investigate API"""
@@ -1,13 +1,96 @@
 """
 Investigate API 后端数据处理器
 在服务器端处理海量数据，减轻前端负担
+
+处理分两步：先对 person_profile 做一次遍历，建立各类去重索引（电话、邮箱、地址、姓名等），
+各板块再基于共享索引输出，避免每个板块重复扫描同一列表。
+各板块惰性计算（只在访问时计算）；处理结果按 investigation_id 缓存，重复处理/生成摘要时直接复用
 """
+import heapq
 import logging
-from typing import Dict, Any, List, Set
-from collections import defaultdict
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from typing import Dict, Any, List, Optional
+
 
 logger = logging.getLogger(__name__)
 
+# 处理结果缓存（按 memo_key，LRU）
+PROCESS_CACHE_SIZE = int(os.environ.get('INVESTIGATE_PROCESS_CACHE_SIZE', 128))
+
+_process_cache: "OrderedDict[str, LazyProcessedResult]" = OrderedDict()
+_process_cache_lock = threading.Lock()
+
+# 处理结果的板块（按输出顺序）；summary 可作为额外选择项
+SECTIONS = (
+    'meta', 'identity', 'contacts', 'professional', 'social',
+    'geographic', 'network', 'financial', 'security', 'quality',
+)
+SELECTABLE_SECTIONS = SECTIONS + ('summary',)
+
+# person_profile 中需要遍历的列表字段
+PROFILE_LIST_FIELDS = (
+    'name_variants', 'languages', 'phones', 'emails', 'addresses', 'employment', 'education',
+    'account_registrations', 'relatives', 'property_records', 'leaked_credentials', 'ip_history',
+    'sources',
+)
+
+
+def memo_key(raw_data: Dict[str, Any]) -> Optional[str]:
+    """
+    处理缓存键：investigation_id + 状态、结束时间和档案各列表长度（廉价的一致性校验）
+
+    不对整个响应做内容哈希：序列化大型档案的开销与一次处理相当。
+    没有 investigation_id 时返回 None（不缓存）
+    """
+    data = raw_data.get('data') if isinstance(raw_data, dict) else None
+    if not isinstance(data, dict) or not data.get('investigation_id'):
+        return None
+    profile = data.get('person_profile')
+    if not isinstance(profile, dict):
+        profile = {}
+    lengths = ','.join(
+        str(len(value)) if isinstance(value, (list, dict)) else '-'
+        for value in (profile.get(field) for field in PROFILE_LIST_FIELDS)
+    )
+    return f"{data['investigation_id']}|{data.get('status', '')}|{data.get('end_time', '')}|{lengths}"
+
+
+def _merge_record(index: Dict[str, Dict], key: str, item: Dict, build, sources_field: str = 'source'):
+    """按键合并记录：首次出现时建立记录，之后合并来源并取最高置信度"""
+    sources = item.get(sources_field)
+    if not isinstance(sources, list):
+        sources = [sources] if sources else []
+    existing = index.get(key)
+    if existing is None:
+        record = build(item)
+        record['sources'] = set(sources)
+        index[key] = record
+    else:
+        existing['sources'].update(sources)
+        confidence = item.get('confidence') or 0
+        if confidence > existing['confidence']:
+            existing['confidence'] = confidence
+
+
+def _finalize(index: Dict[str, Dict], sort_key, limit: int) -> List[Dict]:
+    """
+    取排序后的前 limit 条记录（来源集合转为列表）
+    
+    各板块只输出前 N 条，用 nlargest 选出后再物化，无需复制全部记录
+    """
+    top = heapq.nlargest(limit, index.values(), key=sort_key)
+    return [
+        {**r, 'sources': list(r['sources']), 'sources_count': len(r['sources'])}
+        for r in top
+    ]
+
+
+def _by_confidence(record: Dict) -> float:
+    return record.get('confidence') or 0
+
 
 class InvestigateDataProcessor:
     """
@@ -19,16 +102,63 @@ class InvestigateDataProcessor:
         self.raw_data = raw_data
         self.processed_data = None
     
-    def process(self) -> Dict[str, Any]:
+    def process_lazy(self) -> Optional['LazyProcessedResult']:
         """
-        执行完整的数据处理流程
+        返回惰性处理结果：各板块在首次访问时才计算并缓存
+        
+        相同调查（memo_key）复用同一个结果对象，已计算的板块不再重复计算
         """
         if not self.raw_data or 'data' not in self.raw_data:
             logger.error("❌ [DataProcessor] Invalid raw data")
             return None
         
+        key = memo_key(self.raw_data)
+        if key is not None:
+            with _process_cache_lock:
+                cached = _process_cache.get(key)
+                if cached is not None:
+                    _process_cache.move_to_end(key)
+            if cached is not None:
+                logger.info(f"⚡ [DataProcessor] 命中处理缓存: {key.split('|')[0]}")
+                return cached
+        
         data = self.raw_data['data']
+        result = LazyProcessedResult(self, data, self._resolve_profile(data))
+        
+        if key is not None:
+            with _process_cache_lock:
+                _process_cache[key] = result
+                _process_cache.move_to_end(key)
+                while len(_process_cache) > PROCESS_CACHE_SIZE:
+                    _process_cache.popitem(last=False)
         
+        return result
+    
+    def process(self) -> Dict[str, Any]:
+        """
+        执行完整的数据处理流程（计算全部板块）
+        
+        返回的结构在缓存中共享，调用方不应原地修改
+        """
+        if self.processed_data:
+            return self.processed_data
+        
+        result = self.process_lazy()
+        if result is None:
+            return None
+        
+        already_complete = result.is_complete
+        self.processed_data = result.to_dict()
+        
+        if not already_complete:
+            # 计算处理统计
+            stats = self._calculate_stats()
+            logger.info(f"✅ [DataProcessor] 处理完成: {stats}")
+        
+        return self.processed_data
+    
+    def _resolve_profile(self, data: Dict) -> Dict:
+        """取出 person_profile；为空时从 processed 字段重建"""
         # 防御性类型检查：某些响应会以字符串占位，需转为空结构
         person_profile = data.get('person_profile', {})
         if not isinstance(person_profile, dict):
@@ -59,46 +189,171 @@ class InvestigateDataProcessor:
                     'sources': [],
                     'confidence_score': processed.get('quality', {}).get('overall_confidence', 0)
                 }
+        return person_profile
+    
+    def _build_index(self, profile: Dict) -> Dict[str, Any]:
+        """
+        遍历一次 person_profile，建立所有板块共用的去重索引
         
-        logger.info(f"🔄 [DataProcessor] 开始处理数据...")
-        
-        self.processed_data = {
-            # 元数据
-            'meta': self._extract_metadata(data),
-            
-            # 核心身份（去重姓名）
-            'identity': self._process_identity(person_profile),
-            
-            # 联系方式（深度去重）
-            'contacts': self._process_contacts(person_profile),
-            
-            # 职业信息（合并同公司）
-            'professional': self._process_professional(person_profile),
-            
-            # 社交媒体（智能分组）
-            'social': self._process_social(person_profile),
-            
-            # 地理信息（合并地址）
-            'geographic': self._process_geographic(person_profile),
-            
-            # 关系网络（去重）
-            'network': self._process_network(person_profile),
-            
-            # 财务信息（去重房产）
-            'financial': self._process_financial(person_profile),
-            
-            # 安全信息（分组泄露）
-            'security': self._process_security(person_profile),
-            
-            # 数据质量
-            'quality': self._calculate_quality(person_profile)
+        非列表字段视为空列表，非 dict 元素直接跳过
+        """
+        lists = {}
+        for field in PROFILE_LIST_FIELDS:
+            value = profile.get(field, [])
+            lists[field] = value if isinstance(value, list) else []
+        
+        index = {
+            'lists': lists,
+            'names': list(dict.fromkeys(lists['name_variants'])),
+            'languages': list(dict.fromkeys(lists['languages'])),
+            'phones': {},
+            'emails': {},
+            'addresses': {},
+            'companies': defaultdict(list),
+            'platforms': defaultdict(lambda: {'accounts': [], 'emails': set(), 'registration_dates': []}),
+            'relatives': {},
+            'properties': {},
+            'leak_sources': defaultdict(lambda: {'count': 0, 'emails': set(), 'leak_dates': [], 'has_plaintext': False}),
+            'leaked_emails': {},
+            'unique_ips': {},
         }
         
-        # 计算处理统计
-        stats = self._calculate_stats()
-        logger.info(f"✅ [DataProcessor] 处理完成: {stats}")
+        # 电话：按 E.164 合并
+        phones = index['phones']
+        for phone in lists['phones']:
+            if not isinstance(phone, dict):
+                continue
+            key = phone.get('number_e164')
+            if not key:
+                continue
+            _merge_record(phones, key, phone, lambda p: {
+                'number': p.get('number_e164'),
+                'display': p.get('display', p.get('number_e164')),
+                'type': p.get('type', 'unknown'),
+                'carrier': p.get('carrier', 'Unknown'),
+                'location': p.get('location', ''),
+                'confidence': p.get('confidence', 0),
+                'last_seen': p.get('last_seen')
+            })
+        
+        # 邮箱：按规范化地址（小写）合并
+        emails = index['emails']
+        for email in lists['emails']:
+            if not isinstance(email, dict):
+                continue
+            key = (email.get('normalized') or email.get('address') or '').lower()
+            if not key:
+                continue
+            _merge_record(emails, key, email, lambda e: {
+                'address': e.get('address'),
+                'normalized': e.get('normalized', e.get('address')),
+                'type': e.get('type', 'unknown'),
+                'domain': e.get('domain', ''),
+                'confidence': e.get('confidence', 0),
+                'last_seen': e.get('last_seen')
+            })
         
-        return self.processed_data
+        # 地址：按 街道|城市|邮编 合并
+        addresses = index['addresses']
+        for addr in lists['addresses']:
+            if not isinstance(addr, dict):
+                continue
+            key = '|'.join([
+                (addr.get('street') or '').lower().strip(),
+                (addr.get('city') or '').lower().strip(),
+                (addr.get('postal_code') or '').lower().strip()
+            ])
+            if key == '||':
+                continue
+            _merge_record(addresses, key, addr, lambda a: {
+                'street': a.get('street', ''),
+                'city': a.get('city', ''),
+                'state': a.get('state', ''),
+                'postal_code': a.get('postal_code', ''),
+                'country': a.get('country', 'US'),
+                'role': a.get('role', 'unknown'),
+                'confidence': a.get('confidence', 0),
+                'geolocation': a.get('geolocation')
+            })
+        
+        # 职业：按公司分组
+        companies = index['companies']
+        for job in lists['employment']:
+            if isinstance(job, dict):
+                companies[job.get('company', 'Unknown')].append(job)
+        
+        # 社交账户：按平台分组
+        platforms = index['platforms']
+        for account in lists['account_registrations']:
+            if not isinstance(account, dict) or not account.get('platform'):
+                continue
+            platform_data = platforms[account['platform']]
+            platform_data['accounts'].append(account)
+            if account.get('email'):
+                platform_data['emails'].add(account['email'])
+            if account.get('registration_date'):
+                platform_data['registration_dates'].append(account['registration_date'])
+        
+        # 亲属：按姓名合并
+        relatives = index['relatives']
+        for rel in lists['relatives']:
+            if not isinstance(rel, dict):
+                continue
+            name = (rel.get('name') or '').strip()
+            if not name:
+                continue
+            _merge_record(relatives, name, rel, lambda r: {
+                'name': (r.get('name') or '').strip(),
+                'relationship': r.get('relationship', 'unknown'),
+                'confidence': r.get('confidence', 0)
+            }, sources_field='sources')
+        
+        # 房产：按 地址_城市_邮编 合并
+        properties = index['properties']
+        for prop in lists['property_records']:
+            if not isinstance(prop, dict):
+                continue
+            key = f"{prop.get('address') or ''}_{prop.get('city') or ''}_{prop.get('postal_code') or ''}".lower()
+            if key == '__':
+                continue
+            _merge_record(properties, key, prop, lambda p: {
+                'address': p.get('address', ''),
+                'city': p.get('city', ''),
+                'state': p.get('state', ''),
+                'postal_code': p.get('postal_code', ''),
+                'purchase_year': p.get('purchase_year'),
+                'built_year': p.get('built_year'),
+                'estimated_value': p.get('estimated_value', ''),
+                'bedrooms': p.get('bedrooms', 0),
+                'bathrooms': p.get('bathrooms', 0),
+                'square_feet': p.get('square_feet', 0),
+                'property_type': p.get('property_type', ''),
+                'confidence': p.get('confidence', 0)
+            }, sources_field='sources')
+        
+        # 泄露凭证：按泄露源分组
+        leak_sources = index['leak_sources']
+        leaked_emails = index['leaked_emails']
+        for cred in lists['leaked_credentials']:
+            if not isinstance(cred, dict):
+                continue
+            source_data = leak_sources[cred.get('leak_source', 'Unknown')]
+            source_data['count'] += 1
+            if cred.get('email'):
+                source_data['emails'].add(cred['email'])
+                leaked_emails[cred['email']] = None
+            if cred.get('leak_date'):
+                source_data['leak_dates'].append(cred['leak_date'])
+            if cred.get('plaintext_available'):
+                source_data['has_plaintext'] = True
+        
+        # IP 去重（保持首次出现顺序）
+        unique_ips = index['unique_ips']
+        for ip in lists['ip_history']:
+            if isinstance(ip, dict) and ip.get('ip'):
+                unique_ips[ip['ip']] = None
+        
+        return index
     
     def _extract_metadata(self, data: Dict) -> Dict:
         """提取元数据"""
@@ -112,10 +367,9 @@ class InvestigateDataProcessor:
             'end_time': data.get('end_time', '')
         }
     
-    def _process_identity(self, profile: Dict) -> Dict:
+    def _process_identity(self, profile: Dict, index: Dict) -> Dict:
         """处理身份信息 - 去重姓名变体"""
-        name_variants = profile.get('name_variants', [])
-        unique_names = list(set(name_variants))  # 去重
+        unique_names = index['names']
         
         return {
             'primary_name': profile.get('primary_name', ''),
@@ -128,108 +382,38 @@ class InvestigateDataProcessor:
             'middle_name': profile.get('middle_name', ''),
             'ethnicity': profile.get('ethnicity', ''),
             'religion': profile.get('religion', ''),
-            'languages': list(set(profile.get('languages', []))),  # 去重语言
+            'languages': index['languages'],
             'confidence_score': profile.get('confidence_score', 0)
         }
     
-    def _process_contacts(self, profile: Dict) -> Dict:
+    def _process_contacts(self, index: Dict) -> Dict:
         """处理联系方式 - 深度去重和合并"""
-        phones = profile.get('phones', [])
-        emails = profile.get('emails', [])
-        
-        # 电话去重和合并
-        phone_map = {}
-        for phone in phones:
-            key = phone.get('number_e164')
-            if not key:
-                continue
-            
-            if key not in phone_map:
-                phone_map[key] = {
-                    'number': key,
-                    'display': phone.get('display', key),
-                    'type': phone.get('type', 'unknown'),
-                    'carrier': phone.get('carrier', 'Unknown'),
-                    'location': phone.get('location', ''),
-                    'confidence': phone.get('confidence', 0),
-                    'sources': set(phone.get('source', [])),
-                    'last_seen': phone.get('last_seen')
-                }
-            else:
-                # 合并来源
-                existing = phone_map[key]
-                existing['sources'].update(phone.get('source', []))
-                # 更新置信度（取最高值）
-                existing['confidence'] = max(existing['confidence'], phone.get('confidence', 0))
-        
-        # 转换为列表并排序
-        processed_phones = [
-            {**p, 'sources': list(p['sources']), 'sources_count': len(p['sources'])}
-            for p in phone_map.values()
-        ]
-        processed_phones.sort(key=lambda x: x['confidence'], reverse=True)
-        
-        # 邮箱去重和合并
-        email_map = {}
-        for email in emails:
-            key = (email.get('normalized') or email.get('address', '')).lower()
-            if not key:
-                continue
-            
-            if key not in email_map:
-                email_map[key] = {
-                    'address': email.get('address'),
-                    'normalized': email.get('normalized', email.get('address')),
-                    'type': email.get('type', 'unknown'),
-                    'domain': email.get('domain', ''),
-                    'confidence': email.get('confidence', 0),
-                    'sources': set(email.get('source', [])),
-                    'last_seen': email.get('last_seen')
-                }
-            else:
-                # 合并来源
-                existing = email_map[key]
-                existing['sources'].update(email.get('source', []))
-                existing['confidence'] = max(existing['confidence'], email.get('confidence', 0))
-        
-        # 转换为列表并排序
-        processed_emails = [
-            {**e, 'sources': list(e['sources']), 'sources_count': len(e['sources'])}
-            for e in email_map.values()
-        ]
-        processed_emails.sort(key=lambda x: x['confidence'], reverse=True)
+        # 高置信度列表是按置信度排序后的前缀，因此只需物化前 N 条
+        processed_phones = _finalize(index['phones'], _by_confidence, 20)
+        processed_emails = _finalize(index['emails'], _by_confidence, 25)
         
         return {
             'phones': {
-                'all': processed_phones[:20],  # 只保留前20个
+                'all': processed_phones,  # 只保留前20个
                 'high_confidence': [p for p in processed_phones if p['confidence'] >= 0.8][:10],
-                'total': len(processed_phones),
+                'total': len(index['phones']),
                 'primary': processed_phones[0] if processed_phones else None
             },
             'emails': {
-                'all': processed_emails[:25],  # 只保留前25个
+                'all': processed_emails,  # 只保留前25个
                 'high_confidence': [e for e in processed_emails if e['confidence'] >= 0.8][:15],
-                'total': len(processed_emails),
+                'total': len(index['emails']),
                 'primary': processed_emails[0] if processed_emails else None
             }
         }
     
-    def _process_professional(self, profile: Dict) -> Dict:
+    def _process_professional(self, profile: Dict, index: Dict) -> Dict:
         """处理职业信息 - 按公司合并"""
-        employment = profile.get('employment', [])
-        education = profile.get('education', [])
-        
-        # 按公司分组
-        company_map = defaultdict(list)
-        for job in employment:
-            company = job.get('company', 'Unknown')
-            company_map[company].append(job)
-        
         # 合并同公司职位
         consolidated = []
-        for company, jobs in company_map.items():
+        for company, jobs in index['companies'].items():
             # 按开始日期排序
-            jobs.sort(key=lambda j: j.get('start_date', '0000-00-00'), reverse=True)
+            jobs = sorted(jobs, key=lambda j: j.get('start_date') or '0000-00-00', reverse=True)
             
             consolidated.append({
                 'company': company,
@@ -246,52 +430,30 @@ class InvestigateDataProcessor:
                 ],
                 'total_positions': len(jobs),
                 'latest_position': jobs[0].get('title', '') if jobs else '',
-                'confidence': max([j.get('confidence', 0) for j in jobs], default=0)
+                'confidence': max([j.get('confidence', 0) or 0 for j in jobs], default=0)
             })
         
         # 按置信度排序
-        consolidated.sort(key=lambda x: x['confidence'], reverse=True)
+        consolidated.sort(key=_by_confidence, reverse=True)
         
         return {
             'employment': consolidated[:15],  # 最多15个公司
-            'education': education[:10],
+            'education': index['lists']['education'][:10],
             'income_bracket': profile.get('income_bracket', ''),
             'total_companies': len(consolidated),
-            'total_positions': len(employment)
+            'total_positions': len(index['lists']['employment'])
         }
     
-    def _process_social(self, profile: Dict) -> Dict:
+    def _process_social(self, index: Dict) -> Dict:
         """处理社交媒体 - 智能分组"""
-        registrations = profile.get('account_registrations', [])
-        
-        # 按平台分组
-        platform_map = defaultdict(lambda: {
-            'accounts': [],
-            'emails': set(),
-            'registration_dates': []
-        })
-        
-        for account in registrations:
-            platform = account.get('platform')
-            if not platform:
-                continue
-            
-            platform_data = platform_map[platform]
-            platform_data['accounts'].append(account)
-            if account.get('email'):
-                platform_data['emails'].add(account['email'])
-            if account.get('registration_date'):
-                platform_data['registration_dates'].append(account['registration_date'])
-        
-        # 转换为列表
         platforms = []
-        for platform_name, data in platform_map.items():
+        for platform_name, data in index['platforms'].items():
             platforms.append({
                 'platform': platform_name,
                 'account_count': len(data['accounts']),
                 'unique_emails': list(data['emails']),
                 'email_count': len(data['emails']),
-                'earliest_registration': sorted(data['registration_dates'])[0] if data['registration_dates'] else '',
+                'earliest_registration': min(data['registration_dates']) if data['registration_dates'] else '',
                 'accounts': data['accounts'][:3]  # 每个平台最多3个账户详情
             })
         
@@ -301,55 +463,19 @@ class InvestigateDataProcessor:
         return {
             'platforms': platforms[:30],  # 最多30个平台
             'total_platforms': len(platforms),
-            'total_accounts': len(registrations)
+            'total_accounts': len(index['lists']['account_registrations'])
         }
     
-    def _process_geographic(self, profile: Dict) -> Dict:
+    def _process_geographic(self, profile: Dict, index: Dict) -> Dict:
         """处理地理信息 - 合并地址"""
-        addresses = profile.get('addresses', [])
-        geolocation = profile.get('geolocation', {})
-        
-        # 地址去重
-        address_map = {}
-        for addr in addresses:
-            # 创建唯一键
-            key = '|'.join([
-                (addr.get('street') or '').lower().strip(),
-                (addr.get('city') or '').lower().strip(),
-                (addr.get('postal_code') or '').lower().strip()
-            ])
-            
-            if not key or key == '||':
-                continue
-            
-            if key not in address_map:
-                address_map[key] = {
-                    'street': addr.get('street', ''),
-                    'city': addr.get('city', ''),
-                    'state': addr.get('state', ''),
-                    'postal_code': addr.get('postal_code', ''),
-                    'country': addr.get('country', 'US'),
-                    'role': addr.get('role', 'unknown'),
-                    'confidence': addr.get('confidence', 0),
-                    'sources': set(addr.get('source', [])),
-                    'geolocation': addr.get('geolocation')
-                }
-            else:
-                # 合并来源
-                existing = address_map[key]
-                existing['sources'].update(addr.get('source', []))
-                existing['confidence'] = max(existing['confidence'], addr.get('confidence', 0))
-        
-        # 转换为列表并排序
-        processed_addresses = [
-            {**a, 'sources': list(a['sources']), 'sources_count': len(a['sources'])}
-            for a in address_map.values()
-        ]
-        processed_addresses.sort(key=lambda x: x['confidence'], reverse=True)
+        geolocation = profile.get('geolocation') or {}
+        if not isinstance(geolocation, dict):
+            geolocation = {}
+        processed_addresses = _finalize(index['addresses'], _by_confidence, 15)
         
         return {
-            'addresses': processed_addresses[:15],  # 最多15个地址
-            'total_addresses': len(processed_addresses),
+            'addresses': processed_addresses,  # 最多15个地址
+            'total_addresses': len(index['addresses']),
             'current_address': processed_addresses[0] if processed_addresses else None,
             'geolocation': {
                 'latitude': geolocation.get('latitude'),
@@ -362,140 +488,55 @@ class InvestigateDataProcessor:
             }
         }
     
-    def _process_network(self, profile: Dict) -> Dict:
+    def _process_network(self, profile: Dict, index: Dict) -> Dict:
         """处理关系网络 - 去重亲属"""
-        relatives = profile.get('relatives', [])
-        
-        # 亲属去重（基于姓名）
-        relatives_map = {}
-        for rel in relatives:
-            name = (rel.get('name') or '').strip()
-            if not name:
-                continue
-            
-            if name not in relatives_map:
-                relatives_map[name] = {
-                    'name': name,
-                    'relationship': rel.get('relationship', 'unknown'),
-                    'confidence': rel.get('confidence', 0),
-                    'sources': set(rel.get('sources', []))
-                }
-            else:
-                # 合并来源
-                existing = relatives_map[name]
-                existing['sources'].update(rel.get('sources', []))
-                existing['confidence'] = max(existing['confidence'], rel.get('confidence', 0))
-        
-        # 转换为列表并排序
-        processed_relatives = [
-            {**r, 'sources': list(r['sources']), 'sources_count': len(r['sources'])}
-            for r in relatives_map.values()
-        ]
-        processed_relatives.sort(key=lambda x: x['confidence'], reverse=True)
+        processed_relatives = _finalize(index['relatives'], _by_confidence, 20)
         
         return {
-            'relatives': processed_relatives[:20],  # 最多20个亲属
-            'total_relatives': len(processed_relatives),
+            'relatives': processed_relatives,  # 最多20个亲属
+            'total_relatives': len(index['relatives']),
             'associates': profile.get('associates', [])[:10],
             'household_members': profile.get('household_members', [])[:10]
         }
     
-    def _process_financial(self, profile: Dict) -> Dict:
+    def _process_financial(self, profile: Dict, index: Dict) -> Dict:
         """处理财务信息 - 去重房产"""
-        properties = profile.get('property_records', [])
-        
-        # 房产去重
-        property_map = {}
-        for prop in properties:
-            key = f"{prop.get('address', '')}_{prop.get('city', '')}_{prop.get('postal_code', '')}".lower()
-            if not key or key == '__':
-                continue
-            
-            if key not in property_map:
-                property_map[key] = {
-                    'address': prop.get('address', ''),
-                    'city': prop.get('city', ''),
-                    'state': prop.get('state', ''),
-                    'postal_code': prop.get('postal_code', ''),
-                    'purchase_year': prop.get('purchase_year'),
-                    'built_year': prop.get('built_year'),
-                    'estimated_value': prop.get('estimated_value', ''),
-                    'bedrooms': prop.get('bedrooms', 0),
-                    'bathrooms': prop.get('bathrooms', 0),
-                    'square_feet': prop.get('square_feet', 0),
-                    'property_type': prop.get('property_type', ''),
-                    'sources': set(prop.get('sources', [])),
-                    'confidence': prop.get('confidence', 0)
-                }
-            else:
-                # 合并来源
-                existing = property_map[key]
-                existing['sources'].update(prop.get('sources', []))
-                existing['confidence'] = max(existing['confidence'], prop.get('confidence', 0))
-        
-        # 转换为列表并排序
-        processed_properties = [
-            {**p, 'sources': list(p['sources']), 'sources_count': len(p['sources'])}
-            for p in property_map.values()
-        ]
-        processed_properties.sort(key=lambda x: x.get('purchase_year') or 0, reverse=True)
+        processed_properties = _finalize(index['properties'], lambda x: x.get('purchase_year') or 0, 15)
         
         return {
-            'properties': processed_properties[:15],  # 最多15个房产
-            'total_properties': len(processed_properties),
+            'properties': processed_properties,  # 最多15个房产
+            'total_properties': len(index['properties']),
             'bank_affiliations': profile.get('bank_affiliations', []),
             'credit_capacity': profile.get('credit_capacity', {}),
             'income_bracket': profile.get('income_bracket', '')
         }
     
-    def _process_security(self, profile: Dict) -> Dict:
+    def _process_security(self, profile: Dict, index: Dict) -> Dict:
         """处理安全信息 - 分组泄露源"""
-        leaked_credentials = profile.get('leaked_credentials', [])
-        ip_history = profile.get('ip_history', [])
-        
-        # 按泄露源分组
-        leak_source_map = defaultdict(lambda: {
-            'count': 0,
-            'emails': set(),
-            'leak_dates': [],
-            'has_plaintext': False
-        })
-        
-        for cred in leaked_credentials:
-            source = cred.get('leak_source', 'Unknown')
-            source_data = leak_source_map[source]
-            source_data['count'] += 1
-            if cred.get('email'):
-                source_data['emails'].add(cred['email'])
-            if cred.get('leak_date'):
-                source_data['leak_dates'].append(cred['leak_date'])
-            if cred.get('plaintext_available'):
-                source_data['has_plaintext'] = True
+        ip_history = index['lists']['ip_history']
         
-        # 转换为列表
         leak_sources = [
             {
                 'source': source,
                 'count': data['count'],
                 'emails': list(data['emails']),
                 'email_count': len(data['emails']),
-                'latest_leak': sorted(data['leak_dates'], reverse=True)[0] if data['leak_dates'] else '',
+                'latest_leak': max(data['leak_dates']) if data['leak_dates'] else '',
                 'has_plaintext': data['has_plaintext']
             }
-            for source, data in leak_source_map.items()
+            for source, data in index['leak_sources'].items()
         ]
         leak_sources.sort(key=lambda x: x['count'], reverse=True)
         
-        # IP去重
-        unique_ips = list(set([ip.get('ip') for ip in ip_history if ip.get('ip')]))
+        unique_ips = list(index['unique_ips'])
         
         return {
             'leaked_credentials': {
-                'total': len(leaked_credentials),
+                'total': len(index['lists']['leaked_credentials']),
                 'sources': leak_sources[:20],  # 最多20个泄露源
                 'total_sources': len(leak_sources),
                 'has_plaintext': any(s['has_plaintext'] for s in leak_sources),
-                'affected_emails': list(set([c.get('email') for c in leaked_credentials if c.get('email')]))
+                'affected_emails': list(index['leaked_emails'])
             },
             'ip_history': {
                 'all': ip_history[:30],  # 最多30个IP记录
@@ -509,23 +550,23 @@ class InvestigateDataProcessor:
             'national_id': profile.get('national_id', [])
         }
     
-    def _calculate_quality(self, profile: Dict) -> Dict:
+    def _calculate_quality(self, profile: Dict, index: Dict) -> Dict:
         """计算数据质量指标"""
-        field_confidences = profile.get('field_confidences', {})
-        sources = profile.get('sources', [])
+        lists = index['lists']
+        sources = lists['sources']
         
         # 计算数据完整性
         completeness_fields = {
             'has_name': bool(profile.get('primary_name')),
             'has_age': bool(profile.get('age')),
             'has_gender': bool(profile.get('gender')),
-            'has_phones': len(profile.get('phones', [])) > 0,
-            'has_emails': len(profile.get('emails', [])) > 0,
-            'has_addresses': len(profile.get('addresses', [])) > 0,
-            'has_employment': len(profile.get('employment', [])) > 0,
-            'has_education': len(profile.get('education', [])) > 0,
-            'has_social': len(profile.get('account_registrations', [])) > 0,
-            'has_relatives': len(profile.get('relatives', [])) > 0
+            'has_phones': len(lists['phones']) > 0,
+            'has_emails': len(lists['emails']) > 0,
+            'has_addresses': len(lists['addresses']) > 0,
+            'has_employment': len(lists['employment']) > 0,
+            'has_education': len(lists['education']) > 0,
+            'has_social': len(lists['account_registrations']) > 0,
+            'has_relatives': len(lists['relatives']) > 0
         }
         
         filled_count = sum(completeness_fields.values())
@@ -534,7 +575,7 @@ class InvestigateDataProcessor:
         
         return {
             'overall_confidence': profile.get('confidence_score', 0),
-            'field_confidences': field_confidences,
+            'field_confidences': profile.get('field_confidences', {}),
             'completeness': {
                 'percentage': completeness_percentage,
                 'fields': completeness_fields,
@@ -586,64 +627,184 @@ class InvestigateDataProcessor:
         return self.processed_data
     
     def get_summary(self) -> Dict[str, Any]:
-        """获取数据摘要（用于快速预览）"""
-        if not self.processed_data:
-            result = self.process()
-            if not result:
-                logger.error("❌ [DataProcessor] 无法生成摘要：数据处理失败")
-                return None
+        """获取数据摘要（用于快速预览，只计算摘要用到的板块）"""
+        result = self.process_lazy()
+        if result is None:
+            logger.error("❌ [DataProcessor] 无法生成摘要：数据处理失败")
+            return None
+        return result.summary()
+
+
+class LazyProcessedResult(Mapping):
+    """
+    惰性处理结果
+    
+    按板块名访问（result['contacts']）时才计算该板块并缓存；
+    select() 只返回指定板块，summary() 只计算摘要需要的板块
+    """
+    
+    def __init__(self, processor: InvestigateDataProcessor, data: Dict, profile: Dict):
+        self._data = data
+        self._profile = profile
+        self._index = None
+        self._sections: Dict[str, Any] = {}
+        self._summary = None
+        
+        self._builders = {
+            # 元数据
+            'meta': lambda: processor._extract_metadata(self._data),
+            # 核心身份（去重姓名）
+            'identity': lambda: processor._process_identity(self._profile, self.index),
+            # 联系方式（深度去重）
+            'contacts': lambda: processor._process_contacts(self.index),
+            # 职业信息（合并同公司）
+            'professional': lambda: processor._process_professional(self._profile, self.index),
+            # 社交媒体（智能分组）
+            'social': lambda: processor._process_social(self.index),
+            # 地理信息（合并地址）
+            'geographic': lambda: processor._process_geographic(self._profile, self.index),
+            # 关系网络（去重）
+            'network': lambda: processor._process_network(self._profile, self.index),
+            # 财务信息（去重房产）
+            'financial': lambda: processor._process_financial(self._profile, self.index),
+            # 安全信息（分组泄露）
+            'security': lambda: processor._process_security(self._profile, self.index),
+            # 数据质量
+            'quality': lambda: processor._calculate_quality(self._profile, self.index),
+        }
+        self._build_index = processor._build_index
+    
+    @property
+    def index(self) -> Dict[str, Any]:
+        """共享索引（首个需要它的板块触发构建）"""
+        if self._index is None:
+            logger.info(f"🔄 [DataProcessor] 开始处理数据...")
+            self._index = self._build_index(self._profile)
+        return self._index
+    
+    @property
+    def is_complete(self) -> bool:
+        """是否所有板块都已计算"""
+        return len(self._sections) == len(SECTIONS)
+    
+    def __getitem__(self, name: str) -> Dict[str, Any]:
+        if name not in self._builders:
+            raise KeyError(name)
+        if name not in self._sections:
+            self._sections[name] = self._builders[name]()
+        return self._sections[name]
+    
+    def __iter__(self):
+        return iter(SECTIONS)
+    
+    def __len__(self) -> int:
+        return len(SECTIONS)
+    
+    def select(self, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """返回指定板块（None 表示全部；可包含 summary）"""
+        if sections is None:
+            return {name: self[name] for name in SECTIONS}
+        selected = {name: self[name] for name in sections if name in self._builders}
+        if 'summary' in sections:
+            selected['summary'] = self.summary()
+        return selected
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """计算并返回全部板块"""
+        return self.select()
+    
+    def summary(self) -> Dict[str, Any]:
+        """数据摘要：统计数字直接取自索引，只物化 identity/contacts/geographic/professional 板块"""
+        if self._summary is not None:
+            return self._summary
         
         # 安全地访问嵌套字典
         try:
-            return {
+            index = self.index
+            lists = index['lists']
+            identity = self['identity']
+            contacts = self['contacts']
+            geographic = self['geographic']
+            employment = self['professional'].get('employment')
+            leak_count = len(lists['leaked_credentials'])
+            
+            self._summary = {
                 'identity': {
-                    'name': self.processed_data.get('identity', {}).get('primary_name', ''),
-                    'age': self.processed_data.get('identity', {}).get('age', 0),
-                    'gender': self.processed_data.get('identity', {}).get('gender', ''),
-                    'location': self.processed_data.get('geographic', {}).get('geolocation', {}).get('metro_area', '')
+                    'name': identity.get('primary_name', ''),
+                    'age': identity.get('age', 0),
+                    'gender': identity.get('gender', ''),
+                    'location': geographic.get('geolocation', {}).get('metro_area', '')
                 },
                 'stats': {
-                    'phones': self.processed_data.get('contacts', {}).get('phones', {}).get('total', 0),
-                    'emails': self.processed_data.get('contacts', {}).get('emails', {}).get('total', 0),
-                    'companies': self.processed_data.get('professional', {}).get('total_companies', 0),
-                    'platforms': self.processed_data.get('social', {}).get('total_platforms', 0),
-                    'addresses': self.processed_data.get('geographic', {}).get('total_addresses', 0),
-                    'relatives': self.processed_data.get('network', {}).get('total_relatives', 0),
-                    'properties': self.processed_data.get('financial', {}).get('total_properties', 0),
-                    'leaks': self.processed_data.get('security', {}).get('leaked_credentials', {}).get('total', 0),
-                    'data_sources': self.processed_data.get('meta', {}).get('data_sources_count', 0),
-                    'confidence': round(self.processed_data.get('quality', {}).get('overall_confidence', 0) * 100)
+                    'phones': len(index['phones']),
+                    'emails': len(index['emails']),
+                    'companies': len(index['companies']),
+                    'platforms': len(index['platforms']),
+                    'addresses': len(index['addresses']),
+                    'relatives': len(index['relatives']),
+                    'properties': len(index['properties']),
+                    'leaks': leak_count,
+                    'data_sources': self._data.get('data_sources_count', 0),
+                    'confidence': round((self._profile.get('confidence_score', 0) or 0) * 100)
                 },
                 'highlights': {
-                    'primary_phone': self.processed_data.get('contacts', {}).get('phones', {}).get('primary'),
-                    'primary_email': self.processed_data.get('contacts', {}).get('emails', {}).get('primary'),
-                    'current_address': self.processed_data.get('geographic', {}).get('current_address'),
-                    'latest_job': self.processed_data.get('professional', {}).get('employment', [None])[0] if self.processed_data.get('professional', {}).get('employment') else None
+                    'primary_phone': contacts['phones']['primary'],
+                    'primary_email': contacts['emails']['primary'],
+                    'current_address': geographic.get('current_address'),
+                    'latest_job': employment[0] if employment else None
                 },
                 'risks': {
-                    'has_leaks': self.processed_data.get('security', {}).get('leaked_credentials', {}).get('total', 0) > 0,
-                    'leak_count': self.processed_data.get('security', {}).get('leaked_credentials', {}).get('total', 0),
-                    'has_plaintext': self.processed_data.get('security', {}).get('leaked_credentials', {}).get('has_plaintext', False)
+                    'has_leaks': leak_count > 0,
+                    'leak_count': leak_count,
+                    'has_plaintext': any(s['has_plaintext'] for s in index['leak_sources'].values())
                 }
             }
+            return self._summary
         except Exception as e:
             logger.error(f"❌ [DataProcessor] 摘要生成异常: {str(e)}")
             return None
 
 
-def process_investigate_response(raw_response: Dict[str, Any]) -> Dict[str, Any]:
+def parse_sections(value: Optional[str]) -> Optional[List[str]]:
+    """
+    解析 sections 选择参数（逗号分隔），空值或 all 表示全部板块
+    
+    Raises:
+        ValueError: 包含未知板块名
+    """
+    if not value or value.strip().lower() == 'all':
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SELECTABLE_SECTIONS]
+    if unknown:
+        raise ValueError(f"未知板块: {', '.join(unknown)}（可选: {', '.join(SELECTABLE_SECTIONS)}）")
+    return list(dict.fromkeys(names))
+
+
+def clear_process_cache():
+    """清空处理结果缓存"""
+    with _process_cache_lock:
+        _process_cache.clear()
+
+
+def process_investigate_response(raw_response: Dict[str, Any], sections: Optional[List[str]] = None) -> Dict[str, Any]:
     """
     快速处理函数 - 处理 Investigate API 响应
     
     Args:
         raw_response: Investigate API 的原始响应
+        sections: 只计算并返回这些板块（None 表示全部）
         
     Returns:
         处理后的结构化数据
     """
     try:
         processor = InvestigateDataProcessor(raw_response)
-        processed = processor.process()
+        if sections is None:
+            processed = processor.process()
+        else:
+            result = processor.process_lazy()
+            processed = result.select(sections) if result is not None else None
         
         if not processed:
             logger.error("❌ [DataProcessor] 数据处理失败")
@@ -659,7 +820,7 @@ def process_investigate_response(raw_response: Dict[str, Any]) -> Dict[str, Any]
 
 def get_investigate_summary(raw_response: Dict[str, Any]) -> Dict[str, Any]:
     """
-    获取数据摘要 - 用于快速预览
+    获取数据摘要 - 用于快速预览（与 process_investigate_response 共享处理缓存）
     
     Args:
         raw_response: Investigate API 的原始响应
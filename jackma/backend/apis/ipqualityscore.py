@@ -3,10 +3,10 @@ IPQualityScore API
 电话号码质量评分、欺诈检测
 返回: 有效性、活跃状态、运营商、风险评分
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import IPQS_API_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +32,7 @@ async def query_ipqualityscore(phone: str, timeout: int = DEFAULT_TIMEOUT) -> Di
         
         logger.info(f"🔍 [IPQualityScore] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("ipqualityscore", timeout=timeout) as client:
             response = await client.get(url)
             
             if response.status_code == 200:
@@ -3,15 +3,15 @@ LinkedIn 头像获取 API
 提供LinkedIn用户头像的代理服务
 """
 from fastapi import APIRouter, HTTPException, Query, Request
-from fastapi.responses import StreamingResponse, JSONResponse
-import httpx
+from fastapi.responses import JSONResponse
 import re
 from typing import Optional
 import logging
 from urllib.parse import quote, unquote
 import asyncio
 import json
-import io
+from .image_cache import proxy_image
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/avatar", tags=["Avatar"])
@@ -27,7 +27,8 @@ async def get_linkedin_avatar_from_username(username: str) -> Optional[str]:
     try:
         profile_url = f"{LINKEDIN_PUBLIC_API}{username}"
         
-        async with httpx.AsyncClient(
+        async with provider_client(
+            "linkedin_avatar",
             headers={
                 "User-Agent": USER_AGENT,
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -101,40 +102,34 @@ async def get_linkedin_avatar(username: str = Query(..., description="LinkedIn
         raise HTTPException(status_code=500, detail="获取头像失败")
 
 @router.get("/proxy")
-async def proxy_avatar_image(url: str = Query(..., description="头像图片URL")):
+async def proxy_avatar_image(request: Request, url: str = Query(..., description="头像图片URL")):
     """
-    代理头像图片，解决跨域问题
+    代理头像图片，解决跨域问题（经磁盘缓存）
     """
     try:
         if not url.startswith(('http://', 'https://')):
             raise HTTPException(status_code=400, detail="无效的图片URL")
         
-        async with httpx.AsyncClient(
+        response = await proxy_image(
+            request,
+            url,
+            timeout=10.0,
             headers={
                 "User-Agent": USER_AGENT,
                 "Referer": "https://www.linkedin.com/"
             },
-            timeout=10.0
-        ) as client:
-            response = await client.get(url)
-            
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "image/jpeg")
-                
-                return StreamingResponse(
-                    io.BytesIO(response.content),
-                    media_type=content_type,
-                    headers={
-                        "Cache-Control": "public, max-age=3600",
-                        "Access-Control-Allow-Origin": "*"
-                    }
-                )
-            else:
-                raise HTTPException(status_code=response.status_code, detail="获取图片失败")
+            follow_redirects=False,
+            default_type="image/jpeg",
+            max_age=3600
+        )
+        if not response:
+            raise HTTPException(status_code=404, detail="获取图片失败")
+        
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        return response
                 
-    except httpx.RequestError as e:
-        logger.error(f"Network error proxying image {url}: {e}")
-        raise HTTPException(status_code=502, detail="网络错误")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error proxying image {url}: {e}")
         raise HTTPException(status_code=500, detail="代理图片失败")
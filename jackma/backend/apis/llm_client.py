@@ -0,0 +1,338 @@
+"""
+LLM 调用客户端
+- 流式读取 completion（上游返回 text/event-stream 时逐块转发，返回普通 JSON 时一次性输出）
+- 全局信号量限制并发 LLM 调用数，保护上游配额，并统计排队时间
+- IncrementalJSONExtractor: 从流式文本中增量提取 JSON 对象（代替 find('{')/rfind('}')）
+AI_LLM_API_URL 可指向本地 mock 服务器（jackma/mock_llm_server.py）进行测试
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from .http_instrumentation import provider_client
+
+logger = logging.getLogger(__name__)
+
+# 上游 LLM 接口（RapidAPI ChatGPT-GPT5），测试时可指向本地 mock 服务器
+LLM_API_URL = os.environ.get('AI_LLM_API_URL', 'https://chatgpt-gpt5.p.rapidapi.com/ask')
+LLM_API_KEY = os.environ.get('AI_LLM_API_KEY', 'b491571bafmsh04f7fa840b92045p1a8db2jsn4c5d1dbd653d')
+# 同时进行的 LLM 调用上限
+LLM_MAX_CONCURRENCY = int(os.environ.get('AI_LLM_MAX_CONCURRENCY', 4))
+# 单次调用超时（秒）：连接/首包与相邻两个数据块之间的最长等待
+LLM_TIMEOUT = float(os.environ.get('AI_LLM_TIMEOUT', 60))
+
+_semaphore: Optional[asyncio.Semaphore] = None
+_stats = {
+    'calls': 0,
+    'in_flight': 0,
+    'waiting': 0,
+    'queue_time_total_ms': 0.0,
+    'queue_time_max_ms': 0.0,
+    'errors': 0,
+}
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+@asynccontextmanager
+async def llm_slot():
+    """
+    获取一个 LLM 调用名额（超过并发上限时排队），记录排队时间
+
+    Yields:
+        排队耗时（毫秒）
+    """
+    semaphore = _get_semaphore()
+    _stats['waiting'] += 1
+    start = time.perf_counter()
+    try:
+        await semaphore.acquire()
+    finally:
+        _stats['waiting'] -= 1
+    queue_ms = (time.perf_counter() - start) * 1000
+    _stats['calls'] += 1
+    _stats['in_flight'] += 1
+    _stats['queue_time_total_ms'] += queue_ms
+    _stats['queue_time_max_ms'] = max(_stats['queue_time_max_ms'], queue_ms)
+    if queue_ms > 100:
+        logger.info(f"⏳ [LLM] 排队 {queue_ms:.0f}ms 后开始调用（并发上限 {LLM_MAX_CONCURRENCY}）")
+    try:
+        yield queue_ms
+    finally:
+        _stats['in_flight'] -= 1
+        semaphore.release()
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """LLM 并发与排队统计"""
+    calls = _stats['calls']
+    return {
+        'max_concurrency': LLM_MAX_CONCURRENCY,
+        'in_flight': _stats['in_flight'],
+        'waiting': _stats['waiting'],
+        'calls': calls,
+        'errors': _stats['errors'],
+        'queue_time_avg_ms': round(_stats['queue_time_total_ms'] / calls, 2) if calls else 0.0,
+        'queue_time_max_ms': round(_stats['queue_time_max_ms'], 2),
+    }
+
+
+def _headers() -> Dict[str, str]:
+    return {
+        'Content-Type': 'application/json',
+        'Accept': 'text/event-stream, application/json',
+        'x-rapidapi-host': urlparse(LLM_API_URL).netloc,
+        'x-rapidapi-key': LLM_API_KEY,
+    }
+
+
+def _delta_from_event(data: str) -> str:
+    """
+    解析单个 SSE data 字段中的文本增量
+
+    兼容 OpenAI 风格（choices[0].delta.content）、{"delta"/"response"/"text": ...} 和纯文本
+    """
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        return data
+    if isinstance(payload, str):
+        return payload
+    if not isinstance(payload, dict):
+        return ''
+    choices = payload.get('choices')
+    if isinstance(choices, list) and choices:
+        choice = choices[0] or {}
+        delta = choice.get('delta') or choice.get('message') or {}
+        return delta.get('content') or choice.get('text') or ''
+    for key in ('delta', 'response', 'text', 'content'):
+        if isinstance(payload.get(key), str):
+            return payload[key]
+    return ''
+
+
+async def stream_completion(prompt: str, timeout: float = LLM_TIMEOUT) -> AsyncIterator[str]:
+    """
+    流式调用 LLM，逐块产出文本
+
+    调用方需在 llm_slot() 内使用（stream_llm / complete 已包含）
+    """
+    payload = {'query': prompt, 'stream': True}
+    async with provider_client("llm", timeout=httpx.Timeout(timeout, connect=10.0)) as client:
+        async with client.stream('POST', LLM_API_URL, headers=_headers(), json=payload) as response:
+            if response.status_code != 200:
+                body = (await response.aread()).decode('utf-8', errors='replace')
+                raise httpx.HTTPStatusError(
+                    f"LLM API error: {response.status_code} - {body[:200]}",
+                    request=response.request,
+                    response=response
+                )
+            content_type = response.headers.get('content-type', '')
+            if 'text/event-stream' not in content_type:
+                # 上游不支持流式：一次性返回完整结果
+                body = await response.aread()
+                try:
+                    result = json.loads(body)
+                except ValueError:
+                    yield body.decode('utf-8', errors='replace')
+                    return
+                yield result.get('response', '') if isinstance(result, dict) else str(result)
+                return
+
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                delta = _delta_from_event(data)
+                if delta:
+                    yield delta
+
+
+async def stream_llm(prompt: str, timeout: float = LLM_TIMEOUT) -> AsyncIterator[str]:
+    """在并发名额内流式调用 LLM"""
+    async with llm_slot():
+        try:
+            async for chunk in stream_completion(prompt, timeout):
+                yield chunk
+        except Exception:
+            _stats['errors'] += 1
+            raise
+
+
+async def complete(prompt: str, timeout: float = LLM_TIMEOUT) -> str:
+    """在并发名额内调用 LLM 并返回完整文本"""
+    parts: List[str] = []
+    async for chunk in stream_llm(prompt, timeout):
+        parts.append(chunk)
+    return ''.join(parts)
+
+
+class IncrementalJSONExtractor:
+    """
+    从流式 LLM 输出中增量提取第一个完整的顶层 JSON 对象
+
+    逐字符跟踪字符串/转义/括号深度，忽略对象前后的说明文字和 markdown 代码块标记；
+    顶层对象中每完成一个字段即可通过 feed() 的返回值拿到，前端可以逐步渲染。
+
+    候选对象无效时（解析失败、遇到代码块标记，或文本结束时仍未闭合，如说明文字中多余的 {），
+    从其起始 { 的下一个字符重新扫描；该候选对象已输出的字段作废，discarded 加一，
+    调用方应丢弃之前收到的字段（之后的候选对象会重新输出全部字段）
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.value: Optional[Any] = None
+        self.discarded = 0
+        self._pos = 0
+        self._start: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._emitted: set = set()
+
+    @property
+    def done(self) -> bool:
+        return self.value is not None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        追加文本
+
+        Returns:
+            本次新完成的顶层字段 [(key, value), ...]
+        """
+        if self.done:
+            return []
+        self.buffer += chunk
+        return self._scan()
+
+    def finish(self) -> List[Tuple[str, Any]]:
+        """
+        文本结束：仍未闭合的候选对象视为无效，从其后重新查找
+
+        Returns:
+            重新查找时新完成的顶层字段
+        """
+        fields: List[Tuple[str, Any]] = []
+        while not self.done and self._start is not None:
+            # fields 为上一轮未返回的字段，放弃候选对象时一并清空
+            self._pos = self._restart(fields)
+            fields = self._scan()
+        return fields
+
+    def _scan(self) -> List[Tuple[str, Any]]:
+        fields: List[Tuple[str, Any]] = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                i += 1
+                continue
+            if self._start is None:
+                if ch == '{':
+                    self._start = i
+                    self._depth = 1
+                i += 1
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads(buf[self._start:i + 1])
+                    except ValueError:
+                        # 不是合法 JSON（如说明文字中的花括号），从下一个字符重新寻找
+                        i = self._restart(fields)
+                        continue
+                    self.value = obj
+                    fields.extend(self._new_fields(obj))
+                    self._pos = i + 1
+                    return fields
+            elif ch == '`':
+                # 代码块标记不会出现在 JSON 字符串之外：说明文字中有未闭合的 {，真正的对象在代码块里
+                i = self._restart(fields)
+                continue
+            elif ch == ',' and self._depth == 1:
+                fields.extend(self._partial(buf[self._start:i] + '}'))
+            i += 1
+        self._pos = i
+        return fields
+
+    def _restart(self, fields: List[Tuple[str, Any]]) -> int:
+        """
+        放弃当前候选对象，返回重新扫描的位置（起始 { 的下一个字符）
+
+        fields 为本次调用中该候选对象已产生的字段，直接清空；更早调用中已输出的字段计入 discarded
+        """
+        if len(self._emitted) > len(fields):
+            self.discarded += 1
+        fields.clear()
+        self._emitted.clear()
+        restart = self._start + 1
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        return restart
+
+    def _new_fields(self, obj: Any) -> List[Tuple[str, Any]]:
+        if not isinstance(obj, dict):
+            return []
+        fields = [(k, v) for k, v in obj.items() if k not in self._emitted]
+        self._emitted.update(k for k, _ in fields)
+        return fields
+
+    def _partial(self, text: str) -> List[Tuple[str, Any]]:
+        try:
+            return self._new_fields(json.loads(text))
+        except ValueError:
+            return []
+
+
+# markdown 代码块（```json ... ``` 或 ``` ... ```）
+_FENCED_BLOCK = re.compile(r'```[a-zA-Z]*[ \t]*\n?(.*?)```', re.DOTALL)
+
+
+def _first_object(text: str) -> Optional[Any]:
+    extractor = IncrementalJSONExtractor()
+    extractor.feed(text)
+    extractor.finish()
+    return extractor.value
+
+
+def extract_json_object(text: str) -> Optional[Any]:
+    """
+    从完整文本中提取 JSON 对象，没有时返回 None
+
+    优先取 markdown 代码块中的对象（说明文字里的花括号不会干扰），其次取全文中第一个合法的 JSON 对象
+    """
+    for block in _FENCED_BLOCK.findall(text):
+        value = _first_object(block)
+        if value is not None:
+            return value
+    return _first_object(text)
@@ -3,10 +3,12 @@ Logo API - 获取品牌Logo
 提供统一的品牌logo获取服务
 """
 
-from fastapi import APIRouter, HTTPException, Query, Response
-import httpx
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+import asyncio
 import logging
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote
+from .image_cache import proxy_image
 
 router = APIRouter(prefix="/api/logo", tags=["Logo"])
 logger = logging.getLogger(__name__)
@@ -25,10 +27,102 @@ LOGO_OVERRIDES = {
     'x.com': 'https://abs.twimg.com/favicons/twitter.2.ico'
 }
 
+# 每组候选（按候选URL元组区分，不同路由的候选列表互不影响）上次胜出的来源URL（按插入顺序淘汰）
+LOGO_WINNER_CACHE_SIZE = 1024
+_logo_winners: Dict[Tuple[str, ...], str] = {}
+# 上次胜出的来源先行的时长（秒），期间未成功则与其余候选一起竞速
+LOGO_WINNER_HEAD_START = 1.0
+
+async def _release_response(response: Optional[Response]):
+    """释放未发送给客户端的代理响应所占用的上游连接"""
+    if response is not None and response.background is not None:
+        await response.background()
+
+
+def _discard_candidate(task: asyncio.Task):
+    """取消落选的候选请求；若已完成（或取消前恰好完成）则释放其响应"""
+    def _cleanup(t: asyncio.Task):
+        if t.cancelled() or t.exception() is not None:
+            return
+        asyncio.create_task(_release_response(t.result()))
+    task.add_done_callback(_cleanup)
+    task.cancel()
+
+
+async def race_logo_candidates(
+    request: Optional[Request],
+    domain: str,
+    candidates: List[Tuple[str, str]],
+    timeout: float = 10.0
+) -> Optional[Response]:
+    """
+    并发请求所有候选logo，按优先级返回第一个成功的结果
+    
+    所有候选同时发起，按列表顺序等待：高优先级失败才看下一个，
+    一旦确定胜出者即取消其余请求。胜出来源按候选列表记录，下次先行尝试
+    LOGO_WINNER_HEAD_START 秒，未成功则排在首位与其余候选一起竞速。
+    
+    Args:
+        request: 当前请求（用于 ETag 协商）
+        domain: 已清理的域名
+        candidates: [(url, 默认Content-Type)]，按优先级从高到低排列
+        timeout: 单个候选的超时时间（秒）
+        
+    Returns:
+        图片响应，全部失败返回None
+    """
+    async def _try(url: str, default_type: str) -> Optional[Response]:
+        try:
+            return await proxy_image(request, url, timeout=timeout, follow_redirects=False, default_type=default_type)
+        except HTTPException:
+            # 候选网络错误，或返回了非图片/过大的内容
+            return None
+    
+    key = tuple(url for url, _ in candidates)
+    default_types = dict(candidates)
+    order = list(key)
+    winner_url = _logo_winners.get(key)
+    tasks: Dict[str, asyncio.Task] = {}
+    winner = None
+    try:
+        if winner_url in default_types:
+            # 快速路径：上次胜出的来源先行（通常直接命中磁盘缓存）
+            order.remove(winner_url)
+            order.insert(0, winner_url)
+            first = tasks[winner_url] = asyncio.create_task(_try(winner_url, default_types[winner_url]))
+            await asyncio.wait([first], timeout=LOGO_WINNER_HEAD_START)
+            if first.done() and first.result():
+                winner = first
+                return first.result()
+        
+        for url in order:
+            if url not in tasks:
+                tasks[url] = asyncio.create_task(_try(url, default_types[url]))
+        for url in order:
+            response = await tasks[url]
+            if response:
+                winner = tasks[url]
+                if url != winner_url:
+                    _logo_winners.pop(key, None)
+                    if len(_logo_winners) >= LOGO_WINNER_CACHE_SIZE:
+                        _logo_winners.pop(next(iter(_logo_winners)))
+                    _logo_winners[key] = url
+                logger.info(f"Got logo for {domain}: {url}")
+                return response
+            if url == winner_url:
+                _logo_winners.pop(key, None)
+        return None
+    finally:
+        # 取消/释放其余候选（客户端断开导致本协程被取消时同样适用）
+        for task in tasks.values():
+            if task is not winner:
+                _discard_candidate(task)
+
+
 @router.get("/{domain}")
-async def get_logo(domain: str):
+async def get_logo(domain: str, request: Request):
     """
-    获取指定域名的logo
+    获取指定域名的logo（经磁盘缓存，候选来源并发竞速）
     """
     try:
         if not domain:
@@ -38,45 +132,22 @@ async def get_logo(domain: str):
         clean_domain = domain.lower().strip()
         logger.info(f"Getting logo for domain: {clean_domain}")
         
-        # 检查预定义映射
+        # 候选来源（按优先级）：预定义映射 -> Clearbit -> favicon
+        candidates = []
         if clean_domain in LOGO_OVERRIDES:
-            logo_url = LOGO_OVERRIDES[clean_domain]
-            logger.info(f"Using override logo for {clean_domain}: {logo_url}")
-            
-            # 代理返回图片
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(logo_url)
-                if response.status_code == 200:
-                    return Response(
-                        content=response.content,
-                        media_type=response.headers.get("content-type", "image/png")
-                    )
-        
-        # 尝试Clearbit logo API
-        clearbit_url = f"https://logo.clearbit.com/{clean_domain}"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(clearbit_url)
-            if response.status_code == 200:
-                logger.info(f"Got logo from Clearbit for {clean_domain}")
-                return Response(
-                    content=response.content,
-                    media_type=response.headers.get("content-type", "image/png")
-                )
+            candidates.append((LOGO_OVERRIDES[clean_domain], "image/png"))
+        candidates.append((f"https://logo.clearbit.com/{clean_domain}", "image/png"))
+        candidates.append((f"https://{clean_domain}/favicon.ico", "image/x-icon"))
         
-        # 备用：尝试favicon
-        favicon_url = f"https://{clean_domain}/favicon.ico"
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(favicon_url)
-            if response.status_code == 200:
-                logger.info(f"Got favicon for {clean_domain}")
-                return Response(
-                    content=response.content,
-                    media_type=response.headers.get("content-type", "image/x-icon")
-                )
+        response = await race_logo_candidates(request, clean_domain, candidates, timeout=10.0)
+        if response:
+            return response
         
         # 如果都失败，返回404
         raise HTTPException(status_code=404, detail="Logo not found")
         
+    except HTTPException as e:
+        raise e
     except Exception as e:
         logger.error(f"Error getting logo for {domain}: {e}")
         raise HTTPException(status_code=500, detail="获取logo失败")
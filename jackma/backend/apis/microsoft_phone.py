@@ -3,10 +3,10 @@ Microsoft Phone Checker API
 微软电话验证、企业账户检测
 返回: 微软账户、Xbox、Skype、企业账户信息
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +38,7 @@ async def query_microsoft_phone(phone: str, timeout: int = DEFAULT_TIMEOUT) -> D
         
         logger.info(f"🔍 [Microsoft Phone] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("microsoft_phone", timeout=timeout) as client:
             response = await client.get(url, params=params)
             
             if response.status_code == 200:
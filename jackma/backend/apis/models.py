@@ -9,6 +9,7 @@ class PhoneQueryResult(BaseModel):
     """电话查询结果"""
     success: bool
     phone: str
+    mode: str = "deep"  # 查询模式: quick / deep
     data: Optional[List[Dict[str, Any]]] = None
     error: Optional[str] = None
 
@@ -3,10 +3,10 @@ OSINT Deep API
 综合数据泄露和社交媒体信息查询
 返回: 邮箱泄露、社交媒体账户、数据库泄露信息
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import LONG_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +39,7 @@ async def query_osint_deep_phone(phone: str, timeout: int = LONG_TIMEOUT) -> Dic
         
         logger.info(f"🔍 [OSINT Deep] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("osint_deep", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
             
             if response.status_code == 200:
@@ -7,6 +7,7 @@ import httpx
 import logging
 from typing import Dict, Any
 from .config import OSINT_INDUSTRIES_API_KEY, OSINT_INDUSTRIES_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -44,7 +45,7 @@ async def query_osint_industries(query: str, query_type: str = "email", timeout:
         logger.debug(f"API Key: {OSINT_INDUSTRIES_API_KEY[:8]}...{OSINT_INDUSTRIES_API_KEY[-4:] if len(OSINT_INDUSTRIES_API_KEY) > 12 else '***'}")
         
         # 使用110秒客户端超时
-        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=15.0)) as client:
+        async with provider_client("osint_industries", timeout=httpx.Timeout(timeout, connect=15.0)) as client:
             response = await client.get(url, params=params, headers=headers)
             logger.info(f"📡 [OSINT Industries] 响应状态: {response.status_code}")
             
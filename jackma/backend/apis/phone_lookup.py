@@ -3,10 +3,10 @@ Phone Lookup API (自建)
 详细电话查询、用户信息
 返回: SUSAN ABAZIA 等详细用户信息
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +42,7 @@ async def query_phone_lookup(phone: str, timeout: int = DEFAULT_TIMEOUT) -> Dict
         
         logger.info(f"🔍 [Phone Lookup] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("phone_lookup", timeout=timeout) as client:
             response = await client.post(url, headers=headers, json=data)
             
             if response.status_code == 200:
@@ -0,0 +1,193 @@
+"""
+按 token 预算组装 AI 分析提示词中的数据记录
+对记录去重、剔除空值和噪声字段、紧凑序列化，再按信息量从高到低填满 token 预算，
+并返回 token 估算等统计信息，供 ai_analyzer / gpt5_analyzer 使用
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+# 数据记录部分的默认 token 预算
+PROMPT_RECORD_TOKEN_BUDGET = int(os.environ.get('AI_PROMPT_RECORD_TOKEN_BUDGET', 6000))
+# 单个字符串值的最大长度（超出截断）
+PROMPT_MAX_VALUE_CHARS = int(os.environ.get('AI_PROMPT_MAX_VALUE_CHARS', 300))
+# 列表值最多保留的元素数
+PROMPT_MAX_LIST_ITEMS = 10
+# 记录内保留的最大对象嵌套深度（更深的层级视为噪声；列表不计入深度，
+# { type, proper_key, value } 节点解包为其 value，也不计入）
+PROMPT_MAX_DEPTH = 3
+
+# OSINT Industries 等提供商 spec_format 中的节点结构：{ type, proper_key, value }
+VALUE_NODE_KEYS = frozenset({'type', 'proper_key', 'value'})
+
+# 噪声字段：对人物分析没有信息量，但占用大量 token
+NOISE_FIELDS = frozenset({
+    '_id', '__typename', 'raw', 'raw_data', 'rawResponse', 'raw_response', 'html',
+    'base64', 'image_data', 'thumbnail', 'etag', 'cursor', 'signature', 'token',
+})
+
+# 字段信息量权重（按小写键名包含的关键词匹配，取最高权重）
+FIELD_WEIGHTS = (
+    ('password', 5), ('email', 5), ('phone', 5), ('mobile', 5), ('tel', 4),
+    ('fullname', 4), ('full_name', 4), ('firstname', 4), ('lastname', 4), ('name', 3),
+    ('birth', 3), ('bday', 3), ('dob', 3), ('address', 3), ('street', 3), ('city', 2),
+    ('state', 2), ('zip', 2), ('postal', 2), ('country', 1),
+    ('username', 3), ('nickname', 3), ('login', 3), ('company', 2), ('job', 2), ('title', 1),
+    ('ip', 2), ('gender', 1), ('age', 1), ('link', 1), ('url', 1),
+)
+DEFAULT_FIELD_WEIGHT = 0.5
+# 记录中出现查询目标（电话/邮箱/人名）时的加分
+HINT_BONUS = 10
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数
+
+    安装 tiktoken 时精确计算；否则按经验估算：ASCII 约 4 字符/token，中文等多字节字符约 1 字符/token
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    # UTF-8 下 CJK 字符占 3 字节，(字节数 - 字符数) / 2 近似为多字节字符数
+    non_ascii = (len(text.encode('utf-8')) - len(text)) // 2
+    return (len(text) - non_ascii) // 4 + non_ascii + 1
+
+
+def _field_weight(key: str) -> float:
+    lowered = key.lower()
+    return max((w for fragment, w in FIELD_WEIGHTS if fragment in lowered), default=DEFAULT_FIELD_WEIGHT)
+
+
+def _is_value_node(value: Dict[str, Any]) -> bool:
+    return 'value' in value and value.keys() <= VALUE_NODE_KEYS
+
+
+def clean_record(value: Any, depth: int = 0) -> Any:
+    """
+    剔除空值、噪声字段、内嵌图片数据和过深的嵌套，截断过长的字符串和列表
+
+    spec_format 中的 { type, proper_key, value } 节点先解包为 value
+    （与前端 ResultsPage 的 sanitizeNode 一致），否则姓名等身份字段会因嵌套过深被剔除
+    """
+    if isinstance(value, dict):
+        if _is_value_node(value):
+            return clean_record(value['value'], depth)
+        if depth >= PROMPT_MAX_DEPTH:
+            return None
+        cleaned = {}
+        for k, v in value.items():
+            if k in NOISE_FIELDS:
+                continue
+            v = clean_record(v, depth + 1)
+            if v is not None:
+                cleaned[k] = v
+        return cleaned or None
+    if isinstance(value, list):
+        cleaned = [c for c in (clean_record(v, depth) for v in value[:PROMPT_MAX_LIST_ITEMS]) if c is not None]
+        return cleaned or None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value or value.startswith('data:'):
+            return None
+        if len(value) > PROMPT_MAX_VALUE_CHARS:
+            return value[:PROMPT_MAX_VALUE_CHARS] + '…'
+        return value
+    if value is None:
+        return None
+    return value
+
+
+def score_record(record: Any) -> float:
+    """按包含的高价值字段计算记录信息量"""
+    if isinstance(record, dict):
+        return sum(_field_weight(str(k)) for k in record)
+    return DEFAULT_FIELD_WEIGHT
+
+
+def build_record_section(
+    items: Iterable[Tuple[Optional[str], Any]],
+    token_budget: int = PROMPT_RECORD_TOKEN_BUDGET,
+    hints: Iterable[str] = ()
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    按 token 预算组装数据记录文本
+
+    Args:
+        items: (来源名称, 记录) 序列，来源可为 None
+        token_budget: 数据记录部分的 token 预算
+        hints: 查询目标（电话、邮箱、人名等），包含这些值的记录优先
+
+    Returns:
+        (记录文本, 统计信息)
+        统计信息包含 records_total / records_unique / records_included / records_dropped /
+        record_tokens / token_budget
+    """
+    hint_values = set()
+    for hint in hints:
+        if isinstance(hint, str) and len(hint.strip()) >= 3:
+            hint_values.add(hint.strip().lower())
+            # 电话号码按末 10 位匹配，兼容记录中有无国家码的写法
+            digits = ''.join(ch for ch in hint if ch.isdigit())
+            if len(digits) >= 10:
+                hint_values.add(digits[-10:])
+    seen = set()
+    candidates: List[Tuple[float, int, str]] = []
+    total = 0
+
+    for source, record in items:
+        total += 1
+        cleaned = clean_record(record)
+        if cleaned is None:
+            continue
+        body = cleaned if isinstance(cleaned, str) else orjson.dumps(
+            cleaned, default=str, option=orjson.OPT_NON_STR_KEYS
+        ).decode('utf-8')
+        # 不同来源的相同记录只保留一条
+        digest = hashlib.blake2b(body.encode('utf-8'), digest_size=16).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+
+        line = f"[{source}] {body}" if source else body
+        score = score_record(cleaned)
+        if hint_values:
+            lowered = body.lower()
+            if any(h in lowered for h in hint_values):
+                score += HINT_BONUS
+        candidates.append((score, len(candidates), line))
+
+    # 信息量高的优先；相同信息量时保持原始顺序
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+
+    lines: List[str] = []
+    used = 0
+    for _, _, line in candidates:
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            # 预算不足时继续尝试更短的记录
+            continue
+        lines.append(line)
+        used += cost
+
+    stats = {
+        'records_total': total,
+        'records_unique': len(candidates),
+        'records_included': len(lines),
+        'records_dropped': len(candidates) - len(lines),
+        'record_tokens': used,
+        'token_budget': token_budget,
+    }
+    return '\n'.join(lines) if lines else '无数据记录', stats
@@ -0,0 +1,249 @@
+"""
+提供商注册表
+每个提供商声明输入类型、调用入口、成本、典型耗时、超时、结果缓存时间和依赖，
+聚合查询（aggregator）按注册表调度；新增、停用或调整提供商只需修改这里的声明。
+
+运行时启用/停用：
+- set_enabled() 修改当前进程的状态（管理员接口调用）
+- set_settings_loader() 注册持久化状态的加载函数（后端注册为读取 provider_settings 表），
+  refresh_settings() 每隔 PROVIDER_SETTINGS_TTL 秒重新加载，使 API 进程和 Celery worker 的状态一致
+"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# 持久化启用状态的重新加载间隔（秒）
+PROVIDER_SETTINGS_TTL = float(os.environ.get('PROVIDER_SETTINGS_TTL', 10))
+
+# 聚合结果中没有成功提供商时的缓存时间（秒），与 save_cache 默认的 24 小时一致
+DEFAULT_CACHE_TTL = 86400
+
+# 查询模式：quick 只调度典型耗时不超过 QUICK_MAX_LATENCY_MS 的提供商（运营商、来电姓名等），
+# 且每个提供商的外层超时不超过 QUICK_PROVIDER_TIMEOUT 秒；deep 调度全部已启用的提供商
+QUERY_MODES = ('quick', 'deep')
+QUICK_MAX_LATENCY_MS = int(os.environ.get('QUICK_MAX_LATENCY_MS', 1200))
+QUICK_PROVIDER_TIMEOUT = float(os.environ.get('QUICK_PROVIDER_TIMEOUT', 2.5))
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """提供商声明"""
+    name: str
+    input_type: str  # 'phone' / 'email'
+    target: str  # 调用入口 'module:function'（apis 包内），首次调度时才导入
+    cost: float  # 单次调用的估算成本（美元）
+    expected_latency_ms: int  # 典型耗时（p50），用于调度与管理界面展示
+    timeout: Optional[float] = None  # 外层超时（秒）；None 表示只依赖提供商自身的超时
+    cache_ttl: int = DEFAULT_CACHE_TTL  # 该提供商结果的缓存时间（秒）
+    depends_on: Tuple[str, ...] = ()  # 依赖的提供商：等其成功后才调度，依赖未启用或失败时跳过
+    requires: Tuple[str, ...] = ()  # 需要配置的密钥（apis.config 中的变量名），未配置时跳过
+    kwargs: Dict[str, Any] = field(default_factory=dict)  # 额外的调用参数
+    enabled: bool = True  # 默认是否启用
+    description: str = ''
+
+
+# 注册顺序即聚合结果中的顺序
+PROVIDERS: Dict[str, ProviderSpec] = {spec.name: spec for spec in (
+    # ---------- 电话 ----------
+    ProviderSpec('social_media_scanner', 'phone', 'social_media_scanner:query_social_media_scanner',
+                 cost=0.005, expected_latency_ms=3000, description='社交平台注册检测 (RapidAPI)'),
+    ProviderSpec('caller_id', 'phone', 'caller_id:query_caller_id',
+                 cost=0.003, expected_latency_ms=600, description='Eyecon 来电显示 (RapidAPI)'),
+    ProviderSpec('truecaller', 'phone', 'truecaller:query_truecaller',
+                 cost=0.003, expected_latency_ms=800, description='Truecaller 姓名与运营商'),
+    ProviderSpec('ipqualityscore', 'phone', 'ipqualityscore:query_ipqualityscore',
+                 cost=0.004, expected_latency_ms=350, description='号码有效性、运营商与风险评分'),
+    ProviderSpec('whatsapp', 'phone', 'whatsapp:query_whatsapp',
+                 cost=0.003, expected_latency_ms=1500, timeout=45, description='WhatsApp 注册与头像'),
+    ProviderSpec('callapp', 'phone', 'callapp:query_callapp',
+                 cost=0.002, expected_latency_ms=700, description='CallApp 来电显示'),
+    ProviderSpec('microsoft_phone', 'phone', 'microsoft_phone:query_microsoft_phone',
+                 cost=0.0, expected_latency_ms=900, description='Microsoft 账户关联'),
+    ProviderSpec('phone_lookup', 'phone', 'phone_lookup:query_phone_lookup',
+                 cost=0.0, expected_latency_ms=1200, description='自建号码查询服务'),
+    ProviderSpec('telegram_complete', 'phone', 'telegram_complete:query_telegram_complete',
+                 cost=0.0, expected_latency_ms=2000, description='Telegram 账户与头像'),
+    ProviderSpec('investigate_api', 'phone', 'investigate_api:query_investigate_api',
+                 cost=0.05, expected_latency_ms=8000, kwargs={'timeout': 120}, description='Investigate 人员档案'),
+    ProviderSpec('data_breach', 'phone', 'data_breach:query_data_breach',
+                 cost=0.02, expected_latency_ms=1500, kwargs={'timeout': 120}, description='数据泄露记录'),
+    ProviderSpec('external_lookup', 'phone', 'external_lookup:query_external_lookup',
+                 cost=0.03, expected_latency_ms=5000, kwargs={'mode': 'medium', 'timeout': 120},
+                 description='External Lookup 综合档案'),
+
+    # ---------- 邮箱 ----------
+    ProviderSpec('osint_industries', 'email', 'osint_industries:query_osint_industries',
+                 cost=0.1, expected_latency_ms=6000, requires=('OSINT_INDUSTRIES_API_KEY',),
+                 kwargs={'query_type': 'email'}, description='OSINT Industries 邮箱综合查询'),
+    ProviderSpec('hibp', 'email', 'hibp:query_hibp',
+                 cost=0.0, expected_latency_ms=400, requires=('HIBP_API_KEY',), enabled=False,
+                 description='Have I Been Pwned 泄露检测'),
+)}
+
+# 运行时覆盖的启用状态（提供商 -> 是否启用）
+_enabled_overrides: Dict[str, bool] = {}
+_settings_loader: Optional[Callable[[], Dict[str, bool]]] = None
+_settings_loaded_at = 0.0
+_callables: Dict[str, Callable[..., Any]] = {}
+
+
+def _validate():
+    """注册表自检：输入类型、依赖存在且无环"""
+    for spec in PROVIDERS.values():
+        if spec.input_type not in ('phone', 'email'):
+            raise ValueError(f"提供商 {spec.name} 的输入类型无效: {spec.input_type}")
+        for dependency in spec.depends_on:
+            dep = PROVIDERS.get(dependency)
+            if dep is None or dep.input_type != spec.input_type:
+                raise ValueError(f"提供商 {spec.name} 的依赖无效: {dependency}")
+
+    def visit(name: str, path: Tuple[str, ...]):
+        if name in path:
+            raise ValueError(f"提供商依赖存在环: {' -> '.join(path + (name,))}")
+        for dependency in PROVIDERS[name].depends_on:
+            visit(dependency, path + (name,))
+
+    for name in PROVIDERS:
+        visit(name, ())
+
+
+_validate()
+
+
+def get_provider(name: str) -> Optional[ProviderSpec]:
+    return PROVIDERS.get(name)
+
+
+def resolve(spec: ProviderSpec) -> Callable[..., Any]:
+    """导入提供商模块并返回查询函数（缓存）"""
+    func = _callables.get(spec.name)
+    if func is None:
+        module_name, _, func_name = spec.target.partition(':')
+        func = getattr(importlib.import_module(f".{module_name}", __package__), func_name)
+        _callables[spec.name] = func
+    return func
+
+
+def is_enabled(name: str) -> bool:
+    spec = PROVIDERS.get(name)
+    return spec is not None and _enabled_overrides.get(name, spec.enabled)
+
+
+def is_configured(spec: ProviderSpec) -> bool:
+    """所需密钥是否都已配置（与管理界面一致：长度不足 10 视为未配置）"""
+    return all(len(getattr(config, key, '') or '') >= 10 for key in spec.requires)
+
+
+def set_enabled(name: str, enabled: bool):
+    """修改当前进程中提供商的启用状态"""
+    if name not in PROVIDERS:
+        raise KeyError(name)
+    _enabled_overrides[name] = enabled
+    logger.info(f"✅ [Providers] {name} 已{'启用' if enabled else '停用'}")
+
+
+def set_settings_loader(loader: Optional[Callable[[], Dict[str, bool]]]):
+    """注册持久化启用状态的加载函数（同步函数，返回 提供商 -> 是否启用），下次调度时加载"""
+    global _settings_loader, _settings_loaded_at
+    _settings_loader = loader
+    _settings_loaded_at = 0.0
+
+
+async def refresh_settings(force: bool = False):
+    """距上次加载超过 PROVIDER_SETTINGS_TTL 时重新加载持久化的启用状态（失败时保留当前状态）"""
+    global _settings_loaded_at
+    if _settings_loader is None:
+        return
+    if not force and time.monotonic() - _settings_loaded_at < PROVIDER_SETTINGS_TTL:
+        return
+    _settings_loaded_at = time.monotonic()
+    try:
+        settings = await asyncio.to_thread(_settings_loader)
+    except Exception as e:
+        logger.error(f"❌ [Providers] 加载提供商启用状态失败: {str(e)}")
+        return
+    _enabled_overrides.clear()
+    _enabled_overrides.update({name: enabled for name, enabled in settings.items() if name in PROVIDERS})
+
+
+def select_providers(input_type: str, max_cost: Optional[float] = None,
+                     max_latency_ms: Optional[int] = None) -> List[ProviderSpec]:
+    """
+    按注册顺序选出本次要调度的提供商：已启用、密钥已配置、满足成本/耗时上限，
+    且依赖的提供商也被选中
+    """
+    selected = {
+        spec.name: spec for spec in PROVIDERS.values()
+        if spec.input_type == input_type
+        and is_enabled(spec.name)
+        and is_configured(spec)
+        and (max_cost is None or spec.cost <= max_cost)
+        and (max_latency_ms is None or spec.expected_latency_ms <= max_latency_ms)
+    }
+    # 依赖未被选中的提供商一并跳过（可能逐级传递）
+    changed = True
+    while changed:
+        changed = False
+        for name, spec in list(selected.items()):
+            if any(dependency not in selected for dependency in spec.depends_on):
+                del selected[name]
+                changed = True
+    return list(selected.values())
+
+
+def select_for_mode(input_type: str, mode: str = 'deep', max_cost: Optional[float] = None) -> List[ProviderSpec]:
+    """按查询模式选出提供商"""
+    if mode not in QUERY_MODES:
+        raise ValueError(f"未知的查询模式: {mode}")
+    return select_providers(
+        input_type,
+        max_cost=max_cost,
+        max_latency_ms=QUICK_MAX_LATENCY_MS if mode == 'quick' else None
+    )
+
+
+def mode_timeout(mode: str) -> Optional[float]:
+    """查询模式对每个提供商的外层超时上限（None 表示不限制）"""
+    return QUICK_PROVIDER_TIMEOUT if mode == 'quick' else None
+
+
+def cache_query_type(input_type: str, mode: str = 'deep') -> str:
+    """
+    结果缓存使用的 query_type：深度结果沿用 'phone'，快速结果单独缓存为 'phone_quick'
+    （深度结果包含快速模式的全部提供商，快速查询也可以直接使用深度缓存）
+    """
+    return input_type if mode == 'deep' else f"{input_type}_{mode}"
+
+
+def result_cache_ttl(input_type: str, results: Optional[List[Dict[str, Any]]]) -> int:
+    """聚合结果的缓存时间：成功结果中各提供商 cache_ttl 的最小值"""
+    ttls = [
+        PROVIDERS[r['source']].cache_ttl for r in results or []
+        if isinstance(r, dict) and r.get('success') and r.get('source') in PROVIDERS
+        and PROVIDERS[r['source']].input_type == input_type
+    ]
+    return min(ttls) if ttls else DEFAULT_CACHE_TTL
+
+
+def list_providers() -> List[Dict[str, Any]]:
+    """管理接口用：所有提供商的声明与当前状态"""
+    return [
+        {
+            **{key: value for key, value in asdict(spec).items() if key not in ('target', 'kwargs')},
+            'depends_on': list(spec.depends_on),
+            'requires': list(spec.requires),
+            'default_enabled': spec.enabled,
+            'enabled': is_enabled(spec.name),
+            'configured': is_configured(spec),
+            'modes': ['quick', 'deep'] if spec.expected_latency_ms <= QUICK_MAX_LATENCY_MS else ['deep'],
+        }
+        for spec in PROVIDERS.values()
+    ]
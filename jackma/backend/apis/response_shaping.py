@@ -0,0 +1,258 @@
+"""
+查询结果响应裁剪
+对返回给前端的查询结果做字段投影、原始数据剔除、重复子树去重和单个提供商的大小限制。
+完整结果仍原样保存在数据库中，可通过原始数据接口按需获取
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# 单个提供商结果序列化后的大小上限（字节）
+PROVIDER_PAYLOAD_MAX_BYTES = int(os.environ.get('PROVIDER_PAYLOAD_MAX_BYTES', 256 * 1024))
+# 超过大小上限时，列表最多保留的条数
+PROVIDER_LIST_MAX_ITEMS = int(os.environ.get('PROVIDER_LIST_MAX_ITEMS', 50))
+# 小于该大小的重复子树不做去重（引用本身也有开销）
+DEDUPE_MIN_BYTES = int(os.environ.get('RESPONSE_DEDUPE_MIN_BYTES', 512))
+
+# 原始数据字段：默认不返回（include_raw=true 或原始数据接口可获取）
+RAW_FIELDS = frozenset({'rawResponse', 'raw_response', 'raw', 'raw_data', 'pipeline_result'})
+
+# 原始字段只在提供商结果的前几层查找
+RAW_FIELD_MAX_DEPTH = 3
+
+# 提供商结果中始终保留的字段
+PROVIDER_KEEP_FIELDS = ('success', 'source', 'error', 'module', 'platform_name')
+
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """解析 fields 参数（逗号分隔），空值表示不投影"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    return fields or None
+
+
+def _encode(value: Any) -> bytes:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _encoded_size(value: Any) -> int:
+    return len(_encode(value))
+
+
+def _strip_raw(value: Any, omitted: List[str], path: str, depth: int = 0) -> Any:
+    """剔除前几层中的原始数据字段，记录被剔除的路径"""
+    if depth >= RAW_FIELD_MAX_DEPTH:
+        return value
+    if isinstance(value, dict):
+        stripped = {}
+        for key, child in value.items():
+            child_path = f"{path}.{key}" if path else key
+            if key in RAW_FIELDS:
+                omitted.append(child_path)
+                continue
+            stripped[key] = _strip_raw(child, omitted, child_path, depth + 1)
+        return stripped
+    return value
+
+
+def _project(data: Any, fields: List[str]) -> Any:
+    """
+    字段投影：只保留 data 中列出的键
+
+    包装型提供商（data 只含 module/platform_name/data）会继续投影内层 data
+    """
+    if not isinstance(data, dict):
+        return data
+    inner = data.get('data')
+    if isinstance(inner, dict) and set(data) - {'data'} <= set(PROVIDER_KEEP_FIELDS):
+        return {**data, 'data': _project(inner, fields)}
+    return {key: value for key, value in data.items() if key in fields}
+
+
+def _digest_tree(value: Any, digests: Dict[int, Tuple[bytes, int]]) -> Tuple[bytes, int]:
+    """后序遍历计算每个容器节点的内容摘要和序列化大小（按 id 记录）"""
+    if isinstance(value, dict):
+        key = id(value)
+        if key in digests:
+            return digests[key]
+        h = hashlib.blake2b(b'{', digest_size=16)
+        size = 2
+        for k, child in value.items():
+            child_digest, child_size = _digest_tree(child, digests)
+            encoded_key = _encode(str(k))
+            h.update(encoded_key)
+            h.update(child_digest)
+            size += len(encoded_key) + 2 + child_size
+        digests[key] = (h.digest(), size)
+        return digests[key]
+    if isinstance(value, list):
+        key = id(value)
+        if key in digests:
+            return digests[key]
+        h = hashlib.blake2b(b'[', digest_size=16)
+        size = 2
+        for child in value:
+            child_digest, child_size = _digest_tree(child, digests)
+            h.update(child_digest)
+            size += child_size + 1
+        digests[key] = (h.digest(), size)
+        return digests[key]
+    encoded = _encode(value)
+    return hashlib.blake2b(encoded, digest_size=16).digest(), len(encoded)
+
+
+def _pointer_segment(key: Any) -> str:
+    """JSON Pointer（RFC 6901）路径段转义：~ -> ~0，/ -> ~1（键名中的 . 和 [ 无需转义）"""
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+
+def dedupe_subtrees(value: Any, min_bytes: int = DEDUPE_MIN_BYTES) -> Tuple[Any, int]:
+    """
+    将重复出现的大子树替换为 {"$ref": "<首次出现的路径>"}
+
+    路径为相对于传入结构的 JSON Pointer（如 "/profiles/0/photos"），
+    键名可包含 . 和 [（扁平化后的字段名），前端 responseRefs.js 负责还原
+
+    Returns:
+        (去重后的结构, 被替换的子树数量)
+    """
+    digests: Dict[int, Tuple[bytes, int]] = {}
+    _digest_tree(value, digests)
+    seen: Dict[bytes, str] = {}
+    replaced = 0
+
+    def walk(node: Any, path: str) -> Any:
+        nonlocal replaced
+        if not isinstance(node, (dict, list)):
+            return node
+        digest, size = digests[id(node)]
+        if size >= min_bytes:
+            if digest in seen:
+                replaced += 1
+                return {'$ref': seen[digest]}
+            seen[digest] = path
+        if isinstance(node, dict):
+            return {k: walk(child, f"{path}/{_pointer_segment(k)}") for k, child in node.items()}
+        return [walk(child, f"{path}/{i}") for i, child in enumerate(node)]
+
+    return walk(value, ''), replaced
+
+
+def _truncate_lists(value: Any, max_items: int) -> Tuple[Any, bool]:
+    """将所有列表截断为最多 max_items 条"""
+    truncated = False
+
+    def walk(node: Any) -> Any:
+        nonlocal truncated
+        if isinstance(node, dict):
+            return {k: walk(child) for k, child in node.items()}
+        if isinstance(node, list):
+            if len(node) > max_items:
+                truncated = True
+                node = node[:max_items]
+            return [walk(child) for child in node]
+        return node
+
+    return walk(value), truncated
+
+
+def _cap_payload(data: Any, max_bytes: int, omitted: List[str]) -> Tuple[Any, bool]:
+    """
+    限制单个提供商结果的大小：先截断长列表，仍超限时按大小从大到小移除 data 的顶层字段
+    """
+    if _encoded_size(data) <= max_bytes:
+        return data, False
+    data, truncated = _truncate_lists(data, PROVIDER_LIST_MAX_ITEMS)
+    if not isinstance(data, dict) or _encoded_size(data) <= max_bytes:
+        return data, truncated
+
+    sizes = sorted(((_encoded_size(v), k) for k, v in data.items()), reverse=True)
+    total = _encoded_size(data)
+    data = dict(data)
+    for size, key in sizes:
+        if total <= max_bytes:
+            break
+        data.pop(key)
+        omitted.append(f"data.{key}")
+        total -= size
+    return data, True
+
+
+def shape_provider_result(
+    result: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    include_raw: bool = False,
+    max_bytes: int = PROVIDER_PAYLOAD_MAX_BYTES
+) -> Dict[str, Any]:
+    """
+    裁剪单个提供商结果（返回新对象，不修改原结果）
+
+    被剔除或截断时在结果中标注 _omitted / _truncated，完整数据可通过原始数据接口获取
+    """
+    if not isinstance(result, dict):
+        return result
+    omitted: List[str] = []
+    shaped = {k: v for k, v in result.items() if k != 'data'}
+    data = result.get('data')
+
+    if not include_raw:
+        data = _strip_raw(data, omitted, 'data', 1)
+        for key in RAW_FIELDS & set(shaped):
+            shaped.pop(key)
+            omitted.append(key)
+    if fields:
+        data = _project(data, fields)
+
+    # 先限制大小再去重：引用只指向保留下来的首次出现位置
+    data, truncated = _cap_payload(data, max_bytes, omitted) if max_bytes else (data, False)
+    data, _ = dedupe_subtrees(data)
+
+    shaped['data'] = data
+    if omitted:
+        shaped['_omitted'] = omitted
+    if truncated:
+        shaped['_truncated'] = True
+    return shaped
+
+
+def shape_query_result(
+    result: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    include_raw: bool = False,
+    max_bytes: int = PROVIDER_PAYLOAD_MAX_BYTES
+) -> Dict[str, Any]:
+    """
+    裁剪聚合查询结果（data 为各提供商结果列表）
+
+    Args:
+        result: 电话/邮箱聚合查询结果
+        fields: 各提供商 data 中保留的字段（None 表示全部）
+        include_raw: 是否保留原始数据字段
+        max_bytes: 单个提供商结果的大小上限（0 表示不限制）
+
+    Returns:
+        裁剪后的新结果
+    """
+    if not isinstance(result, dict) or not isinstance(result.get('data'), list):
+        return result
+    return {
+        **result,
+        'data': [shape_provider_result(r, fields, include_raw, max_bytes) for r in result['data']]
+    }
+
+
+def find_provider_results(result: Dict[str, Any], sources: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """从聚合结果中取出指定来源的完整提供商结果（None 表示全部）"""
+    if not isinstance(result, dict) or not isinstance(result.get('data'), list):
+        return []
+    wanted = set(sources) if sources else None
+    return [
+        r for r in result['data']
+        if isinstance(r, dict) and (wanted is None or r.get('source') in wanted)
+    ]
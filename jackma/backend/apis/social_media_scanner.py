@@ -7,6 +7,7 @@ import logging
 import asyncio
 from typing import Dict, Any
 from .config import RAPIDAPI_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -57,7 +58,7 @@ async def query_social_media_scanner(phone: str, timeout: int = DEFAULT_TIMEOUT)
             # 使用更长的超时时间，因为这个 API 可能比较慢
             client_timeout = httpx.Timeout(timeout, connect=10.0)
             
-            async with httpx.AsyncClient(timeout=client_timeout) as client:
+            async with provider_client("social_media_scanner", retry_count=attempt, timeout=client_timeout) as client:
                 response = await client.post(url, json=payload, headers=headers)
                 
                 # 记录响应详情
@@ -3,10 +3,10 @@ Telegram Complete API
 完整的Telegram用户信息查询
 返回: 用户详情、头像、用户名、最后上线时间等
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +40,7 @@ async def query_telegram_complete(phone: str, timeout: int = DEFAULT_TIMEOUT) ->
         
         logger.info(f"🔍 [Telegram Complete] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("telegram_complete", timeout=timeout) as client:
             response = await client.post(url, headers=headers, json=payload)
             
             if response.status_code == 200:
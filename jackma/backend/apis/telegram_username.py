@@ -2,11 +2,11 @@
 Telegram Username API (RapidAPI)
 通过用户名查询Telegram资料，提取高清头像等信息
 """
-import httpx
 import logging
 from typing import Dict, Any
 import re
 from .config import RAPIDAPI_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +36,7 @@ async def query_telegram_by_username(username: str, timeout: int = DEFAULT_TIMEO
 
         logger.info(f"🔍 [Telegram Username] 查询用户名: {username}")
 
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("telegram_username", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
 
         if response.status_code != 200:
@@ -86,7 +86,7 @@ async def query_telegram_by_username(username: str, timeout: int = DEFAULT_TIMEO
         if (not user_info.get("avatar_url_hd") and not user_info.get("avatar_url")) and profile_url:
             try:
                 logger.info(f"🌐 [Telegram Username] 尝试抓取公开页面头像: {profile_url}")
-                async with httpx.AsyncClient(timeout=timeout, headers={
+                async with provider_client("telegram_username", timeout=timeout, headers={
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
                 }) as client:
                     page_resp = await client.get(profile_url)
@@ -0,0 +1,119 @@
+"""
+链路追踪辅助函数（OpenTelemetry API）
+- start_span / traced: 创建子 span，异常自动记录到 span
+- inject_context / attach_context: 跨进程（Celery 任务）传递追踪上下文
+- redact: span 属性中的邮箱、电话号码脱敏
+只依赖 opentelemetry-api；未配置 TracerProvider（见 telemetry.configure_tracing）时 span 为空操作，
+未安装 opentelemetry 时所有函数同样可以正常调用
+"""
+import functools
+import inspect
+import re
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import Status, StatusCode
+    HAS_OTEL = True
+except ImportError:
+    HAS_OTEL = False
+
+TRACER_NAME = 'jackma'
+
+_EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+# 7 位以上的数字序列（可含 +、空格、横线、括号），覆盖各种格式的电话号码
+_PHONE_RE = re.compile(r'\+?\d[\d\s().-]{5,}\d')
+_MAX_ATTRIBUTE_CHARS = 256
+
+
+def redact(value: Any) -> Any:
+    """脱敏：字符串中的邮箱替换为 <email>，电话号码替换为 <phone>；非字符串原样返回"""
+    if not isinstance(value, str):
+        return value
+    value = _EMAIL_RE.sub('<email>', value)
+    value = _PHONE_RE.sub('<phone>', value)
+    return value[:_MAX_ATTRIBUTE_CHARS]
+
+
+def set_attributes(span, **attributes):
+    """设置 span 属性（字符串值脱敏，None 忽略）"""
+    if span is None:
+        return
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        if not isinstance(value, (str, bool, int, float)):
+            value = str(value)
+        span.set_attribute(key, redact(value))
+
+
+@contextmanager
+def start_span(name: str, **attributes) -> Iterator[Optional[Any]]:
+    """
+    在当前上下文下创建子 span
+
+    Yields:
+        span（未安装 opentelemetry 时为 None）
+    """
+    if not HAS_OTEL:
+        yield None
+        return
+    tracer = trace.get_tracer(TRACER_NAME)
+    with tracer.start_as_current_span(name, record_exception=False, set_status_on_exception=False) as span:
+        set_attributes(span, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            # 异常信息可能包含查询值，只记录类型和脱敏后的消息
+            span.set_status(Status(StatusCode.ERROR, redact(str(e))))
+            span.set_attribute('exception.type', type(e).__name__)
+            raise
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """为同步/异步函数创建 span 的装饰器，默认 span 名为函数名"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_context() -> Dict[str, str]:
+    """把当前追踪上下文写入字典（W3C traceparent），用于 Celery 任务参数或请求头"""
+    carrier: Dict[str, str] = {}
+    if HAS_OTEL:
+        propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(carrier: Optional[Dict[str, Any]]):
+    """从字典中读取追踪上下文（未安装 opentelemetry 时为 None）"""
+    if not HAS_OTEL:
+        return None
+    return propagate.extract(carrier or {})
+
+
+def attach_context(ctx) -> Optional[object]:
+    """把上下文设为当前上下文，返回的 token 交给 detach_context 恢复"""
+    if not HAS_OTEL or ctx is None:
+        return None
+    return otel_context.attach(ctx)
+
+
+def detach_context(token: Optional[object]):
+    if HAS_OTEL and token is not None:
+        otel_context.detach(token)
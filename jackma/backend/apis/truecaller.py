@@ -3,10 +3,10 @@ Truecaller API (RapidAPI)
 电话号码详细信息查询
 返回: 姓名、运营商、位置、垃圾评分
 """
-import httpx
 import logging
 from typing import Dict, Any
 from .config import TRUECALLER_RAPIDAPI_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +53,7 @@ async def query_truecaller(phone: str, timeout: int = DEFAULT_TIMEOUT) -> Dict[s
         
         logger.info(f"🔍 [Truecaller] 查询电话: {phone}")
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("truecaller", timeout=timeout) as client:
             response = await client.post(url, headers=headers, json=payload)
             
             if response.status_code == 200:
@@ -2,48 +2,46 @@
 WhatsApp API (CheckLeaked)
 WhatsApp账户验证、头像获取
 """
+import asyncio
 import httpx
 import logging
-import base64
 from typing import Dict, Any
+from .blob_store import externalize_inline_images, store_image_from_url
 from .config import WHATSAPP_API_KEY, WHATSAPP_RAPIDAPI_KEY, DEFAULT_TIMEOUT
+from .http_instrumentation import provider_client
 
 logger = logging.getLogger(__name__)
 
 
-async def download_image_as_base64(url: str, timeout: int = 30) -> str:
+async def attach_profile_picture(data: Dict[str, Any], timeout: int = 15) -> Dict[str, Any]:
     """
-    下载图片并转换为Base64编码
+    下载头像写入 Blob 存储，结果中只保存哈希和访问URL
+    
+    WhatsApp 头像链接会过期，因此落盘保存一份；结果体积不受图片大小影响
     
     Args:
-        url: 图片URL
+        data: 标准化后的 WhatsApp 数据（原地修改）
         timeout: 超时时间
         
     Returns:
-        Base64编码的图片字符串，格式: data:image/jpeg;base64,xxx
+        data 本身，成功时新增 profilePicHash / profilePicBlobUrl
     """
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.get(url)
-            if response.status_code == 200:
-                # 获取内容类型
-                content_type = response.headers.get('content-type', 'image/jpeg')
-                # 转换为Base64
-                image_base64 = base64.b64encode(response.content).decode('utf-8')
-                # 返回Data URL格式
-                return f"data:{content_type};base64,{image_base64}"
-            else:
-                logger.warning(f"⚠️ [WhatsApp] 头像下载失败: {response.status_code}")
-                return None
-    except Exception as e:
-        logger.error(f"❌ [WhatsApp] 头像下载异常: {str(e)}")
-        return None
+    pic_url = data.get('profilePicUrl')
+    if isinstance(pic_url, str) and pic_url.startswith('http'):
+        blob = await store_image_from_url(pic_url, timeout=timeout)
+        if blob:
+            data['profilePicHash'] = blob['hash']
+            data['profilePicBlobUrl'] = blob['url']
+        else:
+            logger.warning("⚠️ [WhatsApp] 头像保存失败")
+    # 个别代理直接返回 data URL 头像，同样外置
+    return await asyncio.to_thread(externalize_inline_images, data)
 
 
 async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
     """
     WhatsApp API: Account Verification
-    WhatsApp账户验证、头像获取（Base64编码）
+    WhatsApp账户验证、头像获取（头像存入 Blob 存储）
     
     Args:
         phone: 电话号码（格式：14403828826，不带+号）
@@ -52,7 +50,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
     Returns:
         Dict包含:
         - success: bool - 查询是否成功
-        - data: dict - WhatsApp账户信息（头像已转换为Base64）
+        - data: dict - WhatsApp账户信息（头像以 profilePicHash / profilePicBlobUrl 引用）
         - source: str - 数据来源标识
         - error: str - 错误信息（如果失败）
     """
@@ -69,7 +67,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
             }
             url = f"https://whatsapp-data1.p.rapidapi.com/number/{clean_phone}"
             logger.info(f"🔍 [WhatsApp] RapidAPI WhatsApp Data for {clean_phone}")
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with provider_client("whatsapp", timeout=timeout) as client:
                 resp = await client.get(url, headers=headers)
             if resp.status_code == 200:
                 payload = resp.json()
@@ -108,6 +106,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
                     'carrierFormatted': carrier.get('formatted'),
                     'rawResponse': payload,
                 }
+                data = await attach_profile_picture(data)
                 logger.info(f"✅ [WhatsApp] RapidAPI success: isUser={data['isUser']}, faceAnalysis={bool(data.get('faceAnalysis'))}")
                 return { 'success': True, 'data': data, 'source': 'whatsapp' }
             else:
@@ -122,7 +121,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
             headers = { 'x-rapidapi-key': api_key }
             url = f"https://whatsapp-proxy.checkleaked.cc/number/{clean_phone}"
             logger.info(f"🔍 [WhatsApp] CheckLeaked proxy for {clean_phone}")
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with provider_client("whatsapp", timeout=timeout) as client:
                 resp = await client.get(url, headers=headers)
             if resp.status_code == 200:
                 payload = resp.json()
@@ -146,6 +145,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
                     'fbLeak': payload.get('fbLeak'),
                     'rawResponse': payload,
                 }
+                data = await attach_profile_picture(data)
                 logger.info(f"✅ [WhatsApp] CheckLeaked success: isUser={data['isUser']}")
                 return { 'success': True, 'data': data, 'source': 'whatsapp' }
             else:
@@ -169,7 +169,7 @@ async def query_whatsapp(phone: str, timeout: int = 60) -> Dict[str, Any]:
                 logger.info(f"🔄 [WhatsApp] Retry {retry_count}/{max_retries} - {clean_phone}")
             else:
                 logger.info(f"🔍 [WhatsApp] Fallback query {clean_phone}")
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            async with provider_client("whatsapp", retry_count=retry_count, timeout=timeout) as client:
                 response = await client.post(url, headers=headers, json=payload)
             if response.status_code == 200:
                 api_response = response.json()
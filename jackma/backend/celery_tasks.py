@@ -3,19 +3,54 @@ Celery异步任务队列
 处理耗时的OSINT查询任务
 """
 from celery import Celery, Task
+from celery.signals import task_postrun, task_prerun, worker_init
 from celery.result import AsyncResult
+from kombu import Exchange, Queue
 import logging
 import os
-from typing import Dict, Any
-import json
+import threading
+import time
+from typing import Dict, Any, Optional
 from datetime import datetime
 
+from serialization import register_celery_serializer
+
 logger = logging.getLogger(__name__)
 
 # Celery配置
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
-CELERY_BROKER_URL = f"{REDIS_URL}/0"  # Redis DB 0 作为消息队列
-CELERY_RESULT_BACKEND = f"{REDIS_URL}/1"  # Redis DB 1 存储任务结果
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', f"{REDIS_URL}/0")  # 默认 Redis DB 0 作为消息队列
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', f"{REDIS_URL}/1")  # 默认 Redis DB 1 存储任务结果
+
+# 队列划分：按提供方类别隔离，避免慢速邮箱查询(OSINT Industries)饿死交互式手机号查询
+QUEUE_PHONE = 'osint_phone'  # 交互式手机号查询
+QUEUE_EMAIL = 'osint_email'  # 邮箱查询（上游响应慢）
+QUEUE_MAINTENANCE = 'osint_maintenance'  # 清理/刷新等后台任务
+ALL_QUEUES = (QUEUE_PHONE, QUEUE_EMAIL, QUEUE_MAINTENANCE)
+
+# 任务优先级 (0-9)，Redis broker 下数值越小越先被消费
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 3
+PRIORITY_BACKGROUND = 9
+
+# 各类Worker池的并发数，启动worker时使用 (见 WORKER_POOLS)
+PHONE_WORKER_CONCURRENCY = int(os.environ.get('CELERY_PHONE_CONCURRENCY', 8))
+EMAIL_WORKER_CONCURRENCY = int(os.environ.get('CELERY_EMAIL_CONCURRENCY', 4))
+MAINTENANCE_WORKER_CONCURRENCY = int(os.environ.get('CELERY_MAINTENANCE_CONCURRENCY', 1))
+
+# Worker池定义：每个池只消费自己的队列，并发数独立配置
+# 启动示例: celery -A celery_tasks worker -Q osint_phone -c 8 -n phone@%h
+WORKER_POOLS = {
+    'phone': {'queues': [QUEUE_PHONE], 'concurrency': PHONE_WORKER_CONCURRENCY},
+    'email': {'queues': [QUEUE_EMAIL], 'concurrency': EMAIL_WORKER_CONCURRENCY},
+    'maintenance': {'queues': [QUEUE_MAINTENANCE], 'concurrency': MAINTENANCE_WORKER_CONCURRENCY},
+}
+
+# 队列统计缓存配置（供监控接口使用，避免每次请求都广播inspect）
+QUEUE_STATS_TTL = float(os.environ.get('QUEUE_STATS_TTL', 5))  # 缓存有效期/轮询间隔（秒）
+QUEUE_STATS_INSPECT_TIMEOUT = float(os.environ.get('QUEUE_STATS_INSPECT_TIMEOUT', 1.0))  # 单次广播等待时间
+_queue_stats_cache: Dict[str, Any] = {'data': None, 'updated_at': 0.0}
+_queue_stats_lock = threading.Lock()
 
 # 创建Celery应用
 celery_app = Celery(
@@ -24,12 +59,16 @@ celery_app = Celery(
     backend=CELERY_RESULT_BACKEND
 )
 
+# 任务参数和结果使用 orjson 序列化（仍接受 json，兼容升级前已入队的消息）
+register_celery_serializer('orjson')
+
 # Celery配置
 celery_app.conf.update(
     # 任务序列化
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
+    task_serializer='orjson',
+    accept_content=['orjson', 'json'],
+    result_serializer='orjson',
+    result_accept_content=['orjson', 'json'],
     timezone='UTC',
     enable_utc=True,
     
@@ -53,9 +92,61 @@ celery_app.conf.update(
     # 重试配置
     task_default_retry_delay=60,  # 默认重试延迟60秒
     task_max_retries=3,  # 最多重试3次
+    
+    # 队列与路由配置
+    task_queues=[
+        Queue(name, Exchange(name), routing_key=name, queue_arguments={'x-max-priority': 10})
+        for name in ALL_QUEUES
+    ],
+    task_default_queue=QUEUE_PHONE,
+    task_routes={
+        'osint_tracker.query_phone': {'queue': QUEUE_PHONE, 'priority': PRIORITY_INTERACTIVE},
+        'osint_tracker.query_email': {'queue': QUEUE_EMAIL, 'priority': PRIORITY_NORMAL},
+        'osint_tracker.cleanup_*': {'queue': QUEUE_MAINTENANCE, 'priority': PRIORITY_BACKGROUND},
+        'osint_tracker.refresh_*': {'queue': QUEUE_MAINTENANCE, 'priority': PRIORITY_BACKGROUND},
+    },
+    task_default_priority=PRIORITY_NORMAL,
+    broker_transport_options={
+        'queue_order_strategy': 'priority',  # Redis broker 按优先级出队
+        'priority_steps': list(range(10)),
+        'visibility_timeout': 3600,
+    },
 )
 
 
+@worker_init.connect
+def _install_usage_sink(**kwargs):
+    """Worker 启动时注册提供商调用记录接收器和提供商启用状态加载（prefork 子进程继承注册）"""
+    import usage_sink
+    import metrics
+    import telemetry
+    import startup
+    usage_sink.install()
+    startup.install_provider_settings()
+    metrics.start_worker_metrics()
+    telemetry.configure_tracing('osint-worker')
+
+
+@task_prerun.connect
+def _record_task_start(task_id=None, task=None, kwargs=None, **extra):
+    """任务开始：记录开始时间，并在发起请求的链路下开始任务 span"""
+    import metrics
+    import telemetry
+    metrics.task_started(task_id)
+    telemetry.start_task_span(task_id, task.name if task else 'unknown', (kwargs or {}).get('trace_context'))
+
+
+@task_postrun.connect
+def _flush_usage_sink(task_id=None, task=None, state=None, **kwargs):
+    """每个任务结束后记录任务耗时、结束任务 span，并批量写入本任务产生的提供商调用记录"""
+    import metrics
+    import telemetry
+    import usage_sink
+    metrics.task_finished(task_id, task.name if task else 'unknown', state)
+    telemetry.end_task_span(task_id, state)
+    usage_sink.flush()
+
+
 class CallbackTask(Task):
     """带回调的任务基类"""
     
@@ -79,19 +170,22 @@ class CallbackTask(Task):
     max_retries=3,
     default_retry_delay=60
 )
-def async_query_phone(self, phone: str, timeout: int = 120) -> Dict[str, Any]:
+def async_query_phone(self, phone: str, timeout: int = 120, trace_context: Optional[Dict[str, Any]] = None,
+                      mode: str = 'deep') -> Dict[str, Any]:
     """
     异步执行手机号查询
     
     Args:
         phone: 手机号
         timeout: 超时时间
+        mode: 查询模式 quick/deep；deep 时复用已缓存的快速结果，只补查其余提供商
+        trace_context: 发起请求的追踪上下文（telemetry.celery_trace_context()，由 task_prerun 处理）
     
     Returns:
         查询结果字典
     """
     try:
-        logger.info(f"🔍 开始异步查询手机号: {phone}")
+        logger.info(f"🔍 开始异步查询手机号: {phone} ({mode})")
         
         # 更新任务状态
         self.update_state(
@@ -106,13 +200,26 @@ def async_query_phone(self, phone: str, timeout: int = 120) -> Dict[str, Any]:
         # 导入查询函数（延迟导入避免循环依赖）
         import asyncio
         from apis import query_phone_comprehensive
+        from apis.provider_registry import cache_query_type
+        
+        # 快速结果升级为深度结果：复用其中成功的提供商
+        reuse = None
+        if mode == 'deep':
+            from models import SessionLocal
+            from db_operations import get_cache
+            db_session = SessionLocal()
+            try:
+                quick_result = get_cache(db_session, phone, cache_query_type("phone", "quick"))
+                reuse = quick_result.get("data") if quick_result else None
+            finally:
+                db_session.close()
         
         # 在新的事件循环中执行异步查询
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         
         try:
-            result = loop.run_until_complete(query_phone_comprehensive(phone))
+            result = loop.run_until_complete(query_phone_comprehensive(phone, mode=mode, reuse=reuse))
             result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
         finally:
             loop.close()
@@ -131,6 +238,7 @@ def async_query_phone(self, phone: str, timeout: int = 120) -> Dict[str, Any]:
         from models import SessionLocal
         from db_operations import save_phone_query
         from redis_cache import save_cached_result
+        from apis.provider_registry import result_cache_ttl
         
         db_session = SessionLocal()
         try:
@@ -150,7 +258,8 @@ def async_query_phone(self, phone: str, timeout: int = 120) -> Dict[str, Any]:
             asyncio.set_event_loop(loop)
             try:
                 loop.run_until_complete(
-                    save_cached_result(phone, "phone", result_dict, db_session)
+                    save_cached_result(phone, cache_query_type("phone", mode), result_dict, db_session,
+                                       result_cache_ttl("phone", result_dict.get("data")))
                 )
             finally:
                 loop.close()
@@ -192,13 +301,14 @@ def async_query_phone(self, phone: str, timeout: int = 120) -> Dict[str, Any]:
     max_retries=3,
     default_retry_delay=60
 )
-def async_query_email(self, email: str, timeout: int = 120) -> Dict[str, Any]:
+def async_query_email(self, email: str, timeout: int = 120, trace_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     异步执行邮箱查询
     
     Args:
         email: 邮箱地址
         timeout: 超时时间
+        trace_context: 发起请求的追踪上下文（telemetry.celery_trace_context()，由 task_prerun 处理）
     
     Returns:
         查询结果字典
@@ -244,6 +354,7 @@ def async_query_email(self, email: str, timeout: int = 120) -> Dict[str, Any]:
         from models import SessionLocal
         from db_operations import save_email_query
         from redis_cache import save_cached_result
+        from apis.provider_registry import result_cache_ttl
         
         db_session = SessionLocal()
         try:
@@ -263,7 +374,8 @@ def async_query_email(self, email: str, timeout: int = 120) -> Dict[str, Any]:
             asyncio.set_event_loop(loop)
             try:
                 loop.run_until_complete(
-                    save_cached_result(email, "email", result_dict, db_session)
+                    save_cached_result(email, "email", result_dict, db_session,
+                                       result_cache_ttl("email", result_dict.get("data")))
                 )
             finally:
                 loop.close()
@@ -409,33 +521,105 @@ def cancel_task(task_id: str) -> bool:
         return False
 
 
-def get_queue_stats() -> Dict[str, Any]:
+def get_queue_depths() -> Dict[str, int]:
     """
-    获取队列统计信息
+    直接从broker读取各队列的待处理消息数
+    
+    Redis transport 下空队列的键不存在，passive 声明会报 NOT_FOUND，
+    因此直接读取长度（LLEN 汇总所有优先级子队列，键不存在时为 0）
     
     Returns:
-        队列统计数据
+        {队列名: 消息数}，读取失败的队列为 -1
+    """
+    depths = {}
+    with celery_app.connection_for_read() as conn:
+        channel = conn.default_channel
+        for name in ALL_QUEUES:
+            try:
+                if hasattr(channel, '_size'):
+                    # kombu 虚拟 transport（Redis 等）
+                    depths[name] = channel._size(name)
+                else:
+                    # AMQP：passive声明不会创建队列
+                    depths[name] = channel.queue_declare(queue=name, passive=True).message_count
+            except Exception as e:
+                logger.warning(f"⚠️ 读取队列深度失败: {name}, {str(e)}")
+                depths[name] = -1
+    return depths
+
+
+def _count_by_queue(tasks_by_worker: Optional[Dict[str, list]]) -> Dict[str, int]:
+    """按 delivery_info.routing_key 统计各队列上的任务数"""
+    counts = {name: 0 for name in ALL_QUEUES}
+    for tasks in (tasks_by_worker or {}).values():
+        for task in tasks:
+            queue = (task.get('delivery_info') or {}).get('routing_key')
+            if queue in counts:
+                counts[queue] += 1
+    return counts
+
+
+def collect_queue_stats() -> Dict[str, Any]:
+    """
+    采集队列统计信息（阻塞调用，会向所有worker广播inspect请求）
+    
+    不要在事件循环中直接调用，由 queue_stats_poller 在后台线程中执行
+    
+    Returns:
+        队列统计数据（含各队列深度与worker利用率）
     """
     try:
-        inspect = celery_app.control.inspect()
+        queue_depths = get_queue_depths()
+        
+        inspect = celery_app.control.inspect(timeout=QUEUE_STATS_INSPECT_TIMEOUT)
         
         # 获取活跃任务
-        active = inspect.active()
-        active_count = sum(len(tasks) for tasks in (active or {}).values())
+        active = inspect.active() or {}
+        active_count = sum(len(tasks) for tasks in active.values())
         
         # 获取预定任务
-        scheduled = inspect.scheduled()
-        scheduled_count = sum(len(tasks) for tasks in (scheduled or {}).values())
+        scheduled = inspect.scheduled() or {}
+        scheduled_count = sum(len(tasks) for tasks in scheduled.values())
         
         # 获取保留任务
-        reserved = inspect.reserved()
-        reserved_count = sum(len(tasks) for tasks in (reserved or {}).values())
+        reserved = inspect.reserved() or {}
+        reserved_count = sum(len(tasks) for tasks in reserved.values())
+        
+        # worker并发上限，用于计算利用率
+        worker_stats = inspect.stats() or {}
+        workers = {}
+        total_capacity = 0
+        for worker, info in worker_stats.items():
+            capacity = (info.get('pool') or {}).get('max-concurrency', 0) or 0
+            busy = len(active.get(worker, []))
+            total_capacity += capacity
+            workers[worker] = {
+                'active': busy,
+                'concurrency': capacity,
+                'utilization': round(busy / capacity, 2) if capacity else 0.0
+            }
+        
+        active_by_queue = _count_by_queue(active)
+        reserved_by_queue = _count_by_queue(reserved)
+        queues = {
+            name: {
+                'depth': queue_depths.get(name, -1),
+                'active': active_by_queue[name],
+                'reserved': reserved_by_queue[name]
+            }
+            for name in ALL_QUEUES
+        }
         
         return {
             'active_tasks': active_count,
             'scheduled_tasks': scheduled_count,
             'reserved_tasks': reserved_count,
-            'total_pending': active_count + scheduled_count + reserved_count
+            'total_pending': active_count + scheduled_count + reserved_count,
+            'queues': queues,
+            'queued_tasks': sum(d for d in queue_depths.values() if d > 0),
+            'workers': workers,
+            'worker_count': len(workers),
+            'worker_utilization': round(active_count / total_capacity, 2) if total_capacity else 0.0
         }
     except Exception as e:
         logger.error(f"❌ 获取队列统计失败: {str(e)}")
@@ -444,3 +628,66 @@ def get_queue_stats() -> Dict[str, Any]:
         }
 
 
+def refresh_queue_stats() -> Dict[str, Any]:
+    """重新采集队列统计并写入缓存"""
+    stats = collect_queue_stats()
+    with _queue_stats_lock:
+        _queue_stats_cache['data'] = stats
+        _queue_stats_cache['updated_at'] = time.time()
+    return stats
+
+
+def get_cached_queue_stats() -> Dict[str, Any]:
+    """
+    读取缓存的队列统计（不阻塞，可在异步路由中直接调用）
+    
+    Returns:
+        最近一次采集的统计数据，附带 updated_at / age_seconds / stale 字段
+    """
+    with _queue_stats_lock:
+        data = _queue_stats_cache['data']
+        updated_at = _queue_stats_cache['updated_at']
+    
+    if data is None:
+        return {'available': False, 'status': 'Queue stats are being collected...'}
+    
+    age = time.time() - updated_at
+    return {
+        **data,
+        'available': True,
+        'updated_at': datetime.utcfromtimestamp(updated_at).isoformat(),
+        'age_seconds': round(age, 2),
+        'stale': age > QUEUE_STATS_TTL
+    }
+
+
+def get_queue_stats() -> Dict[str, Any]:
+    """
+    获取队列统计信息（同步调用方使用；缓存未过期时直接返回缓存）
+    
+    Returns:
+        队列统计数据
+    """
+    with _queue_stats_lock:
+        data = _queue_stats_cache['data']
+        updated_at = _queue_stats_cache['updated_at']
+    if data is not None and time.time() - updated_at <= QUEUE_STATS_TTL:
+        return data
+    return refresh_queue_stats()
+
+
+async def queue_stats_poller(interval: float = QUEUE_STATS_TTL):
+    """
+    后台轮询队列统计，在线程中执行阻塞的inspect调用，避免卡住事件循环
+    
+    Args:
+        interval: 轮询间隔（秒）
+    """
+    import asyncio
+    logger.info(f"📊 队列统计轮询已启动 (间隔 {interval}s)")
+    while True:
+        try:
+            await asyncio.to_thread(refresh_queue_stats)
+        except Exception as e:
+            logger.error(f"❌ 队列统计轮询失败: {str(e)}")
+        await asyncio.sleep(interval)
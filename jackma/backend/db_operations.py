@@ -1,7 +1,6 @@
 """
 Database operations helper functions
 """
-import json
 import hashlib
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
@@ -11,15 +10,21 @@ from models import (
     SearchHistory,
     APIUsageLog,
     CachedResult,
+    ProviderSetting,
 )
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import logging
 
+from apis.tracing import traced
+from metrics import record_cache_lookup
+from serialization import dumps_str, loads
+
 logger = logging.getLogger(__name__)
 
 
 # ==================== Email Query Operations ====================
 
+@traced("db.save_email_query")
 def save_email_query(db: Session, email: str, result: Dict[str, Any], success: bool = True, error: str = None):
     """保存或更新邮箱查询结果"""
     try:
@@ -28,7 +33,7 @@ def save_email_query(db: Session, email: str, result: Dict[str, Any], success: b
         
         if existing:
             # 更新现有记录
-            existing.query_result = json.dumps(result)
+            existing.query_result = dumps_str(result)
             existing.success = success
             existing.error_message = error
             existing.updated_at = datetime.utcnow()
@@ -40,7 +45,7 @@ def save_email_query(db: Session, email: str, result: Dict[str, Any], success: b
             # 创建新记录
             db_query = EmailQuery(
                 email=email,
-                query_result=json.dumps(result),
+                query_result=dumps_str(result),
                 success=success,
                 error_message=error
             )
@@ -55,6 +60,7 @@ def save_email_query(db: Session, email: str, result: Dict[str, Any], success: b
         raise
 
 
+@traced("db.get_email_query")
 def get_email_query(db: Session, email: str) -> Optional[EmailQuery]:
     """获取邮箱查询记录"""
     return db.query(EmailQuery).filter(EmailQuery.email == email).first()
@@ -67,6 +73,7 @@ def get_email_query_history(db: Session, limit: int = 10) -> list:
 
 # ==================== Phone Query Operations ====================
 
+@traced("db.save_phone_query")
 def save_phone_query(db: Session, phone: str, result: Dict[str, Any], success: bool = True, error: str = None):
     """保存或更新手机号查询结果"""
     try:
@@ -75,7 +82,7 @@ def save_phone_query(db: Session, phone: str, result: Dict[str, Any], success: b
         
         if existing:
             # 更新现有记录
-            existing.query_result = json.dumps(result)
+            existing.query_result = dumps_str(result)
             existing.success = success
             existing.error_message = error
             existing.updated_at = datetime.utcnow()
@@ -87,7 +94,7 @@ def save_phone_query(db: Session, phone: str, result: Dict[str, Any], success: b
             # 创建新记录
             db_query = PhoneQuery(
                 phone=phone,
-                query_result=json.dumps(result),
+                query_result=dumps_str(result),
                 success=success,
                 error_message=error
             )
@@ -102,6 +109,7 @@ def save_phone_query(db: Session, phone: str, result: Dict[str, Any], success: b
         raise
 
 
+@traced("db.get_phone_query")
 def get_phone_query(db: Session, phone: str) -> Optional[PhoneQuery]:
     """获取手机号查询记录"""
     return db.query(PhoneQuery).filter(PhoneQuery.phone == phone).first()
@@ -114,6 +122,7 @@ def get_phone_query_history(db: Session, limit: int = 10) -> list:
 
 # ==================== Search History Operations ====================
 
+@traced("db.log_search")
 def log_search(db: Session, query: str, query_type: str, results_count: int = 0):
     """记录搜索历史"""
     try:
@@ -141,6 +150,7 @@ def get_search_history(db: Session, query_type: Optional[str] = None, limit: int
 
 # ==================== API Usage Log Operations ====================
 
+@traced("db.log_api_call")
 def log_api_call(
     db: Session,
     api_name: str,
@@ -169,6 +179,30 @@ def log_api_call(
         logger.error(f"❌ Error logging API call: {str(e)}")
 
 
+@traced("db.log_api_calls")
+def log_api_calls(db: Session, rows: List[Dict[str, Any]]) -> int:
+    """
+    批量记录 API 调用（一次提交），供 usage_sink 使用
+
+    Args:
+        rows: APIUsageLog 列名到值的字典列表
+
+    Returns:
+        写入条数，失败时为 0
+    """
+    if not rows:
+        return 0
+    try:
+        db.bulk_insert_mappings(APIUsageLog, rows)
+        db.commit()
+        logger.debug(f"✅ API calls logged: {len(rows)}")
+        return len(rows)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error logging API calls: {str(e)}")
+        return 0
+
+
 def get_api_usage_stats(db: Session, api_name: str, hours: int = 24) -> Dict[str, Any]:
     """获取 API 使用统计"""
     time_threshold = datetime.utcnow() - timedelta(hours=hours)
@@ -209,6 +243,7 @@ def generate_query_hash(query: str, query_type: str) -> str:
     return hashlib.sha256(query_string.encode()).hexdigest()
 
 
+@traced("db.save_cache")
 def save_cache(db: Session, query: str, query_type: str, result_data: Dict[str, Any], ttl_hours: int = 24):
     """保存缓存结果"""
     try:
@@ -218,14 +253,14 @@ def save_cache(db: Session, query: str, query_type: str, result_data: Dict[str,
         # 检查是否已存在
         existing = db.query(CachedResult).filter(CachedResult.query_hash == query_hash).first()
         if existing:
-            existing.result_data = json.dumps(result_data)
+            existing.result_data = dumps_str(result_data)
             existing.expires_at = expires_at
             db.commit()
         else:
             cache = CachedResult(
                 query_hash=query_hash,
                 query_type=query_type,
-                result_data=json.dumps(result_data),
+                result_data=dumps_str(result_data),
                 expires_at=expires_at
             )
             db.add(cache)
@@ -237,6 +272,7 @@ def save_cache(db: Session, query: str, query_type: str, result_data: Dict[str,
         logger.error(f"❌ Error saving cache: {str(e)}")
 
 
+@traced("db.get_cache")
 def get_cache(db: Session, query: str, query_type: str) -> Optional[Dict[str, Any]]:
     """获取缓存结果"""
     try:
@@ -245,10 +281,11 @@ def get_cache(db: Session, query: str, query_type: str) -> Optional[Dict[str, An
             CachedResult.query_hash == query_hash,
             CachedResult.expires_at > datetime.utcnow()
         ).first()
+        record_cache_lookup('db', query_type, cache is not None)
 
         if cache:
             logger.info(f"✅ Cache hit: {query_type} - {query}")
-            return json.loads(cache.result_data)
+            return loads(cache.result_data)
         
         logger.info(f"❌ Cache miss or expired: {query_type} - {query}")
         return None
@@ -268,6 +305,41 @@ def clear_expired_cache(db: Session):
         logger.error(f"❌ Error clearing cache: {str(e)}")
 
 
+# ==================== Provider Settings ====================
+
+def get_provider_settings(db: Session) -> Dict[str, bool]:
+    """获取提供商启用状态覆盖（提供商 -> 是否启用）"""
+    return {row.provider: bool(row.enabled) for row in db.query(ProviderSetting).all()}
+
+
+def load_provider_settings() -> Dict[str, bool]:
+    """使用独立会话读取提供商启用状态（注册为 provider_registry 的加载函数）"""
+    from models import SessionLocal
+    db = SessionLocal()
+    try:
+        return get_provider_settings(db)
+    finally:
+        db.close()
+
+
+def set_provider_enabled(db: Session, provider: str, enabled: bool, updated_by: Optional[str] = None):
+    """保存提供商启用状态"""
+    try:
+        setting = db.query(ProviderSetting).filter(ProviderSetting.provider == provider).first()
+        if setting is None:
+            setting = ProviderSetting(provider=provider)
+            db.add(setting)
+        setting.enabled = enabled
+        setting.updated_by = updated_by
+        setting.updated_at = datetime.utcnow()
+        db.commit()
+        logger.info(f"✅ Provider setting saved: {provider} -> enabled={enabled}")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error saving provider setting: {str(e)}")
+        raise
+
+
 # ==================== Statistics ====================
 
 def get_database_stats(db: Session) -> Dict[str, Any]:
@@ -0,0 +1,265 @@
+"""
+事件循环阻塞检测与慢请求剖析（诊断模式，默认关闭，DIAGNOSTICS_ENABLED=true 开启）
+- 心跳任务每 DIAGNOSTICS_HEARTBEAT_MS 更新一次时间戳，看门狗线程发现心跳停滞超过
+  DIAGNOSTICS_BLOCK_THRESHOLD_MS 时抓取事件循环线程的调用栈（即正在阻塞循环的同步代码），
+  写入日志和诊断目录
+- DiagnosticsMiddleware: 按 DIAGNOSTICS_PROFILE_SAMPLE_RATE 抽样对请求做剖析，耗时超过
+  DIAGNOSTICS_SLOW_REQUEST_MS 的请求保存剖析结果。安装 pyinstrument 时使用其异步剖析（HTML）；
+  未安装时由看门狗线程对事件循环线程定时采样，保存请求期间的折叠调用栈（可用 flamegraph.pl 渲染）
+- 诊断目录只保留最近 DIAGNOSTICS_MAX_FILES 个文件，管理员接口可列出和下载
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# 只检查是否安装，诊断模式开启后首次剖析时才导入（未开启时不增加启动耗时）
+HAS_PYINSTRUMENT = importlib.util.find_spec('pyinstrument') is not None
+
+DIAGNOSTICS_ENABLED = os.environ.get('DIAGNOSTICS_ENABLED', 'false').lower() == 'true'
+DIAGNOSTICS_DIR = Path(os.environ.get('DIAGNOSTICS_DIR', Path(__file__).resolve().parent / 'diagnostics'))
+# 心跳停滞超过该值视为事件循环被阻塞（毫秒）
+DIAGNOSTICS_BLOCK_THRESHOLD_MS = float(os.environ.get('DIAGNOSTICS_BLOCK_THRESHOLD_MS', 200))
+DIAGNOSTICS_HEARTBEAT_MS = float(os.environ.get('DIAGNOSTICS_HEARTBEAT_MS', 20))
+# 慢请求阈值（毫秒）与剖析抽样比例
+DIAGNOSTICS_SLOW_REQUEST_MS = float(os.environ.get('DIAGNOSTICS_SLOW_REQUEST_MS', 1000))
+DIAGNOSTICS_PROFILE_SAMPLE_RATE = float(os.environ.get('DIAGNOSTICS_PROFILE_SAMPLE_RATE', 1.0))
+# 诊断目录最多保留的文件数（超出删除最旧的）
+DIAGNOSTICS_MAX_FILES = int(os.environ.get('DIAGNOSTICS_MAX_FILES', 200))
+# 未安装 pyinstrument 时事件循环线程的采样间隔（毫秒）
+DIAGNOSTICS_SAMPLE_INTERVAL_MS = float(os.environ.get('DIAGNOSTICS_SAMPLE_INTERVAL_MS', 5))
+
+# 诊断文件名：时间戳-类型-序号.扩展名（管理员接口据此校验，防止路径穿越）
+SAMPLE_NAME_RE = re.compile(r'^\d{8}T\d{6}-(block|profile)-\d+\.(txt|html)$')
+# 采样缓冲最多保留的调用栈数（按默认 5ms 间隔约 60 秒）
+_MAX_STACK_SAMPLES = 12000
+
+
+class _Watchdog(threading.Thread):
+    """看门狗线程：检测心跳停滞并抓取事件循环线程的调用栈；需要时对事件循环线程连续采样"""
+
+    def __init__(self, loop_thread_id: int, sample: bool):
+        super().__init__(name='loop-watchdog', daemon=True)
+        self.loop_thread_id = loop_thread_id
+        self.sample = sample
+        self.last_beat = time.monotonic()
+        self.samples: Deque[Tuple[float, str]] = deque(maxlen=_MAX_STACK_SAMPLES)
+        self._stop_event = threading.Event()
+        self._blocked_since: Optional[float] = None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop_stack(self) -> Optional[Any]:
+        return sys._current_frames().get(self.loop_thread_id)
+
+    def run(self):
+        interval = (DIAGNOSTICS_SAMPLE_INTERVAL_MS if self.sample else DIAGNOSTICS_HEARTBEAT_MS) / 1000
+        while not self._stop_event.wait(interval):
+            now = time.monotonic()
+            if self.sample:
+                frame = self._loop_stack()
+                if frame is not None:
+                    self.samples.append((now, _collapse(frame)))
+            stalled_ms = (now - self.last_beat) * 1000
+            if stalled_ms < DIAGNOSTICS_BLOCK_THRESHOLD_MS:
+                self._blocked_since = None
+                continue
+            if self._blocked_since == self.last_beat:
+                continue  # 同一次阻塞只记录一次
+            self._blocked_since = self.last_beat
+            frame = self._loop_stack()
+            if frame is not None:
+                _record_block(stalled_ms, ''.join(traceback.format_stack(frame)))
+
+
+def _collapse(frame) -> str:
+    """把调用栈折叠为 flamegraph 格式：外层;...;内层"""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+_watchdog: Optional[_Watchdog] = None
+_heartbeat_task: Optional[asyncio.Task] = None
+_write_lock = threading.Lock()
+_sequence = 0
+_stats = {'blocks': 0, 'max_block_ms': 0.0, 'profiles': 0, 'requests_profiled': 0}
+_recent_lag: Deque[float] = deque(maxlen=500)
+
+
+def _write_sample(kind: str, suffix: str, content: str) -> Optional[str]:
+    """写入诊断文件并删除超出数量上限的旧诊断文件（阻塞 I/O，在事件循环中调用时应放到线程中执行）"""
+    global _sequence
+    try:
+        with _write_lock:
+            DIAGNOSTICS_DIR.mkdir(parents=True, exist_ok=True)
+            _sequence += 1
+            name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{kind}-{_sequence}.{suffix}"
+            (DIAGNOSTICS_DIR / name).write_text(content, encoding='utf-8')
+            files = sorted(
+                (p for p in DIAGNOSTICS_DIR.iterdir() if SAMPLE_NAME_RE.match(p.name)),
+                key=lambda p: p.stat().st_mtime
+            )
+            for old in files[:max(0, len(files) - DIAGNOSTICS_MAX_FILES)]:
+                old.unlink(missing_ok=True)
+        return name
+    except Exception as e:
+        logger.error(f"❌ [Diagnostics] 写入诊断文件失败: {str(e)}")
+        return None
+
+
+def _record_block(stalled_ms: float, stack: str):
+    _stats['blocks'] += 1
+    _stats['max_block_ms'] = max(_stats['max_block_ms'], stalled_ms)
+    logger.warning(f"⚠️ [Diagnostics] 事件循环已阻塞 {stalled_ms:.0f}ms，当前调用栈:\n{stack}")
+    _write_sample('block', 'txt', f"# event loop blocked for >= {stalled_ms:.0f}ms\n\n{stack}")
+
+
+async def _heartbeat():
+    interval = DIAGNOSTICS_HEARTBEAT_MS / 1000
+    while True:
+        start = time.monotonic()
+        _watchdog.last_beat = start
+        await asyncio.sleep(interval)
+        _recent_lag.append(max(0.0, (time.monotonic() - start - interval) * 1000))
+
+
+def start():
+    """在当前事件循环中启动阻塞检测（DIAGNOSTICS_ENABLED=false 时不做任何事）"""
+    global _watchdog, _heartbeat_task
+    if not DIAGNOSTICS_ENABLED or _watchdog is not None:
+        return
+    _watchdog = _Watchdog(threading.get_ident(), sample=not HAS_PYINSTRUMENT)
+    _watchdog.start()
+    _heartbeat_task = asyncio.create_task(_heartbeat())
+    logger.info(
+        f"✅ [Diagnostics] 诊断模式已开启：阻塞阈值 {DIAGNOSTICS_BLOCK_THRESHOLD_MS:.0f}ms，"
+        f"慢请求阈值 {DIAGNOSTICS_SLOW_REQUEST_MS:.0f}ms，"
+        f"剖析方式 {'pyinstrument' if HAS_PYINSTRUMENT else '调用栈采样'}，目录 {DIAGNOSTICS_DIR}"
+    )
+
+
+async def stop():
+    global _watchdog, _heartbeat_task
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        try:
+            await _heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        _heartbeat_task = None
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+
+
+def _sampled_profile(start: float, end: float) -> str:
+    """汇总 [start, end] 期间的事件循环线程调用栈（折叠格式，按出现次数降序）"""
+    counts = Counter(stack for ts, stack in list(_watchdog.samples) if start <= ts <= end)
+    return '\n'.join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+class DiagnosticsMiddleware:
+    """对慢请求保存剖析结果"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope['type'] != 'http'
+            or _watchdog is None
+            or random.random() >= DIAGNOSTICS_PROFILE_SAMPLE_RATE
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        _stats['requests_profiled'] += 1
+        profiler = None
+        if HAS_PYINSTRUMENT:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode='enabled')
+        if profiler is not None:
+            profiler.start()
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end = time.monotonic()
+            if profiler is not None:
+                profiler.stop()
+            elapsed_ms = (end - start) * 1000
+            if elapsed_ms >= DIAGNOSTICS_SLOW_REQUEST_MS:
+                route = getattr(scope.get('route'), 'path', None) or scope['path']
+                title = f"{scope['method']} {route} took {elapsed_ms:.0f}ms"
+                # 渲染和写文件放到线程中，不在事件循环上阻塞被剖析的请求
+                if profiler is not None:
+                    name = await asyncio.to_thread(lambda: _write_sample('profile', 'html', profiler.output_html()))
+                else:
+                    content = f"# {title}\n# collapsed stacks: frames count\n{_sampled_profile(start, end)}\n"
+                    name = await asyncio.to_thread(_write_sample, 'profile', 'txt', content)
+                _stats['profiles'] += 1
+                logger.warning(f"🐢 [Diagnostics] 慢请求 {title}，剖析结果: {name}")
+
+
+def get_diagnostics_status() -> Dict[str, Any]:
+    """诊断模式状态、事件循环延迟统计和诊断文件列表"""
+    lag = sorted(_recent_lag)
+    return {
+        'enabled': DIAGNOSTICS_ENABLED,
+        'running': _watchdog is not None,
+        'profiler': 'pyinstrument' if HAS_PYINSTRUMENT else 'stack_sampling',
+        'block_threshold_ms': DIAGNOSTICS_BLOCK_THRESHOLD_MS,
+        'slow_request_ms': DIAGNOSTICS_SLOW_REQUEST_MS,
+        'loop_lag_ms': {
+            'samples': len(lag),
+            'p50': round(lag[len(lag) // 2], 2) if lag else 0.0,
+            'p99': round(lag[int(len(lag) * 0.99)], 2) if lag else 0.0,
+            'max': round(lag[-1], 2) if lag else 0.0,
+        },
+        **_stats,
+        'samples': list_samples(),
+    }
+
+
+def list_samples() -> List[Dict[str, Any]]:
+    """诊断文件列表（最新的在前）"""
+    if not DIAGNOSTICS_DIR.exists():
+        return []
+    files = [p for p in DIAGNOSTICS_DIR.iterdir() if SAMPLE_NAME_RE.match(p.name)]
+    files.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    return [
+        {
+            'name': p.name,
+            'kind': p.name.split('-')[1],
+            'size': p.stat().st_size,
+            'created_at': datetime.utcfromtimestamp(p.stat().st_mtime).isoformat(),
+        }
+        for p in files
+    ]
+
+
+def get_sample_path(name: str) -> Optional[Path]:
+    """按文件名取诊断文件路径（文件名不合法或不存在时返回 None）"""
+    if not SAMPLE_NAME_RE.match(name):
+        return None
+    path = DIAGNOSTICS_DIR / name
+    return path if path.is_file() else None
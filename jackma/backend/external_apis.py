@@ -7,6 +7,8 @@ import logging
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
+from apis.http_instrumentation import provider_client
+
 logger = logging.getLogger(__name__)
 
 # API Keys
@@ -51,7 +53,7 @@ async def query_social_media_scanner(phone: str, timeout: int = 15) -> Dict[str,
             "input": phone
         }
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("social_media_scanner", timeout=timeout) as client:
             response = await client.post(url, json=payload, headers=headers)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "social_media_scanner"}
@@ -76,7 +78,7 @@ async def query_caller_id(phone: str, timeout: int = 15) -> Dict[str, Any]:
         }
         params = {"mobile_number": phone}
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("caller_id", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "caller_id"}
@@ -101,7 +103,7 @@ async def query_truecaller(phone: str, timeout: int = 15) -> Dict[str, Any]:
         }
         params = {"phone": phone}
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("truecaller", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "truecaller"}
@@ -121,7 +123,7 @@ async def query_ipqualityscore(phone: str, timeout: int = 15) -> Dict[str, Any]:
     try:
         url = f"https://www.ipqualityscore.com/api/json/phone/{IPQS_API_KEY}/{phone}"
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("ipqualityscore", timeout=timeout) as client:
             response = await client.get(url)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "ipqualityscore"}
@@ -146,7 +148,7 @@ async def query_whatsapp(phone: str, timeout: int = 15) -> Dict[str, Any]:
             "fetchProfilePicture": "true"
         }
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("whatsapp", timeout=timeout) as client:
             response = await client.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "whatsapp"}
@@ -166,7 +168,7 @@ async def query_osint_deep_phone(phone: str, timeout: int = 30) -> Dict[str, Any
         url = "https://osint.rest/phone"
         params = {"query": phone}
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("osint_deep", timeout=timeout) as client:
             response = await client.get(url, params=params)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "osint_deep"}
@@ -188,7 +190,7 @@ async def query_hibp(email: str, timeout: int = 15) -> Dict[str, Any]:
         url = f"https://haveibeenpwned.com/api/v3/breachedaccount/{email}"
         headers = {"hibp-api-key": HIBP_API_KEY, "User-Agent": "OSINT-Tracker"}
         
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with provider_client("hibp", timeout=timeout) as client:
             response = await client.get(url, headers=headers)
             if response.status_code == 200:
                 return {"success": True, "data": response.json(), "source": "hibp"}
@@ -222,7 +224,7 @@ async def query_osint_industries(query: str, query_type: str = "email", timeout:
         logger.debug(f"API Key: {OSINT_INDUSTRIES_API_KEY[:8]}...{OSINT_INDUSTRIES_API_KEY[-4:] if len(OSINT_INDUSTRIES_API_KEY) > 12 else '***'}")
         
         # 使用110秒客户端超时
-        async with httpx.AsyncClient(timeout=httpx.Timeout(timeout, connect=15.0)) as client:
+        async with provider_client("osint_industries", timeout=httpx.Timeout(timeout, connect=15.0)) as client:
             response = await client.get(url, params=params, headers=headers)
             logger.info(f"📡 OSINT Industries Response: Status {response.status_code}")
             
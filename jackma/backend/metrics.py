@@ -0,0 +1,287 @@
+"""
+Prometheus 指标
+- HTTP 请求延迟（按路由模板，而不是实际路径）
+- 提供商查询延迟/结果（query_phone_comprehensive / query_email_comprehensive 中每个提供商）
+- 提供商出站 HTTP 请求（来自 apis.http_instrumentation）
+- 缓存命中（redis / db 两层，按查询类型）
+- 数据库语句耗时（按语句类型）
+- 事件循环延迟
+- Celery 队列深度（server_optimized）与任务耗时（worker）
+标签只使用路由模板、提供商名、队列名等有限集合，不包含电话号码、邮箱等查询值。
+prometheus_client 为可选依赖，未安装时所有记录函数为空操作，/metrics 返回 503。
+Celery prefork worker 需设置 PROMETHEUS_MULTIPROC_DIR 才能汇总各子进程的指标
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+        generate_latest, start_http_server,
+    )
+    from prometheus_client import multiprocess
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 设为 false 关闭指标采集
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true' and HAS_PROMETHEUS
+# 事件循环延迟采样间隔（秒）
+METRICS_LOOP_LAG_INTERVAL = float(os.environ.get('METRICS_LOOP_LAG_INTERVAL', 0.5))
+# Celery worker 指标端口（未设置时不启动）
+CELERY_METRICS_PORT = int(os.environ.get('CELERY_METRICS_PORT', 0))
+
+# 延迟分桶（秒）：覆盖缓存命中的毫秒级响应到慢速提供商的 2 分钟超时
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# 数据库语句类型标签
+DB_OPERATIONS = frozenset({'SELECT', 'INSERT', 'UPDATE', 'DELETE', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK'})
+
+if METRICS_ENABLED:
+    HTTP_REQUEST_DURATION = Histogram(
+        'http_request_duration_seconds', 'HTTP request latency by route template',
+        ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+    )
+    HTTP_REQUESTS_IN_PROGRESS = Gauge(
+        'http_requests_in_progress', 'HTTP requests currently being served', multiprocess_mode='livesum'
+    )
+    PROVIDER_QUERY_DURATION = Histogram(
+        'provider_query_duration_seconds', 'Provider query latency within comprehensive lookups',
+        ['provider', 'outcome'], buckets=LATENCY_BUCKETS
+    )
+    PROVIDER_HTTP_DURATION = Histogram(
+        'provider_http_request_duration_seconds', 'Outbound provider HTTP request latency',
+        ['provider', 'status_class'], buckets=LATENCY_BUCKETS
+    )
+    PROVIDER_HTTP_RETRIES = Counter(
+        'provider_http_retries_total', 'Outbound provider HTTP requests that were retries', ['provider']
+    )
+    CACHE_LOOKUPS = Counter(
+        'cache_lookups_total', 'Cache lookups by tier and result', ['tier', 'query_type', 'result']
+    )
+    DB_QUERY_DURATION = Histogram(
+        'db_query_duration_seconds', 'Database statement latency', ['operation'], buckets=DB_BUCKETS
+    )
+    EVENT_LOOP_LAG = Histogram(
+        'event_loop_lag_seconds', 'Event loop scheduling delay', buckets=LOOP_LAG_BUCKETS
+    )
+    CELERY_QUEUE_DEPTH = Gauge(
+        'celery_queue_depth', 'Messages waiting in each Celery queue', ['queue'], multiprocess_mode='livemax'
+    )
+    CELERY_TASK_DURATION = Histogram(
+        'celery_task_duration_seconds', 'Celery task run time', ['task', 'state'], buckets=LATENCY_BUCKETS
+    )
+
+
+def _status_class(status_code: int) -> str:
+    return f"{status_code // 100}xx" if status_code else 'error'
+
+
+def observe_provider_query(provider: str, seconds: float, outcome: str):
+    """记录一次提供商查询（outcome: success / error / timeout / exception）"""
+    if METRICS_ENABLED:
+        PROVIDER_QUERY_DURATION.labels(provider, outcome).observe(seconds)
+
+
+def observe_provider_call(call):
+    """apis.http_instrumentation 的调用记录接收器"""
+    if not METRICS_ENABLED:
+        return
+    PROVIDER_HTTP_DURATION.labels(call.source, _status_class(call.status_code)).observe(call.latency_ms / 1000)
+    if call.retry_count:
+        PROVIDER_HTTP_RETRIES.labels(call.source).inc()
+
+
+def record_cache_lookup(tier: str, query_type: str, hit: bool):
+    """记录一次缓存查询（tier: redis / db）"""
+    if METRICS_ENABLED:
+        CACHE_LOOKUPS.labels(tier, query_type, 'hit' if hit else 'miss').inc()
+
+
+# 已导出深度的队列（读取失败时据此移除旧值）
+_queue_depth_labels = set()
+
+
+def set_queue_depths(queues: Dict[str, Any]):
+    """
+    用 celery_tasks.get_cached_queue_stats()['queues'] 更新队列深度
+
+    深度未知的队列（读取失败或本次统计中缺失）不保留上一次的值：移除该标签；
+    多进程模式下 prometheus_client 不支持移除标签，改为置 0
+    """
+    if not METRICS_ENABLED:
+        return
+    current = set()
+    for name, info in (queues or {}).items():
+        depth = info.get('depth', -1) if isinstance(info, dict) else info
+        if depth is not None and depth >= 0:
+            CELERY_QUEUE_DEPTH.labels(name).set(depth)
+            current.add(name)
+    for name in _queue_depth_labels - current:
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            CELERY_QUEUE_DEPTH.labels(name).set(0)
+        else:
+            CELERY_QUEUE_DEPTH.remove(name)
+    _queue_depth_labels.clear()
+    _queue_depth_labels.update(current)
+
+
+class MetricsMiddleware:
+    """按路由模板记录请求延迟的 ASGI 中间件（路由匹配后 scope['route'] 才可用）"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            route = scope.get('route')
+            # 未匹配到 API 路由的请求（静态文件、404）归为一类，避免任意路径成为标签
+            route_label = getattr(route, 'path', None) or ('static' if scope['path'].startswith('/static') else 'unmatched')
+            HTTP_REQUEST_DURATION.labels(scope['method'], route_label, _status_class(status_code)).observe(
+                time.perf_counter() - start
+            )
+
+
+async def loop_lag_monitor(interval: float = METRICS_LOOP_LAG_INTERVAL):
+    """周期性休眠并测量实际唤醒延迟，超出部分即事件循环被阻塞的时间"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - start - interval))
+
+
+def instrument_engine(engine):
+    """为 SQLAlchemy engine 注册语句耗时采集"""
+    if not METRICS_ENABLED:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+        DB_QUERY_DURATION.labels(operation if operation in DB_OPERATIONS else 'OTHER').observe(
+            time.perf_counter() - starts.pop()
+        )
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        starts = context.connection.info.get('metrics_query_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+_loop_lag_task: Optional[asyncio.Task] = None
+_collectors_registered = False
+
+
+def _register_collectors():
+    """注册提供商查询/出站请求接收器和数据库语句采集（每个进程一次）"""
+    global _collectors_registered
+    if _collectors_registered:
+        return
+    _collectors_registered = True
+    from apis.aggregator import add_provider_observer
+    from apis.http_instrumentation import add_call_sink
+    from models import engine
+
+    add_provider_observer(observe_provider_query)
+    add_call_sink(observe_provider_call)
+    instrument_engine(engine)
+
+
+def start():
+    """Web 进程启动时调用：注册提供商埋点接收器和数据库采集，启动事件循环延迟采样"""
+    global _loop_lag_task
+    if not METRICS_ENABLED or _loop_lag_task is not None:
+        return
+    _register_collectors()
+    _loop_lag_task = asyncio.create_task(loop_lag_monitor())
+    logger.info("✅ [Metrics] Prometheus 指标采集已启动")
+
+
+async def stop():
+    global _loop_lag_task
+    if _loop_lag_task is not None:
+        _loop_lag_task.cancel()
+        try:
+            await _loop_lag_task
+        except asyncio.CancelledError:
+            pass
+        _loop_lag_task = None
+
+
+def _registry():
+    """多进程模式（PROMETHEUS_MULTIPROC_DIR）下汇总所有进程的指标"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    生成 Prometheus 文本格式的指标
+
+    Returns:
+        (内容, Content-Type)
+    """
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
+
+
+def start_worker_metrics():
+    """Celery worker 启动时调用：注册采集并在 CELERY_METRICS_PORT 上暴露指标"""
+    if not METRICS_ENABLED:
+        return
+    _register_collectors()
+    if CELERY_METRICS_PORT:
+        start_http_server(CELERY_METRICS_PORT, registry=_registry())
+        logger.info(f"✅ [Metrics] Celery worker 指标端口: {CELERY_METRICS_PORT}")
+
+
+_task_starts: Dict[str, float] = {}
+
+
+def task_started(task_id: str):
+    if METRICS_ENABLED:
+        _task_starts[task_id] = time.perf_counter()
+
+
+def task_finished(task_id: str, task_name: str, state: Optional[str]):
+    start = _task_starts.pop(task_id, None)
+    if METRICS_ENABLED and start is not None:
+        CELERY_TASK_DURATION.labels(task_name, state or 'UNKNOWN').observe(time.perf_counter() - start)
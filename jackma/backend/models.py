@@ -121,6 +121,8 @@ class APIUsageLog(Base):
     endpoint = Column(String(255))
     status_code = Column(Integer)
     response_time_ms = Column(Integer)
+    response_bytes = Column(Integer, nullable=True)
+    retry_count = Column(Integer, default=0)
     success = Column(Boolean, default=False)
     error_message = Column(String(512), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -144,6 +146,19 @@ class CachedResult(Base):
         return f"<CachedResult(type='{self.query_type}', expires_at='{self.expires_at}')>"
 
 
+class ProviderSetting(Base):
+    """提供商运行时启用状态表（覆盖注册表中的默认值）"""
+    __tablename__ = "provider_settings"
+
+    provider = Column(String(50), primary_key=True)
+    enabled = Column(Boolean, default=True)
+    updated_by = Column(String(50), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ProviderSetting(provider='{self.provider}', enabled={self.enabled})>"
+
+
 # ==================== Database Initialization ====================
 
 def init_db():
@@ -171,6 +186,15 @@ def init_db():
                 if 'user_id' not in existing_cols:
                     conn.exec_driver_sql("ALTER TABLE search_history ADD COLUMN user_id INTEGER")
                     print("✅ Added user_id column to search_history table")
+
+                # 获取api_usage_logs表现有列
+                res = conn.exec_driver_sql("PRAGMA table_info(api_usage_logs)")
+                existing_cols = [row[1] for row in res]
+                # 补充提供商调用埋点新增的列
+                if 'response_bytes' not in existing_cols:
+                    conn.exec_driver_sql("ALTER TABLE api_usage_logs ADD COLUMN response_bytes INTEGER")
+                if 'retry_count' not in existing_cols:
+                    conn.exec_driver_sql("ALTER TABLE api_usage_logs ADD COLUMN retry_count INTEGER DEFAULT 0")
     except Exception as e:
         print(f"⚠️ Schema migration skipped or failed: {e}")
 
@@ -2,13 +2,16 @@
 Redis缓存层实现
 提供高性能的分布式缓存服务
 """
-import json
 import logging
 from typing import Optional, Dict, Any
 import redis.asyncio as redis
 from datetime import timedelta
 import os
 
+from apis.tracing import set_attributes, start_span
+from metrics import record_cache_lookup
+from serialization import dumps, loads
+
 logger = logging.getLogger(__name__)
 
 # Redis配置
@@ -83,11 +86,14 @@ class RedisCache:
         
         try:
             key = self._generate_key(query, query_type)
-            cached_data = await self.redis_client.get(key)
+            with start_span("cache.redis get", **{'cache.query_type': query_type}) as span:
+                cached_data = await self.redis_client.get(key)
+                set_attributes(span, **{'cache.hit': bool(cached_data)})
+            record_cache_lookup('redis', query_type, bool(cached_data))
             
             if cached_data:
                 logger.info(f"✅ Redis缓存命中: {query_type}:{query}")
-                return json.loads(cached_data)
+                return loads(cached_data)
             
             logger.info(f"❌ Redis缓存未命中: {query_type}:{query}")
             return None
@@ -119,7 +125,7 @@ class RedisCache:
         
         try:
             key = self._generate_key(query, query_type)
-            serialized_data = json.dumps(data, ensure_ascii=False)
+            serialized_data = dumps(data)
             
             await self.redis_client.setex(
                 key,
@@ -0,0 +1,320 @@
+"""
+响应压缩
+- CompressionMiddleware: 按 Accept-Encoding 协商 zstd/br/gzip 的 ASGI 中间件，
+  小于阈值的响应不压缩；流式响应逐块压缩并 flush，图片等已压缩内容直接透传
+- PrecompressedStaticFiles / precompressed_file_response: 优先返回 frontend/build 中
+  构建时生成的 .br/.gz 文件，带哈希的资源文件名使用长期缓存
+brotli / zstandard 为可选依赖，未安装时只使用 gzip
+"""
+import logging
+import mimetypes
+import os
+import re
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# 小于该大小的响应不压缩（字节）
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+# 服务端偏好顺序（客户端 q 值相同时按此顺序选择）
+COMPRESSION_ENCODINGS = [
+    e.strip() for e in os.environ.get('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',') if e.strip()
+]
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', 3))
+
+# 可压缩的内容类型（图片、视频、压缩包等本身已压缩，不再处理）
+COMPRESSIBLE_TYPE_RE = re.compile(
+    r'^(text/|application/(json|javascript|x-javascript|xml|manifest\+json|x-orjson|wasm)|'
+    r'application/[\w.+-]+\+(json|xml)|image/svg\+xml)',
+    re.IGNORECASE
+)
+
+# CRA 构建产物的内容哈希文件名，如 main.3f2a1b9c.js / 453.8d0e1f2a.chunk.css
+HASHED_ASSET_RE = re.compile(r'\.[0-9a-f]{8,}\.')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# 构建时预压缩文件的后缀
+PRECOMPRESSED_SUFFIXES = {'zstd': '.zst', 'br': '.br', 'gzip': '.gz'}
+
+
+class _GzipStream:
+    def __init__(self):
+        self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliStream:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._obj.process(data)
+        return out + (self._obj.finish() if final else self._obj.flush())
+
+
+class _ZstdStream:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._obj.compress(data)
+        return out + (self._obj.flush() if final else self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+
+
+_STREAMS: Dict[str, Callable] = {'gzip': _GzipStream}
+if HAS_BROTLI:
+    _STREAMS['br'] = _BrotliStream
+if HAS_ZSTD:
+    _STREAMS['zstd'] = _ZstdStream
+
+
+def available_encodings() -> List[str]:
+    """当前环境可用的编码（按服务端偏好排序）"""
+    return [e for e in COMPRESSION_ENCODINGS if e in _STREAMS]
+
+
+def negotiate_encoding(accept_encoding: str, supported: Iterable[str]) -> Optional[str]:
+    """
+    按 Accept-Encoding 的 q 值选择编码，q 值相同时按 supported 的顺序
+
+    Returns:
+        编码名称，无可接受的编码时返回 None
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    return bool(content_type) and bool(COMPRESSIBLE_TYPE_RE.match(content_type))
+
+
+def _add_vary(headers: MutableHeaders):
+    vary = headers.get('vary', '')
+    if 'accept-encoding' not in vary.lower():
+        headers['Vary'] = f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'
+
+
+def _weaken_etag(headers: MutableHeaders):
+    """压缩后内容与原 ETag 不再逐字节一致，改为弱 ETag"""
+    etag = headers.get('etag')
+    if etag and not etag.startswith('W/'):
+        headers['ETag'] = f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """
+    响应压缩中间件（纯 ASGI，不缓冲流式响应）
+
+    - 完整响应：小于 minimum_size 时原样返回，否则整体压缩并重写 Content-Length
+    - 流式响应（StreamingResponse、SSE）：每个分块压缩后立即 flush，客户端可实时解码
+    - 已有 Content-Encoding、不可压缩类型（图片代理等）、Range 请求、204/304 直接透传
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_BYTES,
+                 encodings: Optional[List[str]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = [e for e in (encodings or available_encodings()) if e in _STREAMS]
+        logger.info(f"✅ [Compression] 已启用响应压缩: {', '.join(self.encodings)}（阈值 {minimum_size} 字节）")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        if 'range' in request_headers:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(request_headers.get('accept-encoding', ''), self.encodings)
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    """拦截 send：在第一个 body 消息到达时决定透传、整体压缩还是流式压缩"""
+
+    def __init__(self, send: Send, encoding: Optional[str], minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.mode: Optional[str] = None  # passthrough / stream
+        self.stream = None
+
+    async def __call__(self, message: Message):
+        if self.mode == 'passthrough':
+            await self.send(message)
+            return
+        if self.mode == 'stream':
+            await self._send_stream(message)
+            return
+
+        if message['type'] == 'http.response.start':
+            self.start_message = message
+            return
+        if message['type'] != 'http.response.body' or self.start_message is None:
+            await self._passthrough(message)
+            return
+
+        headers = MutableHeaders(raw=list(self.start_message['headers']))
+        self.start_message['headers'] = headers.raw
+        status = self.start_message['status']
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+
+        if (status < 200 or status in (204, 206, 304)
+                or 'content-encoding' in headers
+                or not is_compressible(headers.get('content-type', ''))
+                or 'no-transform' in headers.get('cache-control', '')):
+            await self._passthrough(message)
+            return
+
+        _add_vary(headers)
+        if self.encoding is None:
+            await self._passthrough(message)
+            return
+
+        if not more_body:
+            if len(body) < self.minimum_size:
+                await self._passthrough(message)
+                return
+            compressed = _STREAMS[self.encoding]().compress(body, final=True)
+            headers['Content-Encoding'] = self.encoding
+            headers['Content-Length'] = str(len(compressed))
+            _weaken_etag(headers)
+            await self.send(self.start_message)
+            await self.send({'type': 'http.response.body', 'body': compressed})
+            return
+
+        declared = headers.get('content-length')
+        if declared is not None and declared.isdigit() and int(declared) < self.minimum_size:
+            await self._passthrough(message)
+            return
+
+        self.mode = 'stream'
+        self.stream = _STREAMS[self.encoding]()
+        headers['Content-Encoding'] = self.encoding
+        del headers['Content-Length']
+        _weaken_etag(headers)
+        await self.send(self.start_message)
+        await self._send_stream(message)
+
+    async def _passthrough(self, message: Message):
+        self.mode = 'passthrough'
+        if self.start_message is not None:
+            await self.send(self.start_message)
+        await self.send(message)
+
+    async def _send_stream(self, message: Message):
+        if message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+        more_body = message.get('more_body', False)
+        chunk = self.stream.compress(message.get('body', b''), final=not more_body)
+        await self.send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+
+def cache_control_for(path: str) -> str:
+    """带内容哈希的构建产物长期缓存，其它文件每次校验"""
+    return IMMUTABLE_CACHE_CONTROL if HASHED_ASSET_RE.search(os.path.basename(path)) else REVALIDATE_CACHE_CONTROL
+
+
+def _precompressed_variant(path: str, accept_encoding: str) -> Tuple[Optional[str], Optional[str]]:
+    """查找客户端可接受的预压缩文件，返回 (编码, 文件路径)"""
+    candidates = [e for e in COMPRESSION_ENCODINGS if e in PRECOMPRESSED_SUFFIXES]
+    existing = [e for e in candidates if os.path.isfile(path + PRECOMPRESSED_SUFFIXES[e])]
+    encoding = negotiate_encoding(accept_encoding, existing)
+    if encoding is None:
+        return None, None
+    return encoding, path + PRECOMPRESSED_SUFFIXES[encoding]
+
+
+def precompressed_file_response(path, accept_encoding: str = '', cache_control: Optional[str] = None) -> FileResponse:
+    """
+    返回文件响应，存在可接受的 .br/.gz 预压缩文件时直接返回该文件
+
+    Args:
+        path: 原始文件路径
+        accept_encoding: 请求的 Accept-Encoding
+        cache_control: Cache-Control（None 时按文件名是否带哈希决定）
+    """
+    path = str(path)
+    media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    headers = {
+        'Cache-Control': cache_control or cache_control_for(path),
+        'Vary': 'Accept-Encoding',
+    }
+    encoding, variant = _precompressed_variant(path, accept_encoding)
+    if variant:
+        headers['Content-Encoding'] = encoding
+        return FileResponse(variant, media_type=media_type, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles 的预压缩版本：优先返回 .br/.gz 文件，并按文件名设置缓存头"""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {'Cache-Control': cache_control_for(full_path), 'Vary': 'Accept-Encoding'}
+        media_type = mimetypes.guess_type(full_path)[0]
+
+        encoding, variant = (None, None)
+        if 'range' not in request_headers:
+            encoding, variant = _precompressed_variant(full_path, request_headers.get('accept-encoding', ''))
+        if variant:
+            headers['Content-Encoding'] = encoding
+            response = FileResponse(variant, status_code=status_code, media_type=media_type,
+                                    headers=headers, stat_result=os.stat(variant))
+        else:
+            response = FileResponse(full_path, status_code=status_code, media_type=media_type,
+                                    headers=headers, stat_result=stat_result)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
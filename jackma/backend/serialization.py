@@ -0,0 +1,85 @@
+"""
+统一序列化模块
+基于 orjson 的 JSON 编解码，API 响应、Redis 缓存、数据库和 Celery 消息共用。
+orjson 不支持的类型（set、Decimal、Pydantic 模型等）通过 _default 转换
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+from enum import Enum
+from pathlib import PurePath
+from typing import Any, Union
+from uuid import UUID
+
+import orjson
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# 非字符串键（如 int）自动转为字符串；numpy 数组/标量直接序列化
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Celery 消息的内容类型
+CELERY_CONTENT_TYPE = 'application/x-orjson'
+
+
+def _default(obj: Any) -> Any:
+    """orjson 无法原生序列化的类型"""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (PurePath, UUID)):
+        return str(obj)
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    if hasattr(obj, '__dict__'):
+        return vars(obj)
+    # 兜底：与 json.dumps(default=str) 行为一致
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节串"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+def dumps_str(obj: Any) -> str:
+    """序列化为 JSON 字符串（用于数据库 Text 字段）"""
+    return dumps(obj).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """反序列化 JSON（bytes 或 str）"""
+    return orjson.loads(data)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    orjson 响应类（应用默认 response_class）
+
+    路由直接返回本类实例时可跳过 FastAPI 的 jsonable_encoder，大结果应这样返回
+    """
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def register_celery_serializer(name: str = 'orjson'):
+    """注册 kombu 序列化器，Celery 任务参数和结果使用 orjson"""
+    from kombu.serialization import register
+
+    register(
+        name,
+        dumps_str,
+        loads,
+        content_type=CELERY_CONTENT_TYPE,
+        content_encoding='utf-8'
+    )
@@ -1,20 +1,21 @@
+# 启动耗时剖析（最先导入，记录开始导入应用代码的时间）
+import startup
+
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query
-from fastapi import Response
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+import asyncio
+import importlib.util
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import Integer
-import httpx
 # 外部搜索模块
 from apis.external_search import query_external_search
 HAS_EXTERNAL_SEARCH = True
@@ -25,15 +26,44 @@ from apis.linkedin_avatar import router as linkedin_avatar_router
 # Logo API
 from apis.logo_api import router as logo_router
 
-# Google API
-from apis.google_api import router as google_router
+# 图片代理磁盘缓存
+from apis.image_cache import proxy_image
+from apis.logo_api import race_logo_candidates
+from apis.blob_store import get_blob_store
 
-# Google API
-from apis.google_api import router as google_router
+# orjson 序列化（默认响应类、数据库结果解析）
+from serialization import ORJSONResponse, loads
+
+# 响应压缩（gzip/br/zstd 协商）与预压缩静态资源
+from response_compression import CompressionMiddleware, PrecompressedStaticFiles, precompressed_file_response
 
+# 提供商调用记录批量写入 api_usage_logs
+import usage_sink
 
+# Prometheus 指标（/metrics）
+import metrics
+from metrics import MetricsMiddleware
 
+# 链路追踪（TRACING_EXPORTER 选择导出器）
+import telemetry
+from telemetry import TracingMiddleware
 
+# 诊断模式（DIAGNOSTICS_ENABLED：事件循环阻塞检测与慢请求剖析）
+import diagnostics
+from diagnostics import DiagnosticsMiddleware
+
+# 响应裁剪（字段投影/原始数据/大小限制）
+from apis.response_shaping import parse_fields, shape_query_result, find_provider_results
+
+# 提供商查询模式（quick/deep）对应的缓存类型
+from apis.provider_registry import cache_query_type
+
+# Investigate 结果按板块返回
+from apis.investigate_api import select_investigate_sections, get_investigate_sections
+from apis.investigate_data_processor import parse_sections
+
+# Google API
+from apis.google_api import router as google_router
 
 # Configure logging FIRST before using logger
 logging.basicConfig(
@@ -43,10 +73,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import database and API modules
-from models import init_db, get_db
+from models import get_db
 from db_operations import (
     save_email_query,
+    get_email_query,
     save_phone_query,
+    get_phone_query,
     log_search,
     get_cache,
     save_cache
@@ -57,61 +89,54 @@ from auth_operations import (
     login_user,
     verify_session,
     logout_user,
-    init_default_users,
     create_user,
     get_user_info
 )
 
-try:
-    from apis import (
-        query_email_comprehensive, 
-        query_phone_comprehensive,
-        EmailQueryResult,
-        PhoneQueryResult
-    )
-    HAS_EXTERNAL_APIS = True
-except ImportError:
-    HAS_EXTERNAL_APIS = False
+# 提供商模块在首次查询时才导入（apis 包按需解析），这里只检查模块是否存在；
+# 导入失败时由 startup.load_provider_query 回退到模拟数据
+HAS_EXTERNAL_APIS = importlib.util.find_spec('apis.aggregator') is not None
+if not HAS_EXTERNAL_APIS:
     print("⚠️ Warning: external_apis module not found, queries will use mock data")
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Initialize SQLite database
-try:
-    init_db()
-    # Initialize default users on startup
-    from models import SessionLocal
-    db_session = SessionLocal()
-    init_default_users(db_session)
-    db_session.close()
-except Exception as e:
-    print(f"⚠️ Database initialization skipped: {str(e)}")
-
-# MongoDB connection (optional)
-try:
-    mongo_url = os.environ.get('MONGO_URL')
-    if mongo_url:
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[os.environ.get('DB_NAME', 'jackma_db')]
-    else:
-        db = None
-        client = None
-except Exception as e:
-    print(f"⚠️ MongoDB connection skipped: {str(e)}")
-    db = None
-    client = None
+# MongoDB connection (optional)，在 lifespan 中建立
+db = None
+client = None
 
 # Lifespan context manager for startup/shutdown events
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global client, db
     # Startup
     logger.info("🚀 Server starting up...")
+    # Initialize SQLite database and default users
+    with startup.step('init_db'):
+        startup.init_database()
+    with startup.step('mongodb'):
+        client, db = startup.connect_mongo()
+    with startup.step('provider_registry'):
+        startup.install_provider_settings()
+    with startup.step('usage_sink'):
+        usage_sink.start()
+    with startup.step('metrics'):
+        metrics.start()
+    with startup.step('tracing'):
+        telemetry.configure_tracing('osint-api')
+    with startup.step('diagnostics'):
+        diagnostics.start()
+    startup.mark('ready')
     yield
     # Shutdown
+    await diagnostics.stop()
+    telemetry.shutdown_tracing()
+    await metrics.stop()
+    await usage_sink.stop()
     if client:
         client.close()
         logger.info("MongoDB connection closed")
@@ -122,7 +147,8 @@ app = FastAPI(
     title="OSINT Tracker API",
     description="Comprehensive OSINT data gathering platform",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Create a router with the /api prefix
@@ -186,6 +212,7 @@ class EmailQueryRequest(BaseModel):
 class PhoneQueryRequest(BaseModel):
     phone: str
     timeout: int = 60
+    mode: Literal["quick", "deep"] = "deep"  # quick 只查询低延迟提供商（运营商、来电姓名），约 2 秒返回
 
 class TelegramUsernameQueryRequest(BaseModel):
     username: str
@@ -253,26 +280,34 @@ async def get_status_checks():
     return status_checks
 
 @api_router.post("/email/query")
-async def query_email(request: EmailQueryRequest, db_session: Session = Depends(get_db)):
+async def query_email(
+    request: EmailQueryRequest,
+    fields: Optional[str] = Query(None, description="各提供商 data 中只返回这些字段，逗号分隔"),
+    include_raw: bool = Query(False, description="是否返回原始数据字段（rawResponse/pipeline_result 等）"),
+    db_session: Session = Depends(get_db)
+):
     """
     Query email information using multiple OSINT APIs
     Saves results to SQLite database for history and caching
+    The response is shaped (raw payloads omitted, per-provider size caps);
+    the full result is available from /api/raw/email
     """
+    selected_fields = parse_fields(fields)
     try:
         # 清理邮箱地址,去除前后空格
         email = request.email.strip()
         
         # Check cache first
-        cache_key = f"email_{email}"
-        cached_result = get_cache(db_session, cache_key, "email")
+        cached_result = get_cache(db_session, email, "email")
         if cached_result:
             logger.info(f"✅ Cache hit for email: {email}")
-            return cached_result
+            return ORJSONResponse(shape_query_result(cached_result, selected_fields, include_raw))
         
         # Query comprehensive email data
         logger.info(f"🔍 Querying email: {email}")
         
-        if HAS_EXTERNAL_APIS:
+        query_email_comprehensive = startup.load_provider_query('query_email_comprehensive') if HAS_EXTERNAL_APIS else None
+        if query_email_comprehensive:
             result = await query_email_comprehensive(email)
             result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
         else:
@@ -295,14 +330,15 @@ async def query_email(request: EmailQueryRequest, db_session: Session = Depends(
             db=db_session,
             query=email,
             query_type="email",
-            result_data=result_dict
+            result_data=result_dict,
+            ttl_hours=_cache_ttl_hours("email", result_dict)
         )
         
         # Log search
         log_search(db_session, request.email, "email", 1)
         
         logger.info(f"✅ Email query completed for: {request.email}")
-        return result_dict
+        return ORJSONResponse(shape_query_result(result_dict, selected_fields, include_raw))
     except Exception as e:
         logger.error(f"❌ Error querying email {request.email}: {str(e)}")
         error_result = {
@@ -319,28 +355,62 @@ async def query_email(request: EmailQueryRequest, db_session: Session = Depends(
         )
         return error_result
 
+def _parse_sections_param(sections: Optional[str]) -> Optional[List[str]]:
+    """解析 sections 查询参数，非法时返回 400"""
+    try:
+        return parse_sections(sections)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _select_phone_sections(result_dict: Dict[str, Any], sections: Optional[List[str]]) -> Dict[str, Any]:
+    """按 sections 裁剪电话查询结果中的 Investigate 数据（不修改已缓存的结果）"""
+    if sections is None or not isinstance(result_dict, dict) or not isinstance(result_dict.get('data'), list):
+        return result_dict
+    return {**result_dict, 'data': select_investigate_sections(result_dict['data'], sections)}
+
+
 @api_router.post("/phone/query")
-async def query_phone(request: PhoneQueryRequest, db_session: Session = Depends(get_db)):
+async def query_phone(
+    request: PhoneQueryRequest,
+    sections: Optional[str] = Query(None, description="Investigate 结果只返回这些板块，逗号分隔（如 summary,contacts）"),
+    fields: Optional[str] = Query(None, description="各提供商 data 中只返回这些字段，逗号分隔"),
+    include_raw: bool = Query(False, description="是否返回原始数据字段（rawResponse/pipeline_result 等）"),
+    db_session: Session = Depends(get_db)
+):
     """
     Query phone number information using multiple OSINT APIs
     Saves results to SQLite database for history and caching
+    The response is shaped (raw payloads omitted, per-provider size caps);
+    the full result is available from /api/raw/phone
+
+    mode=quick runs only the low-latency providers and is cached separately;
+    a later mode=deep query reuses the quick result and only queries the rest
     """
+    selected_sections = _parse_sections_param(sections)
+    selected_fields = parse_fields(fields)
     try:
         # 清理手机号,去除前后空格
         phone = request.phone.strip()
+        mode = request.mode
         
-        # Check cache first
-        cache_key = f"phone_{phone}"
-        cached_result = get_cache(db_session, cache_key, "phone")
+        # Check cache first（深度结果包含快速模式的全部提供商，两种模式都优先使用深度缓存）
+        cached_result = get_cache(db_session, phone, "phone")
+        quick_result = get_cache(db_session, phone, cache_query_type("phone", "quick")) if not cached_result else None
+        if not cached_result and mode == "quick":
+            cached_result = quick_result
         if cached_result:
-            logger.info(f"✅ Cache hit for phone: {phone}")
-            return cached_result
+            logger.info(f"✅ Cache hit for phone: {phone} ({cached_result.get('mode', 'deep')})")
+            return ORJSONResponse(shape_query_result(_select_phone_sections(cached_result, selected_sections), selected_fields, include_raw))
         
         # Query comprehensive phone data
-        logger.info(f"🔍 Querying phone: {phone}")
+        logger.info(f"🔍 Querying phone: {phone} ({mode})")
         
-        if HAS_EXTERNAL_APIS:
-            result = await query_phone_comprehensive(phone)
+        query_phone_comprehensive = startup.load_provider_query('query_phone_comprehensive') if HAS_EXTERNAL_APIS else None
+        if query_phone_comprehensive:
+            # 快速结果升级为深度结果：复用其中成功的提供商
+            reuse = quick_result.get("data") if quick_result else None
+            result = await query_phone_comprehensive(phone, mode=mode, reuse=reuse)
             result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
         else:
             result_dict = {"success": True, "phone": phone, "data": "Mock data"}
@@ -357,19 +427,20 @@ async def query_phone(request: PhoneQueryRequest, db_session: Session = Depends(
             error=error_msg
         )
         
-        # Cache the result
+        # Cache the result（快速结果单独缓存）
         save_cache(
             db=db_session,
             query=phone,
-            query_type="phone",
-            result_data=result_dict
+            query_type=cache_query_type("phone", mode),
+            result_data=result_dict,
+            ttl_hours=_cache_ttl_hours("phone", result_dict)
         )
         
         # Log search
         log_search(db_session, request.phone, "phone", 1)
         
         logger.info(f"✅ Phone query completed for: {request.phone}")
-        return result_dict
+        return ORJSONResponse(shape_query_result(_select_phone_sections(result_dict, selected_sections), selected_fields, include_raw))
     except Exception as e:
         logger.error(f"❌ Error querying phone {request.phone}: {str(e)}")
         error_result = {
@@ -389,6 +460,80 @@ async def query_phone(request: PhoneQueryRequest, db_session: Session = Depends(
 # 已移除：/phone/lookup3008 独立路由（不再使用）
 
 
+@api_router.get("/phone/investigate")
+async def get_phone_investigate_sections(
+    phone: str,
+    sections: Optional[str] = Query(None, description="需要的板块，逗号分隔（如 summary,contacts）；为空返回全部"),
+    db_session: Session = Depends(get_db)
+):
+    """
+    按需返回已查询号码的 Investigate 板块（前端切换标签页时只请求当前板块）
+    只计算请求的板块，同一结果的重复请求命中处理缓存
+    """
+    selected_sections = _parse_sections_param(sections)
+    try:
+        phone = phone.strip()
+        record = get_phone_query(db_session, phone)
+        if not record or not record.query_result:
+            raise HTTPException(status_code=404, detail="No query result for this phone")
+        
+        stored = loads(record.query_result)
+        results = stored.get('data') if isinstance(stored, dict) else None
+        investigate = next(
+            (r for r in (results or []) if isinstance(r, dict) and r.get('source') == 'investigate_api' and r.get('success')),
+            None
+        )
+        if not investigate:
+            raise HTTPException(status_code=404, detail="No Investigate API result for this phone")
+        
+        selected = await asyncio.to_thread(get_investigate_sections, investigate, selected_sections)
+        if selected is None:
+            raise HTTPException(status_code=500, detail="Investigate data processing failed")
+        
+        return ORJSONResponse({
+            "success": True,
+            "phone": phone,
+            "investigation_id": investigate['data'].get('investigation_id', ''),
+            "sections": selected
+        })
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error loading investigate sections for {phone}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+@api_router.get("/raw/{query_type}")
+async def get_raw_query_result(
+    query_type: str,
+    query: str,
+    source: Optional[str] = Query(None, description="只返回这些提供商的完整结果，逗号分隔"),
+    db_session: Session = Depends(get_db)
+):
+    """
+    Return the full, unshaped provider results stored for a phone/email query
+    (raw payloads omitted from /phone/query and /email/query are fetched here on demand)
+    """
+    try:
+        if query_type == "phone":
+            record = get_phone_query(db_session, query.strip())
+        elif query_type == "email":
+            record = get_email_query(db_session, query.strip())
+        else:
+            raise HTTPException(status_code=400, detail="query_type must be phone or email")
+        if not record or not record.query_result:
+            raise HTTPException(status_code=404, detail="No stored result for this query")
+        
+        stored = await asyncio.to_thread(loads, record.query_result)
+        results = find_provider_results(stored, parse_fields(source))
+        return ORJSONResponse({"success": True, "query_type": query_type, "query": query.strip(), "data": results})
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error loading raw {query_type} result for {query}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
 # ==================== Telegram Username Query ====================
 
 @api_router.get("/telegram/username/{username}")
@@ -406,9 +551,11 @@ async def query_telegram_username(username: str, timeout: int = 30):
 # ==================== Logo Proxy Endpoint ====================
 
 @api_router.get("/logo/{domain}")
-async def get_logo(domain: str):
+async def get_logo(domain: str, request: Request):
     """Fetch platform logo via same-origin proxy to display authentic brand icons.
-    Tries Clearbit first, then falls back to /favicon.ico on the target domain.
+    Races Clearbit, the site's /favicon.ico and DuckDuckGo concurrently and keeps
+    the highest-priority hit; the winning source is remembered per candidate list.
+    Images (and upstream 404s) are served from the shared disk cache when possible.
     """
     try:
         dom = (domain or "").strip().lower()
@@ -416,44 +563,67 @@ async def get_logo(domain: str):
             dom = dom[4:]
         candidates = [
             # 1) Clearbit 品牌 Logo
-            f"https://logo.clearbit.com/{dom}",
+            (f"https://logo.clearbit.com/{dom}", "image/png"),
             # 2) 站点 favicon
-            f"https://{dom}/favicon.ico",
+            (f"https://{dom}/favicon.ico", "image/png"),
             # 3) DuckDuckGo 图标服务（覆盖率更高）
-            f"https://icons.duckduckgo.com/ip3/{dom}.ico",
+            (f"https://icons.duckduckgo.com/ip3/{dom}.ico", "image/png"),
         ]
-        async with httpx.AsyncClient(timeout=5) as client:
-            for url in candidates:
-                try:
-                    resp = await client.get(url)
-                    if resp.status_code == 200 and resp.content:
-                        media_type = resp.headers.get("Content-Type", "image/png")
-                        return Response(content=resp.content, media_type=media_type)
-                except Exception:
-                    continue
+        # 三个来源并发请求，按上述优先级取第一个成功的结果
+        response = await race_logo_candidates(request, dom, candidates, timeout=5)
+        if response:
+            return response
         raise HTTPException(status_code=404, detail="Logo not found")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Logo fetch error: {str(e)}")
 
 
 @api_router.get("/avatar")
-async def get_avatar(url: str):
+async def get_avatar(url: str, request: Request):
     """Proxy external avatar images through same-origin to avoid CSP/CORS/ORB issues.
-    Only http/https schemes are allowed.
+    Only http/https schemes are allowed. The body is streamed, capped in size and
+    restricted to image content types.
     """
     try:
         if not url or not (url.startswith("http://") or url.startswith("https://")):
             raise HTTPException(status_code=400, detail="Invalid URL")
-        async with httpx.AsyncClient(timeout=8, follow_redirects=True) as client:
-            resp = await client.get(url)
-            if resp.status_code == 200 and resp.content:
-                media_type = resp.headers.get("Content-Type", "image/jpeg")
-                return Response(content=resp.content, media_type=media_type)
+        response = await proxy_image(request, url, timeout=8, follow_redirects=True, default_type="image/jpeg")
+        if response:
+            return response
         raise HTTPException(status_code=404, detail="Avatar not found")
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Avatar fetch error: {str(e)}")
 
 
+@api_router.get("/blob/{blob_hash}")
+async def get_blob(blob_hash: str, request: Request):
+    """Serve a content-addressed blob (e.g. provider avatars saved at query time).
+    Blobs never change once written, so responses are cacheable forever and
+    revalidation is answered with 304 from the hash alone.
+    """
+    store = get_blob_store()
+    meta = await asyncio.to_thread(store.get_meta, blob_hash)
+    if not meta:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    headers = {
+        "ETag": f'"{blob_hash}"',
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    path = store.local_path(blob_hash)
+    if path:
+        return FileResponse(path, media_type=meta["content_type"], headers=headers)
+    data = await asyncio.to_thread(store.read, blob_hash)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return Response(content=data, media_type=meta["content_type"], headers=headers)
+
+
 # ==================== Admin Routes ====================
 
 def verify_admin_session(session_token: str, db: Session) -> dict:
@@ -966,20 +1136,35 @@ async def get_api_usage(
             APIUsageLog.api_name,
             func.count(APIUsageLog.id).label('total_calls'),
             func.sum(func.cast(APIUsageLog.success, Integer)).label('successful_calls'),
-            func.avg(APIUsageLog.response_time_ms).label('avg_response_time')
+            func.avg(APIUsageLog.response_time_ms).label('avg_response_time'),
+            func.max(APIUsageLog.response_time_ms).label('max_response_time'),
+            func.sum(APIUsageLog.response_bytes).label('total_bytes'),
+            func.sum(APIUsageLog.retry_count).label('total_retries')
         ).filter(
             APIUsageLog.created_at >= start_date
         ).group_by(APIUsageLog.api_name).all()
         
         usage_list = []
         for stat in usage_stats:
-            success_rate = (stat.successful_calls / stat.total_calls * 100) if stat.total_calls > 0 else 0
+            successful_calls = stat.successful_calls or 0
+            success_rate = (successful_calls / stat.total_calls * 100) if stat.total_calls > 0 else 0
+            # P95 延迟：按耗时排序后取第 95% 位置的记录
+            p95_response_time = db_session.query(APIUsageLog.response_time_ms).filter(
+                APIUsageLog.api_name == stat.api_name,
+                APIUsageLog.created_at >= start_date
+            ).order_by(APIUsageLog.response_time_ms).offset(int((stat.total_calls - 1) * 0.95)).limit(1).scalar()
             usage_list.append({
                 "api_name": stat.api_name,
                 "total_calls": stat.total_calls,
-                "successful_calls": stat.successful_calls or 0,
+                "successful_calls": successful_calls,
+                "failed_calls": stat.total_calls - successful_calls,
                 "success_rate": round(success_rate, 2),
-                "avg_response_time": round(stat.avg_response_time or 0, 2)
+                "error_rate": round(100 - success_rate, 2) if stat.total_calls > 0 else 0,
+                "avg_response_time": round(stat.avg_response_time or 0, 2),
+                "p95_response_time": p95_response_time or 0,
+                "max_response_time": stat.max_response_time or 0,
+                "total_bytes": stat.total_bytes or 0,
+                "total_retries": stat.total_retries or 0
             })
         
         # 总计
@@ -1007,6 +1192,85 @@ async def get_api_usage(
             "message": "Failed to fetch API usage statistics"
         }
 
+# ==================== Provider Registry ====================
+
+def _cache_ttl_hours(query_type: str, result_dict: Dict[str, Any]) -> int:
+    """聚合结果的缓存时间（小时）：取结果中成功提供商声明的最小 cache_ttl"""
+    from apis.provider_registry import result_cache_ttl
+    return max(1, result_cache_ttl(query_type, result_dict.get("data")) // 3600)
+
+
+class UpdateProviderRequest(BaseModel):
+    enabled: bool
+
+
+@api_router.get("/admin/providers")
+async def get_admin_providers(session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """提供商注册表：成本、典型耗时、超时、缓存时间、依赖与当前启用状态"""
+    try:
+        verify_admin_session(session_token, db_session)
+        from apis import provider_registry
+        await provider_registry.refresh_settings(force=True)
+        return {"success": True, "data": provider_registry.list_providers()}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error fetching providers: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.patch("/admin/providers/{name}")
+async def update_admin_provider(
+    name: str,
+    request: UpdateProviderRequest,
+    session_token: str = Query(...),
+    db_session: Session = Depends(get_db)
+):
+    """启用/停用提供商（保存到数据库，其他进程在 PROVIDER_SETTINGS_TTL 秒内生效）"""
+    try:
+        verify_result = verify_admin_session(session_token, db_session)
+        from apis import provider_registry
+        from db_operations import set_provider_enabled
+
+        if provider_registry.get_provider(name) is None:
+            raise HTTPException(status_code=404, detail="Provider not found")
+
+        set_provider_enabled(db_session, name, request.enabled, verify_result.get('username'))
+        provider_registry.set_enabled(name, request.enabled)
+        provider = next(p for p in provider_registry.list_providers() if p['name'] == name)
+        return {"success": True, "data": provider, "message": "Provider updated successfully"}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error updating provider {name}: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.get("/admin/diagnostics")
+async def get_diagnostics(session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """诊断模式状态：事件循环延迟、阻塞次数、诊断文件列表和启动耗时剖析"""
+    try:
+        verify_admin_session(session_token, db_session)
+        from diagnostics import get_diagnostics_status
+        return {"success": True, "data": {**get_diagnostics_status(), "startup": startup.get_startup_profile()}}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error fetching diagnostics: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.get("/admin/diagnostics/samples/{name}")
+async def get_diagnostics_sample(name: str, session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """下载单个诊断文件（阻塞调用栈 / 慢请求剖析）"""
+    verify_admin_session(session_token, db_session)
+    from diagnostics import get_sample_path
+    path = get_sample_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Sample not found")
+    media_type = "text/html" if path.suffix == ".html" else "text/plain"
+    return FileResponse(str(path), media_type=media_type)
+
 
 # 创建用户请求模型
 class CreateUserRequest(BaseModel):
@@ -1051,11 +1315,10 @@ app.include_router(api_router)
 app.include_router(linkedin_avatar_router)
 app.include_router(logo_router)
 app.include_router(google_router)
-app.include_router(google_router)
 
 # ==================== Person Summary (External Search) ====================
 @app.get("/api/person/summary")
-async def get_person_summary(phone: str, timeout: int = 30):
+async def get_person_summary(phone: str, timeout: int = 30, include_raw: bool = False):
     """调用外部搜索服务并对返回的字段进行去重整合，输出个人信息摘要。"""
     try:
         result = await query_external_search(phone, timeout=timeout) if HAS_EXTERNAL_SEARCH else {"success": False, "error": "External search module not available"}
@@ -1077,24 +1340,55 @@ async def get_person_summary(phone: str, timeout: int = 30):
         
         logger.info(f"📊 [PersonSummary] Extracted {len(data)} fields, {source_count} sources")
         
-        return {
+        response = {
             "success": True,
             "phone": phone,
             "summary": data,  # data包含所有提取的字段
             "count": source_count,
-            "raw": data,  # 保留完整数据
         }
+        if include_raw:
+            # raw 与 summary 内容相同，仅在显式请求时返回
+            response["raw"] = data
+        return response
     except Exception as e:
         logger.error(f"❌ [PersonSummary] Error: {str(e)}")
         return {"success": False, "error": str(e)}
 
 
 # ==================== GPT-5 OSINT Data Analysis ====================
+def _gpt5_analysis_response(
+    result: Dict[str, Any],
+    cached: bool,
+    query: str,
+    main_person: Optional[str],
+    prompt_stats: Dict[str, Any]
+) -> Dict[str, Any]:
+    """GPT-5 分析接口的响应（流式与非流式共用）"""
+    if result.get("success"):
+        logger.info(f"✅ [GPT-5 Analysis] Analysis completed successfully (cached={cached})")
+        return {
+            "success": True,
+            "query": query,
+            "main_person": main_person,
+            "analyzed_data": result.get("data"),
+            "raw_response": result.get("raw_response"),
+            "cached": cached,
+            "prompt_stats": prompt_stats
+        }
+    logger.error(f"❌ [GPT-5 Analysis] Analysis failed: {result.get('error')}")
+    return {
+        "success": False,
+        "error": result.get("error"),
+        "raw_response": result.get("raw_response")
+    }
+
+
 @app.post("/api/osint/gpt5-analyze")
 async def analyze_osint_with_gpt5(
     results: List[Dict[str, Any]],
     query: str,
-    main_person: Optional[str] = None
+    main_person: Optional[str] = None,
+    db_session: Session = Depends(get_db)
 ):
     """
     使用 GPT-5 分析 OSINT Industries 数据
@@ -1108,28 +1402,22 @@ async def analyze_osint_with_gpt5(
         AI 分析结果，包含提取的字段和摘要
     """
     try:
-        from apis.gpt5_analyzer import analyze_osint_data_with_gpt5
+        from apis.gpt5_analyzer import analyze_osint_data_with_gpt5, assemble_gpt5_prompt, MODEL_ID
+        from ai_cache import analysis_cache_key, cached_analysis
         
         logger.info(f"🤖 [GPT-5 Analysis] Analyzing {len(results)} records for {query}")
         
-        result = await analyze_osint_data_with_gpt5(results, query, main_person)
+        # 相同提示词输入 + 模型直接复用缓存的分析结果
+        prompt, prompt_stats = assemble_gpt5_prompt(results, query, main_person)
+        logger.info(f"📝 [GPT-5 Analysis] Prompt ~{prompt_stats['prompt_tokens']} tokens, {prompt_stats['records_included']}/{prompt_stats['records_unique']} records")
+        cache_key = analysis_cache_key("gpt5_osint", MODEL_ID, prompt)
+        result, cached = await cached_analysis(
+            cache_key,
+            lambda: analyze_osint_data_with_gpt5(results, query, main_person, prompt=prompt),
+            db_session
+        )
         
-        if result.get("success"):
-            logger.info(f"✅ [GPT-5 Analysis] Analysis completed successfully")
-            return {
-                "success": True,
-                "query": query,
-                "main_person": main_person,
-                "analyzed_data": result.get("data"),
-                "raw_response": result.get("raw_response")
-            }
-        else:
-            logger.error(f"❌ [GPT-5 Analysis] Analysis failed: {result.get('error')}")
-            return {
-                "success": False,
-                "error": result.get("error"),
-                "raw_response": result.get("raw_response")
-            }
+        return _gpt5_analysis_response(result, cached, query, main_person, prompt_stats)
     
     except Exception as e:
         logger.error(f"❌ [GPT-5 Analysis] Error: {str(e)}")
@@ -1139,6 +1427,45 @@ async def analyze_osint_with_gpt5(
         }
 
 
+@app.post("/api/osint/gpt5-analyze/stream")
+async def analyze_osint_with_gpt5_stream(
+    results: List[Dict[str, Any]],
+    query: str,
+    main_person: Optional[str] = None
+):
+    """
+    GPT-5 分析的 SSE 流式版本
+    
+    事件: status / delta（文本增量）/ field（已解析的顶层字段）/ reset（之前的 field 作废）/
+    result（与非流式接口相同的结果）/ error
+    """
+    from apis.gpt5_analyzer import assemble_gpt5_prompt, parse_gpt5_response, MODEL_ID
+    from ai_cache import analysis_cache_key
+    from ai_streaming import SSE_HEADERS, sse_event, stream_analysis
+    from models import SessionLocal
+    
+    prompt, prompt_stats = assemble_gpt5_prompt(results, query, main_person)
+    cache_key = analysis_cache_key("gpt5_osint", MODEL_ID, prompt)
+    
+    async def build_response(result: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+        return _gpt5_analysis_response(result, cached, query, main_person, prompt_stats)
+    
+    async def events():
+        # 流式响应结束后依赖注入的会话可能已关闭，这里自行管理
+        db_session = SessionLocal()
+        try:
+            yield sse_event("status", {"stage": "prompt", "prompt_stats": prompt_stats})
+            async for event in stream_analysis(prompt, cache_key, parse_gpt5_response, build_response, db_session):
+                yield event
+        except Exception as e:
+            logger.error(f"❌ [GPT-5 Analysis] Stream error: {str(e)}")
+            yield sse_event("error", {"success": False, "error": str(e)})
+        finally:
+            db_session.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 # ==================== Celery Task Status ====================
 @app.get("/api/tasks/status")
 async def get_task_status_endpoint(task_id: str):
@@ -1151,8 +1478,44 @@ async def get_task_status_endpoint(task_id: str):
 
 
 # ==================== AI Analysis (ChatGPT) ====================
+async def _person_analysis_response(
+    ai_result: Dict[str, Any],
+    cached: bool,
+    phone: str,
+    osint_data: Dict[str, Any],
+    prompt_stats: Dict[str, Any]
+) -> Dict[str, Any]:
+    """AI 人物分析接口的响应（流式与非流式共用）"""
+    from apis.ai_analyzer import generate_person_summary
+    
+    if not ai_result.get("success"):
+        return {
+            "success": False,
+            "error": f"AI analysis failed: {ai_result.get('error', 'Unknown error')}",
+            "osint_data": osint_data  # 返回原始数据以便调试
+        }
+    
+    # 3. 生成简洁摘要
+    person_profile = ai_result.get("person_profile", {})
+    summary_text = await generate_person_summary(person_profile)
+    
+    logger.info(f"✅ [AI Analysis] Analysis completed successfully")
+    
+    return {
+        "success": True,
+        "phone": phone,
+        "ai_analysis": ai_result.get("analysis"),  # AI的完整分析文本
+        "person_profile": person_profile,  # 结构化的人物档案
+        "summary": summary_text,  # 简洁的中文摘要
+        "osint_data": osint_data,  # 原始OSINT数据
+        "raw_response": ai_result.get("raw_response"),  # ChatGPT原始响应
+        "cached": cached,  # 是否复用了缓存的分析结果
+        "prompt_stats": prompt_stats  # 提示词 token 估算与记录取舍统计
+    }
+
+
 @app.get("/api/person/ai-analysis")
-async def get_ai_analysis(phone: str, timeout: int = 120):
+async def get_ai_analysis(phone: str, timeout: int = 120, db_session: Session = Depends(get_db)):
     """
     使用AI分析OSINT数据，提取主要人物资料
     
@@ -1178,32 +1541,20 @@ async def get_ai_analysis(phone: str, timeout: int = 120):
         
         # 2. 使用AI分析数据
         logger.info(f"🤖 [AI Analysis] Step 2: Analyzing data with ChatGPT")
-        from apis.ai_analyzer import analyze_person_data, generate_person_summary
-        
-        ai_result = await analyze_person_data(osint_data)
-        
-        if not ai_result.get("success"):
-            return {
-                "success": False,
-                "error": f"AI analysis failed: {ai_result.get('error', 'Unknown error')}",
-                "osint_data": osint_data  # 返回原始数据以便调试
-            }
-        
-        # 3. 生成简洁摘要
-        person_profile = ai_result.get("person_profile", {})
-        summary_text = await generate_person_summary(person_profile)
-        
-        logger.info(f"✅ [AI Analysis] Analysis completed successfully")
+        from apis.ai_analyzer import analyze_person_data, assemble_analysis_prompt, MODEL_ID
+        from ai_cache import analysis_cache_key, cached_analysis
+        
+        # 缓存键基于提示词输入（不含时间戳等易变字段），数据未变化时不再调用 LLM
+        prompt, prompt_stats = assemble_analysis_prompt(osint_data)
+        logger.info(f"📝 [AI Analysis] Prompt ~{prompt_stats['prompt_tokens']} tokens, {prompt_stats['records_included']}/{prompt_stats['records_unique']} records")
+        cache_key = analysis_cache_key("person_analysis", MODEL_ID, prompt)
+        ai_result, cached = await cached_analysis(
+            cache_key,
+            lambda: analyze_person_data(osint_data, prompt=prompt),
+            db_session
+        )
         
-        return {
-            "success": True,
-            "phone": phone,
-            "ai_analysis": ai_result.get("analysis"),  # AI的完整分析文本
-            "person_profile": person_profile,  # 结构化的人物档案
-            "summary": summary_text,  # 简洁的中文摘要
-            "osint_data": osint_data,  # 原始OSINT数据
-            "raw_response": ai_result.get("raw_response")  # ChatGPT原始响应
-        }
+        return await _person_analysis_response(ai_result, cached, phone, osint_data, prompt_stats)
         
     except Exception as e:
         logger.error(f"❌ [AI Analysis] Error: {str(e)}")
@@ -1212,6 +1563,67 @@ async def get_ai_analysis(phone: str, timeout: int = 120):
             "error": str(e)
         }
 
+@app.get("/api/person/ai-analysis/stream")
+async def get_ai_analysis_stream(phone: str):
+    """
+    AI 人物分析的 SSE 流式版本
+    
+    事件: status（fetching/prompt/queued/analyzing）/ delta（文本增量）/
+    field（已解析的顶层字段）/ reset（之前的 field 作废）/ result（与非流式接口相同的结果）/ error
+    """
+    from apis.ai_analyzer import assemble_analysis_prompt, build_analysis_result, MODEL_ID
+    from ai_cache import analysis_cache_key
+    from ai_streaming import SSE_HEADERS, sse_event, stream_analysis
+    from models import SessionLocal
+    
+    async def events():
+        # 流式响应结束后依赖注入的会话可能已关闭，这里自行管理
+        db_session = SessionLocal()
+        try:
+            yield sse_event("status", {"stage": "fetching"})
+            osint_result = await query_external_search(phone, timeout=60) if HAS_EXTERNAL_SEARCH else {"success": False, "error": "External search module not available"}
+            if not osint_result.get("success"):
+                yield sse_event("error", {
+                    "success": False,
+                    "error": f"Failed to fetch OSINT data: {osint_result.get('error', 'Unknown error')}"
+                })
+                return
+            
+            osint_data = {"summary": osint_result.get("data", {})}
+            prompt, prompt_stats = assemble_analysis_prompt(osint_data)
+            cache_key = analysis_cache_key("person_analysis", MODEL_ID, prompt)
+            yield sse_event("status", {"stage": "prompt", "prompt_stats": prompt_stats})
+            
+            async def build_response(result: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+                return await _person_analysis_response(result, cached, phone, osint_data, prompt_stats)
+            
+            async for event in stream_analysis(prompt, cache_key, build_analysis_result, build_response, db_session):
+                yield event
+        except Exception as e:
+            logger.error(f"❌ [AI Analysis] Stream error: {str(e)}")
+            yield sse_event("error", {"success": False, "error": str(e)})
+        finally:
+            db_session.close()
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/api/llm/stats")
+async def get_llm_stats_endpoint():
+    """LLM 并发上限、进行中/排队中的调用数和排队时间统计"""
+    from apis.llm_client import get_llm_stats
+    return {"success": True, "data": get_llm_stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 抓取端点"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=503, detail="Metrics disabled (prometheus_client not installed)")
+    content, content_type = metrics.render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 # ==================== Security Headers: Content-Security-Policy ====================
 # 为前端构建（React）统一添加 CSP，允许 Mapbox/Esri、data/blob 资源，以及 mapbox-gl 需要的 unsafe-eval 与 worker/blob。
 @app.middleware("http")
@@ -1272,11 +1684,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 中间件顺序：后添加的在外层。请求依次经过
+#   Metrics → Tracing → Diagnostics → Compression → CORS → CSP → 路由
+# 压缩作用于 CORS/CSP 处理后的最终响应；指标、追踪和剖析位于压缩外层，耗时包含压缩
+app.add_middleware(CompressionMiddleware)
+
+# 慢请求剖析（仅诊断模式）
+app.add_middleware(DiagnosticsMiddleware)
+
+# 链路追踪根 span
+app.add_middleware(TracingMiddleware)
+
+# 请求延迟指标（最外层）
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files for production (frontend build)
 FRONTEND_BUILD_DIR = ROOT_DIR.parent / "frontend" / "build"
 if FRONTEND_BUILD_DIR.exists():
     # Mount static assets (JS, CSS, images, etc.)
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_BUILD_DIR / "static")), name="static")
+    # 优先返回构建时生成的 .br/.gz 文件，带哈希的文件名长期缓存
+    app.mount("/static", PrecompressedStaticFiles(directory=str(FRONTEND_BUILD_DIR / "static")), name="static")
     
     # Serve other static files (favicon, manifest, etc.)
     @app.get("/favicon.ico")
@@ -1289,10 +1716,10 @@ if FRONTEND_BUILD_DIR.exists():
         return Response(status_code=204)
     
     @app.get("/manifest.json")
-    async def manifest():
+    async def manifest(request: Request):
         manifest_path = FRONTEND_BUILD_DIR / "manifest.json"
         if manifest_path.exists():
-            return FileResponse(manifest_path)
+            return precompressed_file_response(manifest_path, request.headers.get("accept-encoding", ""))
         raise HTTPException(status_code=404)
     
     @app.get("/logo192.png")
@@ -1312,7 +1739,7 @@ if FRONTEND_BUILD_DIR.exists():
     # Catch-all route for React Router (SPA support)
     # This must be the last route to avoid conflicts with API routes
     @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    async def serve_react_app(full_path: str, request: Request):
         """
         Serve the React app for all non-API routes.
         This enables client-side routing to work properly.
@@ -1323,7 +1750,8 @@ if FRONTEND_BUILD_DIR.exists():
         
         index_path = FRONTEND_BUILD_DIR / "index.html"
         if index_path.exists():
-            return FileResponse(index_path)
+            # index.html 每次校验，确保新版本发布后立即引用新的哈希资源
+            return precompressed_file_response(index_path, request.headers.get("accept-encoding", ""))
         raise HTTPException(status_code=404, detail="Frontend build not found. Please run 'yarn build' in the frontend directory.")
     
     logger.info(f"✅ Serving frontend from: {FRONTEND_BUILD_DIR}")
@@ -1331,6 +1759,8 @@ else:
     logger.warning(f"⚠️ Frontend build directory not found at: {FRONTEND_BUILD_DIR}")
     logger.warning("⚠️ Please run 'yarn build' in the frontend directory to enable single-port deployment")
 
+startup.mark('imported')
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("🚀 Starting OSINT API server...")
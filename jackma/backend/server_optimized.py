@@ -2,35 +2,50 @@
 优化版服务器 - 集成Redis缓存和Celery异步任务
 使用此文件替代原server.py以启用高性能特性
 """
+# 启动耗时剖析（最先导入，记录开始导入应用代码的时间）
+import startup
+
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, BackgroundTasks
-from fastapi.staticfiles import StaticFiles
+from fastapi import Request, Response
 from fastapi.responses import FileResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+import importlib.util
 import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
+import asyncio
 
 # 导入Redis缓存和Celery任务
 from redis_cache import (
     redis_cache,
     get_cached_result,
-    save_cached_result,
-    CACHE_TTL_LONG
+    save_cached_result
 )
 from celery_tasks import (
     async_query_phone,
     async_query_email,
     get_task_status,
     cancel_task,
-    get_queue_stats
+    get_cached_queue_stats,
+    queue_stats_poller
 )
+from serialization import ORJSONResponse
+# 提供商查询模式（quick/deep）对应的缓存类型
+from apis.provider_registry import cache_query_type
+from response_compression import CompressionMiddleware, PrecompressedStaticFiles, precompressed_file_response
+import usage_sink
+import metrics
+from metrics import MetricsMiddleware
+import telemetry
+from telemetry import TracingMiddleware, celery_trace_context
+import diagnostics
+from diagnostics import DiagnosticsMiddleware
 
 logging.basicConfig(
     level=logging.INFO,
@@ -39,7 +54,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Import database and API modules
-from models import init_db, get_db
+from models import get_db
 from db_operations import (
     save_email_query,
     save_phone_query,
@@ -53,75 +68,59 @@ from auth_operations import (
     login_user,
     verify_session,
     logout_user,
-    init_default_users,
     create_user,
     get_user_info
 )
 
-try:
-    from apis import (
-        query_email_comprehensive, 
-        query_phone_comprehensive,
-        EmailQueryResult,
-        PhoneQueryResult
-    )
-    HAS_EXTERNAL_APIS = True
-except ImportError:
-    HAS_EXTERNAL_APIS = False
+# 提供商模块在首次查询时才导入（apis 包按需解析），这里只检查模块是否存在；
+# 导入失败时由 startup.load_provider_query 回退到模拟数据
+HAS_EXTERNAL_APIS = importlib.util.find_spec('apis.aggregator') is not None
+if not HAS_EXTERNAL_APIS:
     print("⚠️ Warning: external_apis module not found")
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Initialize SQLite database
-try:
-    init_db()
-    from models import SessionLocal
-    db_session = SessionLocal()
-    init_default_users(db_session)
-    db_session.close()
-except Exception as e:
-    print(f"⚠️ Database initialization skipped: {str(e)}")
-
-# MongoDB connection (optional)
-try:
-    mongo_url = os.environ.get('MONGO_URL')
-    if mongo_url:
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[os.environ.get('DB_NAME', 'jackma_db')]
-    else:
-        db = None
-except Exception as e:
-    print(f"⚠️ MongoDB connection skipped: {str(e)}")
-    db = None
+# MongoDB connection (optional)，在 lifespan 中建立
+db = None
+client = None
 
-# Create the main app
-app = FastAPI(
-    title="OSINT Tracker API (Optimized)",
-    description="High-performance OSINT platform with Redis cache and Celery tasks",
-    version="2.0.0"
-)
+# ==================== Startup & Shutdown ====================
 
-# Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+# 队列统计后台轮询任务
+queue_stats_task: Optional[asyncio.Task] = None
 
 
-# ==================== Startup & Shutdown Events ====================
-
-@app.on_event("startup")
-async def startup_event():
-    """应用启动时初始化Redis连接"""
-    try:
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时初始化数据库、Redis连接并启动队列统计轮询；关闭时清理资源"""
+    global client, db, queue_stats_task
+    with startup.step('init_db'):
+        startup.init_database()
+    with startup.step('mongodb'):
+        client, db = startup.connect_mongo()
+    with startup.step('provider_registry'):
+        startup.install_provider_settings()
+    with startup.step('redis'):
         await redis_cache.initialize()
-        logger.info("✅ 应用启动完成 - Redis已连接")
-    except Exception as e:
-        logger.error(f"⚠️ Redis连接失败: {str(e)}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """应用关闭时清理资源"""
+    queue_stats_task = asyncio.create_task(queue_stats_poller())
+    with startup.step('usage_sink'):
+        usage_sink.start()
+    with startup.step('metrics'):
+        metrics.start()
+    with startup.step('tracing'):
+        telemetry.configure_tracing('osint-api')
+    with startup.step('diagnostics'):
+        diagnostics.start()
+    startup.mark('ready')
+    yield
     try:
+        if queue_stats_task:
+            queue_stats_task.cancel()
+        await diagnostics.stop()
+        await metrics.stop()
+        telemetry.shutdown_tracing()
+        await usage_sink.stop()
         await redis_cache.close()
         if client:
             client.close()
@@ -130,6 +129,19 @@ async def shutdown_event():
         logger.error(f"⚠️ 关闭时出错: {str(e)}")
 
 
+# Create the main app
+app = FastAPI(
+    title="OSINT Tracker API (Optimized)",
+    description="High-performance OSINT platform with Redis cache and Celery tasks",
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+# Create a router with the /api prefix
+api_router = APIRouter(prefix="/api")
+
+
 # ==================== Models ====================
 
 class EmailQueryRequest(BaseModel):
@@ -141,6 +153,7 @@ class PhoneQueryRequest(BaseModel):
     phone: str
     timeout: int = 60
     use_async: bool = True  # 是否使用异步任务
+    mode: Literal["quick", "deep"] = "deep"  # quick 只查询低延迟提供商（运营商、来电姓名），约 2 秒返回
 
 class TaskStatusResponse(BaseModel):
     task_id: str
@@ -196,12 +209,12 @@ async def query_email_optimized(
         cached_result = await get_cached_result(email, "email", db_session)
         if cached_result:
             logger.info(f"✅ 缓存命中: {email}")
-            return cached_result
+            return ORJSONResponse(cached_result)
         
         # 缓存未命中
         if request.use_async:
             # 异步模式: 提交任务到Celery队列
-            task = async_query_email.delay(email, request.timeout)
+            task = async_query_email.delay(email, request.timeout, trace_context=celery_trace_context())
             logger.info(f"🚀 异步任务已提交: {task.id} for {email}")
             
             return {
@@ -216,7 +229,8 @@ async def query_email_optimized(
             # 同步模式: 立即执行查询
             logger.info(f"🔍 同步查询邮箱: {email}")
             
-            if HAS_EXTERNAL_APIS:
+            query_email_comprehensive = startup.load_provider_query('query_email_comprehensive') if HAS_EXTERNAL_APIS else None
+            if query_email_comprehensive:
                 result = await query_email_comprehensive(email)
                 result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
             else:
@@ -227,11 +241,13 @@ async def query_email_optimized(
             error_msg = result_dict.get('error', None)
             
             save_email_query(db=db_session, email=email, result=result_dict, success=success, error=error_msg)
-            await save_cached_result(email, "email", result_dict, db_session, CACHE_TTL_LONG)
+            from apis.provider_registry import result_cache_ttl
+            await save_cached_result(email, "email", result_dict, db_session,
+                                     result_cache_ttl("email", result_dict.get("data")))
             log_search(db_session, email, "email", 1)
             
             logger.info(f"✅ 邮箱查询完成: {email}")
-            return result_dict
+            return ORJSONResponse(result_dict)
             
     except Exception as e:
         logger.error(f"❌ 邮箱查询错误: {str(e)}")
@@ -255,20 +271,28 @@ async def query_phone_optimized(
     2. 检查数据库缓存 (50-100ms)
     3. 如果use_async=True，提交到Celery队列并立即返回任务ID
     4. 如果use_async=False，同步执行查询
+    
+    mode=quick 只查询低延迟提供商并单独缓存；之后的 deep 查询复用快速结果，只补查其余提供商
     """
     try:
         phone = request.phone.strip()
+        mode = request.mode
         
-        # L1 & L2: 检查缓存
+        # L1 & L2: 检查缓存（深度结果包含快速模式的全部提供商，两种模式都优先使用深度缓存）
         cached_result = await get_cached_result(phone, "phone", db_session)
+        quick_result = None
+        if not cached_result:
+            quick_result = await get_cached_result(phone, cache_query_type("phone", "quick"), db_session)
+            if mode == "quick":
+                cached_result = quick_result
         if cached_result:
             logger.info(f"✅ 缓存命中: {phone}")
-            return cached_result
+            return ORJSONResponse(cached_result)
         
         # 缓存未命中
         if request.use_async:
             # 异步模式: 提交任务到Celery队列
-            task = async_query_phone.delay(phone, request.timeout)
+            task = async_query_phone.delay(phone, request.timeout, trace_context=celery_trace_context(), mode=mode)
             logger.info(f"🚀 异步任务已提交: {task.id} for {phone}")
             
             return {
@@ -281,10 +305,13 @@ async def query_phone_optimized(
             }
         else:
             # 同步模式: 立即执行查询
-            logger.info(f"🔍 同步查询手机号: {phone}")
+            logger.info(f"🔍 同步查询手机号: {phone} ({mode})")
             
-            if HAS_EXTERNAL_APIS:
-                result = await query_phone_comprehensive(phone)
+            query_phone_comprehensive = startup.load_provider_query('query_phone_comprehensive') if HAS_EXTERNAL_APIS else None
+            if query_phone_comprehensive:
+                # 快速结果升级为深度结果：复用其中成功的提供商
+                reuse = quick_result.get("data") if quick_result else None
+                result = await query_phone_comprehensive(phone, mode=mode, reuse=reuse)
                 result_dict = result.model_dump() if hasattr(result, 'model_dump') else result
             else:
                 result_dict = {"success": True, "phone": phone, "data": "Mock data"}
@@ -294,11 +321,13 @@ async def query_phone_optimized(
             error_msg = result_dict.get('error', None)
             
             save_phone_query(db=db_session, phone=phone, result=result_dict, success=success, error=error_msg)
-            await save_cached_result(phone, "phone", result_dict, db_session, CACHE_TTL_LONG)
+            from apis.provider_registry import result_cache_ttl
+            await save_cached_result(phone, cache_query_type("phone", mode), result_dict, db_session,
+                                     result_cache_ttl("phone", result_dict.get("data")))
             log_search(db_session, phone, "phone", 1)
             
             logger.info(f"✅ 手机号查询完成: {phone}")
-            return result_dict
+            return ORJSONResponse(result_dict)
             
     except Exception as e:
         logger.error(f"❌ 手机号查询错误: {str(e)}")
@@ -347,9 +376,9 @@ async def cancel_task_route(task_id: str):
 
 @api_router.get("/queue/stats")
 async def get_queue_stats_route():
-    """获取任务队列统计信息"""
+    """获取任务队列统计信息（读取后台轮询的缓存，立即返回）"""
     try:
-        stats = get_queue_stats()
+        stats = get_cached_queue_stats()
         return {
             "success": True,
             "data": stats
@@ -444,8 +473,8 @@ async def get_admin_stats(session_token: str = Query(...), db_session: Session =
         # 获取Redis统计
         redis_stats = await redis_cache.get_stats()
         
-        # 获取Celery队列统计
-        queue_stats = get_queue_stats()
+        # 获取Celery队列统计（缓存）
+        queue_stats = get_cached_queue_stats()
         
         return {
             "success": True,
@@ -467,6 +496,88 @@ async def get_admin_stats(session_token: str = Query(...), db_session: Session =
         }
 
 
+class UpdateProviderRequest(BaseModel):
+    enabled: bool
+
+
+@api_router.get("/admin/providers")
+async def get_admin_providers(session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """提供商注册表：成本、典型耗时、超时、缓存时间、依赖与当前启用状态"""
+    try:
+        verify_admin_session(session_token, db_session)
+        from apis import provider_registry
+        await provider_registry.refresh_settings(force=True)
+        return {"success": True, "data": provider_registry.list_providers()}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error fetching providers: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.patch("/admin/providers/{name}")
+async def update_admin_provider(
+    name: str,
+    request: UpdateProviderRequest,
+    session_token: str = Query(...),
+    db_session: Session = Depends(get_db)
+):
+    """启用/停用提供商（保存到数据库，其他进程在 PROVIDER_SETTINGS_TTL 秒内生效）"""
+    try:
+        verify_result = verify_admin_session(session_token, db_session)
+        from apis import provider_registry
+        from db_operations import set_provider_enabled
+
+        if provider_registry.get_provider(name) is None:
+            raise HTTPException(status_code=404, detail="Provider not found")
+
+        set_provider_enabled(db_session, name, request.enabled, verify_result.get('username'))
+        provider_registry.set_enabled(name, request.enabled)
+        provider = next(p for p in provider_registry.list_providers() if p['name'] == name)
+        return {"success": True, "data": provider, "message": "Provider updated successfully"}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error updating provider {name}: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.get("/admin/diagnostics")
+async def get_diagnostics(session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """诊断模式状态：事件循环延迟、阻塞次数、诊断文件列表和启动耗时剖析"""
+    try:
+        verify_admin_session(session_token, db_session)
+        from diagnostics import get_diagnostics_status
+        return {"success": True, "data": {**get_diagnostics_status(), "startup": startup.get_startup_profile()}}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        logger.error(f"❌ Error fetching diagnostics: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+
+@api_router.get("/admin/diagnostics/samples/{name}")
+async def get_diagnostics_sample(name: str, session_token: str = Query(...), db_session: Session = Depends(get_db)):
+    """下载单个诊断文件（阻塞调用栈 / 慢请求剖析）"""
+    verify_admin_session(session_token, db_session)
+    from diagnostics import get_sample_path
+    path = get_sample_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Sample not found")
+    media_type = "text/html" if path.suffix == ".html" else "text/plain"
+    return FileResponse(str(path), media_type=media_type)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 抓取端点（含 Celery 队列深度）"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=503, detail="Metrics disabled (prometheus_client not installed)")
+    metrics.set_queue_depths(get_cached_queue_stats().get('queues'))
+    content, content_type = metrics.render_metrics()
+    return Response(content=content, media_type=content_type)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -484,20 +595,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 中间件顺序：后添加的在外层。请求依次经过
+#   Metrics → Tracing → Diagnostics → Compression → CORS → 路由
+# 压缩（gzip/br/zstd 协商）作用于 CORS 处理后的最终响应；指标、追踪和剖析位于压缩外层，耗时包含压缩
+app.add_middleware(CompressionMiddleware)
+
+# 慢请求剖析（仅诊断模式）
+app.add_middleware(DiagnosticsMiddleware)
+
+# 链路追踪根 span
+app.add_middleware(TracingMiddleware)
+
+# 请求延迟指标（最外层）
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files for production
 FRONTEND_BUILD_DIR = ROOT_DIR.parent / "frontend" / "build"
 if FRONTEND_BUILD_DIR.exists():
-    app.mount("/static", StaticFiles(directory=str(FRONTEND_BUILD_DIR / "static")), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=str(FRONTEND_BUILD_DIR / "static")), name="static")
     
     @app.get("/{full_path:path}")
-    async def serve_react_app(full_path: str):
+    async def serve_react_app(full_path: str, request: Request):
         if full_path.startswith("api/"):
             raise HTTPException(status_code=404)
         index_path = FRONTEND_BUILD_DIR / "index.html"
         if index_path.exists():
-            return FileResponse(index_path)
+            return precompressed_file_response(index_path, request.headers.get("accept-encoding", ""))
         raise HTTPException(status_code=404)
     
     logger.info(f"✅ Serving frontend from: {FRONTEND_BUILD_DIR}")
 else:
     logger.warning(f"⚠️ Frontend build directory not found")
+
+startup.mark('imported')
@@ -90,9 +90,22 @@ if ($celeryRunning) {
 } else {
     Write-Host "   启动Celery Worker (后台运行)..." -ForegroundColor Cyan
     
-    # 在新窗口启动Celery Worker
-    $celeryCmd = "celery -A celery_tasks worker --loglevel=info --pool=solo"
-    Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PWD'; $celeryCmd" -WindowStyle Minimized
+    # 每类队列一个独立的Worker池（手机号/邮箱/后台清理），并发数分别配置
+    $phoneConcurrency = if ($env:CELERY_PHONE_CONCURRENCY) { $env:CELERY_PHONE_CONCURRENCY } else { 8 }
+    $emailConcurrency = if ($env:CELERY_EMAIL_CONCURRENCY) { $env:CELERY_EMAIL_CONCURRENCY } else { 4 }
+    $maintenanceConcurrency = if ($env:CELERY_MAINTENANCE_CONCURRENCY) { $env:CELERY_MAINTENANCE_CONCURRENCY } else { 1 }
+    $workerPools = @(
+        @{ Name = "phone"; Queues = "osint_phone"; Concurrency = $phoneConcurrency },
+        @{ Name = "email"; Queues = "osint_email"; Concurrency = $emailConcurrency },
+        @{ Name = "maintenance"; Queues = "osint_maintenance"; Concurrency = $maintenanceConcurrency }
+    )
+    
+    # 在新窗口启动各个Celery Worker（Windows下使用threads池以支持并发）
+    foreach ($pool in $workerPools) {
+        $celeryCmd = "celery -A celery_tasks worker --loglevel=info --pool=threads -Q $($pool.Queues) -c $($pool.Concurrency) -n $($pool.Name)@%h"
+        Start-Process powershell -ArgumentList "-NoExit", "-Command", "cd '$PWD'; $celeryCmd" -WindowStyle Minimized
+        Write-Host "   - $($pool.Name) worker: 队列 $($pool.Queues), 并发 $($pool.Concurrency)" -ForegroundColor White
+    }
     
     Write-Host "✅ Celery Worker已启动 (最小化窗口)" -ForegroundColor Green
     Start-Sleep -Seconds 2
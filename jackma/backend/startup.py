@@ -0,0 +1,96 @@
+"""
+启动初始化与启动耗时剖析
+数据库建表、默认用户、MongoDB 连接等初始化统一在 lifespan 中执行（而不是模块导入时），
+uvicorn 重载、worker 重启时只有真正启动服务才付出初始化成本；每一步的耗时写入日志，
+并可通过 get_startup_profile() 查询
+"""
+import importlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 本模块被导入的时间点（服务入口最先导入本模块，近似为开始导入应用代码的时间）
+IMPORT_STARTED = time.perf_counter()
+
+_steps: List[Dict[str, Any]] = []
+_marks: Dict[str, float] = {}
+
+
+@contextmanager
+def step(name: str):
+    """记录一个启动步骤的耗时；步骤失败时记录错误并继续（与原先导入时初始化的容错行为一致）"""
+    start = time.perf_counter()
+    error: Optional[str] = None
+    try:
+        yield
+    except Exception as e:
+        error = str(e)
+        logger.warning(f"⚠️ [Startup] {name} 失败: {error}")
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _steps.append({'step': name, 'ms': round(elapsed_ms, 1), 'error': error})
+        if error is None:
+            logger.info(f"⏱️ [Startup] {name}: {elapsed_ms:.1f}ms")
+
+
+def mark(name: str):
+    """记录一个时间点（距本模块导入的毫秒数），如 'imported'、'ready'"""
+    _marks[name] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+    if name == 'ready':
+        total = sum(s['ms'] for s in _steps)
+        logger.info(
+            f"✅ [Startup] 服务就绪: 导入 {_marks.get('imported', 0):.1f}ms，"
+            f"初始化 {total:.1f}ms，合计 {_marks['ready']:.1f}ms"
+        )
+
+
+def get_startup_profile() -> Dict[str, Any]:
+    """启动剖析：各时间点与各初始化步骤耗时"""
+    return {'marks': dict(_marks), 'steps': list(_steps)}
+
+
+def init_database():
+    """创建 SQLite 表并初始化默认用户"""
+    from models import SessionLocal, init_db
+    from auth_operations import init_default_users
+
+    init_db()
+    db_session = SessionLocal()
+    try:
+        init_default_users(db_session)
+    finally:
+        db_session.close()
+
+
+def connect_mongo() -> Tuple[Any, Any]:
+    """按 MONGO_URL 创建 MongoDB 客户端（未配置时不导入 motor），返回 (client, db)"""
+    mongo_url = os.environ.get('MONGO_URL')
+    if not mongo_url:
+        return None, None
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(mongo_url)
+    return client, client[os.environ.get('DB_NAME', 'jackma_db')]
+
+
+def load_provider_query(name: str) -> Optional[Callable]:
+    """
+    按需导入 apis 包中的聚合查询函数（如 query_phone_comprehensive）
+
+    提供商模块导入失败（依赖未安装等）时返回 None，调用方回退到模拟数据
+    """
+    try:
+        return getattr(importlib.import_module('apis'), name)
+    except ImportError as e:
+        logger.warning(f"⚠️ [Startup] 提供商模块导入失败，使用模拟数据: {e}")
+        return None
+
+
+def install_provider_settings():
+    """提供商启用状态从 provider_settings 表加载（管理员接口修改后各进程定期刷新）"""
+    from apis import provider_registry
+    from db_operations import load_provider_settings
+    provider_registry.set_settings_loader(load_provider_settings)
@@ -0,0 +1,195 @@
+"""
+链路追踪配置（OpenTelemetry SDK）
+- configure_tracing(): 按 TRACING_EXPORTER 选择导出器：none（默认）/ console / otlp / memory，
+  也可以直接传入自定义 SpanExporter（otlp 需要安装 opentelemetry-exporter-otlp-proto-http）
+- TracingMiddleware: 每个 HTTP 请求一个根 span（名称使用路由模板），支持传入的 traceparent 头
+- Celery: 任务参数 trace_context 携带发起请求的上下文，task_prerun/task_postrun 中开始/结束任务 span，
+  并记录排队时间
+span 辅助函数和脱敏规则见 apis/tracing.py
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apis.tracing import attach_context, detach_context, extract_context, inject_context, redact, set_attributes
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+    HAS_OTEL_SDK = True
+except ImportError:
+    HAS_OTEL_SDK = False
+
+# 导出器：none / console / otlp / memory
+TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', 'none').lower()
+# OTLP HTTP 接收地址（未设置时使用 OTEL_EXPORTER_OTLP_ENDPOINT 或 SDK 默认值）
+TRACING_OTLP_ENDPOINT = os.environ.get('TRACING_OTLP_ENDPOINT')
+
+_provider = None
+_memory_exporter = None
+
+
+def _build_exporter(name: str):
+    global _memory_exporter
+    if name == 'console':
+        return ConsoleSpanExporter()
+    if name == 'memory':
+        _memory_exporter = InMemorySpanExporter()
+        return _memory_exporter
+    if name == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        if TRACING_OTLP_ENDPOINT:
+            return OTLPSpanExporter(endpoint=TRACING_OTLP_ENDPOINT)
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown tracing exporter: {name}")
+
+
+def configure_tracing(service_name: str, exporter=None) -> bool:
+    """
+    初始化全局 TracerProvider（每个进程一次）
+
+    Args:
+        service_name: 服务名（如 osint-api / osint-worker）
+        exporter: 自定义 SpanExporter 实例，优先于 TRACING_EXPORTER
+
+    Returns:
+        是否已启用追踪
+    """
+    global _provider
+    if _provider is not None:
+        return True
+    if exporter is None and TRACING_EXPORTER in ('', 'none'):
+        return False
+    if not HAS_OTEL_SDK:
+        logger.warning("⚠️ [Tracing] 未安装 opentelemetry-sdk，链路追踪未启用")
+        return False
+    try:
+        if exporter is None:
+            exporter = _build_exporter(TRACING_EXPORTER)
+    except Exception as e:
+        logger.error(f"❌ [Tracing] 创建导出器失败: {str(e)}")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    # 控制台和内存导出器同步导出，便于调试和测试；其它导出器批量后台导出
+    if isinstance(exporter, (ConsoleSpanExporter, InMemorySpanExporter)):
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+    else:
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    _provider = provider
+    logger.info(f"✅ [Tracing] 链路追踪已启用: {service_name} -> {type(exporter).__name__}")
+    return True
+
+
+def get_memory_exporter():
+    """TRACING_EXPORTER=memory 时返回内存导出器（测试用）"""
+    return _memory_exporter
+
+
+def shutdown_tracing():
+    """导出剩余 span"""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+class TracingMiddleware:
+    """每个 HTTP 请求创建根 span（或延续请求头 traceparent 中的链路）"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or _provider is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        tracer = trace.get_tracer('jackma')
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        with tracer.start_as_current_span(
+            f"{scope['method']} {redact(scope['path'])}",
+            context=extract_context(headers),
+            kind=SpanKind.SERVER,
+            record_exception=False,
+            set_status_on_exception=False,
+        ) as span:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                span.set_status(Status(StatusCode.ERROR, redact(str(e))))
+                raise
+            finally:
+                route = getattr(scope.get('route'), 'path', None)
+                # 路径中可能包含查询值，优先使用路由模板作为 span 名称
+                span.update_name(f"{scope['method']} {route or redact(scope['path'])}")
+                set_attributes(
+                    span,
+                    **{
+                        'http.request.method': scope['method'],
+                        'http.route': route,
+                        'url.path': scope['path'],
+                        'http.response.status_code': status_code,
+                    }
+                )
+                if status_code >= 500:
+                    span.set_status(Status(StatusCode.ERROR))
+
+
+def celery_trace_context() -> Dict[str, Any]:
+    """提交 Celery 任务时的 trace_context 参数：当前追踪上下文 + 入队时间"""
+    return {**inject_context(), 'enqueued_at': time.time()}
+
+
+# 进行中的任务 span：task_id -> (span, context token)
+_task_spans: Dict[str, Any] = {}
+
+
+def start_task_span(task_id: str, task_name: str, trace_context: Optional[Dict[str, Any]]):
+    """task_prerun 中调用：在发起请求的链路下开始任务 span"""
+    if _provider is None or not task_id:
+        return
+    trace_context = trace_context or {}
+    span = trace.get_tracer('jackma').start_span(
+        f"celery {task_name}", context=extract_context(trace_context), kind=SpanKind.CONSUMER
+    )
+    enqueued_at = trace_context.get('enqueued_at')
+    set_attributes(
+        span,
+        **{
+            'celery.task_name': task_name,
+            'celery.task_id': task_id,
+            'celery.queue_wait_ms': int((time.time() - enqueued_at) * 1000) if enqueued_at else None,
+        }
+    )
+    token = attach_context(trace.set_span_in_context(span))
+    _task_spans[task_id] = (span, token)
+
+
+def end_task_span(task_id: str, state: Optional[str]):
+    """task_postrun 中调用：结束任务 span"""
+    entry = _task_spans.pop(task_id, None)
+    if entry is None:
+        return
+    span, token = entry
+    set_attributes(span, **{'celery.state': state})
+    if state and state not in ('SUCCESS', 'RETRY'):
+        span.set_status(Status(StatusCode.ERROR))
+    span.end()
+    detach_context(token)
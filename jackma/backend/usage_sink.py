@@ -0,0 +1,145 @@
+"""
+提供商调用记录的批量写入
+apis.http_instrumentation 产生的每条 ProviderCall 先进入内存缓冲，由后台任务按间隔或批量大小
+一次性写入 api_usage_logs（一次提交），避免每个出站请求都单独提交数据库事务。
+- Web 进程：lifespan / startup 中调用 start()，关闭时 await stop() 写入剩余记录
+- Celery worker：install() 注册接收器，每个任务结束后（task_postrun）调用 flush()
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from apis.http_instrumentation import ProviderCall, add_call_sink, remove_call_sink
+
+logger = logging.getLogger(__name__)
+
+# 设为 false 关闭调用记录写入
+USAGE_SINK_ENABLED = os.environ.get('USAGE_SINK_ENABLED', 'true').lower() == 'true'
+# 后台写入间隔（秒）
+USAGE_SINK_FLUSH_INTERVAL = float(os.environ.get('USAGE_SINK_FLUSH_INTERVAL', 5))
+# 缓冲达到该条数时立即写入
+USAGE_SINK_BATCH_SIZE = int(os.environ.get('USAGE_SINK_BATCH_SIZE', 200))
+# 缓冲上限：数据库不可用时丢弃新记录，避免内存无限增长
+USAGE_SINK_MAX_PENDING = int(os.environ.get('USAGE_SINK_MAX_PENDING', 10000))
+
+_lock = threading.Lock()
+_pending: List[Dict[str, Any]] = []
+_stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'flushes': 0, 'failed_flushes': 0}
+_task: Optional[asyncio.Task] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_wakeup: Optional[asyncio.Event] = None
+
+
+def record_call(call: ProviderCall):
+    """调用记录接收器：转换为 APIUsageLog 行并放入缓冲（不访问数据库）"""
+    row = {
+        'api_name': call.source[:50],
+        'endpoint': call.endpoint,
+        'status_code': call.status_code,
+        'response_time_ms': call.latency_ms,
+        'response_bytes': call.response_bytes,
+        'retry_count': call.retry_count,
+        'success': call.success,
+        'error_message': call.error[:512] if call.error else None,
+        'created_at': datetime.utcnow(),
+    }
+    with _lock:
+        if len(_pending) >= USAGE_SINK_MAX_PENDING:
+            _stats['dropped'] += 1
+            return
+        _pending.append(row)
+        _stats['recorded'] += 1
+        full = len(_pending) >= USAGE_SINK_BATCH_SIZE
+    if full and _wakeup is not None and _loop is not None:
+        # 记录可能来自其它线程/事件循环（如 Celery 任务中的临时循环）
+        _loop.call_soon_threadsafe(_wakeup.set)
+
+
+def flush() -> int:
+    """
+    把缓冲中的记录写入数据库（同步，在事件循环中应通过 asyncio.to_thread 调用）
+
+    Returns:
+        写入条数
+    """
+    with _lock:
+        if not _pending:
+            return 0
+        rows = _pending[:]
+        _pending.clear()
+
+    from models import SessionLocal
+    from db_operations import log_api_calls
+
+    db_session = SessionLocal()
+    try:
+        written = log_api_calls(db_session, rows)
+    finally:
+        db_session.close()
+    with _lock:
+        _stats['flushes'] += 1
+        if written:
+            _stats['written'] += written
+        else:
+            _stats['failed_flushes'] += 1
+            _stats['dropped'] += len(rows)
+    return written
+
+
+async def _flush_loop():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=USAGE_SINK_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            await asyncio.to_thread(flush)
+        except Exception as e:
+            logger.error(f"❌ [UsageSink] 写入调用记录失败: {str(e)}")
+
+
+def install():
+    """只注册接收器，不启动后台任务（由调用方负责 flush，如 Celery worker）"""
+    if USAGE_SINK_ENABLED:
+        add_call_sink(record_call)
+
+
+def start():
+    """注册接收器并在当前事件循环中启动后台写入任务"""
+    global _task, _loop, _wakeup
+    if not USAGE_SINK_ENABLED or _task is not None:
+        return
+    install()
+    _loop = asyncio.get_running_loop()
+    _wakeup = asyncio.Event()
+    _task = asyncio.create_task(_flush_loop())
+    logger.info(f"✅ [UsageSink] 提供商调用记录批量写入已启动（间隔 {USAGE_SINK_FLUSH_INTERVAL}s，批量 {USAGE_SINK_BATCH_SIZE}）")
+
+
+async def stop():
+    """停止后台任务并写入剩余记录"""
+    global _task, _loop, _wakeup
+    remove_call_sink(record_call)
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    _loop = None
+    _wakeup = None
+    try:
+        await asyncio.to_thread(flush)
+    except Exception as e:
+        logger.error(f"❌ [UsageSink] 写入剩余调用记录失败: {str(e)}")
+
+
+def get_sink_stats() -> Dict[str, Any]:
+    """缓冲与写入统计"""
+    with _lock:
+        return {**_stats, 'pending': len(_pending)}
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+数据整形热点函数微基准测试
+对 CPU 密集的纯函数在合成数据上测量耗时（timeit 自动校准循环次数，多轮取最小值/中位数）
+和内存分配（tracemalloc 峰值与分配块数），结果保存为 JSON，compare 子命令对比两次运行
+
+用例（每个用例有 small / large / pathological 三档数据）:
+    investigate_process       InvestigateDataProcessor.process（冷缓存）
+    investigate_normalize     investigate_api.normalize_investigate_payload（person_profile 为空时的兜底路径）
+    external_lookup_convert   external_lookup.convert_consolidated_to_processed
+    data_breach_group         data_breach.group_breach_entries
+    external_search_normalize external_search.normalize_fields
+    google_privacy_risk       google_api.assess_privacy_risk
+
+用法:
+    python benchmark_hot_paths.py run
+    python benchmark_hot_paths.py run --cases data_breach_group --sizes large,pathological --output before.json
+    python benchmark_hot_paths.py compare before.json after.json --fail-above 0.10
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from apis import investigate_data_processor
+from apis.data_breach import group_breach_entries
+from apis.external_lookup import convert_consolidated_to_processed
+from apis.external_search import normalize_fields
+from apis.google_api import assess_privacy_risk
+from apis.investigate_api import normalize_investigate_payload
+from benchmark_investigate_processor import make_response
+
+logging.disable(logging.CRITICAL)
+
+ROOT_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = ROOT_DIR / 'benchmark_results'
+SIZES = ('small', 'large', 'pathological')
+
+
+# ---------------------------------------------------------------------------
+# 合成数据
+# ---------------------------------------------------------------------------
+
+def make_consolidated(records: int, duplicate_ratio: float, seed: int = 7) -> Dict[str, Any]:
+    """External Lookup 的 consolidated 响应；duplicate_ratio 控制重复地址比例（触发去重）"""
+    rnd = random.Random(seed)
+    unique = max(1, int(records * (1 - duplicate_ratio)))
+    return {
+        'primary': {'caller_id_name': 'John Doe', 'carrier': 'AT&T', 'city': 'Cleveland', 'state': 'OH'},
+        'consolidated': {
+            'names': {'full_names': [f"John Doe {i}" for i in range(records)]},
+            'contact': {
+                'phones': [f"+1440{i:07d}" for i in range(records)],
+                'emails': [f"user{i}@example.com" for i in range(records)],
+            },
+            'address': {'addresses': [
+                {'address': f"{i % unique} Main St", 'city': 'Cleveland', 'state': 'OH', 'postcode': f"{44100 + i % unique}"}
+                for i in range(records)
+            ]},
+            'employment': {'records': [
+                {'company': f"Company {i % 50}", 'title': f"Role {i}", 'start_date': f"20{i % 24:02d}-01", 'region': 'OH'}
+                for i in range(records)
+            ]},
+            'demographics': {'genders': ['M'], 'birth_dates': ['1980-01-01'], 'birth_years': ['1980']},
+            'financial': {'incomes': [str(rnd.randint(20, 200) * 1000) for _ in range(records)]},
+        },
+        'sources': {f"source_{i}": {'records': rnd.randint(1, 20)} for i in range(min(records, 60))},
+    }
+
+
+def make_breach_entries(entries: int, databases: int, seed: int = 11) -> List[Dict[str, Any]]:
+    """data_breach 代理响应的 result.entries；databases 越少，单个数据库合并的条目越多"""
+    rnd = random.Random(seed)
+    return [
+        {'entry': {
+            'database_name': f"Breach {i % databases}",
+            'email': f"user{i % 40}@example.com",
+            'name': 'John Doe',
+            'phone': '14403828826',
+            'address': f"{i} Main St, Cleveland, OH",
+            'username': f"jdoe{i % 10}",
+            'ip_address': f"10.{i % 250}.{i // 250 % 250}.{rnd.randint(1, 254)}",
+            'license_plate': f"ABC{i:04d}\nXYZ{i % 100:04d}",
+            'dob': '1980-01-01',
+            'hashed_password': f"{rnd.getrandbits(128):032x}",
+            'source': {
+                'BreachDate': '2019-06-01',
+                'DataClasses': ['Email addresses', 'Passwords'],
+                'Sources': ['combolist'],
+                'Domain': f"breach{i % databases}.com",
+                'extra': {'Category': 'Social', 'Entries': 1000000},
+            },
+        }}
+        for i in range(entries)
+    ]
+
+
+def make_nested(width: int, depth: int) -> Dict[str, Any]:
+    """external_search 原始响应：宽 width、深 depth 的嵌套字典，叶子中混有字段别名"""
+    aliases = ['city', 'town', 'state', 'email', 'mail', 'phone', 'mobile', 'full_name', 'sex', 'dob', 'lat', 'lng']
+
+    def build(level: int) -> Dict[str, Any]:
+        node: Dict[str, Any] = {aliases[i % len(aliases)] if level == depth else f"field_{i}": f"value {level}.{i}"
+                                for i in range(width)}
+        if level < depth:
+            node['child'] = build(level + 1)
+            node['list'] = [f"item {i}" for i in range(width)]
+        return node
+
+    data = build(0)
+    data.update({alias: f"top {alias}" for alias in aliases})
+    return data
+
+
+def make_investigate_payload(records: int) -> Dict[str, Any]:
+    """
+    person_profile 为空、只有 phone_lookup_data 的 Investigate 响应（走兜底档案构造）
+    summary 为空，每次调用都重新估算数据源数量；records 控制顶层字段数（浅拷贝成本）
+    """
+    payload = {
+        'investigation_id': 'bench',
+        'status': 'completed',
+        'duration_seconds': 12.5,
+        'summary': None,
+        'pipeline_result': {
+            'success': True,
+            'results': {
+                'phone_lookup_data': {
+                    'name': 'John Doe',
+                    'city': 'Cleveland',
+                    'state': 'OH',
+                    'carrier': 'AT&T',
+                    'number_type': 'mobile',
+                    'confidence_score': 0.8,
+                    'all_detected_names': [f"John Doe {i}" for i in range(records)],
+                    'api_sources': [f"source_{i}" for i in range(records)],
+                    'raw_data': {'phone_number': '+14403828826', 'formatted_number': '(440) 382-8826'},
+                },
+            },
+        },
+    }
+    payload.update({f"extra_{i}": {'index': i} for i in range(records)})
+    return payload
+
+
+def _investigate_process(response: Dict[str, Any]) -> Callable[[], Any]:
+    def run():
+        investigate_data_processor.clear_process_cache()
+        return investigate_data_processor.InvestigateDataProcessor(response).process()
+    return run
+
+
+# 用例 -> 档位 -> 返回无参调用的构造函数（数据在构造时生成，不计入耗时）
+CASES: Dict[str, Dict[str, Callable[[], Callable[[], Any]]]] = {
+    'investigate_process': {
+        'small': lambda: _investigate_process(make_response(20)),
+        'large': lambda: _investigate_process(make_response(500)),
+        'pathological': lambda: _investigate_process(make_response(3000)),
+    },
+    'investigate_normalize': {
+        'small': lambda: (lambda p=make_investigate_payload(10): normalize_investigate_payload(p)),
+        'large': lambda: (lambda p=make_investigate_payload(1000): normalize_investigate_payload(p)),
+        'pathological': lambda: (lambda p=make_investigate_payload(50000): normalize_investigate_payload(p)),
+    },
+    'external_lookup_convert': {
+        'small': lambda: (lambda d=make_consolidated(10, 0.2): convert_consolidated_to_processed(d)),
+        'large': lambda: (lambda d=make_consolidated(500, 0.3): convert_consolidated_to_processed(d)),
+        # 几乎全部重复的地址：去重集合命中率最高，且列表远超截取上限
+        'pathological': lambda: (lambda d=make_consolidated(20000, 0.999): convert_consolidated_to_processed(d)),
+    },
+    'data_breach_group': {
+        'small': lambda: (lambda e=make_breach_entries(20, 5): group_breach_entries(e)),
+        'large': lambda: (lambda e=make_breach_entries(2000, 50): group_breach_entries(e)),
+        # 所有条目属于同一数据库：合并时的列表去重退化为 O(n²)
+        'pathological': lambda: (lambda e=make_breach_entries(5000, 1): group_breach_entries(e)),
+    },
+    'external_search_normalize': {
+        'small': lambda: (lambda d=make_nested(10, 2): normalize_fields(d)),
+        'large': lambda: (lambda d=make_nested(200, 5): normalize_fields(d)),
+        'pathological': lambda: (lambda d=make_nested(20, 400): normalize_fields(d)),
+    },
+    'google_privacy_risk': {
+        'small': lambda: (lambda: assess_privacy_risk({'exists': True}, {'name': 'John'}, {'reviews_count': 0}, [])),
+        'large': lambda: (lambda s=[{'platform': f"p{i}"} for i in range(100)]: assess_privacy_risk(
+            {'exists': True}, {'name': 'John', 'avatar_url': 'x'}, {'reviews_count': 12}, s)),
+        'pathological': lambda: (lambda s=[{'platform': f"p{i}"} for i in range(100000)]: assess_privacy_risk(
+            {'exists': True}, {'name': 'John', 'avatar_url': 'x'}, {'reviews_count': 10 ** 6}, s)),
+    },
+}
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+def measure_time(fn: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    """自动校准每轮循环次数（每轮至少 min_time 秒），返回单次调用耗时（微秒）"""
+    timer = timeit.Timer(fn)
+    loops = 1
+    while True:
+        if timer.timeit(loops) >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+    per_call = [t / loops * 1e6 for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        'loops': loops,
+        'min_us': round(min(per_call), 3),
+        'median_us': round(statistics.median(per_call), 3),
+        'stdev_us': round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+    }
+
+
+def measure_allocations(fn: Callable[[], Any]) -> Dict[str, Any]:
+    """单次调用的内存分配：tracemalloc 峰值、调用期间分配的块数和返回值占用"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+    return {
+        'peak_kb': round((peak - base) / 1024, 1),
+        'retained_kb': round((current - base) / 1024, 1),
+        'new_blocks': blocks,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'nogit'
+
+
+def run(args: argparse.Namespace) -> int:
+    cases = [c for c in (args.cases.split(',') if args.cases else CASES)]
+    sizes = args.sizes.split(',') if args.sizes else list(SIZES)
+    unknown = [c for c in cases if c not in CASES] + [s for s in sizes if s not in SIZES]
+    if unknown:
+        raise SystemExit(f"未知用例或档位: {unknown}")
+
+    print(f"📊 热点函数微基准测试（{args.repeat} 轮，每轮至少 {args.min_time}s）\n")
+    print(f"{'用例':<34}{'min µs':>12}{'median µs':>12}{'峰值 KB':>11}{'新增块':>9}")
+    print('-' * 78)
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        for size in sizes:
+            fn = CASES[case][size]()
+            timing = measure_time(fn, args.repeat, args.min_time)
+            allocations = measure_allocations(fn)
+            key = f"{case}/{size}"
+            results[key] = {**timing, **allocations}
+            print(f"{key:<34}{timing['min_us']:>12.1f}{timing['median_us']:>12.1f}"
+                  f"{allocations['peak_kb']:>11.1f}{allocations['new_blocks']:>9}")
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"hot_paths-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{commit}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n💾 已保存: {output}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    old = json.loads(Path(args.old).read_text())
+    new = json.loads(Path(args.new).read_text())
+    print(f"📊 {args.old} ({old['meta']['commit']}) -> {args.new} ({new['meta']['commit']})\n")
+    print(f"{'用例':<34}{'旧 min µs':>12}{'新 min µs':>12}{'变化':>10}{'峰值 KB':>20}")
+    print('-' * 87)
+
+    regressions: List[Tuple[str, float]] = []
+    for key in sorted(set(old['results']) | set(new['results'])):
+        before, after = old['results'].get(key), new['results'].get(key)
+        if not before or not after:
+            print(f"{key:<34}{'(仅存在于一次运行中)':>33}")
+            continue
+        change = after['min_us'] / before['min_us'] - 1 if before['min_us'] else 0.0
+        memory = f"{before['peak_kb']:.0f} -> {after['peak_kb']:.0f}"
+        marker = ''
+        # 绝对差值低于噪声下限的用例（亚微秒级函数）不计入回归
+        significant = abs(after['min_us'] - before['min_us']) >= args.min_delta_us
+        if significant and change > args.fail_above:
+            marker = ' ❌'
+            regressions.append((key, change))
+        elif significant and change < -args.fail_above:
+            marker = ' ✅'
+        print(f"{key:<34}{before['min_us']:>12.1f}{after['min_us']:>12.1f}{change:>+10.1%}{memory:>20}{marker}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} 个用例变慢超过 {args.fail_above:.0%}")
+        return 1
+    print(f"\n✅ 没有用例变慢超过 {args.fail_above:.0%}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据整形热点函数微基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('--cases', help=f"逗号分隔的用例（默认全部: {', '.join(CASES)}）")
+    run_parser.add_argument('--sizes', help=f"逗号分隔的档位（默认全部: {', '.join(SIZES)}）")
+    run_parser.add_argument('--repeat', type=int, default=5, help='测量轮数')
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='每轮最短耗时（秒）')
+    run_parser.add_argument('--output', help=f"结果文件（默认 {RESULTS_DIR.name}/hot_paths-<时间>-<提交>.json）")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = subparsers.add_parser('compare', help='对比两次运行结果')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--fail-above', type=float, default=0.10, help='min 耗时增幅超过该比例时退出码为 1')
+    compare_parser.add_argument('--min-delta-us', type=float, default=1.0, help='绝对差值低于该值（微秒）时视为噪声')
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == '__main__':
+    main()
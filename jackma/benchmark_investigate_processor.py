@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+InvestigateDataProcessor 微基准测试
+使用合成的大型 person_profile（数百条电话/地址/账户）测量处理耗时
+
+用法:
+    python benchmark_investigate_processor.py
+    python benchmark_investigate_processor.py --baseline old_processor.py   # 与旧实现对比并校验输出一致
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from apis import investigate_data_processor as current
+
+logging.disable(logging.CRITICAL)
+
+
+def make_profile(size: int, seed: int = 42) -> dict:
+    """生成合成 person_profile；size 控制各列表长度（约 1/3 重复以触发去重合并）"""
+    rnd = random.Random(seed)
+    sources = [f"source_{i}" for i in range(40)]
+
+    def pick_sources():
+        return rnd.sample(sources, rnd.randint(1, 4))
+
+    def dup(i):
+        return i % max(1, size * 2 // 3)
+
+    return {
+        'primary_name': 'John Doe',
+        'name_variants': [f"John Doe {dup(i) % 50}" for i in range(size)],
+        'languages': ['en', 'es', 'en', 'fr'],
+        'gender': 'male',
+        'age': 42,
+        'confidence_score': 0.87,
+        'phones': [
+            {'number_e164': f"+1440{dup(i):07d}", 'type': 'mobile', 'carrier': 'AT&T',
+             'confidence': rnd.random(), 'source': pick_sources()}
+            for i in range(size)
+        ],
+        'emails': [
+            {'address': f"user{dup(i)}@example.com", 'domain': 'example.com',
+             'confidence': rnd.random(), 'source': pick_sources()}
+            for i in range(size)
+        ],
+        'addresses': [
+            {'street': f"{dup(i)} Main St", 'city': 'Cleveland', 'postal_code': '44101',
+             'confidence': rnd.random(), 'source': pick_sources()}
+            for i in range(size)
+        ],
+        'employment': [
+            {'company': f"Company {i % 60}", 'title': f"Role {i}", 'start_date': f"20{i % 24:02d}-01-01",
+             'confidence': rnd.random(), 'source': 'x'}
+            for i in range(size)
+        ],
+        'education': [{'school': f"School {i}"} for i in range(20)],
+        'account_registrations': [
+            {'platform': f"platform_{i % 80}", 'email': f"user{i % 30}@example.com",
+             'registration_date': f"20{i % 24:02d}-05-01"}
+            for i in range(size)
+        ],
+        'relatives': [
+            {'name': f"Relative {dup(i)}", 'relationship': 'sibling',
+             'confidence': rnd.random(), 'sources': pick_sources()}
+            for i in range(size)
+        ],
+        'property_records': [
+            {'address': f"{dup(i)} Oak Ave", 'city': 'Cleveland', 'postal_code': '44101',
+             'purchase_year': 1990 + i % 30, 'confidence': rnd.random(), 'sources': pick_sources()}
+            for i in range(size)
+        ],
+        'leaked_credentials': [
+            {'leak_source': f"leak_{i % 25}", 'email': f"user{i % 40}@example.com",
+             'leak_date': f"20{i % 24:02d}-03-01", 'plaintext_available': i % 7 == 0}
+            for i in range(size)
+        ],
+        'ip_history': [{'ip': f"10.0.{i % 200}.{i % 50}"} for i in range(size)],
+        'sources': sources,
+    }
+
+
+def make_response(size: int, seed: int = 42) -> dict:
+    return {
+        'success': True,
+        'data': {
+            'investigation_id': f"bench-{size}-{seed}",
+            'phone_number': '+14403828826',
+            'status': 'completed',
+            'data_sources_count': 40,
+            'person_profile': make_profile(size, seed),
+        }
+    }
+
+
+def load_baseline(path: str):
+    spec = importlib.util.spec_from_file_location('baseline_processor', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def canonical(obj):
+    """去掉列表顺序差异（旧实现用 set 去重，顺序不确定）后用于比较"""
+    if isinstance(obj, dict):
+        return {k: canonical(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        items = [canonical(v) for v in obj]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    return obj
+
+
+def bench(fn, rounds: int) -> float:
+    """返回单次调用的最短耗时（毫秒），减少 GC/调度抖动的影响"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='InvestigateDataProcessor 微基准测试')
+    parser.add_argument('--sizes', default='50,200,500,1000', help='合成列表长度，逗号分隔')
+    parser.add_argument('--rounds', type=int, default=20, help='每项测量的轮数')
+    parser.add_argument('--baseline', help='旧版 investigate_data_processor.py 路径（可选）')
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+
+    print(f"📊 InvestigateDataProcessor 基准测试（{args.rounds} 轮取最小值）\n")
+    header = f"{'size':>6} | {'冷处理 ms':>10} | {'缓存命中 ms':>11} | {'处理+摘要 ms':>12}"
+    if baseline:
+        header += f" | {'旧实现 ms':>10} | {'冷处理加速':>8} | {'旧 处理+摘要':>12} | {'加速':>6}"
+    print(header)
+    print('-' * len(header.encode('gbk', errors='replace')))
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        response = make_response(size)
+
+        def cold():
+            current.clear_process_cache()
+            current.InvestigateDataProcessor(response).process()
+
+        def warm():
+            current.InvestigateDataProcessor(response).process()
+
+        def both():
+            current.clear_process_cache()
+            current.process_investigate_response(response)
+            current.get_investigate_summary(response)
+
+        cold_ms = bench(cold, args.rounds)
+        current.InvestigateDataProcessor(response).process()
+        warm_ms = bench(warm, args.rounds)
+        both_ms = bench(both, args.rounds)
+        row = f"{size:>6} | {cold_ms:>10.2f} | {warm_ms:>11.2f} | {both_ms:>12.2f}"
+
+        if baseline:
+            old_ms = bench(lambda: baseline.InvestigateDataProcessor(response).process(), args.rounds)
+            old_both_ms = bench(lambda: (baseline.process_investigate_response(response),
+                                         baseline.get_investigate_summary(response)), args.rounds)
+            row += (f" | {old_ms:>10.2f} | {old_ms / cold_ms:>9.2f}x"
+                    f" | {old_both_ms:>12.2f} | {old_both_ms / both_ms:>5.1f}x")
+
+            current.clear_process_cache()
+            new_result = current.process_investigate_response(response)
+            old_result = baseline.process_investigate_response(response)
+            # 旧实现对 set 截取前20个 IP，结果不确定，不参与比较
+            for result in (new_result, old_result):
+                result['security']['ip_history'].pop('unique_ips', None)
+            if canonical(new_result) != canonical(old_result):
+                row += "  ❌ 输出不一致"
+        print(row)
+
+    print("\n✅ 完成")
+
+
+if __name__ == '__main__':
+    main()
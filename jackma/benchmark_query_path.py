@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+查询链路端到端基准测试
+在子进程中启动后端（uvicorn）和 mock 提供商服务器（mock_provider_farm.py，PROVIDER_BASE_URL_OVERRIDE 指向它），
+按指定并发驱动各场景并统计：
+- 吞吐量（请求/秒）、延迟 p50/p95/p99、首字节时间（time-to-first-result）
+- 数据库写入速率（各表新增行数/秒）
+- 整次运行的后端进程内存峰值（VmHWM，仅 Linux；进程生命周期内的峰值，不按场景拆分）
+结果保存为 JSON（含 git 提交号），可与基线结果对比；超过阈值（benchmark_thresholds.json）时退出码为 1
+
+场景:
+    phone_cold    每个请求一个新号码，经过全部提供商
+    phone_cached  预热后重复查询同一批号码（数据库缓存命中）
+    email_cold    每个请求一个新邮箱
+    email_cached  预热后重复查询同一批邮箱
+    task_status   /api/tasks/status 轮询（默认使用内存结果后端，--redis-url 时使用 Redis）
+
+用法:
+    python benchmark_query_path.py
+    python benchmark_query_path.py --concurrency 50 --requests 500 --provider-latency-scale 0.02
+    python benchmark_query_path.py --scenarios phone_cached,task_status --baseline latest
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import create_engine, inspect, text
+
+ROOT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = ROOT_DIR / 'backend'
+RESULTS_DIR = ROOT_DIR / 'benchmark_results'
+THRESHOLDS_FILE = ROOT_DIR / 'benchmark_thresholds.json'
+
+SCENARIOS = ('phone_cold', 'phone_cached', 'email_cold', 'email_cached', 'task_status')
+# 缓存场景预热的查询值个数
+WARM_KEYS = 20
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+        dirty = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT_DIR, text=True).strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def memory_hwm_mb(pid: int) -> Optional[float]:
+    """进程常驻内存峰值（/proc/<pid>/status 的 VmHWM），非 Linux 返回 None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class Stack:
+    """后端 + mock 提供商服务器子进程"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.workdir = Path(tempfile.mkdtemp(prefix='bench-query-'))
+        self.database_url = args.database_url or f"sqlite:///{self.workdir / 'bench.db'}"
+        self.farm_url = f"http://127.0.0.1:{free_port()}"
+        self.api_url = f"http://127.0.0.1:{free_port()}"
+        self.processes: List[subprocess.Popen] = []
+        self.server: Optional[subprocess.Popen] = None
+
+    def _spawn(self, cmd: List[str], cwd: Path, env: Dict[str, str], name: str) -> subprocess.Popen:
+        log = open(self.workdir / f'{name}.log', 'w')
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self.processes.append(process)
+        return process
+
+    async def start(self):
+        env = dict(os.environ)
+        farm_cmd = [sys.executable, 'mock_provider_farm.py', '--port', self.farm_url.rsplit(':', 1)[1],
+                    '--latency-scale', str(self.args.provider_latency_scale)]
+        if self.args.provider_profiles:
+            farm_cmd += ['--profiles', self.args.provider_profiles]
+        self._spawn(farm_cmd, ROOT_DIR, env, 'farm')
+
+        env.update({
+            'DATABASE_URL': self.database_url,
+            'PROVIDER_BASE_URL_OVERRIDE': self.farm_url,
+            'MONGO_URL': '',
+            'IMAGE_CACHE_DIR': str(self.workdir / 'images'),
+            'BLOB_STORE_DIR': str(self.workdir / 'blobs'),
+            'DIAGNOSTICS_DIR': str(self.workdir / 'diagnostics'),
+            'USAGE_SINK_FLUSH_INTERVAL': '0.5',
+            'CELERY_RESULT_BACKEND': f"{self.args.redis_url}/1" if self.args.redis_url else 'cache+memory://',
+        })
+        env.setdefault('OSINT_INDUSTRIES_API_KEY', 'benchmark-dummy-key')
+        app_module, _, app_name = self.args.app.partition(':')
+        self.server = self._spawn(
+            [sys.executable, '-m', 'uvicorn', f"{app_module}:{app_name or 'app'}", '--port', self.api_url.rsplit(':', 1)[1],
+             '--log-level', 'warning', '--no-access-log'],
+            BACKEND_DIR, env, 'server'
+        )
+        await self._wait_ready(f"{self.farm_url}/_mock/stats")
+        await self._wait_ready(f"{self.api_url}/api/")
+
+    async def _wait_ready(self, url: str, timeout: float = 60):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if any(p.poll() is not None for p in self.processes):
+                    break
+                try:
+                    if (await client.get(url)).status_code < 500:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"{url} 未就绪，日志见 {self.workdir}")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+class RowCounter:
+    """统计数据库各表行数，用于计算写入速率"""
+
+    def __init__(self, database_url: str):
+        self.engine = create_engine(database_url)
+
+    def total(self) -> int:
+        tables = inspect(self.engine).get_table_names()
+        with self.engine.connect() as conn:
+            return sum(conn.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar() for table in tables)
+
+
+async def timed_request(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Tuple[float, float, bool]:
+    """返回 (总耗时, 首字节时间, 是否成功)，单位秒"""
+    start = time.perf_counter()
+    async with client.stream(method, url, **kwargs) as response:
+        first_byte = None
+        async for _ in response.aiter_raw():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+        elapsed = time.perf_counter() - start
+        return elapsed, first_byte if first_byte is not None else elapsed, response.status_code == 200
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request: Callable[[int], Tuple[str, str, Dict[str, Any]]],
+                       total: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    ttfb: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            try:
+                elapsed, first_byte, ok = await timed_request(client, method, url, **kwargs)
+                latencies.append(elapsed)
+                ttfb.append(first_byte)
+                errors += 0 if ok else 1
+            except httpx.HTTPError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    def ms(values: List[float], pct: float) -> float:
+        return round(percentile(values, pct) * 1000, 2)
+
+    return {
+        'requests': total,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(total / duration, 2) if duration else 0.0,
+        'latency_ms': {'p50': ms(latencies, 50), 'p95': ms(latencies, 95), 'p99': ms(latencies, 99),
+                       'max': ms(latencies, 100)},
+        'ttfb_ms': {'p50': ms(ttfb, 50), 'p95': ms(ttfb, 95), 'p99': ms(ttfb, 99)},
+    }
+
+
+def scenario_requests(name: str, run_id: str) -> Tuple[Callable[[int], Tuple[str, str, Dict[str, Any]]], List[Tuple[str, str, Dict[str, Any]]]]:
+    """返回 (第 i 个请求的构造函数, 预热请求列表)"""
+    def phone(i: int) -> str:
+        return f"+1{run_id}{i:06d}"
+
+    def email(i: int) -> str:
+        return f"bench{run_id}.{i}@example.com"
+
+    if name == 'phone_cold':
+        return lambda i: ('POST', '/api/phone/query', {'json': {'phone': phone(100000 + i)}}), []
+    if name == 'phone_cached':
+        warm = [('POST', '/api/phone/query', {'json': {'phone': phone(k)}}) for k in range(WARM_KEYS)]
+        return lambda i: warm[i % WARM_KEYS], warm
+    if name == 'email_cold':
+        return lambda i: ('POST', '/api/email/query', {'json': {'email': email(100000 + i)}}), []
+    if name == 'email_cached':
+        warm = [('POST', '/api/email/query', {'json': {'email': email(k)}}) for k in range(WARM_KEYS)]
+        return lambda i: warm[i % WARM_KEYS], warm
+    if name == 'task_status':
+        # 预热一次：路由首次调用时才导入 celery_tasks
+        status = lambda i: ('GET', '/api/tasks/status', {'params': {'task_id': str(uuid.uuid4())}})
+        return status, [status(0)]
+    raise ValueError(f"unknown scenario: {name}")
+
+
+def load_thresholds(path: Path) -> Dict[str, Dict[str, float]]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_baseline(spec: Optional[str], exclude: Path) -> Optional[Path]:
+    if not spec:
+        return None
+    if spec != 'latest':
+        return Path(spec)
+    candidates = sorted(p for p in RESULTS_DIR.glob('*.json') if p != exclude)
+    return candidates[-1] if candidates else None
+
+
+def check_regressions(current: Dict[str, Any], baseline: Optional[Dict[str, Any]],
+                      thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """
+    阈值（每个场景可覆盖 default）:
+        max_error_rate        错误率上限
+        max_p95_ms            p95 延迟上限（绝对值）
+        min_throughput_rps    吞吐量下限（绝对值）
+        p95_regression        相对基线 p95 允许的增幅（0.25 表示 +25%）
+        throughput_regression 相对基线吞吐量允许的降幅
+        memory_regression     相对基线内存峰值允许的增幅（只读取 default；整次运行比较一次，场景集合须与基线相同）
+    """
+    failures = []
+    memory_limit = thresholds.get('default', {}).get('memory_regression')
+    memory, base_memory = current.get('server_memory_hwm_mb'), (baseline or {}).get('server_memory_hwm_mb')
+    same_scenarios = set(current['scenarios']) == set((baseline or {}).get('scenarios', {}))
+    if (memory_limit is not None and memory and base_memory and same_scenarios
+            and memory > base_memory * (1 + memory_limit)):
+        failures.append(f"memory {memory}MB vs baseline {base_memory}MB")
+
+    for name, result in current['scenarios'].items():
+        limits = {**thresholds.get('default', {}), **thresholds.get(name, {})}
+        p95 = result['latency_ms']['p95']
+        if 'max_error_rate' in limits and result['error_rate'] > limits['max_error_rate']:
+            failures.append(f"{name}: error_rate {result['error_rate']} > {limits['max_error_rate']}")
+        if 'max_p95_ms' in limits and p95 > limits['max_p95_ms']:
+            failures.append(f"{name}: p95 {p95}ms > {limits['max_p95_ms']}ms")
+        if 'min_throughput_rps' in limits and result['throughput_rps'] < limits['min_throughput_rps']:
+            failures.append(f"{name}: throughput {result['throughput_rps']} < {limits['min_throughput_rps']}")
+
+        base = (baseline or {}).get('scenarios', {}).get(name)
+        if not base:
+            continue
+        base_p95 = base['latency_ms']['p95']
+        if 'p95_regression' in limits and base_p95 and p95 > base_p95 * (1 + limits['p95_regression']):
+            failures.append(f"{name}: p95 {p95}ms vs baseline {base_p95}ms (+{(p95 / base_p95 - 1) * 100:.0f}%)")
+        base_rps = base['throughput_rps']
+        if ('throughput_regression' in limits and base_rps
+                and result['throughput_rps'] < base_rps * (1 - limits['throughput_regression'])):
+            failures.append(f"{name}: throughput {result['throughput_rps']} vs baseline {base_rps} "
+                            f"({(result['throughput_rps'] / base_rps - 1) * 100:.0f}%)")
+    return failures
+
+
+def print_table(results: Dict[str, Dict[str, Any]]):
+    header = f"{'场景':<14}{'吞吐(req/s)':>12}{'p50':>9}{'p95':>9}{'p99':>9}{'TTFB p50':>10}{'错误率':>8}{'DB行/s':>9}"
+    print(header)
+    print('-' * 81)
+    for name, r in results.items():
+        print(f"{name:<14}{r['throughput_rps']:>12.1f}{r['latency_ms']['p50']:>9.1f}{r['latency_ms']['p95']:>9.1f}"
+              f"{r['latency_ms']['p99']:>9.1f}{r['ttfb_ms']['p50']:>10.1f}{r['error_rate']:>8.2%}"
+              f"{r['db_rows_per_s']:>9.1f}")
+
+
+async def run(args: argparse.Namespace) -> int:
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"未知场景: {sorted(unknown)}，可选 {', '.join(SCENARIOS)}")
+
+    stack = Stack(args)
+    print(f"🚀 启动后端 {args.app} 与 mock 提供商服务器（延迟倍数 {args.provider_latency_scale}），工作目录 {stack.workdir}")
+    run_id = f"{int(time.time()) % 10000:04d}"
+    results: Dict[str, Dict[str, Any]] = {}
+    memory_mb = None
+    try:
+        await stack.start()
+        rows = RowCounter(stack.database_url)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=stack.api_url, limits=limits, timeout=args.timeout) as client:
+            for name in scenarios:
+                make_request, warmup = scenario_requests(name, run_id)
+                for method, url, kwargs in warmup:
+                    await client.request(method, url, **kwargs)
+                await asyncio.sleep(1)  # 等待使用记录批量写入完成，避免计入本场景
+                rows_before = rows.total()
+                result = await run_scenario(client, make_request, args.requests, args.concurrency)
+                await asyncio.sleep(1)
+                written = rows.total() - rows_before
+                result['db_rows_written'] = written
+                result['db_rows_per_s'] = round(written / result['duration_s'], 2) if result['duration_s'] else 0.0
+                results[name] = result
+                print(f"  ✅ {name}: {result['throughput_rps']} req/s, p95 {result['latency_ms']['p95']}ms, "
+                      f"错误 {result['errors']}/{result['requests']}")
+        # VmHWM 是进程生命周期内的峰值，只能代表整次运行
+        memory_mb = memory_hwm_mb(stack.server.pid)
+    finally:
+        stack.stop()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            **git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'app': args.app,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'provider_latency_scale': args.provider_latency_scale,
+            'database': stack.database_url.split(':', 1)[0],
+        },
+        'scenarios': results,
+        'server_memory_hwm_mb': memory_mb,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{report['meta']['commit'] or 'nogit'}.json")
+    baseline_path = find_baseline(args.baseline, output)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path else None
+    failures = check_regressions(report, baseline, load_thresholds(Path(args.thresholds)))
+    report['baseline'] = str(baseline_path) if baseline_path else None
+    report['failures'] = failures
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    print(f"\n📊 结果（并发 {args.concurrency}，每个场景 {args.requests} 个请求，延迟单位 ms）\n")
+    print_table(results)
+    if memory_mb is not None:
+        print(f"\n🧠 后端内存峰值（整次运行）: {memory_mb:.1f} MB")
+    print(f"\n💾 已保存: {output}")
+    if baseline_path:
+        print(f"📎 基线: {baseline_path} ({baseline['meta'].get('commit')})")
+    if failures:
+        print("\n❌ 超过阈值:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\n✅ 未超过阈值")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查询链路端到端基准测试')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='逗号分隔的场景')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=100, help='每个场景的请求数')
+    parser.add_argument('--timeout', type=float, default=120, help='单个请求的超时（秒）')
+    parser.add_argument('--app', default='server:app', help='后端应用（backend 目录中的模块:变量）')
+    parser.add_argument('--provider-latency-scale', type=float, default=0.05, help='mock 提供商延迟倍数')
+    parser.add_argument('--provider-profiles', help='mock 提供商配置（JSON 文件或字符串，见 mock_provider_farm.py）')
+    parser.add_argument('--database-url', help='默认使用临时 SQLite 数据库')
+    parser.add_argument('--redis-url', help='task_status 场景使用的 Redis（默认内存结果后端）')
+    parser.add_argument('--output', help=f'结果文件（默认 {RESULTS_DIR.name}/<时间>-<提交>.json）')
+    parser.add_argument('--baseline', help='对比的基线结果文件，latest 表示结果目录中最新的一个')
+    parser.add_argument('--thresholds', default=str(THRESHOLDS_FILE), help='阈值配置文件')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+序列化基准测试
+在典型的缓存电话查询结果上对比标准库 json 与 serialization 模块（orjson）的吞吐量：
+编码/解码、API 响应渲染（FastAPI 默认 jsonable_encoder + JSONResponse vs ORJSONResponse）和 Celery 消息编解码
+
+用法:
+    python benchmark_serialization.py
+    python benchmark_serialization.py --sizes 100,1000 --rounds 10
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from kombu.serialization import dumps as kombu_dumps, loads as kombu_loads
+
+import serialization
+from apis.investigate_data_processor import process_investigate_response, get_investigate_summary
+from benchmark_investigate_processor import make_response
+
+logging.disable(logging.CRITICAL)
+
+
+def make_phone_result(size: int) -> dict:
+    """构造与 /api/phone/query 缓存结果结构相同的数据（Investigate + 若干小提供商）"""
+    raw = make_response(size)
+    investigate = {
+        'success': True,
+        'source': 'investigate_api',
+        'data': {
+            **raw['data'],
+            'processed': process_investigate_response(raw),
+            'summary': get_investigate_summary(raw),
+            'pipeline_result': {'person_profile': raw['data']['person_profile']},
+        }
+    }
+    small = [
+        {'success': True, 'source': f"provider_{i}", 'data': {'found': True, 'name': 'John Doe', 'items': list(range(20))}}
+        for i in range(10)
+    ]
+    return {'success': True, 'phone': '+14403828826', 'data': [investigate] + small, 'error': None}
+
+
+def celery_roundtrip(payload: dict, serializer: str):
+    """按 Celery 发送/接收消息的方式编码再解码"""
+    content_type, content_encoding, body = kombu_dumps(payload, serializer=serializer)
+    return kombu_loads(body, content_type, content_encoding)
+
+
+def bench(fn, rounds: int) -> float:
+    """返回单次调用的最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='json vs orjson 序列化基准测试')
+    parser.add_argument('--sizes', default='100,500,2000', help='合成 person_profile 列表长度，逗号分隔')
+    parser.add_argument('--rounds', type=int, default=20, help='每项测量的轮数')
+    args = parser.parse_args()
+
+    serialization.register_celery_serializer('orjson')
+
+    print(f"📊 序列化基准测试（{args.rounds} 轮取最小值，吞吐量单位 MB/s）\n")
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        payload = make_phone_result(size)
+        encoded = json.dumps(payload)
+        mb = len(serialization.dumps(payload)) / 1024 / 1024
+        print(f"── size={size}  payload={mb:.2f} MB")
+
+        cases = [
+            ('编码（缓存/数据库写入）',
+             lambda: json.dumps(payload, ensure_ascii=False),
+             lambda: serialization.dumps(payload)),
+            ('解码（缓存/数据库读取）',
+             lambda: json.loads(encoded),
+             lambda: serialization.loads(encoded)),
+            ('API 响应渲染',
+             lambda: JSONResponse(jsonable_encoder(payload)),
+             lambda: serialization.ORJSONResponse(payload)),
+            ('Celery 消息编解码',
+             lambda: celery_roundtrip(payload, 'json'),
+             lambda: celery_roundtrip(payload, 'orjson')),
+        ]
+
+        for name, stdlib_fn, orjson_fn in cases:
+            stdlib_s = bench(stdlib_fn, args.rounds)
+            orjson_s = bench(orjson_fn, args.rounds)
+            print(f"  {name:<16} json {mb / stdlib_s:>8.1f}  |  orjson {mb / orjson_s:>8.1f}  |  {stdlib_s / orjson_s:>5.1f}x")
+        print()
+
+    print("✅ 完成")
+
+
+if __name__ == '__main__':
+    main()
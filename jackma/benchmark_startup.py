@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+后端冷启动基准测试
+每轮启动一个全新的 Python 进程，测量:
+- import_ms         python -c "import server" 的总耗时（含解释器启动）
+- time_to_ready_ms  从启动 uvicorn 子进程到 /api/ 首次返回的耗时（uvicorn 重载、worker 重启时付出的成本）
+另外用 python -X importtime 列出导入耗时最多的模块（--top），便于定位新的启动开销
+结果保存为 JSON（含 git 提交号）
+
+用法:
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 10 --app server_optimized:app --top 20
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = ROOT_DIR / 'backend'
+RESULTS_DIR = ROOT_DIR / 'benchmark_results'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_env(workdir: Path) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f"sqlite:///{workdir / 'startup.db'}",
+        'MONGO_URL': '',
+        'IMAGE_CACHE_DIR': str(workdir / 'images'),
+        'BLOB_STORE_DIR': str(workdir / 'blobs'),
+        'DIAGNOSTICS_DIR': str(workdir / 'diagnostics'),
+        'CELERY_RESULT_BACKEND': 'cache+memory://',
+    })
+    return env
+
+
+def measure_import(module: str, env: Dict[str, str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', f"import {module}"], cwd=BACKEND_DIR, env=env,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def measure_ready(app: str, env: Dict[str, str], workdir: Path, timeout: float = 60) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/"
+    with open(workdir / 'server.log', 'a') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', app, '--port', str(port), '--log-level', 'warning', '--no-access-log'],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            with httpx.Client() as client:
+                while time.perf_counter() - start < timeout:
+                    if process.poll() is not None:
+                        break
+                    try:
+                        if client.get(url).status_code < 500:
+                            return (time.perf_counter() - start) * 1000
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.01)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    raise RuntimeError(f"{app} 未就绪，日志见 {workdir / 'server.log'}")
+
+
+def import_profile(module: str, env: Dict[str, str], top: int) -> List[Tuple[str, float]]:
+    """python -X importtime 中直接导入（第一层）的模块按累计耗时排序"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=BACKEND_DIR, env=env,
+                            check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 缩进两个空格以内：应用模块本身及其直接导入的模块
+        if len(name) - len(name.lstrip()) <= 3:
+            modules.append((name.strip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: item[1], reverse=True)[:top]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        'min_ms': round(min(values), 1),
+        'median_ms': round(statistics.median(values), 1),
+        'max_ms': round(max(values), 1),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'nogit'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='后端冷启动基准测试')
+    parser.add_argument('--app', default='server:app', help='uvicorn 应用（默认 server:app）')
+    parser.add_argument('--runs', type=int, default=5, help='测量轮数')
+    parser.add_argument('--top', type=int, default=15, help='列出导入耗时最多的模块数')
+    parser.add_argument('--output', help='结果文件（默认 benchmark_results/startup-<时间>-<提交>.json）')
+    args = parser.parse_args()
+
+    module = args.app.partition(':')[0]
+    workdir = Path(tempfile.mkdtemp(prefix='bench-startup-'))
+    env = make_env(workdir)
+    # 预热一次：建表、创建默认用户、生成 .pyc（之后各轮对应重启场景）
+    measure_ready(args.app, env, workdir)
+
+    print(f"🚀 冷启动基准测试: {args.app}（{args.runs} 轮）\n")
+    import_ms = [measure_import(module, env) for _ in range(args.runs)]
+    ready_ms = [measure_ready(args.app, env, workdir) for _ in range(args.runs)]
+    results = {'import': summarize(import_ms), 'time_to_ready': summarize(ready_ms)}
+    for name, stats in results.items():
+        print(f"  {name:<14} min {stats['min_ms']:>7.1f}ms  median {stats['median_ms']:>7.1f}ms  max {stats['max_ms']:>7.1f}ms")
+
+    profile = import_profile(module, env, args.top)
+    print(f"\n📦 导入耗时最多的模块（累计）")
+    for name, ms in profile:
+        print(f"  {ms:>8.1f}ms  {name}")
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': commit,
+            'app': args.app,
+            'runs': args.runs,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+        'import_profile': [{'module': name, 'cumulative_ms': ms} for name, ms in profile],
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"startup-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{commit}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n💾 已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+// 构建后预压缩：为 build/ 中的文本资源生成 .br 和 .gz 文件，
+// 后端 PrecompressedStaticFiles 按 Accept-Encoding 直接返回，无需运行时压缩
+const fs = require("fs");
+const path = require("path");
+const zlib = require("zlib");
+
+const BUILD_DIR = path.resolve(__dirname, "..", "build");
+const COMPRESSIBLE = /\.(js|css|html|json|svg|txt|map|ico|webmanifest)$/i;
+const MIN_BYTES = 1024;
+
+function walk(dir) {
+  return fs.readdirSync(dir, { withFileTypes: true }).flatMap((entry) => {
+    const full = path.join(dir, entry.name);
+    return entry.isDirectory() ? walk(full) : [full];
+  });
+}
+
+function main() {
+  if (!fs.existsSync(BUILD_DIR)) {
+    console.warn(`⚠️ build directory not found: ${BUILD_DIR}`);
+    return;
+  }
+  let count = 0;
+  let original = 0;
+  let brotli = 0;
+  for (const file of walk(BUILD_DIR)) {
+    if (!COMPRESSIBLE.test(file)) continue;
+    const data = fs.readFileSync(file);
+    if (data.length < MIN_BYTES) continue;
+
+    const br = zlib.brotliCompressSync(data, {
+      params: {
+        [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+        [zlib.constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+      },
+    });
+    const gz = zlib.gzipSync(data, { level: zlib.constants.Z_BEST_COMPRESSION });
+    // 压缩后没有变小的文件不生成预压缩版本
+    if (br.length < data.length) fs.writeFileSync(`${file}.br`, br);
+    if (gz.length < data.length) fs.writeFileSync(`${file}.gz`, gz);
+
+    count += 1;
+    original += data.length;
+    brotli += Math.min(br.length, data.length);
+  }
+  const kb = (n) => (n / 1024).toFixed(1);
+  console.log(`✅ precompressed ${count} files: ${kb(original)} KB -> ${kb(brotli)} KB (br)`);
+}
+
+main();
@@ -9,6 +9,7 @@ import LoadingProgress from './components/LoadingProgress';
 import ErrorBoundary from './components/ErrorBoundary';
 import { ThemeProvider } from './contexts/ThemeContext';
 import { Toaster } from './components/ui/sonner';
+import { resolveResponseRefs } from './utils/responseRefs';
 
 function AppContent() {
   const [isAuthenticated, setIsAuthenticated] = useState(false);
@@ -159,7 +160,8 @@ function AppContent() {
         clearTimeout(timeoutId);
         
         if (!response.ok) throw new Error('API request failed');
-        const data = await response.json();
+        // 还原后端对重复子树的去重引用
+        const data = resolveResponseRefs(await response.json());
         
         // 直接处理结果，不通过LoadingProgress的onComplete
         setIsLoading(false);
@@ -144,9 +144,11 @@ export const WhatsAppDisplay = ({ whatsappData, socialMediaData, externalLookupD
 
   // 提取所有字段
   const displayPhone = wdata?.phone || wdata?.number || query;
+  // 后端已保存的头像（WhatsApp 头像链接会过期，优先使用）
+  const profilePicBlobUrl = wdata?.profilePicBlobUrl;
   const profilePicBase64 = wdata?.profilePicBase64;
   const profilePicUrl = cleanUrl(wdata?.profilePicUrl) || cleanUrl(wdata?.profilePic) || cleanUrl(wdata?.urlImage);
-  const profilePic = profilePicBase64 || profilePicUrl;
+  const profilePic = profilePicBlobUrl || profilePicBase64 || profilePicUrl;
   const about = wdata?.about;
   const aboutSetAt = wdata?.aboutSetAt;
   const aboutHistory = wdata?.aboutHistory;
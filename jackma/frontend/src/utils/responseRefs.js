@@ -0,0 +1,46 @@
+// 查询结果去重引用还原工具
+// 后端会把提供商结果中重复出现的大子树替换为 {"$ref": "路径"}（路径为相对于该提供商 data 的 JSON Pointer），
+// 这里在渲染前把引用还原为实际对象（共享引用，不复制）
+
+// 按 "/a/b/0/c" 形式的 JSON Pointer 取值（~1 -> /，~0 -> ~；键名中的 . 和 [ 原样保留）
+const getByPath = (root, path = "") => {
+  const parts = String(path).split("/").slice(1)
+    .map((part) => part.replace(/~1/g, "/").replace(/~0/g, "~"));
+  return parts.reduce((node, key) => (node == null ? undefined : node[key]), root);
+};
+
+const isRef = (node) => (
+  node && typeof node === "object" && !Array.isArray(node)
+  && Object.keys(node).length === 1 && typeof node.$ref === "string"
+);
+
+// 原地还原单个提供商 data 中的引用
+const resolveIn = (root) => {
+  const walk = (node) => {
+    if (!node || typeof node !== "object") return node;
+    const entries = Array.isArray(node) ? node.entries() : Object.entries(node);
+    for (const [key, child] of entries) {
+      if (isRef(child)) {
+        const target = getByPath(root, child.$ref);
+        if (target !== undefined) node[key] = target;
+      } else {
+        walk(child);
+      }
+    }
+    return node;
+  };
+  return walk(root);
+};
+
+// 还原聚合查询结果（data 为各提供商结果列表）中的所有引用
+export const resolveResponseRefs = (result) => {
+  if (!result || !Array.isArray(result.data)) return result;
+  result.data.forEach((provider) => {
+    if (provider && provider.data && typeof provider.data === "object") {
+      resolveIn(provider.data);
+    }
+  });
+  return result;
+};
+
+export default resolveResponseRefs;
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+本地 mock LLM 服务器
+模拟 RapidAPI ChatGPT-GPT5 的 /ask 接口，用于在不消耗上游配额的情况下测试 AI 分析：
+- 请求体 {"query": ..., "stream": true} 且 Accept 包含 text/event-stream 时按 OpenAI 风格 SSE 分块返回
+- 否则返回 {"response": "..."}
+
+用法:
+    python mock_llm_server.py --port 9100 --delay 0.05
+    AI_LLM_API_URL=http://127.0.0.1:9100/ask uvicorn server:app   # 在 backend 目录中启动后端
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 每个分块之间的延迟（秒），模拟 LLM 逐步生成
+CHUNK_DELAY = float(os.environ.get('MOCK_LLM_DELAY', 0.02))
+CHUNK_SIZE = int(os.environ.get('MOCK_LLM_CHUNK_SIZE', 24))
+
+MOCK_PROFILE = {
+    "efid": {"version": "v1", "primary_email": "inesbrady@gmail.com", "primary_phone": "4126704024"},
+    "identity_assessment": {"conclusion": "唯一真实人（High Confidence）", "confidence_score": 92},
+    "basic_info": {"full_name": "Ines Brady", "age": 59, "gender": "Female"},
+    "contact_info": {"emails": ["inesbrady@gmail.com"], "phones": ["+14126704024"]},
+    "location": {"current_city": "Pittsburgh", "current_state": "PA"},
+    "summary": {"full_name": "Ines Brady", "brief": "mock 分析结果"}
+}
+
+app = FastAPI(title="Mock LLM")
+app.state.calls = 0
+
+
+def mock_completion(query: str) -> str:
+    """带说明文字和代码块标记的响应，覆盖 JSON 提取逻辑"""
+    return f"以下是分析结果（提示词 {len(query)} 字符）：\n```json\n{json.dumps(MOCK_PROFILE, ensure_ascii=False, indent=2)}\n```\n"
+
+
+@app.post("/ask")
+async def ask(request: Request):
+    body = await request.json()
+    app.state.calls += 1
+    text = mock_completion(body.get("query", ""))
+
+    if not (body.get("stream") and "text/event-stream" in request.headers.get("accept", "")):
+        await asyncio.sleep(CHUNK_DELAY * 5)
+        return JSONResponse({"response": text})
+
+    async def events():
+        for i in range(0, len(text), CHUNK_SIZE):
+            await asyncio.sleep(CHUNK_DELAY)
+            chunk = {"choices": [{"delta": {"content": text[i:i + CHUNK_SIZE]}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return {"calls": app.state.calls}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--delay", type=float, default=CHUNK_DELAY, help="分块间隔（秒）")
+    args = parser.parse_args()
+    CHUNK_DELAY = args.delay
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+本地 mock 提供商服务器（离线压测 / 延迟测试用）
+模拟 apis/ 中各提供商接口的请求路径和响应结构，每个提供商可单独配置：
+- latency_ms / latency_sigma: 延迟中位数（毫秒）与对数正态分布 sigma（0 为固定延迟）
+- error_rate / error_statuses: 按比例返回错误状态码
+- timeout_rate / hang_seconds: 按比例挂起请求（超过客户端超时）
+- records: 列表类字段的条目数（控制响应体大小）
+- found_rate: 号码/邮箱命中比例（未命中时返回各提供商的"未找到"结构）
+同一号码/邮箱生成的数据固定（按查询值取随机种子），便于对比结果
+
+后端设置 PROVIDER_BASE_URL_OVERRIDE 后所有提供商请求改发到本服务器，原始 host[:port] 作为路径第一段，
+LLM 接口（chatgpt-gpt5.p.rapidapi.com/ask）由 mock_llm_server 处理
+
+用法:
+    python mock_provider_farm.py --port 9200 --latency-scale 0.1
+    python mock_provider_farm.py --profiles profiles.json      # {"*": {...}, "whatsapp": {"error_rate": 0.2}}
+    PROVIDER_BASE_URL_OVERRIDE=http://127.0.0.1:9200 uvicorn server:app   # 在 backend 目录中启动后端
+
+运行时调整:
+    GET  /_mock/profiles                 当前配置
+    PUT  /_mock/profiles/{provider}      部分更新（provider 为 * 时修改所有提供商）
+    GET  /_mock/stats                    各提供商调用次数、错误数、超时数
+    POST /_mock/reset                    清空统计
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from mock_llm_server import app as llm_app
+
+
+@dataclass
+class Profile:
+    """单个提供商的模拟配置"""
+    latency_ms: float = 300
+    latency_sigma: float = 0.4
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [500, 502, 503, 429])
+    timeout_rate: float = 0.0
+    hang_seconds: float = 300
+    records: int = 3
+    found_rate: float = 1.0
+
+    def update(self, values: Dict[str, Any]):
+        names = {f.name for f in fields(self)}
+        unknown = set(values) - names
+        if unknown:
+            raise ValueError(f"unknown profile fields: {sorted(unknown)}")
+        for key, value in values.items():
+            setattr(self, key, value)
+
+
+# 默认延迟大致参照线上各提供商的典型耗时
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "social_media_scanner": {"latency_ms": 3000, "latency_sigma": 0.6},
+    "caller_id": {"latency_ms": 600},
+    "truecaller": {"latency_ms": 800},
+    "ipqualityscore": {"latency_ms": 350},
+    "whatsapp": {"latency_ms": 1500, "latency_sigma": 0.5},
+    "callapp": {"latency_ms": 700},
+    "microsoft_phone": {"latency_ms": 900},
+    "phone_lookup": {"latency_ms": 1200},
+    "telegram_complete": {"latency_ms": 2000, "latency_sigma": 0.5},
+    "telegram_username": {"latency_ms": 800},
+    "investigate_api": {"latency_ms": 8000, "latency_sigma": 0.5},
+    "data_breach": {"latency_ms": 1500, "records": 6},
+    "external_lookup": {"latency_ms": 5000, "latency_sigma": 0.5, "records": 5},
+    "osint_industries": {"latency_ms": 6000, "latency_sigma": 0.5, "records": 6},
+    "hibp": {"latency_ms": 400},
+    "image": {"latency_ms": 150, "latency_sigma": 0.3},
+}
+
+# 全局延迟倍数（压测时可调小以缩短运行时间）
+LATENCY_SCALE = float(os.environ.get('MOCK_LATENCY_SCALE', 1.0))
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Martinez", "Wilson"]
+CITIES = [("Pittsburgh", "PA", "15213"), ("Austin", "TX", "73301"), ("Denver", "CO", "80202"),
+          ("Seattle", "WA", "98101"), ("Miami", "FL", "33101"), ("Chicago", "IL", "60601")]
+CARRIERS = ["Verizon Wireless", "T-Mobile USA", "AT&T Mobility", "Sprint"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Health", "Stark Industries", "Wayne Enterprises"]
+BREACHES = ["Facebook", "LinkedIn", "Dropbox", "Adobe", "Canva", "MyFitnessPal", "Zynga", "Twitter"]
+PLATFORMS = ["facebook", "instagram", "twitter", "linkedin", "snapchat", "telegram", "skype", "amazon"]
+
+# 最小的 JPEG 文件头，后面填充随机字节作为头像内容
+_JPEG_HEADER = bytes.fromhex("ffd8ffe000104a46494600010100000100010000")
+
+
+class Persona:
+    """按查询值生成的固定假数据"""
+
+    def __init__(self, query: str, profile: Profile):
+        seed = int(hashlib.sha256(query.encode()).hexdigest()[:16], 16)
+        self.rng = random.Random(seed)
+        self.query = query
+        self.digits = ''.join(ch for ch in query if ch.isdigit()) or "14155550100"
+        self.found = self.rng.random() < profile.found_rate
+        self.first = self.rng.choice(FIRST_NAMES)
+        self.last = self.rng.choice(LAST_NAMES)
+        self.name = f"{self.first} {self.last}"
+        self.city, self.state, self.zip = self.rng.choice(CITIES)
+        self.carrier = self.rng.choice(CARRIERS)
+        self.email = f"{self.first.lower()}.{self.last.lower()}{self.digits[-2:]}@example.com"
+        self.username = f"{self.first.lower()}{self.last.lower()[:3]}{self.digits[-3:]}"
+        self.e164 = f"+{self.digits}"
+        self.records = max(0, int(profile.records))
+
+    def many(self, build: Callable[[int], Any]) -> List[Any]:
+        return [build(i) for i in range(self.records)]
+
+
+# ---------------------------------------------------------------------------
+# 各提供商响应
+# ---------------------------------------------------------------------------
+
+def social_media_scanner(p: Persona, request: Request) -> Any:
+    platforms = PLATFORMS[:max(1, p.records)] if p.found else []
+    return {
+        "input": p.e164,
+        "results": [
+            {"platform": name, "exists": True, "username": p.username,
+             "url": f"https://{name}.com/{p.username}"}
+            for name in platforms
+        ],
+    }
+
+
+def caller_id(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return {"data": {}}
+    fb_id = str(100000000000000 + int(p.digits[-9:]))
+    return {
+        "data": {
+            "name": p.name,
+            "fb": {
+                "fb": fb_id,
+                "profile_url": f"https://www.facebook.com/{fb_id}",
+                "image_url": f"https://graph.facebook.com/{fb_id}/picture?type=large",
+            },
+        }
+    }
+
+
+def truecaller(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return {"phone_number": p.e164, "found": False}
+    return {
+        "phone_number": p.e164,
+        "found": True,
+        "name": p.name,
+        "carrier": p.carrier,
+        "country_code": "US",
+        "city": p.city,
+        "email": p.email,
+        "spam_score": p.rng.randint(0, 10),
+        "tags": [],
+    }
+
+
+def ipqualityscore(p: Persona, request: Request) -> Any:
+    return {
+        "success": True,
+        "message": "Phone is valid.",
+        "formatted": p.e164,
+        "local_format": p.digits[-10:],
+        "valid": True,
+        "fraud_score": p.rng.randint(0, 100),
+        "recent_abuse": False,
+        "VOIP": False,
+        "prepaid": p.rng.random() < 0.2,
+        "risky": False,
+        "active": True,
+        "name": p.name if p.found else "N/A",
+        "carrier": p.carrier,
+        "line_type": "Wireless",
+        "country": "US",
+        "city": p.city,
+        "region": p.state,
+        "zip_code": p.zip,
+        "dialing_code": 1,
+        "active_status": "Active",
+        "leaked": p.found,
+        "spammer": False,
+        "timezone": "America/New_York",
+        "associated_email_addresses": {"status": "Enterprise Plus or higher required.", "emails": []},
+        "request_id": hashlib.md5(p.query.encode()).hexdigest()[:10],
+    }
+
+
+def whatsapp(p: Persona, request: Request) -> Any:
+    # 头像下载同样经过 PROVIDER_BASE_URL_OVERRIDE 改写，由下面的 image 路由返回
+    return {
+        "phone": p.digits,
+        "number": p.digits,
+        "isUser": p.found,
+        "isWAContact": p.found,
+        "profilePic": f"https://pps.whatsapp.net/v/t61/{p.digits}.jpg" if p.found else None,
+        "id": {"server": "c.us", "user": p.digits, "_serialized": f"{p.digits}@c.us"},
+        "countryCode": "US",
+        "type": "in",
+        "about": "Hey there! I am using WhatsApp." if p.found else "",
+        "aboutSetAt": "2023-04-01T12:00:00Z" if p.found else None,
+        "isBusiness": False,
+        "isVerified": False,
+        "isEnterprise": False,
+        "isBlocked": False,
+        "aboutHistory": [],
+        "pictureHistory": [],
+        "carrierData": {
+            "country": "US", "location": f"{p.city}, {p.state}", "lineType": "mobile",
+            "valid": True, "formatted": p.e164,
+        },
+    }
+
+
+def whatsapp_fallback(p: Persona, request: Request) -> Any:
+    return {
+        "success": True,
+        "best_result": {
+            "data": {
+                "hasWhatsapp": p.found,
+                "phone_number": p.digits,
+                "device_type": "business",
+                "device_os": "android",
+                "country_code": "US",
+                "language": "en",
+                "locale": "en_US",
+            }
+        },
+    }
+
+
+def callapp(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return {"name": None}
+    return {
+        "name": p.name,
+        "emails": [{"email": p.email}],
+        "addresses": [{"street": f"{100 + i} Main St", "city": p.city, "state": p.state} for i in range(min(p.records, 3))],
+        "photoUrl": None,
+        "priority": p.rng.randint(1, 10),
+        "websites": [],
+        "facebookID": None,
+    }
+
+
+def microsoft_phone(p: Persona, request: Request) -> Any:
+    return {"value": p.e164, "exists": p.found, "type": "phone", "provider": "microsoft"}
+
+
+def phone_lookup(p: Persona, request: Request) -> Any:
+    return {
+        "success": True,
+        "phone_number": p.digits,
+        "formatted_number": p.e164,
+        "name": p.name if p.found else "",
+        "carrier": p.carrier,
+        "location": f"{p.city}, {p.state}",
+        "number_type": "mobile",
+        "confidence_score": round(p.rng.uniform(0.5, 0.99), 2) if p.found else 0,
+    }
+
+
+def telegram_complete(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return {"data": {"telegram_found": False}}
+    return {
+        "data": {
+            "telegram_found": True,
+            "user": {
+                "user_id": int(p.digits[-9:]),
+                "username": p.username,
+                "display_name": p.name,
+                "first_name": p.first,
+                "last_name": p.last,
+                "is_premium": False,
+                "last_seen": "recently",
+            },
+        }
+    }
+
+
+def telegram_username(p: Persona, request: Request) -> Any:
+    username = request.query_params.get("username", p.username)
+    return {
+        "id": int(p.digits[-9:]),
+        "username": username,
+        "name": p.name,
+        "bio": "",
+        "profile_pic_url": f"https://cdn4.telesco.pe/file/{username}.jpg",
+        "profile_url": f"https://t.me/{username}",
+    }
+
+
+def investigate_api(p: Persona, request: Request) -> Any:
+    profile = {}
+    if p.found:
+        profile = {
+            "primary_name": p.name,
+            "name_variants": [p.name, f"{p.first[0]}. {p.last}"],
+            "phones": [{"number": p.e164, "type": "mobile", "carrier": p.carrier}],
+            "emails": [{"address": p.email}],
+            "addresses": p.many(lambda i: {"street": f"{100 + i} Main St", "city": p.city, "state": p.state,
+                                           "postal_code": p.zip}),
+        }
+    return {
+        "investigation_id": hashlib.md5(p.query.encode()).hexdigest(),
+        "status": "completed",
+        "duration_seconds": round(p.rng.uniform(3, 15), 1),
+        "person_profile": profile,
+        "summary": {"data_sources_found": 3 if p.found else 0},
+        "pipeline_result": {"success": True, "results": {}},
+    }
+
+
+def data_breach(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return {"result": {"entries": [], "results": 0, "pages": 1}}
+    entries = p.many(lambda i: {
+        "entry": {
+            "database_name": BREACHES[i % len(BREACHES)],
+            "email": p.email,
+            "name": p.name,
+            "phone": p.digits,
+            "address": f"{100 + i} Main St, {p.city}, {p.state}",
+            "username": p.username,
+            "ip_address": f"10.0.{i}.{p.rng.randint(1, 254)}",
+            "dob": "1980-01-01",
+            "source": {
+                "BreachDate": f"20{10 + i % 12}-06-01",
+                "DataClasses": ["Email addresses", "Names", "Phone numbers"],
+                "Domain": f"{BREACHES[i % len(BREACHES)].lower()}.com",
+                "extra": {"Category": "Social", "Entries": p.rng.randint(10 ** 5, 10 ** 8)},
+            },
+        }
+    })
+    return {"result": {"entries": entries, "results": len(entries), "pages": 1}}
+
+
+def external_lookup(p: Persona, request: Request) -> Any:
+    primary = {"caller_id_name": p.name if p.found else "", "carrier": p.carrier, "city": p.city, "state": p.state}
+    if not p.found:
+        return {"primary": primary, "consolidated": {}, "sources": {}}
+    return {
+        "primary": primary,
+        "consolidated": {
+            "names": {"full_names": [p.name, f"{p.first[0]} {p.last}"]},
+            "contact": {"phones": [p.e164], "emails": [p.email]},
+            "address": {"addresses": p.many(lambda i: {"address": f"{100 + i} Main St", "city": p.city,
+                                                       "state": p.state, "postcode": p.zip})},
+            "employment": {"records": p.many(lambda i: {"company": COMPANIES[i % len(COMPANIES)],
+                                                        "title": "Engineer", "start_date": f"20{10 + i}-01",
+                                                        "region": p.state})},
+            "demographics": {"genders": [p.rng.choice(["M", "F"])], "birth_years": [str(p.rng.randint(1955, 2000))],
+                             "birth_dates": []},
+        },
+        "sources": {"people_search": {"records": p.records}, "caller_id": {"records": 1}},
+    }
+
+
+def osint_industries(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return []
+    return p.many(lambda i: {
+        "module": PLATFORMS[i % len(PLATFORMS)],
+        "schemaModule": PLATFORMS[i % len(PLATFORMS)],
+        "status": "found",
+        "query": p.query,
+        "reliable_source": True,
+        "spec_format": [{
+            "registered": {"value": True},
+            "name": {"value": p.name},
+            "username": {"value": p.username},
+            "profile_url": {"value": f"https://{PLATFORMS[i % len(PLATFORMS)]}.com/{p.username}"},
+        }],
+    })
+
+
+def hibp(p: Persona, request: Request) -> Any:
+    if not p.found:
+        return None
+    return p.many(lambda i: {
+        "Name": BREACHES[i % len(BREACHES)],
+        "Title": BREACHES[i % len(BREACHES)],
+        "Domain": f"{BREACHES[i % len(BREACHES)].lower()}.com",
+        "BreachDate": f"20{10 + i % 12}-06-01",
+        "PwnCount": p.rng.randint(10 ** 5, 10 ** 8),
+        "DataClasses": ["Email addresses", "Passwords"],
+        "IsVerified": True,
+    })
+
+
+def image(p: Persona, request: Request) -> Response:
+    body = _JPEG_HEADER + p.rng.randbytes(2048 * max(1, p.records))
+    return Response(content=body, media_type="image/jpeg")
+
+
+# (提供商, 方法, host[:port], 路径正则, 响应函数)，按顺序匹配
+ROUTES: List[Tuple[str, str, str, re.Pattern, Callable[[Persona, Request], Any]]] = [
+    ("social_media_scanner", "POST", "social-media-scanner1.p.rapidapi.com", re.compile(r"^/check$"), social_media_scanner),
+    ("caller_id", "GET", "caller-id-social-search-eyecon.p.rapidapi.com", re.compile(r"^/search$"), caller_id),
+    ("truecaller", "POST", "47.253.47.192:8080", re.compile(r"^/query$"), truecaller),
+    ("ipqualityscore", "GET", "www.ipqualityscore.com", re.compile(r"^/api/json/phone/[^/]*/[^/]+$"), ipqualityscore),
+    ("whatsapp", "GET", "whatsapp-data1.p.rapidapi.com", re.compile(r"^/number/[^/]+$"), whatsapp),
+    ("whatsapp", "GET", "whatsapp-proxy.checkleaked.cc", re.compile(r"^/number/[^/]+$"), whatsapp),
+    ("whatsapp", "POST", "47.253.47.192:8088", re.compile(r"^/api/osint/phone$"), whatsapp_fallback),
+    ("callapp", "GET", "callapp.p.rapidapi.com", re.compile(r"^/api/v1/search$"), callapp),
+    ("microsoft_phone", "GET", "ms-roan-chi.vercel.app", re.compile(r"^/api/check/phone$"), microsoft_phone),
+    ("phone_lookup", "POST", "47.253.47.192:3000", re.compile(r"^/api/v1/phone-lookup$"), phone_lookup),
+    ("telegram_complete", "POST", "47.253.47.192:8086", re.compile(r"^/api/check$"), telegram_complete),
+    ("telegram_username", "GET", "telegram-api8.p.rapidapi.com", re.compile(r"^/tg$"), telegram_username),
+    ("investigate_api", "GET", "47.253.238.111:3007", re.compile(r"^/investigate/[^/]+$"), investigate_api),
+    ("data_breach", "GET", "47.253.47.192:8888", re.compile(r"^/check-leaked/[^/]+$"), data_breach),
+    ("external_lookup", "GET", "47.253.238.111:8090", re.compile(r"^/lookup/\d+$"), external_lookup),
+    ("osint_industries", "GET", "api.osint.industries", re.compile(r"^/v2/request$"), osint_industries),
+    ("hibp", "GET", "haveibeenpwned.com", re.compile(r"^/api/v3/breachedaccount/[^/]+$"), hibp),
+    ("image", "GET", "pps.whatsapp.net", re.compile(r"^/"), image),
+    ("image", "GET", "graph.facebook.com", re.compile(r"^/"), image),
+    ("image", "GET", "cdn4.telesco.pe", re.compile(r"^/"), image),
+]
+
+# 未找到时按提供商返回的状态码（其余提供商返回 200 + "未找到"结构）
+NOT_FOUND_STATUS = {"hibp": 404, "image": 404}
+
+
+app = FastAPI(title="Mock Provider Farm")
+app.state.profiles = {}
+app.state.stats = defaultdict(lambda: {"calls": 0, "errors": 0, "timeouts": 0, "not_found": 0})
+
+
+def load_profiles(overrides: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Profile]:
+    """默认配置 + 覆盖配置（"*" 作用于所有提供商）"""
+    overrides = overrides or {}
+    base = overrides.get("*", {})
+    profiles = {"*": Profile()}
+    profiles["*"].update(base)
+    for name in {*DEFAULT_PROFILES, *overrides} - {"*"}:
+        profile = Profile()
+        profile.update({**DEFAULT_PROFILES.get(name, {}), **base, **overrides.get(name, {})})
+        profiles[name] = profile
+    return profiles
+
+
+def get_profile(provider: str) -> Profile:
+    return app.state.profiles.get(provider) or app.state.profiles["*"]
+
+
+def sample_latency(profile: Profile, rng: random.Random) -> float:
+    """对数正态分布延迟（秒）：中位数 latency_ms，sigma 越大长尾越明显"""
+    latency_ms = profile.latency_ms * math.exp(profile.latency_sigma * rng.gauss(0, 1))
+    return max(0.0, latency_ms * LATENCY_SCALE / 1000)
+
+
+async def _query_value(request: Request, provider: str) -> str:
+    """从路径、查询参数或 JSON 请求体中取出查询值（电话号码或邮箱），用作假数据种子"""
+    if provider == "osint_industries":
+        return request.query_params.get("query", "")
+    values = [request.url.path] + list(request.query_params.values())
+    if request.method == "POST":
+        try:
+            body = await request.json()
+            if isinstance(body, dict):
+                values += [str(v) for v in body.values()]
+        except ValueError:
+            pass
+    for value in values:
+        match = re.search(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+", value)
+        if match:
+            return match.group(0)
+    digits = max((re.sub(r"\D", "", v) for v in values), key=len, default="")
+    return digits
+
+
+@app.get("/_mock/profiles")
+async def list_profiles():
+    return {name: asdict(profile) for name, profile in sorted(app.state.profiles.items())}
+
+
+@app.put("/_mock/profiles/{provider}")
+async def update_profile(provider: str, request: Request):
+    values = await request.json()
+    try:
+        if provider == "*":
+            for profile in app.state.profiles.values():
+                profile.update(values)
+        else:
+            app.state.profiles.setdefault(provider, Profile(**asdict(app.state.profiles["*"]))).update(values)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {name: asdict(profile) for name, profile in app.state.profiles.items() if provider in ("*", name)}
+
+
+@app.get("/_mock/stats")
+async def stats():
+    return {"providers": dict(app.state.stats), "llm_calls": llm_app.state.calls}
+
+
+@app.post("/_mock/reset")
+async def reset():
+    app.state.stats.clear()
+    llm_app.state.calls = 0
+    return {"success": True}
+
+
+app.mount("/chatgpt-gpt5.p.rapidapi.com", llm_app)
+
+
+@app.api_route("/{netloc}/{path:path}", methods=["GET", "POST"])
+async def provider(netloc: str, path: str, request: Request):
+    route_path = f"/{path}"
+    for name, method, host, pattern, build in ROUTES:
+        if host == netloc and method == request.method and pattern.match(route_path):
+            break
+    else:
+        return JSONResponse({"error": f"mock: no provider for {request.method} {netloc}{route_path}"}, status_code=404)
+
+    profile = get_profile(name)
+    stat = app.state.stats[name]
+    stat["calls"] += 1
+    rng = random.Random()
+
+    await asyncio.sleep(sample_latency(profile, rng))
+    roll = rng.random()
+    if roll < profile.timeout_rate:
+        stat["timeouts"] += 1
+        await asyncio.sleep(profile.hang_seconds)
+        return JSONResponse({"error": "mock: upstream timeout"}, status_code=504)
+    if roll < profile.timeout_rate + profile.error_rate:
+        stat["errors"] += 1
+        status = rng.choice(profile.error_statuses)
+        return JSONResponse({"error": f"mock: simulated HTTP {status}"}, status_code=status)
+
+    persona = Persona(await _query_value(request, name), profile)
+    if not persona.found:
+        stat["not_found"] += 1
+        if name in NOT_FOUND_STATUS:
+            return JSONResponse({"error": "not found"}, status_code=NOT_FOUND_STATUS[name])
+    result = build(persona, request)
+    return result if isinstance(result, Response) else JSONResponse(result)
+
+
+app.state.profiles = load_profiles()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock provider farm")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-scale", type=float, default=LATENCY_SCALE, help="全局延迟倍数")
+    parser.add_argument("--error-rate", type=float, help="所有提供商的错误比例")
+    parser.add_argument("--timeout-rate", type=float, help="所有提供商的挂起比例")
+    parser.add_argument("--profiles", default=os.environ.get('MOCK_PROVIDER_PROFILES'),
+                        help="JSON 配置文件（或 JSON 字符串）: {\"*\": {...}, \"whatsapp\": {...}}")
+    args = parser.parse_args()
+
+    overrides: Dict[str, Dict[str, Any]] = {}
+    if args.profiles:
+        text = open(args.profiles).read() if os.path.exists(args.profiles) else args.profiles
+        overrides = json.loads(text)
+    for key, value in (("error_rate", args.error_rate), ("timeout_rate", args.timeout_rate)):
+        if value is not None:
+            overrides.setdefault("*", {})[key] = value
+    LATENCY_SCALE = args.latency_scale
+    app.state.profiles = load_profiles(overrides)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+AI 分析流式输出测试（使用本地 mock LLM 服务器，不消耗上游配额）
+- 增量 JSON 提取（说明文字中的花括号、代码块、无效候选对象）
+- 全局并发上限与排队时间统计
+- 相同输入的并发分析共享一次调用，发起方被取消时其他请求自行计算
+- /api/osint/gpt5-analyze/stream 的 SSE 事件与缓存，并发的相同流式请求只调用一次 LLM
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+PORT = free_port()
+os.environ['AI_LLM_API_URL'] = f"http://127.0.0.1:{PORT}/ask"
+os.environ['AI_LLM_MAX_CONCURRENCY'] = '2'
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'osint_test')
+
+import httpx
+import uvicorn
+
+import mock_llm_server
+from apis.llm_client import IncrementalJSONExtractor, complete, extract_json_object, get_llm_stats
+
+
+def start_mock_server():
+    config = uvicorn.Config(mock_llm_server.app, host='127.0.0.1', port=PORT, log_level='warning')
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    for _ in range(50):
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/stats")
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError('mock LLM server did not start')
+
+
+def test_extractor():
+    print("🔍 增量 JSON 提取")
+    text = mock_llm_server.mock_completion('x' * 10) + ' 结尾的 {说明} 文字'
+    extractor = IncrementalJSONExtractor()
+    fields = []
+    for i in range(0, len(text), 7):
+        fields.extend(key for key, _ in extractor.feed(text[i:i + 7]))
+    assert extractor.value == mock_llm_server.MOCK_PROFILE, extractor.value
+    assert fields == list(mock_llm_server.MOCK_PROFILE), fields
+    print(f"  ✅ 逐字段输出: {fields}")
+
+    assert extract_json_object('Missing brace { here\n```json\n{"a": 1}\n```') == {'a': 1}
+    assert extract_json_object('Missing brace { here\n{"a": 1}') == {'a': 1}
+    assert extract_json_object('例如 {"x": 0}，结果:\n```json\n{"a": 2}\n```') == {'a': 2}
+    print("  ✅ 说明文字中未闭合的 { 不影响提取，优先代码块")
+
+    extractor = IncrementalJSONExtractor()
+    events = []
+    for ch in '{"a": 1, oops} then {"a": 2, "b": 3}':
+        fields = extractor.feed(ch)
+        if extractor.discarded > len([e for e in events if e == 'reset']):
+            events.append('reset')
+        events.extend(fields)
+    assert extractor.value == {'a': 2, 'b': 3}
+    assert events == [('a', 1), 'reset', ('a', 2), ('b', 3)], events
+    print(f"  ✅ 无效候选对象的字段作废: {events}")
+
+
+async def test_concurrency():
+    print("🔍 并发上限（AI_LLM_MAX_CONCURRENCY=2，同时发起 6 个调用）")
+    results = await asyncio.gather(*(complete(f"prompt {i}") for i in range(6)))
+    assert all('Ines Brady' in r for r in results)
+    stats = get_llm_stats()
+    assert stats['calls'] >= 6 and stats['queue_time_max_ms'] > 0, stats
+    print(f"  ✅ {stats}")
+
+
+async def test_inflight_cancel():
+    print("🔍 并发去重与取消")
+    from ai_cache import cached_analysis
+
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.5)
+        return {'success': True, 'call': len(calls)}
+
+    key = f"inflight-{time.time()}"
+    results = await asyncio.gather(*(cached_analysis(key, compute) for _ in range(3)))
+    assert len(calls) == 1 and all(cached is False for _, cached in results), results
+    print("  ✅ 3 个并发请求共享 1 次调用，cached=False")
+
+    calls.clear()
+    key = f"inflight-cancel-{time.time()}"
+    leader = asyncio.create_task(cached_analysis(key, compute))
+    while not calls:
+        await asyncio.sleep(0.01)
+    followers = [asyncio.create_task(cached_analysis(key, compute)) for _ in range(2)]
+    await asyncio.sleep(0.1)
+    leader.cancel()
+    results = await asyncio.gather(*followers)
+    assert all(r['success'] for r, _ in results) and len(calls) == 2, (results, calls)
+    print("  ✅ 发起方取消后等待方自行计算（只补调 1 次）")
+
+
+async def test_sse_endpoint():
+    print("🔍 /api/osint/gpt5-analyze/stream")
+    import server
+
+    records = [{'module': 'twitter', 'FullName': 'Ines Brady', 'Email': 'inesbrady@gmail.com'}]
+    params = {'query': f"stream-test-{time.time()}"}
+    # 建表等初始化在 lifespan 中执行
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            for attempt in ('首次', '缓存'):
+                events = []
+                async with client.stream('POST', '/api/osint/gpt5-analyze/stream', params=params, json=records) as resp:
+                    assert resp.headers['content-type'].startswith('text/event-stream')
+                    event = None
+                    async for line in resp.aiter_lines():
+                        if line.startswith('event:'):
+                            event = line[6:].strip()
+                        elif line.startswith('data:'):
+                            events.append((event, json.loads(line[5:])))
+                names = [e for e, _ in events]
+                result = events[-1][1]
+                assert names[-1] == 'result' and result['success'], events[-1]
+                print(f"  ✅ {attempt}: {len(names)} 个事件 "
+                      f"(delta={names.count('delta')}, field={names.count('field')}), cached={result['cached']}")
+            assert result['cached'] is True
+
+            async def stream(query):
+                names = []
+                async with client.stream('POST', '/api/osint/gpt5-analyze/stream',
+                                         params={'query': query}, json=records) as resp:
+                    async for line in resp.aiter_lines():
+                        if line.startswith('event:'):
+                            names.append(line[6:].strip())
+                return names
+
+            before = httpx.get(f"http://127.0.0.1:{PORT}/stats").json()['calls']
+            query = f"stream-dedupe-{time.time()}"
+            streams = await asyncio.gather(*(stream(query) for _ in range(3)))
+            calls = httpx.get(f"http://127.0.0.1:{PORT}/stats").json()['calls'] - before
+            assert calls == 1 and all(names[-1] == 'result' for names in streams), (calls, streams)
+            print(f"  ✅ 3 个并发的相同流式请求只调用 1 次 LLM（{[len(n) for n in streams]} 个事件）")
+
+
+async def main():
+    start_mock_server()
+    test_extractor()
+    await test_concurrency()
+    await test_inflight_cancel()
+    await test_sse_endpoint()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
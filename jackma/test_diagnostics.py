@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+诊断模式测试
+- 同步阻塞事件循环时记录调用栈
+- 慢请求保存剖析结果（pyinstrument / 调用栈采样两种方式）
+- 诊断文件列表与文件名校验
+- 超出数量上限时只删除诊断文件，不删除目录中的其他文件
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+os.environ['DIAGNOSTICS_ENABLED'] = 'true'
+os.environ['DIAGNOSTICS_DIR'] = tempfile.mkdtemp()
+os.environ['DIAGNOSTICS_BLOCK_THRESHOLD_MS'] = '100'
+os.environ['DIAGNOSTICS_SLOW_REQUEST_MS'] = '150'
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+from fastapi import FastAPI
+
+import diagnostics
+
+
+def blocking_json_dump():
+    """模拟在事件循环中执行的耗时同步调用"""
+    time.sleep(0.3)
+
+
+app = FastAPI()
+app.add_middleware(diagnostics.DiagnosticsMiddleware)
+
+
+@app.get("/slow/{item_id}")
+async def slow(item_id: str):
+    blocking_json_dump()
+    return {"item_id": item_id}
+
+
+@app.get("/fast")
+async def fast():
+    return {"ok": True}
+
+
+async def run_requests(use_pyinstrument: bool):
+    mode = 'pyinstrument' if use_pyinstrument else 'stack_sampling'
+    print(f"\n🔬 剖析方式: {mode}")
+    diagnostics.HAS_PYINSTRUMENT = use_pyinstrument
+    before = {s['name'] for s in diagnostics.list_samples()}
+    diagnostics.start()
+    try:
+        await asyncio.sleep(0.05)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            assert (await client.get('/fast')).status_code == 200
+            assert (await client.get('/slow/123')).status_code == 200
+        await asyncio.sleep(0.05)
+    finally:
+        await diagnostics.stop()
+
+    new = [s for s in diagnostics.list_samples() if s['name'] not in before]
+    kinds = sorted(s['kind'] for s in new)
+    assert kinds == ['block', 'profile'], new
+    block = next(s for s in new if s['kind'] == 'block')
+    block_text = diagnostics.get_sample_path(block['name']).read_text()
+    assert 'blocking_json_dump' in block_text
+    profile = next(s for s in new if s['kind'] == 'profile')
+    profile_text = diagnostics.get_sample_path(profile['name']).read_text()
+    assert 'blocking_json_dump' in profile_text
+    assert profile['name'].endswith('.html' if use_pyinstrument else '.txt')
+    for sample in new:
+        print(f"  ✅ {sample['name']} ({sample['size']} bytes)")
+
+
+def test_sample_names():
+    print("\n🔒 文件名校验")
+    assert diagnostics.get_sample_path('../server.py') is None
+    assert diagnostics.get_sample_path('20260101T000000-block-1.txt/../../x') is None
+    status = diagnostics.get_diagnostics_status()
+    assert status['blocks'] >= 1 and status['profiles'] >= 1
+    print(f"  ✅ blocks={status['blocks']} profiles={status['profiles']} loop_lag={status['loop_lag_ms']}")
+
+
+def test_rotation():
+    print("\n🗂️ 旧文件清理")
+    other = diagnostics.DIAGNOSTICS_DIR / 'README.txt'
+    other.write_text('not a sample')
+    for _ in range(diagnostics.DIAGNOSTICS_MAX_FILES + 5):
+        diagnostics._write_sample('block', 'txt', 'x')
+    samples = [p for p in diagnostics.DIAGNOSTICS_DIR.iterdir() if diagnostics.SAMPLE_NAME_RE.match(p.name)]
+    assert len(samples) == diagnostics.DIAGNOSTICS_MAX_FILES and other.exists()
+    print(f"  ✅ 保留 {len(samples)} 个诊断文件，其他文件未被删除")
+
+
+async def main():
+    if diagnostics.HAS_PYINSTRUMENT:
+        await run_requests(True)
+    await run_requests(False)
+    test_sample_names()
+    test_rotation()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
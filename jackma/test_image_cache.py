@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+图片代理磁盘缓存测试（不访问外部接口，上游由 httpx.MockTransport 返回）
+- 同一 URL 并发未命中时各自写入独立的临时文件，两个响应都完整，缓存只保留一个条目
+- 临时文件已被登记时 commit 不删除现有条目
+- 上游网络错误返回 502，与图片不存在（404）区分
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ['IMAGE_CACHE_DIR'] = tempfile.mkdtemp()
+os.environ.setdefault('BLOB_STORE_DIR', tempfile.mkdtemp())
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/image_cache_test.db")
+os.environ.setdefault('MONGO_URL', '')
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+from fastapi import HTTPException
+
+from apis import image_cache
+
+URL = 'https://img.example.com/avatar.png'
+BODY = b'\x89PNG' + bytes(range(256)) * 400
+
+
+def mock_client(name, endpoint=None, timeout=None, follow_redirects=False, headers=None):
+    async def body():
+        # 分块慢速返回，让两个下载交错进行
+        for i in range(0, len(BODY), 16 * 1024):
+            await asyncio.sleep(0.01)
+            yield BODY[i:i + 16 * 1024]
+
+    def handler(request):
+        return httpx.Response(200, headers={'Content-Type': 'image/png'}, content=body())
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), timeout=timeout)
+
+
+async def read_body(response):
+    chunks = [chunk async for chunk in response.body_iterator]
+    await response.background()
+    return b''.join(chunks)
+
+
+async def test_concurrent_misses():
+    print("\n🖼️ 同一 URL 并发未命中")
+    first, second = await asyncio.gather(image_cache.proxy_image(None, URL), image_cache.proxy_image(None, URL))
+    bodies = await asyncio.gather(read_body(first), read_body(second))
+    assert bodies[0] == BODY and bodies[1] == BODY, [len(b) for b in bodies]
+
+    cache = image_cache.image_cache
+    entry = cache.get(URL)
+    assert entry is not None and entry['size'] == len(BODY), entry
+    assert cache.data_path(entry).read_bytes() == BODY
+    assert cache.get_stats()['entries'] == 1 and cache._total_bytes == len(BODY), cache.get_stats()
+    assert not list(cache.cache_dir.glob('*.tmp'))
+    print(f"  ✅ 两个响应均完整（{len(BODY)} bytes），缓存 1 个条目，无残留临时文件")
+
+
+def test_commit_missing_temp():
+    print("\n📥 临时文件已登记")
+    cache = image_cache.image_cache
+    entry = cache.get(URL)
+    missing = cache.temp_path(URL)
+    assert cache.commit(URL, missing, 1, 'x' * 64, 'image/png') == entry
+    assert cache.get(URL) == entry and cache.data_path(entry).read_bytes() == BODY
+    print("  ✅ 返回现有条目，缓存文件保留")
+
+
+async def test_network_error():
+    print("\n🌐 上游网络错误")
+    from apis import linkedin_avatar
+
+    def failing_client(name, endpoint=None, timeout=None, follow_redirects=False, headers=None):
+        def handler(request):
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler), timeout=timeout)
+
+    image_cache.provider_client = failing_client
+    try:
+        await linkedin_avatar.proxy_avatar_image(None, 'https://media.example.com/unreachable.jpg')
+        raise AssertionError('expected HTTPException')
+    except HTTPException as e:
+        assert e.status_code == 502, e.status_code
+    finally:
+        image_cache.provider_client = mock_client
+    print("  ✅ /api/avatar/proxy 返回 502")
+
+
+if __name__ == "__main__":
+    image_cache.provider_client = mock_client
+    asyncio.run(test_concurrent_misses())
+    test_commit_missing_temp()
+    asyncio.run(test_network_error())
+    print("\n✅ 全部通过")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Investigate API 结果处理测试（不访问外部接口，HTTP 请求由 httpx.MockTransport 返回）
+- 按需计算的板块（/api/phone/investigate）与查询时内联的 processed 一致，并命中查询时的处理缓存
+- 早期保存的结果（没有 processor_meta）仍可按需计算
+- 数据处理成功时返回结果（回归）
+"""
+import asyncio
+import copy
+import os
+import sys
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+
+from apis import investigate_api, investigate_data_processor
+from apis.investigate_api import get_investigate_sections, query_investigate_api
+
+PHONE = '+14155550123'
+
+# person_profile 嵌套在 pipeline_result 中、顶层带起止时间的响应
+RESPONSE = {
+    "investigation_id": "inv-001",
+    "phone_number": PHONE,
+    "status": "completed",
+    "duration_seconds": 4.2,
+    "start_time": "t0",
+    "end_time": "t1",
+    "pipeline_result": {
+        "success": True,
+        "results": {
+            "summary": {"data_sources_found": 3},
+            "person_profile": {
+                "primary_name": "Jane Roe",
+                "name_variants": ["Jane Roe", "J. Roe"],
+                "phones": [{"number_e164": PHONE, "confidence": 0.9, "source": "a"}],
+                "emails": [{"address": "jane@example.com", "source": "b"}],
+                "addresses": [{"street": "1 Main St", "city": "Austin", "state": "TX", "source": "a"}],
+                "confidence_score": 0.8,
+            },
+        },
+    },
+}
+
+
+def mock_client(name, timeout=None):
+    def handler(request):
+        return httpx.Response(200, json=copy.deepcopy(RESPONSE))
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler), timeout=timeout)
+
+
+async def test_query_returns_result():
+    print("\n📞 查询成功时返回结果")
+    investigate_data_processor.clear_process_cache()
+    result = await query_investigate_api(PHONE)
+    # 回归：成功返回曾嵌套在处理失败的分支中，处理成功时返回 None
+    assert result is not None and result['success'], result
+    assert result['metadata']['processed'] is True and result['data']['processed'], result['metadata']
+    print(f"  ✅ success={result['success']} processed={result['metadata']['processed']}")
+
+
+async def test_sections_match_inline():
+    print("\n🧩 按需板块与内联 processed 一致")
+    investigate_data_processor.clear_process_cache()
+    result = await query_investigate_api(PHONE)
+    assert result['success'], result
+    processed = result['data']['processed']
+    assert processed['identity']['primary_name'] == 'Jane Roe'
+    assert processed['meta']['start_time'] == 't0' and processed['meta']['end_time'] == 't1'
+
+    cached = dict(investigate_data_processor._process_cache)
+    on_demand = get_investigate_sections(result, None)
+    assert on_demand == processed, (on_demand['identity'], on_demand['meta'])
+    assert dict(investigate_data_processor._process_cache) == cached
+    print(f"  ✅ identity={on_demand['identity']['primary_name']} phones={on_demand['contacts']['phones']['total']} "
+          f"meta={on_demand['meta']['start_time']}/{on_demand['meta']['end_time']}，命中查询时的处理缓存")
+
+    selected = get_investigate_sections(result, ['contacts', 'summary'])
+    assert set(selected) == {'contacts', 'summary'} and selected['summary'] == result['data']['summary']
+    print("  ✅ 只返回请求的板块，摘要与查询时一致")
+
+
+async def test_legacy_result():
+    print("\n🗄️ 早期保存的结果")
+    result = await query_investigate_api(PHONE)
+    legacy = copy.deepcopy(result)
+    legacy['data'].pop('processor_meta')
+    investigate_data_processor.clear_process_cache()
+    sections = get_investigate_sections(legacy, ['identity', 'contacts'])
+    assert sections['identity']['primary_name'] == 'Jane Roe' and sections['contacts']['phones']['total'] == 1
+    print("  ✅ 没有 processor_meta 时重新规范化后计算")
+
+
+async def main():
+    investigate_api.provider_client = mock_client
+    await test_query_returns_result()
+    await test_sections_match_inline()
+    await test_legacy_result()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
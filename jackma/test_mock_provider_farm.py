@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+mock 提供商服务器测试（不访问外部接口）
+- PROVIDER_BASE_URL_OVERRIDE 把所有提供商请求改发到本地 mock 服务器
+- 综合电话查询中每个提供商都能拿到符合原结构的数据
+- 运行时调整错误率、挂起比例后提供商按预期失败
+- 调用记录中的端点仍为原始提供商地址
+"""
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('BLOB_STORE_DIR', tempfile.mkdtemp())
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+import uvicorn
+
+import mock_provider_farm
+from apis import http_instrumentation
+
+PHONE = '+14155550123'
+
+
+def start_farm() -> str:
+    """在后台线程中启动 mock 服务器，返回地址"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock_provider_farm.app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def test_phone_comprehensive(base_url: str):
+    print("\n📞 综合电话查询")
+    from apis.aggregator import query_phone_comprehensive
+
+    calls = []
+    http_instrumentation.add_call_sink(calls.append)
+    result = await query_phone_comprehensive(PHONE)
+    http_instrumentation.remove_call_sink(calls.append)
+
+    by_source = {r.get('source'): r for r in result.data}
+    failed = {source: r.get('error') for source, r in by_source.items() if not r.get('success')}
+    assert not failed, failed
+    assert len(by_source) == 12, sorted(by_source)
+    assert by_source['whatsapp']['data']['isUser'] is True
+    assert by_source['whatsapp']['data'].get('profilePicHash')
+    assert len(by_source['data_breach']['data']) == 6, by_source['data_breach']['databases']
+    assert by_source['external_lookup']['data']['data']['processed']
+    for source in sorted(by_source):
+        print(f"  ✅ {source}")
+
+    assert calls and all('127.0.0.1' not in c.endpoint for c in calls)
+    assert any(c.endpoint.startswith('www.ipqualityscore.com/api/json/phone') for c in calls)
+    print(f"  ✅ {len(calls)} 条调用记录，端点为原始提供商地址")
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        stats = (await client.get('/_mock/stats')).json()['providers']
+    assert stats['whatsapp']['calls'] == 1 and stats['image']['calls'] == 1, stats
+
+
+async def test_faults(base_url: str):
+    print("\n💥 错误与超时注入")
+    from apis.hibp import query_hibp
+    from apis.ipqualityscore import query_ipqualityscore
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.put('/_mock/profiles/ipqualityscore', json={'error_rate': 1.0, 'error_statuses': [503]})
+        assert response.status_code == 200
+        assert (await client.put('/_mock/profiles/hibp', json={'timeout_rate': 1.0, 'hang_seconds': 5})).status_code == 200
+        assert (await client.put('/_mock/profiles/hibp', json={'bogus': 1})).status_code == 400
+
+    result = await query_ipqualityscore(PHONE)
+    assert not result['success'] and '503' in result['error'], result
+    print(f"  ✅ ipqualityscore: {result['error']}")
+
+    start = time.perf_counter()
+    result = await query_hibp('someone@example.com', timeout=0.5)
+    assert not result['success'] and time.perf_counter() - start < 2, result
+    print(f"  ✅ hibp 挂起后客户端超时: {result['error']}")
+
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        stats = (await client.get('/_mock/stats')).json()['providers']
+        await client.post('/_mock/reset')
+    assert stats['ipqualityscore']['errors'] == 1 and stats['hibp']['timeouts'] == 1, stats
+
+
+async def test_unknown_endpoint(base_url: str):
+    print("\n❓ 未模拟的接口")
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        response = await client.get('/example.com/anything')
+    assert response.status_code == 404 and 'no provider' in response.json()['error']
+    print("  ✅ 返回 404")
+
+
+async def main():
+    mock_provider_farm.LATENCY_SCALE = 0.01
+    base_url = start_farm()
+    http_instrumentation.PROVIDER_BASE_URL_OVERRIDE = base_url
+    await test_phone_comprehensive(base_url)
+    await test_faults(base_url)
+    await test_unknown_endpoint(base_url)
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+AI 提示词记录组装测试（不调用模型）
+- OSINT Industries 形状的记录：spec_format 中 { type, proper_key, value } 节点解包后保留身份字段
+- 仅身份字段不同的记录不会被当作重复记录合并
+- 噪声字段和过深的嵌套仍被剔除
+"""
+import os
+import sys
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from apis.gpt5_analyzer import assemble_gpt5_prompt
+from apis.prompt_budget import build_record_section, clean_record
+
+
+def node(proper_key, value, type_='str'):
+    return {'type': type_, 'proper_key': proper_key, 'value': value}
+
+
+def osint_record(module, name, username, location=None):
+    """OSINT Industries 返回的单个模块记录（结构与接口一致，值为虚构）"""
+    spec = {
+        'registered': node('Registered', True, 'bool'),
+        'name': node('Name', name),
+        'username': node('Username', username),
+        'picture_url': node('Picture Url', f'https://pbs.example.com/{username}.jpg'),
+        'creation_date': node('Creation Date', '2015-03-02T11:20:00', 'datetime'),
+    }
+    if location:
+        spec['location'] = node('Location', location)
+    return {
+        'module': module,
+        'schemaModule': module,
+        'status': 'found',
+        'query': 'ines.brady@example.com',
+        'reliable_source': False,
+        'front_schemas': [{'image': f'https://pbs.example.com/{username}.jpg', 'tags': [{'tag': 'Registered'}]}],
+        'spec_format': [spec],
+        'raw': '<html>...</html>',
+    }
+
+
+def test_clean_osint_record():
+    print("\n🧹 OSINT Industries 记录清理")
+    cleaned = clean_record(osint_record('twitter', 'Ines Brady', 'ibrady', location={'city': 'Austin', 'country': 'US'}))
+    spec = cleaned['spec_format'][0]
+    assert spec['name'] == 'Ines Brady' and spec['username'] == 'ibrady', cleaned
+    assert spec['registered'] is True and spec['creation_date'] == '2015-03-02T11:20:00'
+    assert spec['location'] == {'city': 'Austin', 'country': 'US'}
+    assert 'raw' not in cleaned
+    print(f"  ✅ spec_format 节点解包: name={spec['name']} username={spec['username']} location={spec['location']}")
+
+    # 解包不改变普通对象的深度限制
+    deep = clean_record({'a': {'b': {'c': {'d': 'too deep'}}, 'keep': 1}})
+    assert deep == {'a': {'keep': 1}}, deep
+    print("  ✅ 普通对象超过深度限制仍被剔除")
+
+
+def test_prompt_keeps_identity():
+    print("\n📝 GPT-5 提示词")
+    results = [
+        osint_record('twitter', 'Ines Brady', 'ibrady'),
+        osint_record('twitter', 'Ines B. Brady', 'ines_b'),
+        osint_record('twitter', 'Ines Brady', 'ibrady'),
+    ]
+    prompt, stats = assemble_gpt5_prompt(results, 'ines.brady@example.com', main_person='Ines Brady')
+    assert 'Ines Brady' in prompt and 'Ines B. Brady' in prompt and 'ines_b' in prompt
+    assert stats['records_unique'] == 2 and stats['records_included'] == 2, stats
+    print(f"  ✅ 身份字段进入提示词，完全相同的记录去重: {stats['records_total']} -> {stats['records_unique']}")
+
+    _, stats = build_record_section([('twitter', osint_record('twitter', f'Person {i}', f'user{i}')) for i in range(5)])
+    assert stats['records_unique'] == 5, stats
+    print("  ✅ 仅身份字段不同的记录不被合并")
+
+
+if __name__ == "__main__":
+    test_clean_osint_record()
+    test_prompt_keeps_identity()
+    print("\n✅ 全部通过")
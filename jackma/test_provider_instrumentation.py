@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+提供商调用埋点测试（httpx MockTransport，不访问外部接口）
+- 状态码、字节数、重试次数、连接失败记录
+- 端点中的电话/邮箱片段脱敏，图片代理的端点不记录任意 host
+- 代理环境变量（HTTPS_PROXY / NO_PROXY）与普通 httpx.AsyncClient 一样生效
+- usage_sink 批量写入 api_usage_logs
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# 使用临时数据库，避免污染本地数据
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/instrumentation_test.db"
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+
+from apis import http_instrumentation
+from apis.http_instrumentation import InstrumentedTransport, add_call_sink, provider_client, remove_call_sink
+from models import APIUsageLog, SessionLocal, init_db
+import usage_sink
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith('/down'):
+        raise httpx.ConnectError('connection refused', request=request)
+    if request.url.path.startswith('/fail'):
+        return httpx.Response(503, stream=httpx.ByteStream(b'unavailable'))
+    return httpx.Response(200, stream=httpx.ByteStream(b'x' * 1024))
+
+
+async def test_calls_recorded():
+    print("\n📊 调用记录")
+    calls = []
+    add_call_sink(calls.append)
+    transport = InstrumentedTransport('mock_provider', retry_count=1, transport=httpx.MockTransport(handler))
+    try:
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get('https://api.example.com/number/+14155550123?key=secret')
+            await client.get('https://api.example.com/fail/someone@example.com')
+            try:
+                await client.get('https://api.example.com/down')
+            except httpx.ConnectError:
+                pass
+    finally:
+        remove_call_sink(calls.append)
+
+    ok, failed, down = calls
+    assert (ok.status_code, ok.response_bytes, ok.retry_count, ok.success) == (200, 1024, 1, True)
+    assert ok.endpoint == 'api.example.com/number/{id}', ok.endpoint
+    assert (failed.status_code, failed.success, failed.error) == (503, False, 'HTTP 503')
+    assert failed.endpoint == 'api.example.com/fail/{id}', failed.endpoint
+    assert down.status_code == 0 and down.error.startswith('ConnectError')
+    for call in calls:
+        print(f"  ✅ {call.method} {call.endpoint} -> {call.status_code} ({call.response_bytes} bytes, {call.latency_ms}ms)")
+
+
+async def test_fixed_endpoint():
+    print("\n🖼️ 固定端点标识")
+    calls = []
+    add_call_sink(calls.append)
+    transport = InstrumentedTransport('image_proxy', transport=httpx.MockTransport(handler), endpoint='{image_host}')
+    try:
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get('https://avatars.somecdn.example/u/123.jpg')
+    finally:
+        remove_call_sink(calls.append)
+    assert [c.endpoint for c in calls] == ['{image_host}'], calls
+    print("  ✅ 图片地址记为 {image_host}")
+
+
+def test_env_proxies():
+    print("\n🌐 代理环境变量")
+    saved = {k: os.environ.get(k) for k in ('HTTPS_PROXY', 'NO_PROXY')}
+    override = http_instrumentation.PROVIDER_BASE_URL_OVERRIDE
+    os.environ['HTTPS_PROXY'] = 'http://proxy.internal:3128'
+    os.environ['NO_PROXY'] = 'internal.example'
+    http_instrumentation.PROVIDER_BASE_URL_OVERRIDE = ''
+    try:
+        plain = httpx.AsyncClient()
+        client = provider_client('mock_provider')
+        for url in ('https://api.example.com/x', 'https://internal.example/x', 'http://api.example.com/x'):
+            expected = plain._transport_for_url(httpx.URL(url))
+            actual = client._transport_for_url(httpx.URL(url))
+            assert isinstance(actual, InstrumentedTransport), (url, actual)
+            assert type(actual._transport._pool) is type(expected._pool), (url, actual._transport._pool, expected._pool)
+        assert client._transport_for_url(httpx.URL('https://api.example.com/x')) is not client._transport
+        assert client._transport_for_url(httpx.URL('https://internal.example/x')) is client._transport
+        print("  ✅ HTTPS 请求走代理，NO_PROXY 与 HTTP 请求直连（与 httpx.AsyncClient 一致）")
+
+        assert not provider_client('mock_provider', trust_env=False)._mounts
+        http_instrumentation.PROVIDER_BASE_URL_OVERRIDE = 'http://127.0.0.1:9'
+        assert not provider_client('mock_provider')._mounts
+        print("  ✅ trust_env=False 或改发到 mock 服务器时不使用代理")
+    finally:
+        http_instrumentation.PROVIDER_BASE_URL_OVERRIDE = override
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+async def test_batched_sink():
+    print("\n💾 批量写入")
+    usage_sink.start()
+    transport = InstrumentedTransport('mock_provider', transport=httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        await asyncio.gather(*(client.get(f'https://api.example.com/item/{i}') for i in range(20)))
+    assert usage_sink.get_sink_stats()['pending'] == 20
+    await usage_sink.stop()
+
+    stats = usage_sink.get_sink_stats()
+    db_session = SessionLocal()
+    try:
+        rows = db_session.query(APIUsageLog).filter(APIUsageLog.api_name == 'mock_provider').count()
+    finally:
+        db_session.close()
+    assert rows == 20 and stats['flushes'] == 1, (rows, stats)
+    print(f"  ✅ {rows} 条记录一次写入: {stats}")
+
+
+async def main():
+    init_db()
+    await test_calls_recorded()
+    await test_fixed_endpoint()
+    test_env_proxies()
+    await test_batched_sink()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+提供商注册表测试（不访问外部接口，提供商查询函数替换为本地桩函数）
+- 聚合查询按注册表调度：顺序、停用、成本上限、外层超时、依赖
+- 启用状态持久化到 provider_settings 表并被其他进程加载
+- 管理员接口列出和启用/停用提供商
+- quick/deep 查询模式：快速结果单独缓存，深度查询复用快速结果只补查其余提供商
+"""
+import asyncio
+import dataclasses
+import os
+import sys
+import tempfile
+
+_workdir = tempfile.mkdtemp()
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault('BLOB_STORE_DIR', os.path.join(_workdir, 'blobs'))
+os.environ['MONGO_URL'] = ''
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+
+from apis import provider_registry
+from apis.aggregator import query_phone_comprehensive
+
+PHONE = '+14155550123'
+calls = []
+
+
+def stub(name: str, delay: float = 0.0, success: bool = True):
+    async def query(phone, **kwargs):
+        calls.append(name)
+        await asyncio.sleep(delay)
+        return {"success": success, "data": {"phone": phone}, "error": None if success else "stub error", "source": name}
+    return query
+
+
+def install_stubs():
+    calls.clear()
+    provider_registry._enabled_overrides.clear()
+    for spec in provider_registry.PROVIDERS.values():
+        provider_registry._callables[spec.name] = stub(spec.name)
+
+
+def sources(result):
+    return [r['source'] for r in result.data or []]
+
+
+async def test_schedule():
+    print("\n📋 按注册表调度")
+    install_stubs()
+    phone_providers = [s.name for s in provider_registry.PROVIDERS.values() if s.input_type == 'phone']
+    result = await query_phone_comprehensive(PHONE)
+    assert sources(result) == phone_providers, sources(result)
+    print(f"  ✅ 默认调度 {len(phone_providers)} 个电话提供商，顺序与注册表一致")
+
+    provider_registry.set_enabled('investigate_api', False)
+    result = await query_phone_comprehensive(PHONE)
+    assert 'investigate_api' not in sources(result) and 'investigate_api' not in calls[len(phone_providers):]
+    provider_registry.set_enabled('investigate_api', True)
+    print("  ✅ 停用后不再调用")
+
+    result = await query_phone_comprehensive(PHONE, max_cost=0.01)
+    assert not {'investigate_api', 'data_breach', 'external_lookup'} & set(sources(result)), sources(result)
+    print(f"  ✅ 成本上限 $0.01: {len(result.data)} 个提供商")
+
+
+async def test_timeout_and_dependencies():
+    print("\n⏱️ 外层超时与依赖")
+    install_stubs()
+    original = dict(provider_registry.PROVIDERS)
+    try:
+        provider_registry.PROVIDERS['whatsapp'] = dataclasses.replace(original['whatsapp'], timeout=0.05)
+        provider_registry._callables['whatsapp'] = stub('whatsapp', delay=1)
+        provider_registry.PROVIDERS['enrich'] = provider_registry.ProviderSpec(
+            'enrich', 'phone', 'unused:unused', cost=0.0, expected_latency_ms=10, depends_on=('caller_id',))
+        provider_registry._callables['enrich'] = stub('enrich')
+
+        result = await query_phone_comprehensive(PHONE)
+        by_source = {r['source']: r for r in result.data}
+        assert not by_source['whatsapp']['success'] and 'timeout' in by_source['whatsapp']['error'].lower()
+        assert by_source['enrich']['success'] and calls.index('enrich') > calls.index('caller_id')
+        print("  ✅ whatsapp 外层超时返回失败结果；enrich 在 caller_id 成功后调用")
+
+        provider_registry._callables['caller_id'] = stub('caller_id', success=False)
+        calls.clear()
+        result = await query_phone_comprehensive(PHONE)
+        by_source = {r['source']: r for r in result.data}
+        assert not by_source['enrich']['success'] and 'enrich' not in calls, by_source['enrich']
+        print(f"  ✅ 依赖失败时跳过: {by_source['enrich']['error']}")
+
+        provider_registry.set_enabled('caller_id', False)
+        assert 'enrich' not in [s.name for s in provider_registry.select_providers('phone')]
+        print("  ✅ 依赖停用时一并跳过")
+    finally:
+        provider_registry.PROVIDERS.clear()
+        provider_registry.PROVIDERS.update(original)
+        provider_registry._callables.pop('enrich', None)
+        provider_registry._enabled_overrides.clear()
+
+    assert provider_registry.result_cache_ttl('phone', [{'source': 'caller_id', 'success': True}]) == 86400
+    assert provider_registry.result_cache_ttl('phone', None) == provider_registry.DEFAULT_CACHE_TTL
+
+
+async def test_admin_api():
+    print("\n🔧 管理员接口与持久化")
+    import server
+    from db_operations import load_provider_settings
+
+    install_stubs()
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            login = (await client.post('/api/auth/login', json={'username': 'admin', 'password': 'admin123'})).json()
+            token = login['session_token']
+
+            providers = (await client.get('/api/admin/providers', params={'session_token': token})).json()['data']
+            assert [p['name'] for p in providers] == list(provider_registry.PROVIDERS)
+            hibp = next(p for p in providers if p['name'] == 'hibp')
+            assert hibp['enabled'] is False and hibp['requires'] == ['HIBP_API_KEY']
+            print(f"  ✅ 列出 {len(providers)} 个提供商")
+
+            response = await client.patch('/api/admin/providers/data_breach', params={'session_token': token},
+                                          json={'enabled': False})
+            assert response.json()['data']['enabled'] is False
+            assert load_provider_settings() == {'data_breach': False}
+            result = await query_phone_comprehensive(PHONE)
+            assert 'data_breach' not in sources(result)
+            print("  ✅ 停用 data_breach：已保存到 provider_settings 并立即生效")
+
+            # 模拟另一个进程：内存状态丢失后从数据库重新加载
+            provider_registry._enabled_overrides.clear()
+            await provider_registry.refresh_settings(force=True)
+            assert not provider_registry.is_enabled('data_breach')
+            print("  ✅ 其他进程刷新后加载到相同状态")
+
+            response = await client.patch('/api/admin/providers/nope', params={'session_token': token},
+                                          json={'enabled': True})
+            assert response.status_code == 404
+            response = await client.get('/api/admin/providers', params={'session_token': 'invalid'})
+            assert response.status_code == 403
+            print("  ✅ 未知提供商 404，非管理员 403")
+
+            await client.patch('/api/admin/providers/data_breach', params={'session_token': token},
+                               json={'enabled': True})
+
+
+async def test_query_modes():
+    print("\n⚡ quick/deep 查询模式")
+    import server
+
+    install_stubs()
+    quick = [s.name for s in provider_registry.PROVIDERS.values()
+             if s.input_type == 'phone' and s.expected_latency_ms <= provider_registry.QUICK_MAX_LATENCY_MS]
+    deep = [s.name for s in provider_registry.PROVIDERS.values() if s.input_type == 'phone']
+
+    original_timeout = provider_registry.QUICK_PROVIDER_TIMEOUT
+    provider_registry.QUICK_PROVIDER_TIMEOUT = 0.05
+    try:
+        provider_registry._callables['callapp'] = stub('callapp', delay=1)
+        result = await query_phone_comprehensive(PHONE, mode='quick')
+        assert result.mode == 'quick' and sources(result) == quick, sources(result)
+        callapp = next(r for r in result.data if r['source'] == 'callapp')
+        assert not callapp['success'] and 'timeout' in callapp['error'].lower()
+        print(f"  ✅ quick 只调度 {len(quick)} 个低延迟提供商，超过 {provider_registry.QUICK_PROVIDER_TIMEOUT}s 的按超时处理")
+    finally:
+        provider_registry.QUICK_PROVIDER_TIMEOUT = original_timeout
+
+    install_stubs()
+    phone = '+14155550999'
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            async def query(mode):
+                calls.clear()
+                response = await client.post('/api/phone/query', json={'phone': phone, 'mode': mode})
+                assert response.status_code == 200, response.text
+                return response.json(), list(calls)
+
+            body, called = await query('quick')
+            assert body['mode'] == 'quick' and sorted(called) == sorted(quick), called
+            body, called = await query('quick')
+            assert body['mode'] == 'quick' and called == []
+            print("  ✅ quick 结果单独缓存")
+
+            body, called = await query('deep')
+            assert body['mode'] == 'deep' and sorted(called) == sorted(set(deep) - set(quick)), called
+            assert [r['source'] for r in body['data']] == deep
+            print(f"  ✅ deep 复用快速结果，只补查 {len(called)} 个提供商")
+
+            body, called = await query('quick')
+            assert body['mode'] == 'deep' and called == []
+            print("  ✅ 已有深度结果时 quick 直接返回深度缓存")
+
+            response = await client.post('/api/phone/query', json={'phone': phone, 'mode': 'bogus'})
+            assert response.status_code == 422
+
+
+async def main():
+    await test_schedule()
+    await test_timeout_and_dependencies()
+    await test_admin_api()
+    await test_query_modes()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
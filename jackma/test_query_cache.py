@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+电话/邮箱查询数据库缓存测试（不访问外部接口，聚合查询被替换为计数的假实现）
+- 第二次相同查询命中第一次查询保存的缓存，不再调用聚合查询
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/query_cache_test.db"
+os.environ.setdefault('MONGO_URL', '')
+os.environ.setdefault('IMAGE_CACHE_DIR', tempfile.mkdtemp())
+os.environ.setdefault('BLOB_STORE_DIR', tempfile.mkdtemp())
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+
+PHONE = '+14155550123'
+EMAIL = 'someone@example.com'
+
+
+async def test_repeat_query_hits_cache():
+    print("\n🗃️ 重复查询命中数据库缓存")
+    import apis
+    import server
+
+    calls = []
+
+    async def fake_phone(phone, mode='deep', reuse=None):
+        calls.append(('phone', phone))
+        return {"success": True, "phone": phone, "mode": mode, "data": {"fake": {"success": True, "data": {"n": 1}}}}
+
+    async def fake_email(email):
+        calls.append(('email', email))
+        return {"success": True, "email": email, "data": {"fake": {"success": True, "data": {"n": 1}}}}
+
+    apis.query_phone_comprehensive = fake_phone
+    apis.query_email_comprehensive = fake_email
+
+    async with server.app.router.lifespan_context(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            for path, body in (('/api/phone/query', {'phone': PHONE}), ('/api/email/query', {'email': EMAIL})):
+                first = await client.post(path, json=body)
+                second = await client.post(path, json=body)
+                assert first.status_code == 200 and second.status_code == 200
+                assert second.json() == first.json(), (first.json(), second.json())
+
+    # 回归：查询时使用 phone_/email_ 前缀的键，而结果按原值保存，缓存从未命中
+    assert calls == [('phone', PHONE), ('email', EMAIL)], calls
+    print(f"  ✅ 2 次电话查询、2 次邮箱查询，聚合查询只调用 {len(calls)} 次")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_repeat_query_hits_cache())
+    print("\n✅ 全部通过")
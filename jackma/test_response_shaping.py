@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+查询结果响应裁剪测试
+- 重复子树替换为 JSON Pointer 引用，键名包含 . [ / ~ 时仍可还原
+- 大小限制先于去重执行，引用不会指向被移除或截断的数据
+"""
+import os
+import sys
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from apis.response_shaping import dedupe_subtrees, shape_provider_result
+
+
+def resolve(root, node=None):
+    """与 frontend/src/utils/responseRefs.js 相同的还原逻辑"""
+    def get(path):
+        target = root
+        for part in path.split('/')[1:]:
+            part = part.replace('~1', '/').replace('~0', '~')
+            target = target[int(part)] if isinstance(target, list) else target[part]
+        return target
+
+    node = root if node is None else node
+    items = enumerate(node) if isinstance(node, list) else node.items()
+    for key, child in list(items):
+        if isinstance(child, dict) and list(child) == ['$ref']:
+            node[key] = get(child['$ref'])
+        elif isinstance(child, (dict, list)):
+            resolve(root, child)
+    return root
+
+
+def subtree(tag):
+    return {'photos': [f'https://example.com/{tag}/photo-{i:04d}-large-resolution.jpg' for i in range(40)]}
+
+
+def test_pointer_paths():
+    print("\n🔗 引用路径")
+    data = {'profile.name': {'a[0]': subtree('x')}, 'x/y~z': [subtree('x')], 'copy': subtree('x')}
+    original = {'profile.name': {'a[0]': subtree('x')}, 'x/y~z': [subtree('x')], 'copy': subtree('x')}
+    deduped, replaced = dedupe_subtrees(data, min_bytes=100)
+    assert replaced == 2 and deduped['copy'] == {'$ref': '/profile.name/a[0]'}, deduped
+    assert resolve(deduped) == original
+    print(f"  ✅ {replaced} 个引用，含 . [ / ~ 的键名可还原")
+
+
+def test_cap_before_dedupe():
+    print("\n📏 大小限制与去重")
+    result = {'success': True, 'source': 'x', 'data': {'a': subtree('a'), 'b': subtree('a')}}
+    shaped = shape_provider_result(result, max_bytes=3000)
+    assert len(shaped['_omitted']) == 1 and list(shaped['data'].values()) == [subtree('a')], shaped
+    print(f"  ✅ 移除 {shaped['_omitted'][0]} 后另一份保留完整数据")
+
+    result = {'success': True, 'source': 'x', 'data': {
+        'items': [{'id': i, 'name': f'item {i}'} for i in range(60)] + [subtree('dup')],
+        'other': subtree('dup'),
+    }}
+    shaped = shape_provider_result(result, max_bytes=5000)
+    assert shaped.get('_truncated') and len(shaped['data']['items']) == 50, shaped
+    assert '$ref' not in str(shaped['data']) and resolve(shaped['data'])['other'] == subtree('dup')
+    print("  ✅ 列表截断后引用均可还原")
+
+
+if __name__ == "__main__":
+    test_pointer_paths()
+    test_cap_before_dedupe()
+    print("\n✅ 全部通过")
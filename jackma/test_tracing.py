@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+链路追踪测试（内存导出器，不访问外部接口）
+- HTTP 根 span 使用路由模板命名，延续请求头中的 traceparent
+- 数据库/缓存/提供商子 span
+- Celery 任务 span 延续提交任务时的链路
+- span 名称和属性中不出现电话号码、邮箱
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ['TRACING_EXPORTER'] = 'memory'
+os.environ['DATABASE_URL'] = f"sqlite:///{tempfile.mkdtemp()}/tracing_test.db"
+os.environ.setdefault('MONGO_URL', '')
+os.environ.setdefault('IMAGE_CACHE_DIR', tempfile.mkdtemp())
+os.environ.setdefault('BLOB_STORE_DIR', tempfile.mkdtemp())
+
+# 添加后端路径到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import httpx
+
+PHONE = '+1 (415) 555-0123'
+EMAIL = 'someone@example.com'
+TRACE_ID = '4bf92f3577b34da6a3ce929d0e0e4736'
+
+
+def assert_no_pii(spans):
+    for span in spans:
+        text = span.name + ' ' + ' '.join(str(v) for v in span.attributes.values())
+        assert '555-0123' not in text and '5550123' not in text and EMAIL not in text, (span.name, span.attributes)
+
+
+def test_redact():
+    print("\n🔒 属性脱敏")
+    from apis.tracing import redact
+    assert redact(f"lookup {PHONE} / {EMAIL}") == 'lookup <phone> / <email>'
+    assert redact('/api/phone/+14155550123') == '/api/phone/<phone>'
+    assert redact(42) == 42
+    print("  ✅ 电话号码和邮箱已替换")
+
+
+async def test_request_spans():
+    print("\n🌐 HTTP 请求链路")
+    import server
+    import telemetry
+    from db_operations import save_cache
+    from models import SessionLocal
+
+    async with server.app.router.lifespan_context(server.app):
+        exporter = telemetry.get_memory_exporter()
+        db_session = SessionLocal()
+        save_cache(db_session, PHONE, "phone", {"success": True, "phone": PHONE, "data": []})
+        db_session.close()
+        exporter.clear()
+
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.post(
+                '/api/phone/query', json={'phone': PHONE},
+                headers={'traceparent': f'00-{TRACE_ID}-00f067aa0ba902b7-01'}
+            )
+        assert response.status_code == 200
+
+        spans = exporter.get_finished_spans()
+        root = next(s for s in spans if s.name == 'POST /api/phone/query')
+        assert format(root.context.trace_id, '032x') == TRACE_ID
+        # 沿父 span 向上查找请求 span（较新版本的 FastAPI 自带的 span 可能位于中间）
+        by_id = {s.context.span_id: s for s in spans}
+        ancestor = next(s for s in spans if s.name == 'db.get_cache')
+        while ancestor.parent is not None and ancestor.parent.span_id in by_id:
+            ancestor = by_id[ancestor.parent.span_id]
+        assert ancestor.name == 'POST /api/phone/query', ancestor.name
+        assert_no_pii(spans)
+        for span in spans:
+            print(f"  ✅ {span.name} {dict(span.attributes)}")
+
+
+async def test_provider_and_task_spans():
+    print("\n🧵 提供商与 Celery 任务链路")
+    import telemetry
+    from apis.aggregator import _timed
+    from apis.tracing import start_span
+
+    telemetry.configure_tracing('osint-test')
+    exporter = telemetry.get_memory_exporter()
+
+    async def fake_provider():
+        return {"success": False, "error": f"Query timeout for {PHONE}", "source": "whatsapp"}
+
+    with start_span("request", query=EMAIL) as parent:
+        await _timed("whatsapp", fake_provider())
+        trace_context = telemetry.celery_trace_context()
+
+    # 模拟 worker 中的 task_prerun / task_postrun
+    telemetry.start_task_span('task-1', 'osint_tracker.query_phone', trace_context)
+    with start_span("db.save_phone_query"):
+        pass
+    telemetry.end_task_span('task-1', 'SUCCESS')
+
+    spans = {s.name: s for s in exporter.get_finished_spans()}
+    provider = spans['provider whatsapp']
+    assert provider.parent.span_id == parent.get_span_context().span_id
+    assert provider.attributes['provider.outcome'] == 'timeout'
+    task = spans['celery osint_tracker.query_phone']
+    assert task.parent.span_id == parent.get_span_context().span_id
+    assert 'celery.queue_wait_ms' in task.attributes
+    assert spans['db.save_phone_query'].parent.span_id == task.context.span_id
+    assert spans['request'].attributes['query'] == '<email>'
+    assert_no_pii(spans.values())
+    for name, span in spans.items():
+        print(f"  ✅ {name} {dict(span.attributes)}")
+
+
+async def main():
+    test_redact()
+    await test_provider_and_task_spans()
+    # 服务关闭时会关闭 TracerProvider，放在最后
+    await test_request_spans()
+    print("\n✅ 全部通过")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())